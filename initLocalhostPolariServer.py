@@ -17,6 +17,12 @@ from wsgiref.simple_server import make_server, WSGIServer
 from socketserver import ThreadingMixIn
 from falcon import falcon
 
+try:
+    import uvicorn
+    HAS_UVICORN = True
+except ImportError:
+    HAS_UVICORN = False
+
 
 class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
     """Multi-threaded WSGI server to handle concurrent requests.
@@ -82,6 +88,40 @@ def run_https_server(app, port):
         print(f"[HTTPS] HTTPS server on port {port} has stopped")
 
 
+def run_asgi_server(app, port, use_ssl=False):
+    """Run an ASGI app under uvicorn on the specified port, optionally with SSL.
+
+    uvicorn's pure-Python HTTP protocol (h11) and asyncio loop are used, so no
+    compiled extras are needed.  Signal handlers are only installed when run
+    from the main thread.
+    """
+    label = "HTTPS" if use_ssl else "HTTP"
+    server_config = uvicorn.Config(
+        app, host='', port=port, http='h11', loop='asyncio', lifespan='off',
+        log_level='warning',
+        ssl_certfile=SSL_CERT_PATH if use_ssl else None,
+        ssl_keyfile=SSL_KEY_PATH if use_ssl else None
+    )
+    server = uvicorn.Server(server_config)
+    if threading.current_thread() is not threading.main_thread():
+        server.install_signal_handlers = lambda: None
+    try:
+        print(f"[{label}] ASGI server starting on port {port}")
+        server.run()
+    except Exception as e:
+        print(f"[{label}] Server error: {e}")
+        print(f"[{label}] {label} server on port {port} has stopped")
+
+
+def get_server_mode():
+    """Return 'asgi' when configured and uvicorn is installed, otherwise 'wsgi'."""
+    server_mode = config.get_string('api.server_mode', 'wsgi').lower()
+    if server_mode == 'asgi' and not HAS_UVICORN:
+        print("[Server] api.server_mode is asgi but uvicorn is not installed - using wsgi")
+        return 'wsgi'
+    return 'asgi' if server_mode == 'asgi' else 'wsgi'
+
+
 if(__name__=='__main__'):
     print("="*70)
     print("POLARI BACKEND SERVER STARTING")
@@ -94,6 +134,10 @@ if(__name__=='__main__'):
     # Persist all initialized instances to database
     if db_enabled and localHostedManagerServer.db is not None:
         localHostedManagerServer.persistTree()
+        # Optionally keep persisting changed instances in the background
+        persist_interval = config.get_int('database.persist_interval', 0)
+        if persist_interval > 0:
+            localHostedManagerServer.startPersistInterval(persist_interval)
 
     # Get backend port from configuration
     http_port = get_backend_port()
@@ -121,6 +165,27 @@ if(__name__=='__main__'):
     print("\n" + "="*70 + "\n")
 
     falcon_app = localHostedManagerServer.polServer.falconServer
+    server_mode = get_server_mode()
+
+    if server_mode == 'asgi':
+        # Both servers share one ASGI app, so requests share one bounded worker pool
+        asgi_workers = config.get_int('api.asgi_workers', 16)
+        asgi_stream_workers = config.get_int('api.asgi_stream_workers', 8)
+        asgi_app = localHostedManagerServer.polServer.buildASGIApp(maxWorkers=asgi_workers, maxStreamWorkers=asgi_stream_workers)
+        print(f"[Server] ASGI mode with {asgi_workers} worker threads and {asgi_stream_workers} stream workers")
+
+        if ssl_available:
+            https_thread = threading.Thread(
+                target=run_asgi_server,
+                args=(asgi_app, HTTPS_PORT, True),
+                daemon=True
+            )
+            https_thread.start()
+            print(f"[HTTPS] Background server started on port {HTTPS_PORT}")
+
+        print(f"[HTTP]  Server listening on port {http_port}...")
+        run_asgi_server(asgi_app, http_port)
+        sys.exit(0)
 
     if ssl_available:
         # Start HTTPS server in a separate thread
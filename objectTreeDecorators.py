@@ -25,6 +25,10 @@ import types, inspect, base64
 # for update/delete operations!
 TREE_OBJECT_INTERNAL_VARS = frozenset({'manager', 'branch', 'inTree'})
 
+# Types of values which can never reference a tree object, so assigning them needs no
+# tree handling.  Compared against type(value) directly, so subclasses take the full path.
+PRIMITIVE_SET_TYPES = frozenset({str, int, float, bool, complex, bytes, type(None)})
+
 
 def treeObjectInit(init):
     #Note: For objects instantiated using this Decorator, MUST USER KEYWORD ARGUMENTS NOT POSITIONAL, EX: (manager=mngObj, id='base64Id')
@@ -77,8 +81,43 @@ class treeObject:
             else:
                 self.manager.objectTables[key] = {}
                 self.manager.objectTables[key][self.id] = self
+            if(getattr(self.manager, 'dirtyTracking', False)):
+                self.manager.markInstanceDirty(self)
+            if(getattr(self.manager, 'attributeIndexes', None)):
+                self.manager.indexInstance(self)
+            if(hasattr(self.manager, 'classVersions')):
+                self.manager.bumpClassVersion(key, self.id)
+
+    #Only reached for attributes missing from the instance, which for an instance restored lazily
+    #from the database means it is still a stub, so it is hydrated from its row and looked up again.
+    def __getattr__(self, name):
+        currentManager = self.__dict__.get('manager')
+        if(currentManager is not None and name[:2] != '__' and hasattr(type(currentManager), 'hydrateInstance')):
+            if(currentManager.hydrateInstance(self)):
+                return getattr(self, name)
+        raise AttributeError("'" + type(self).__name__ + "' object has no attribute '" + name + "'")
 
     def __setattr__(self, name, value):
+        #Record the change for the manager's next incremental persist.  The instance is read
+        #when the changes are flushed, so marking it before the value is set is enough.
+        currentManager = self.__dict__.get('manager')
+        if(currentManager is not None and name not in TREE_OBJECT_INTERNAL_VARS):
+            #A lazily restored stub is built from its row first, so the row cannot overwrite the new value.
+            if(currentManager.__dict__.get('unhydratedInstances')):
+                currentManager.hydrateInstance(self)
+            if(getattr(currentManager, 'dirtyTracking', False)):
+                currentManager.markInstanceDirty(self)
+            #Keep any secondary index on this attribute in step with the new value.
+            attributeIndexes = getattr(currentManager, 'attributeIndexes', None)
+            if(attributeIndexes and name in attributeIndexes.get(self.__class__.__name__, ())):
+                currentManager.updateAttributeIndex(self, name, value)
+            if(hasattr(currentManager, 'classVersions')):
+                currentManager.bumpClassVersion(self.__class__.__name__, self.__dict__.get('id'))
+        #Fast path for primitive values, which never need to be wired into the tree.  The
+        #manager and branch are excluded since assigning them places the object in the tree.
+        if(type(value) in PRIMITIVE_SET_TYPES and name != 'manager' and name != 'branch'):
+            super(treeObject, self).__setattr__(name, value)
+            return
         if(type(value).__name__ == 'list'):
             #print("converting from list with value ", value, " to a polariList.")
             #Instead of initializing a polariList, we try to just cast the list to be type polariList.
@@ -97,7 +136,7 @@ class treeObject:
                         #TODO Confirm that the value being assigned has a treeObject base type.
                         super(treeObject, self).__setattr__(name, value[2])
                         if(hasattr(self, 'manager')):
-                            if(self.manager != None):
+                            if(self.manager != None and not self.deferTreeWiring(self.manager)):
                                 self.managerSet(potentialManager=self.manager)
                         return
                     else:
@@ -109,7 +148,7 @@ class treeObject:
                         #TODO Confirm that the value being assigned has a treeObject base type.
                         super(treeObject, self).__setattr__(name, value)
                         if(hasattr(self, 'manager')):
-                            if(self.manager != None):
+                            if(self.manager != None and not self.deferTreeWiring(self.manager)):
                                 self.managerSet(potentialManager=self.manager)
                         return
                     else:
@@ -123,6 +162,9 @@ class treeObject:
                         pass
                 if(hasattr(self, 'branch')):
                     if(self.branch != None):
+                        if(self.deferTreeWiring(value)):
+                            super(treeObject, self).__setattr__(name, value)
+                            return
                         self.managerSet(potentialManager=value)
                         return
                 super(treeObject, self).__setattr__(name, value)
@@ -136,6 +178,12 @@ class treeObject:
                         else:
                             value.objectTables[key] = {}
                             value.objectTables[key][self.id] = self
+                        if(getattr(value, 'dirtyTracking', False)):
+                            value.markInstanceDirty(self)
+                        if(getattr(value, 'attributeIndexes', None)):
+                            value.indexInstance(self)
+                        if(hasattr(value, 'classVersions')):
+                            value.bumpClassVersion(key, self.id)
                 return
         elif(self.manager == None or not hasattr(self, 'branch')):
             super(treeObject, self).__setattr__(name, value)
@@ -146,6 +194,10 @@ class treeObject:
         if(self.__class__.__name__ == 'polyTypedObject' or self.__class__.__name__ == 'polyTypedVariable'):
             super(treeObject, self).__setattr__(name, value)
             return
+        if(self.manager != None and self.branch != None and self.deferTreeWiring(self.manager)):
+            #Wiring of the referenced instances happens when the manager's batch ends.
+            super(treeObject, self).__setattr__(name, value)
+            return
         if(self.manager != None and self.branch != None):
             #print("Setting non-standard value on treeObject after manager is set and branch is set.")
             selfPolyObj = self.manager.getObjectTyping(self.__class__)
@@ -309,6 +361,15 @@ class treeObject:
         super(treeObject, self).__setattr__(name, value)
 
 
+    #While the manager is in batch mode, queues this object to be wired into the tree when the
+    #batch ends and returns True, otherwise returns False so the wiring happens immediately.
+    def deferTreeWiring(self, potentialManager):
+        pendingWiring = getattr(potentialManager, 'batchPendingWiring', None)
+        if(pendingWiring == None or potentialManager.batchDepth == 0):
+            return False
+        pendingWiring[self] = None
+        return True
+
     #A function that triggers when the manager has just been set on the object instance
     #This first goes in and ascertains that the object has indeed been added to the
     #object tree.  currentBranchObject should be the treeObject instance that self
@@ -514,9 +575,16 @@ class treeObject:
             #print('current object: ', self)
             #print('Object\'s manager: ', self.manager)
             #print('manager idList: ', self.manager.idList)
-            if(not idString in self.manager.idList):
+            idSet = getattr(self.manager, 'idSet', None)
+            if(idSet is None):
+                idTaken = idString in self.manager.idList
+            else:
+                idTaken = idString in idSet
+            if(not idTaken):
                 self.id = idString
                 (self.manager.idList).append(idString)
+                if(idSet is not None):
+                    idSet.add(idString)
                 return
             else:
                 self.id = self.makeUniqueIdentifier(self, N=N+1)
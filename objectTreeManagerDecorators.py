@@ -14,16 +14,24 @@
 #    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from functools import wraps
 from polariDataTyping.polyTyping import *
-from objectTreeDecorators import TREE_OBJECT_INTERNAL_VARS
+from objectTreeDecorators import treeObject, TREE_OBJECT_INTERNAL_VARS, PRIMITIVE_SET_TYPES
+from objectTreeQueryIndexes import hashAttributeIndex, sortedAttributeIndex, queryValueKey, queryConditionHolds, querySortKey, QUERY_OPERATORS
+from objectTreeQueryLanguage import compileObjectTreeQuery
+from objectTreeSerializer import compiledClassSerializer, dumpJSONbytes
 from polariFiles.managedFiles import *
 from polariFiles.managedExecutables import *
 from polariNetworking.defineLocalSys import isoSys
 from polariDBmanagement.managedDB import *
+from polariDBmanagement.sqliteConnectionPool import dbConnectionPool
 from polariApiServer.polariServer import polariServer
 #from polariFiles.managedImages import *
 from polariDataTyping.polariList import polariList
 from polariFiles.dataChannels import *
-import types, inspect, base64, json, os, time, sqlite3
+import types, inspect, base64, json, os, time, threading, hashlib, itertools
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+import heapq
 import psutil
 from datetime import datetime
 
@@ -37,6 +45,63 @@ def _captureResourceCheckpoint():
         "timestamp": str(datetime.now())
     }
 
+# Properties skipped when fingerprinting seed instances:
+# - Tree infrastructure internals
+# - Per-boot random/volatile values
+# - Live object references (different memory address each boot)
+# - Timestamped metrics
+SEED_FINGERPRINT_IGNORED_PROPS = frozenset({
+    '_branch_path', 'manager', 'branch', 'inTree', 'complete',
+    'objectTree', 'objectTables', 'objectTyping', 'objectTypingDict',
+    'polServer', 'hostSys', 'subManagers', 'db',
+    # User: random per boot
+    'sessionSecret', 'sessionCookie', 'sessionJWT',
+    # isoSys: Docker container changes hostname each restart
+    'networkName', 'IPaddress', 'domainName',
+    # isoSys: timestamped memory metrics (contain datetime.now())
+    'availableMainMemoryInBytes', 'percentMainMemoryUsed',
+    'usedMainMemoryInBytes', 'freeMainMemoryInBytes',
+    'swappedOutMemory', 'swappedInMemory',
+    'freeSwapMemoryInBytes', 'usedSwapMemoryInBytes',
+    'SwapMemoryConsumptionVectorInBytesPerVarMilliSeconds',
+    # polariServer: random/volatile per boot
+    'serverPasswordSaltDict', 'falconServer', 'lastCycleTime',
+    'serverInstance', 'publicFrontendKey', 'privateFrontendKey'
+})
+# String forms treated as the same boolean, so Python True/False matches SQLite 1/0.
+_SEED_TRUTHY = frozenset({'True', 'true', '1', '1.0'})
+_SEED_FALSY = frozenset({'False', 'false', '0', '0.0', 'None', 'none', ''})
+
+# Default for attributes an instance does not have, which never match a query requirement.
+_MISSING_ATTRIBUTE = object()
+# Number of compiled object tree queries each manager keeps, keyed by query text.
+COMPILED_QUERY_CACHE_SIZE = 256
+
+def _normalizeSeedValue(value):
+    """Reduce a runtime value or a stored DB value to the canonical form both share."""
+    if value is None or value == []:
+        return 'F'
+    # DB stores dicts/lists as JSON strings while runtime has Python objects
+    if isinstance(value, str) and (value.startswith('{') or value.startswith('[')):
+        try:
+            value = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    if isinstance(value, (list, dict, tuple)):
+        return json.dumps(value, sort_keys=True, default=str)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    valueStr = str(value)
+    if valueStr in _SEED_TRUTHY:
+        return 'T'
+    if valueStr in _SEED_FALSY:
+        return 'F'
+    return valueStr
+
+def _seedFingerprint(values):
+    """Hash the normalized values of a row's seedable columns, stable across boots."""
+    return hashlib.sha1('\x1f'.join([_normalizeSeedValue(value) for value in values]).encode('utf-8')).hexdigest()
+
 def managerObjectInit(init):
     #Note: For objects instantiated using this Decorator, MUST USER KEYWORD ARGUMENTS NOT POSITIONAL, EX: (manager=mngObj, id='base64Id')
     @wraps(init)
@@ -53,9 +118,65 @@ def managerObjectInit(init):
 #Defines a Decorator @managerObject, which allocates all variables and functions necessary for
 #an object to be a the manager object to an Object Tree.
 class managerObject:
+    #Locks, counters and events the manager uses at runtime, which are never typed, wired into
+    #the tree or persisted.
+    untypedVars = frozenset({'persistLock', 'persistIntervalStop', 'hydrationLock', 'versionCounter'})
+
     def __init__(self, *args, **keywordargs):
         #Adding on the necessary variables for a manager object, in the case they are not defined.
         self.complete = False
+        #Side indexes over the objectTree, maintained by every tree mutation so that path
+        #lookups do not need to walk the whole tree.  Both are keyed by (className, identifiers).
+        #FORMAT: objectTreeIndex = {(className, ids):{mainNodeTuple:parentNodeTuple}}
+        #FORMAT: objectTreeDuplicateIndex = {(className, ids):{(duplicateNodeTuple, parentNodeTuple):None}}
+        self.objectTreeIndex = {}
+        self.objectTreeDuplicateIndex = {}
+        #Registry of the main nodes in the objectTree partitioned by class and by depth, kept
+        #in step with objectTreeIndex so instance listings need no traversal.
+        #FORMAT: classInstanceRegistry = {className:{mainNodeTuple:depth}}
+        #FORMAT: depthInstanceRegistry = {depth:{mainNodeTuple:None}}
+        self.classInstanceRegistry = {}
+        self.depthInstanceRegistry = {}
+        #Set mirror of idList, used for constant-time uniqueness checks when generating ids.
+        self.idSet = set()
+        #Tree objects whose tree wiring was deferred while in batchMode, in the order they were
+        #queued, and the nesting depth of batchMode blocks.
+        self.batchPendingWiring = {}
+        self.batchDepth = 0
+        #Instances created, changed or removed since the last persist, which persistChanges
+        #writes to the database.  Only tracked for managers which have a database.
+        #FORMAT: dirtyInstances = {className:{id:instance}}
+        #FORMAT: deletedInstanceIds = {className:{id:None}}
+        self.dirtyInstances = {}
+        self.deletedInstanceIds = {}
+        self.dirtyTracking = bool(keywordargs.get('hasDB', False))
+        self.persistLock = threading.Lock()
+        self.persistIntervalStop = None
+        #Lazily restored instances which have not been built from their database row yet, and
+        #the per-class restore details, cached by (className, columnNames).
+        #FORMAT: unhydratedInstances = {className:{id:(stubInstance, restoreInfo, row)}}
+        self.unhydratedInstances = {}
+        self.restoreInfoCache = {}
+        self.hydrationLock = threading.RLock()
+        self.bootRestoreProfile = None
+        #Secondary indexes over instance attributes, created with createAttributeIndex and used
+        #by getListOfInstancesByAttributes.
+        #FORMAT: attributeIndexes = {className:{attributeName:hashAttributeIndex or sortedAttributeIndex}}
+        self.attributeIndexes = {}
+        #Compiled queryObjectTree plans, keyed by query text.
+        self.compiledQueryCache = {}
+        #Serializers used by getJSONdictForClass, built the first time a class is sent.
+        #FORMAT: classSerializers = {className:compiledClassSerializer}
+        self.classSerializers = {}
+        #Version of each class, bumped whenever one of its instances is created, changed or
+        #removed, or its changes are persisted, and the time it last changed.  Versions are drawn
+        #from one counter shared by all classes, so they only increase even across threads.
+        #FORMAT: classVersions = {className:version}
+        #FORMAT: classModifiedTimes = {className:timeInSeconds}
+        self.classVersions = {}
+        self.classModifiedTimes = {}
+        self.versionCounter = itertools.count(1)
+        self.versionStartTime = time.time()
         if not 'manager' in keywordargs.keys():
             setattr(self, 'manager', None)
         if not 'hostSys' in keywordargs.keys():
@@ -71,6 +192,10 @@ class managerObject:
         #which is accessible through the class as a key for each typing object. (Need to keep list for API)
         if not 'objectTypingDict' in keywordargs.keys():
             setattr(self, 'objectTypingDict', {})
+        #Secondary key into the same typing registry, by the class object itself, so typing
+        #lookups for an instance or class never need to compare class names.
+        #FORMAT: objectTypingClassDict = {classObject:polyTypedObject}
+        self.objectTypingClassDict = {}
         if not 'objectTree' in keywordargs.keys():
             #print('setting object tree')
             setattr(self, 'objectTree', None)
@@ -103,6 +228,7 @@ class managerObject:
             #print('In parameters, found attribute ', name, ' with value ', keywordargs[name])
             if(name=='manager' or name=='branch' or name=='id' or name=='objectTables' or name=='objectTree' or name=='managedFiles' or name=='id' or name=='db' or name=='idList' or name=='cloudIdList' or name == 'subManagers' or name == 'polServer' or name == 'hasServer' or name == 'hasDB' or name == 'hostSys'):
                 setattr(self, name, keywordargs[name])
+        self.idSet.update(self.idList)
         self.primePolyTyping()
         self.complete = True
         # Boot resource profiling
@@ -281,19 +407,27 @@ class managerObject:
                     except Exception as e:
                         print(f'[DB] Skipping generalized table for {someClass}: {e}')
             print(f'[DB] Database jumpstarted with {len(self.db.tables)} tables ({tablesCreated} created)')
+            self.recordSeedFingerprints()
             self.bootResourcePostDB = _captureResourceCheckpoint()
 
-    def restoreFromDatabase(self, dbName, dbPath):
+    def restoreFromDatabase(self, dbName, dbPath, lazy=None):
         """Restore object tree from an existing SQLite database.
 
-        Loads all tables, creates instances from stored data,
-        and reconstructs the tree using _branch_path column.
+        Streams the rows of each table and restores them as instances.  In lazy
+        mode rows are registered as id stubs in objectTables and each is only built
+        when first accessed, while eager mode builds every instance up front.
 
         Args:
             dbName: Database file name (without .db extension)
             dbPath: Directory path containing the .db file
+            lazy: Restore lazily, defaults to config database.restore_mode == 'lazy'
         """
-        import json as jsonLib
+        if lazy is None:
+            try:
+                from config_loader import config
+                lazy = config.get('database.restore_mode', 'eager') == 'lazy'
+            except Exception:
+                lazy = False
 
         # 1. Connect to existing DB and load table list
         self.db = managedDatabase(name=dbName, manager=self)
@@ -320,11 +454,15 @@ class managerObject:
         except Exception as e:
             print(f'[DB] Error restoring dynamic classes: {e}')
 
-        # Identify seed instance IDs to skip during restore
-        seedDbIds = self.identifySeedDBIds()
+        # Identify seed instance IDs to skip during restore, and remember this boot's seeds
+        runtimeSeedFingerprints = self.getSeedFingerprints()
+        seedDbIds = self.identifySeedDBIds(runtimeSeedFingerprints)
 
-        # 2. Load instances from each table
-        restoredInstances = []  # list of (instance, branchPath)
+        # 2. Stream instances from each table.  In lazy mode rows are kept as id stubs in
+        # objectTables and only built into instances when first accessed, see hydrateInstance.
+        restoreStartTime = time.perf_counter()
+        restoredInstances = []
+        rowsRead = 0
         totalSeedSkips = 0
 
         for tableName in self.db.tables:
@@ -343,139 +481,281 @@ class managerObject:
             polyTypedObj = self.objectTypingDict[tName]
 
             try:
-                columnNames, dataTuples = self.db.getAllInTable(tName)
+                columnNames, rowIterator = self.db.iterateTableRows(tName)
             except Exception as e:
                 print(f'[DB] Error reading table {tName}: {e}')
                 continue
 
-            if not dataTuples:
+            restoreInfo = self.getRestoreInfo(tName, polyTypedObj, columnNames)
+            if restoreInfo is None:
                 continue
+            idIdx = restoreInfo['idIdx']
+            lazyTable = lazy and restoreInfo['lazyRestorable']
 
             # Get seed IDs to skip for this class (rows matching runtime instances)
             seedIdsForClass = seedDbIds.get(tName, set())
+            tableRestoreCount = 0
+            tableSeedSkips = 0
 
-            # Get class constructor
-            try:
-                CreateMethod = polyTypedObj.getCreateMethod()
-            except Exception as e:
-                print(f'[DB] Cannot get constructor for {tName}: {e}')
-                continue
-
-            # Inspect constructor to find required args and skip non-restorable classes
-            import inspect
-            try:
-                sig = inspect.signature(CreateMethod)
-            except (ValueError, TypeError):
-                sig = None
-            # Check if constructor requires args we can't supply from DB
-            if sig is not None:
-                nonRestorableArgs = set()
-                for paramName, param in sig.parameters.items():
-                    if paramName == 'self':
-                        continue
-                    if param.default is inspect.Parameter.empty and param.kind not in (
-                        inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD
-                    ):
-                        # Required positional/keyword arg — check if it's in DB columns or is 'manager'
-                        if paramName != 'manager' and paramName not in columnNames:
-                            nonRestorableArgs.add(paramName)
-                if nonRestorableArgs:
-                    print(f'[DB] Skipping {tName}: constructor requires {nonRestorableArgs} (not in DB, re-created at runtime)', flush=True)
-                    continue
-
-            # Find column indices for branch path and identifier
-            branchPathIdx = columnNames.index('_branch_path') if '_branch_path' in columnNames else None
-            idIdx = None
-            idVarName = None
-            for idVar in polyTypedObj.identifiers:
-                if idVar in columnNames:
-                    idIdx = columnNames.index(idVar)
-                    idVarName = idVar
-                    break
-
-            restoreCount = len(dataTuples) - len(seedIdsForClass)
-            if seedIdsForClass:
-                print(f'[DB] {tName}: {len(dataTuples)} rows, skipping {len(seedIdsForClass)} seeds, restoring {restoreCount}', flush=True)
-            elif restoreCount > 0:
-                print(f'[DB] Restoring {restoreCount} instances of {tName}', flush=True)
-
-            for row in dataTuples:
+            for row in rowIterator:
+                rowsRead += 1
                 # Skip seed instances (matching runtime-created instances)
                 if idIdx is not None and row[idIdx] in seedIdsForClass:
-                    totalSeedSkips += 1
+                    tableSeedSkips += 1
                     continue
-
-                # Extract branch path
-                branchPath = None
-                if branchPathIdx is not None and row[branchPathIdx]:
-                    try:
-                        branchPath = jsonLib.loads(row[branchPathIdx])
-                    except (jsonLib.JSONDecodeError, TypeError):
-                        pass
-
-                # Build kwargs for constructor from DB data
-                initKwargs = {'manager': self}
-                if idIdx is not None and row[idIdx] is not None:
-                    initKwargs[idVarName] = row[idIdx]
-                # Supply other required positional args from DB row if available
-                if sig is not None:
-                    for paramName, param in sig.parameters.items():
-                        if paramName in ('self', 'manager') or paramName in initKwargs:
-                            continue
-                        if param.default is inspect.Parameter.empty and param.kind not in (
-                            inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD
-                        ):
-                            if paramName in columnNames:
-                                colIdx = columnNames.index(paramName)
-                                initKwargs[paramName] = row[colIdx]
-
-                # Create instance
-                try:
-                    instance = CreateMethod(**initKwargs)
-                except Exception as e:
-                    print(f'[DB] Error creating {tName} instance: {e}', flush=True)
+                if lazyTable and row[idIdx] is not None:
+                    self.registerRestoreStub(restoreInfo, row)
+                    tableRestoreCount += 1
                     continue
+                instance = self.buildRestoredInstance(restoreInfo, row)
+                if instance is not None:
+                    restoredInstances.append(instance)
+                    tableRestoreCount += 1
 
-                # Set remaining attributes via direct setattr (bypass tree logic)
-                for i, colName in enumerate(columnNames):
-                    if colName == '_branch_path':
-                        continue
-                    if colName in initKwargs:
-                        continue  # Already set via constructor
-
-                    value = row[i]
-                    if value is not None:
-                        # Deserialize compound types if needed
-                        value = polyTypedObj.deserializeColumnValue(colName, value)
-
-                    try:
-                        object.__setattr__(instance, colName, value)
-                    except Exception:
-                        pass  # Skip attributes that can't be set directly
-
-                restoredInstances.append((instance, branchPath))
+            totalSeedSkips += tableSeedSkips
+            if tableSeedSkips:
+                print(f'[DB] {tName}: skipped {tableSeedSkips} seeds, restored {tableRestoreCount}', flush=True)
+            elif tableRestoreCount > 0:
+                print(f'[DB] Restored {tableRestoreCount} instances of {tName}', flush=True)
 
         # 3. Confirm registration — instances were already registered in
-        # objectTables by treeObjectInit during CreateMethod() above.
+        # objectTables by treeObjectInit during construction above.
         # Count how many actually made it in.
         registeredCount = 0
-        for instance, branchPath in restoredInstances:
+        for instance in restoredInstances:
             key = instance.__class__.__name__
             if key in self.objectTables and hasattr(instance, 'id') and instance.id in self.objectTables.get(key, {}):
                 registeredCount += 1
+        stubCount = sum(len(classPending) for classPending in self.unhydratedInstances.values())
+
+        print(f'[DB] Restored {len(restoredInstances)} instances and {stubCount} lazy stubs ({totalSeedSkips} seeds skipped), {registeredCount} registered in objectTables', flush=True)
+
+        # Restored instances already match their rows, so the next persist does not rewrite them.
+        with self.persistLock:
+            for instance in restoredInstances:
+                classDirty = self.dirtyInstances.get(instance.__class__.__name__)
+                if classDirty != None:
+                    classDirty.pop(getattr(instance, 'id', None), None)
+        # Skipped seed rows are stale copies of runtime instances, which are persisted in their place.
+        for seedClassName, seedIdsForClass in seedDbIds.items():
+            for seedId in seedIdsForClass:
+                if seedId not in self.objectTables.get(seedClassName, {}):
+                    self.markInstanceDeleted(seedClassName, seedId)
+        self.recordSeedFingerprints(runtimeSeedFingerprints)
+
+        self.bootRestoreProfile = {
+            "mode": 'lazy' if lazy else 'eager',
+            "rowsRead": rowsRead,
+            "instancesBuilt": len(restoredInstances),
+            "lazyStubs": stubCount,
+            "seconds": round(time.perf_counter() - restoreStartTime, 3)
+        }
+        self.bootResourcePostDB = _captureResourceCheckpoint()
+
+    #Returns how rows of a table are turned into instances, cached per class so the constructor
+    #signature is only inspected once.  Returns None if the class cannot be restored from the
+    #table, because its constructor requires arguments which are not stored in it.
+    def getRestoreInfo(self, className, polyTypedObj, columnNames):
+        cacheKey = (className, tuple(columnNames))
+        if cacheKey in self.restoreInfoCache:
+            return self.restoreInfoCache[cacheKey]
+        restoreInfo = None
+        try:
+            CreateMethod = polyTypedObj.getCreateMethod()
+        except Exception as e:
+            print(f'[DB] Cannot get constructor for {className}: {e}')
+            self.restoreInfoCache[cacheKey] = None
+            return None
+        # Inspect constructor to find required args and skip non-restorable classes
+        try:
+            sig = inspect.signature(CreateMethod)
+        except (ValueError, TypeError):
+            sig = None
+        requiredParams = []
+        nonRestorableArgs = set()
+        if sig is not None:
+            for paramName, param in sig.parameters.items():
+                if paramName in ('self', 'manager'):
+                    continue
+                if param.default is inspect.Parameter.empty and param.kind not in (
+                    inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD
+                ):
+                    # Required positional/keyword arg — must be supplied from the DB columns
+                    if paramName in columnNames:
+                        requiredParams.append(paramName)
+                    else:
+                        nonRestorableArgs.add(paramName)
+        if nonRestorableArgs:
+            print(f'[DB] Skipping {className}: constructor requires {nonRestorableArgs} (not in DB, re-created at runtime)', flush=True)
+        else:
+            # Find column index for the identifier
+            idIdx = None
+            idVarName = None
+            for idVar in polyTypedObj.identifiers:
+                if idVar in columnNames:
+                    idIdx = columnNames.index(idVar)
+                    idVarName = idVar
+                    break
+            restoreInfo = {
+                'className': className,
+                'createMethod': CreateMethod,
+                'polyTypedObj': polyTypedObj,
+                'columnNames': columnNames,
+                'idIdx': idIdx,
+                'idVarName': idVarName,
+                'requiredParams': requiredParams,
+                # Stubs are keyed by id, and need a treeObject class to hydrate on access.
+                'lazyRestorable': idVarName == 'id' and isinstance(CreateMethod, type) and issubclass(CreateMethod, treeObject)
+            }
+        self.restoreInfoCache[cacheKey] = restoreInfo
+        return restoreInfo
+
+    #Builds an instance from a table row, or hydrates an existing stub instance in place.
+    #Returns None if the constructor fails.
+    def buildRestoredInstance(self, restoreInfo, row, instance=None):
+        columnNames = restoreInfo['columnNames']
+        polyTypedObj = restoreInfo['polyTypedObj']
+        # Build kwargs for constructor from DB data
+        initKwargs = {'manager': self}
+        idIdx = restoreInfo['idIdx']
+        if idIdx is not None and row[idIdx] is not None:
+            initKwargs[restoreInfo['idVarName']] = row[idIdx]
+        # Supply other required args from the DB row
+        for paramName in restoreInfo['requiredParams']:
+            if paramName not in initKwargs:
+                initKwargs[paramName] = row[columnNames.index(paramName)]
+        try:
+            if instance is None:
+                instance = restoreInfo['createMethod'](**initKwargs)
+            else:
+                # The stub's manager is removed so the constructor assigns it as it would on a
+                # new instance, after the branch, rather than placing the stub in the tree.
+                instance.__dict__.pop('manager', None)
+                restoreInfo['createMethod'].__init__(instance, **initKwargs)
+        except Exception as e:
+            print(f'[DB] Error creating {restoreInfo["className"]} instance: {e}', flush=True)
+            return None
+        # Set remaining attributes via direct setattr (bypass tree logic)
+        for i, colName in enumerate(columnNames):
+            if colName == '_branch_path' or colName in initKwargs:
+                continue
+            value = row[i]
+            if value is not None:
+                # Deserialize compound types if needed
+                value = polyTypedObj.deserializeColumnValue(colName, value)
+            try:
+                object.__setattr__(instance, colName, value)
+            except Exception:
+                pass  # Skip attributes that can't be set directly
+        self.indexInstance(instance)
+        return instance
+
+    #Registers a lightweight stub for a table row, holding only the id and manager, which is
+    #hydrated from the row the first time one of its other attributes is accessed.
+    def registerRestoreStub(self, restoreInfo, row):
+        className = restoreInfo['className']
+        instanceId = row[restoreInfo['idIdx']]
+        CreateMethod = restoreInfo['createMethod']
+        instance = CreateMethod.__new__(CreateMethod)
+        instanceDict = instance.__dict__
+        instanceDict['manager'] = self
+        instanceDict['id'] = instanceId
+        instanceDict['branch'] = None
+        instanceDict['inTree'] = None
+        if className not in self.objectTables:
+            self.objectTables[className] = {}
+        self.objectTables[className][instanceId] = instance
+        if className not in self.unhydratedInstances:
+            self.unhydratedInstances[className] = {}
+        self.unhydratedInstances[className][instanceId] = (instance, restoreInfo, row)
+        return instance
+
+    #Hydrates a lazily restored stub from its row.  Returns True once the instance is hydrated,
+    #including by another thread while this one waited, and False if it is not an unhydrated
+    #stub or is being hydrated further up this thread.
+    def hydrateInstance(self, instance):
+        classPending = self.unhydratedInstances.get(instance.__class__.__name__)
+        if(classPending == None):
+            return False
+        instanceId = instance.__dict__.get('id')
+        if(instanceId not in classPending):
+            return False
+        with self.hydrationLock:
+            pending = classPending.get(instanceId)
+            # Another thread hydrated the instance while this one waited for the lock.
+            if(pending == None):
+                return True
+            # The instance is None while its hydration is in progress further up this thread.
+            if(pending[0] is not instance):
+                return False
+            classPending[instanceId] = (None, None, None)
+            try:
+                self.buildRestoredInstance(pending[1], pending[2], instance=instance)
+            finally:
+                del classPending[instanceId]
+                if(classPending == {}):
+                    self.unhydratedInstances.pop(instance.__class__.__name__, None)
+            # The instance matches its row, so hydrating it is not a change to persist.
+            with self.persistLock:
+                classDirty = self.dirtyInstances.get(instance.__class__.__name__)
+                if(classDirty != None):
+                    classDirty.pop(instanceId, None)
+        return True
+
+    #Records a change to a class, called on create, update and delete of its instances.  Setting
+    #the attributes of a stub while it is hydrated from its row is not a change.
+    def bumpClassVersion(self, className, instanceId=None):
+        classPending = self.unhydratedInstances.get(className)
+        if(classPending != None and instanceId in classPending and classPending[instanceId][0] is None):
+            return
+        self.classVersions[className] = next(self.versionCounter)
+        self.classModifiedTimes[className] = time.time()
 
-        print(f'[DB] Restored {len(restoredInstances)} instances ({totalSeedSkips} seeds skipped), {registeredCount} registered in objectTables', flush=True)
+    #Returns (version, modifiedTime) for a class, where a class unchanged since the manager
+    #started is at version 0.
+    def getClassVersion(self, className):
+        return (self.classVersions.get(className, 0), self.classModifiedTimes.get(className, self.versionStartTime))
+
+    #Hydrates every unhydrated stub among the given instances.
+    def hydrateInstances(self, instances):
+        if(self.unhydratedInstances == {}):
+            return
+        for instance in instances:
+            self.hydrateInstance(instance)
+
+    #Hydrates every unhydrated stub of a class, or of every class if none is given.
+    def hydrateClass(self, className=None):
+        if(className == None):
+            for someClassName in list(self.unhydratedInstances.keys()):
+                self.hydrateClass(someClassName)
+            return
+        classPending = self.unhydratedInstances.get(className)
+        if(classPending == None):
+            return
+        for (instance, restoreInfo, row) in list(classPending.values()):
+            if(instance != None):
+                self.hydrateInstance(instance)
 
-    def persistTree(self):
-        """Save all instances from objectTables into the database.
+    def persistTree(self, fullRewrite=False):
+        """Save the instances from objectTables into the database.
 
-        Clears each table first, then re-inserts all current instances.
-        This prevents row duplication for tables without a PRIMARY KEY.
+        By default only the changes recorded since the last persist are written, see
+        persistChanges.  With fullRewrite each table is cleared first and all current
+        instances are re-inserted, which also prevents row duplication for tables
+        without a PRIMARY KEY.
         """
         if self.db is None:
             print('[DB] Cannot persist tree — no database initialized.', flush=True)
             return
-        dbFilePath = os.path.join(self.db.Path, self.db.name + '.db') if self.db.Path else self.db.name + '.db'
+        if not fullRewrite:
+            self.persistChanges()
+            return
+        # Stubs only hold their ids, so they are built before their rows are rewritten.
+        self.hydrateClass()
+        # Everything is about to be written, so the recorded changes are already covered.
+        with self.persistLock:
+            self.dirtyInstances = {}
+            self.deletedInstanceIds = {}
         savedCount = 0
         skippedCount = 0
         errorCount = 0
@@ -485,152 +765,173 @@ class managerObject:
                 continue
             # Clear existing rows before re-persisting to prevent duplicates
             try:
-                dbConn = sqlite3.connect(dbFilePath)
-                dbConn.execute(f'DELETE FROM {className}')
-                dbConn.commit()
-                dbConn.close()
+                with dbConnectionPool.transaction(self.db.getDBFilePath()) as dbConn:
+                    dbConn.execute(f'DELETE FROM {className}')
             except Exception as e:
                 print(f'[DB] Error clearing table {className}: {e}', flush=True)
-            for instanceId, instance in instancesDict.items():
+            try:
+                classSavedCount = self.db.saveInstancesInDB(list(instancesDict.values()))
+                savedCount += classSavedCount
+                errorCount += len(instancesDict) - classSavedCount
+            except Exception as e:
+                errorCount += len(instancesDict)
+                print(f'[DB] Error saving {className} instances: {e}', flush=True)
+        print(f'[DB] Persisted {savedCount} instances to database ({skippedCount} skipped — no table, {errorCount} not written)', flush=True)
+
+    #Records a new or changed instance, to be upserted by the next persistChanges.
+    def markInstanceDirty(self, instance):
+        instanceId = instance.__dict__.get('id')
+        if(instanceId == None):
+            return
+        className = instance.__class__.__name__
+        #A stub must be built from its row before it changes, or the rest of its row is lost.
+        if(className in self.unhydratedInstances):
+            self.hydrateInstance(instance)
+        with self.persistLock:
+            classDirty = self.dirtyInstances.get(className)
+            if(classDirty == None):
+                classDirty = {}
+                self.dirtyInstances[className] = classDirty
+            classDirty[instanceId] = instance
+            classDeleted = self.deletedInstanceIds.get(className)
+            if(classDeleted != None):
+                classDeleted.pop(instanceId, None)
+
+    #Records a removed instance, whose row is deleted by the next persistChanges.
+    def markInstanceDeleted(self, className, instanceId):
+        if(not self.dirtyTracking or instanceId == None):
+            return
+        with self.persistLock:
+            classDirty = self.dirtyInstances.get(className)
+            if(classDirty != None):
+                classDirty.pop(instanceId, None)
+            self.deletedInstanceIds.setdefault(className, {})[instanceId] = None
+
+    #Forgets the recorded changes of a class, used when its table is dropped.
+    def clearClassChanges(self, className):
+        with self.persistLock:
+            self.dirtyInstances.pop(className, None)
+            self.deletedInstanceIds.pop(className, None)
+
+    def persistChanges(self):
+        """Write the instances created, changed or removed since the last persist.
+
+        New and changed instances are upserted and removed ones are deleted by id, all in a
+        single transaction.  If the transaction fails the changes are kept for the next call.
+        Returns a tuple of (upsertedCount, deletedCount).
+        """
+        if self.db is None:
+            return (0, 0)
+        with self.persistLock:
+            dirtyInstances = self.dirtyInstances
+            deletedInstanceIds = self.deletedInstanceIds
+            self.dirtyInstances = {}
+            self.deletedInstanceIds = {}
+        if dirtyInstances == {} and deletedInstanceIds == {}:
+            return (0, 0)
+        startTime = time.perf_counter()
+        upsertedCount = 0
+        deletedCount = 0
+        try:
+            with dbConnectionPool.transaction(self.db.getDBFilePath()) as dbConn:
+                for className, classDeleted in deletedInstanceIds.items():
+                    if className not in self.db.tables or 'id' not in self.db.getTableLayout(className, dbConn)[0]:
+                        continue
+                    dbConn.executemany(f'DELETE FROM {className} WHERE id = ?', [(instanceId,) for instanceId in classDeleted])
+                    deletedCount += len(classDeleted)
+                changedInstances = []
+                for classDirty in dirtyInstances.values():
+                    changedInstances.extend(classDirty.values())
+                upsertedCount = self.db.saveInstancesInDB(changedInstances)
+        except Exception as e:
+            print(f'[DB] Error persisting changes, keeping them for the next persist: {e}', flush=True)
+            self.requeueChanges(dirtyInstances, deletedInstanceIds)
+            return (0, 0)
+        #Endpoints reading from the database serve the new rows from here on.
+        for className in set(dirtyInstances) | set(deletedInstanceIds):
+            self.bumpClassVersion(className)
+        print(f'[DB] Persisted changes: {upsertedCount} upserted, {deletedCount} deleted in {(time.perf_counter() - startTime) * 1000:.1f}ms', flush=True)
+        return (upsertedCount, deletedCount)
+
+    #Puts changes taken by a failed persistChanges back, without overwriting newer changes.
+    def requeueChanges(self, dirtyInstances, deletedInstanceIds):
+        with self.persistLock:
+            for className, classDirty in dirtyInstances.items():
+                currentDirty = self.dirtyInstances.setdefault(className, {})
+                currentDeleted = self.deletedInstanceIds.get(className, {})
+                for instanceId, instance in classDirty.items():
+                    if instanceId not in currentDeleted:
+                        currentDirty.setdefault(instanceId, instance)
+            for className, classDeleted in deletedInstanceIds.items():
+                currentDeleted = self.deletedInstanceIds.setdefault(className, {})
+                currentDirty = self.dirtyInstances.get(className, {})
+                for instanceId in classDeleted:
+                    if instanceId not in currentDirty:
+                        currentDeleted[instanceId] = None
+
+    #Starts a background thread which calls persistChanges every intervalSeconds.
+    def startPersistInterval(self, intervalSeconds):
+        self.stopPersistInterval()
+        stopEvent = threading.Event()
+        self.persistIntervalStop = stopEvent
+        def persistLoop():
+            while not stopEvent.wait(intervalSeconds):
                 try:
-                    self.db.saveInstanceInDB(instance)
-                    savedCount += 1
+                    self.persistChanges()
                 except Exception as e:
-                    errorCount += 1
-                    print(f'[DB] Error saving {className}(id={instanceId}): {e}', flush=True)
-        print(f'[DB] Persisted {savedCount} instances to database ({skippedCount} skipped — no table, {errorCount} errors)', flush=True)
-
-    def identifySeedDBIds(self):
-        """Identify DB rows that match runtime seed instances by property fingerprinting.
-
-        Compares each DB row's non-ID properties against runtime instances. DB rows
-        matching a runtime instance on >=60% of comparable properties (min 2 matches)
-        are considered seeds. Returns their DB IDs so restore can skip them.
+                    print(f'[DB] Background persist failed: {e}', flush=True)
+        threading.Thread(target=persistLoop, name='polariPersistInterval', daemon=True).start()
+
+    #Stops the background persist thread, if one is running.
+    def stopPersistInterval(self):
+        if self.persistIntervalStop is not None:
+            self.persistIntervalStop.set()
+            self.persistIntervalStop = None
+
+    def identifySeedDBIds(self, runtimeFingerprints=None):
+        """Identify DB rows that are earlier copies of runtime seed instances.
+
+        A row is a seed if its content fingerprint (see _seedFingerprint) equals the one
+        recorded for its id by an earlier boot, or the fingerprint of a runtime instance of
+        the same class.  A recorded seed edited since no longer matches and is restored like
+        any other row.  Each row costs one fingerprint and two dict probes, so this is linear
+        in the number of rows.  Returns the seed DB IDs per class so restore can skip them.
         """
         seedIds = {}
-        # Properties to skip during fingerprint comparison:
-        # - Tree infrastructure internals
-        # - Per-boot random/volatile values
-        # - Live object references (different memory address each boot)
-        # - Timestamped metrics
-        internalProps = {
-            '_branch_path', 'manager', 'branch', 'inTree', 'complete',
-            'objectTree', 'objectTables', 'objectTyping', 'objectTypingDict',
-            'polServer', 'hostSys', 'subManagers', 'db',
-            # User: random per boot
-            'sessionSecret', 'sessionCookie', 'sessionJWT',
-            # isoSys: Docker container changes hostname each restart
-            'networkName', 'IPaddress', 'domainName',
-            # isoSys: timestamped memory metrics (contain datetime.now())
-            'availableMainMemoryInBytes', 'percentMainMemoryUsed',
-            'usedMainMemoryInBytes', 'freeMainMemoryInBytes',
-            'swappedOutMemory', 'swappedInMemory',
-            'freeSwapMemoryInBytes', 'usedSwapMemoryInBytes',
-            'SwapMemoryConsumptionVectorInBytesPerVarMilliSeconds',
-            # polariServer: random/volatile per boot
-            'serverPasswordSaltDict', 'falconServer', 'lastCycleTime',
-            'serverInstance', 'publicFrontendKey', 'privateFrontendKey'
-        }
-
-        for className, runtimeInstances in self.objectTables.items():
-            if not runtimeInstances:
-                continue
-            if className not in self.db.tables:
-                continue
-            if className not in self.objectTypingDict:
-                continue
+        recordedSeedIds = self.loadRecordedSeedIds()
+        if runtimeFingerprints is None:
+            runtimeFingerprints = self.getSeedFingerprints()
 
+        for className, classFingerprints in runtimeFingerprints.items():
             polyTypedObj = self.objectTypingDict[className]
-
             try:
-                columnNames, dataTuples = self.db.getAllInTable(className)
+                columnNames, rowIterator = self.db.iterateTableRows(className)
             except Exception:
                 continue
-            if not dataTuples:
-                continue
-
-            # Identifier columns (used for DB row ID extraction, excluded from comparison)
-            idCols = set(polyTypedObj.identifiers)
-            compareCols = [
-                col for col in columnNames
-                if col not in idCols and col not in internalProps
-            ]
-            if not compareCols:
-                continue
 
             # Find the ID column index for extracting DB row IDs
-            idColName = None
             idColIdx = None
             for idVar in polyTypedObj.identifiers:
                 if idVar in columnNames:
-                    idColName = idVar
                     idColIdx = columnNames.index(idVar)
                     break
+            if idColIdx is None:
+                continue
+            compareIdxs = [i for i, col in enumerate(columnNames) if col not in polyTypedObj.identifiers and col not in SEED_FINGERPRINT_IGNORED_PROPS]
+            if not compareIdxs:
+                continue
+            # Probe by fingerprint, the runtime instance ids are not needed for matching.
+            fingerprintSet = set(classFingerprints.values())
+            classRecordedIds = recordedSeedIds.get(className, {})
 
             matchedDbIds = set()
-            # Truthy/falsy string sets for boolean normalization
-            _truthy = {'True', 'true', '1', '1.0'}
-            _falsy = {'False', 'false', '0', '0.0', 'None', 'none', ''}
-
-            for row in dataTuples:
-                rowDict = dict(zip(columnNames, row))
-
-                for instId, instance in runtimeInstances.items():
-                    matchCount = 0
-                    compareCount = 0
-
-                    for col in compareCols:
-                        if not hasattr(instance, col):
-                            continue
-
-                        dbVal = rowDict.get(col)
-                        rtVal = getattr(instance, col)
-
-                        # Skip if both are None/empty — not informative
-                        if (dbVal is None or dbVal == '') and (rtVal is None or rtVal == '' or rtVal == []):
-                            continue
-
-                        compareCount += 1
-
-                        # Try direct equality first
-                        if dbVal == rtVal:
-                            matchCount += 1
-                            continue
-
-                        # JSON-aware comparison: DB stores dicts/lists as JSON strings
-                        # while runtime has Python objects (single vs double quotes)
-                        if isinstance(dbVal, str) and (dbVal.startswith('{') or dbVal.startswith('[')):
-                            try:
-                                dbParsed = json.loads(dbVal)
-                                if dbParsed == rtVal:
-                                    matchCount += 1
-                                    continue
-                            except (json.JSONDecodeError, TypeError):
-                                pass
-
-                        # Normalize booleans: Python True/False vs SQLite 1/0
-                        dbStr = str(dbVal)
-                        rtStr = str(rtVal)
-                        if rtStr == dbStr:
-                            matchCount += 1
-                        elif (rtStr in _truthy and dbStr in _truthy) or (rtStr in _falsy and dbStr in _falsy):
-                            matchCount += 1
-
-                    # Threshold: >=60% match rate. Min matches scales with column count:
-                    # 1-3 comparable columns → require at least 1 match
-                    # 4+ comparable columns → require at least 2 matches
-                    # 0 comparable columns (all empty on both sides) → treat as match
-                    minMatches = 1 if compareCount <= 3 else 2
-                    isSeed = False
-                    if compareCount == 0 and len(compareCols) > 0:
-                        # All properties are empty/None on both sides — structurally identical
-                        isSeed = True
-                    elif compareCount > 0 and matchCount >= minMatches and (matchCount / compareCount) >= 0.6:
-                        isSeed = True
-                    if isSeed:
-                        if idColIdx is not None and rowDict.get(idColName):
-                            matchedDbIds.add(rowDict[idColName])
-                        break  # Row matched a runtime instance, move to next row
+            for row in rowIterator:
+                rowId = row[idColIdx]
+                if not rowId:
+                    continue
+                rowFingerprint = _seedFingerprint([row[i] for i in compareIdxs])
+                if classRecordedIds.get(rowId) == rowFingerprint or rowFingerprint in fingerprintSet:
+                    matchedDbIds.add(rowId)
 
             if matchedDbIds:
                 seedIds[className] = matchedDbIds
@@ -638,6 +939,52 @@ class managerObject:
 
         return seedIds
 
+    #Returns the content fingerprints of the runtime instances of every class with a table.
+    #FORMAT: {className:{id:fingerprint}}
+    def getSeedFingerprints(self):
+        seedFingerprints = {}
+        for className, runtimeInstances in self.objectTables.items():
+            if not runtimeInstances or className not in self.db.tables or className not in self.objectTypingDict:
+                continue
+            polyTypedObj = self.objectTypingDict[className]
+            (columnNames, hasBranchPath) = self.db.getTableLayout(className)
+            compareCols = [col for col in columnNames if col not in polyTypedObj.identifiers and col not in SEED_FINGERPRINT_IGNORED_PROPS]
+            if not compareCols:
+                continue
+            classFingerprints = {}
+            for instId, instance in runtimeInstances.items():
+                instanceDict = instance.__dict__
+                classFingerprints[instId] = _seedFingerprint([instanceDict.get(col) for col in compareCols])
+            seedFingerprints[className] = classFingerprints
+        return seedFingerprints
+
+    #Returns the seed ids recorded by the last boot.
+    #FORMAT: {className:{id:fingerprint}}
+    def loadRecordedSeedIds(self):
+        recordedSeedIds = {}
+        dbConn = self.db.getConnection()
+        if dbConn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='_seed_fingerprints'").fetchone() is None:
+            return recordedSeedIds
+        for (className, seedId, fingerprint) in dbConn.execute('SELECT className, id, fingerprint FROM _seed_fingerprints'):
+            recordedSeedIds.setdefault(className, {})[seedId] = fingerprint
+        return recordedSeedIds
+
+    #Records the runtime instances of this boot as the seeds, replacing those of earlier boots,
+    #so the next boot recognizes their rows by id while they still hold the seeded content.
+    def recordSeedFingerprints(self, seedFingerprints=None):
+        if self.db is None:
+            return
+        if seedFingerprints is None:
+            seedFingerprints = self.getSeedFingerprints()
+        try:
+            with dbConnectionPool.transaction(self.db.getDBFilePath()) as dbConn:
+                dbConn.execute('CREATE TABLE IF NOT EXISTS _seed_fingerprints (className TEXT, id TEXT, fingerprint TEXT, PRIMARY KEY (className, id))')
+                dbConn.execute('DELETE FROM _seed_fingerprints')
+                dbConn.executemany('INSERT INTO _seed_fingerprints VALUES (?, ?, ?)',
+                    [(className, instId, fingerprint) for className, classFingerprints in seedFingerprints.items() for instId, fingerprint in classFingerprints.items()])
+        except Exception as e:
+            print(f'[DB] Error recording seed fingerprints: {e}', flush=True)
+
     def __delete__(self, instance):
         #TODO Go through all polyTyping objects and delete them, close all file references.
         #WRITE CODE HERE
@@ -645,12 +992,16 @@ class managerObject:
         
 
     def __setattr__(self, name, value):
+        #Fast path for primitive values, which never need to be wired into the tree.
+        if(type(value) in PRIMITIVE_SET_TYPES):
+            super(managerObject, self).__setattr__(name, value)
+            return
         if(type(value).__name__ == 'list'):
             #if name == "usersList" -> converting from list with value ", value, " to a polariList.
             #Instead of initializing a polariList, we try to just cast the list to be type polariList.
             value = polariList(value)
             value.jumpstart(treeObjInstance=self, varName=name)
-        if(name == 'manager'):
+        if(name == 'manager' or name in managerObject.untypedVars):
             #TODO Write functionality to connect with a parent tree when/if manager is assigned.
             super(managerObject, self).__setattr__(name, value)
             return
@@ -783,8 +1134,45 @@ class managerObject:
         #print("Finished setting value of ", name, " to be ", value)
         super(managerObject, self).__setattr__(name, value)
 
+    #Defers the tree wiring of tree objects created or assigned references inside the block,
+    #then wires all of them into the tree in one pass when the outermost block exits.
+    #Ex: with manager.batchMode():
+    #        for row in rows:
+    #            someObject(manager=manager, branch=manager, **row)
+    @contextmanager
+    def batchMode(self):
+        self.batchDepth += 1
+        try:
+            yield self
+        finally:
+            self.batchDepth -= 1
+            if(self.batchDepth == 0):
+                self.resolveBatchWiring()
+
+    #Wires every tree object queued during batchMode into the tree.  Objects whose branch has
+    #not been placed yet are retried after the rest of the queue, until no more can be placed.
+    def resolveBatchWiring(self):
+        pendingInstances = list(self.batchPendingWiring.keys())
+        self.batchPendingWiring = {}
+        while pendingInstances != []:
+            unresolvedInstances = []
+            for instance in pendingInstances:
+                if(instance.manager == None or instance.branch == None):
+                    continue
+                if(not instance.managerSet(potentialManager=instance.manager)):
+                    unresolvedInstances.append(instance)
+            if(len(unresolvedInstances) == len(pendingInstances)):
+                for instance in unresolvedInstances:
+                    print("Could not place ", instance, " into the object tree, it's branch ", instance.branch, " is not in the tree.")
+                break
+            pendingInstances = unresolvedInstances
+
     #Deletes a tree node, deletes all dependent tree nodes with no existing duplicates
-    def deleteTreeNode(self, className, nodePolariId, baseDeleteData=None, deleteData=None, instancesDeleted=[], migratedInstances=[], startDelete=True):
+    def deleteTreeNode(self, className, nodePolariId, baseDeleteData=None, deleteData=None, instancesDeleted=None, migratedInstances=None, startDelete=True):
+        if(instancesDeleted == None):
+            instancesDeleted = []
+        if(migratedInstances == None):
+            migratedInstances = []
         if(startDelete == True):
             instToDelete = self.objectTables[className][nodePolariId]
             instancesDeleted.append(nodePolariId)
@@ -793,9 +1181,13 @@ class managerObject:
 
             # Handle instances that are in objectTables but not in objectTree
             # This occurs when instances are created without a branch parameter
-            if(deletePath == None):
+            if(deletePath == None or type(deletePath) == tuple):
                 # Simply remove from objectTables
                 del self.objectTables[className][nodePolariId]
+                self.unhydratedInstances.get(className, {}).pop(nodePolariId, None)
+                self.unindexInstance(className, nodePolariId)
+                self.markInstanceDeleted(className, nodePolariId)
+                self.bumpClassVersion(className)
                 return (instancesDeleted, migratedInstances)
 
             deleteData = (instToDelete, tupToDelete, deletePath)
@@ -810,24 +1202,20 @@ class managerObject:
         removeIndex = None
         curIndex = 0
         for somePath in pathsList:
-            if(somePath[len(baseDeletePath)-1] == tupToDelete):
+            if(list(somePath) == list(deletePath)):
                 removeIndex = curIndex
                 break
             else:
                 curIndex += 1
         if(removeIndex != None):
-            pathsList.remove(removeIndex)
+            pathsList.pop(removeIndex)
         else:
             raise ValueError("Something has gone very wrong... trying to delete node but main node cannot be located, it may have been deleted already?")
         #Go through all duplicates and delete them
         for nodePath in pathsList:
-            tempPath = nodePath
-            tempPath.pop()
-            treeBranch = self.getBranchNode(tempPath)
-            #Remove the duplicateNode from the treeBranch
-            treeBranch.remove(nodePath[len(nodePath)-1])
+            self.removeTreeBranch(nodePath[:len(nodePath)-1], nodePath[len(nodePath)-1])
         #Access the main node
-        treeBranch = self.getBranchNode(baseDeletePath)
+        treeBranch = self.getBranchNode(deletePath)
         #
         duplicates = []
         mainNodes = []
@@ -840,63 +1228,57 @@ class managerObject:
         #Go through all duplicate nodes and delete them since we know they
         #should not be migrated.
         for duplicateKey in duplicates:
-            treeBranch.remove(duplicateKey)
+            self.removeTreeBranch(deletePath, duplicateKey)
         #
         baseDeletePathLength = len(baseDeletePath)
         #Go through main nodes and see whether they can be migrated outside of
         #the current sub-tree being deleted.
         #If they can, migrate them.  If not, delete them and their sub-tree.
         for mainKey in mainNodes:
+            mainPath = list(deletePath) + [mainKey]
             #Get all paths
             pathsList = self.getAllPathsForTupleInObjTree(mainKey)
             #Compare to see if any paths exist outside of baseDeletePath
             insidePaths = []
             outsidePaths = []
             for somePath in pathsList:
-                isOutside = False
-                somePathLength = len(somePath)
-                if(baseDeletePathLength <= somePathLength):
-                    iter = range(0,baseDeletePathLength - 1)
-                    for i in iter:
-                        if(not somePath[i] == baseDeletePath[i]):
-                            isOutside = True
-                            break
-                    if(isOutside):
-                        outsidePaths.append(somePath)
-                    else:
-                        insidePaths.append(somePath)
+                if(list(somePath) == mainPath):
+                    continue
+                #Any path which does not begin with the base delete path is outside of the
+                #sub-tree being deleted.
+                if(list(somePath[:baseDeletePathLength]) == list(baseDeletePath)):
+                    insidePaths.append(somePath)
                 else:
-                    #Since it is lower level than delete path, cannot possibly
-                    #be under the deleted sub-tree, so we migrate the sub-tree.
-                    #Note: Under normal conditions this should never happen because
-                    #main nodes should always exist at lowest path length...
-                    #will put it here just in case though.
                     outsidePaths.append(somePath)
             #Delete all duplicates on inside paths
             for inPath in insidePaths:
-                tempPath = inPath
-                tempPath.pop()
-                inBranch = self.getBranchNode(tempPath)
-                #Remove the duplicateNode from the treeBranch
-                inBranch.remove(inPath[len(inPath)-1])
+                self.removeTreeBranch(inPath[:len(inPath)-1], inPath[len(inPath)-1])
             shortestPath = None
             #If no outside paths exist, the main node and it's sub-tree must be deleted.
             if(len(outsidePaths) == 0):
                 newTupToDelete = mainKey
                 newInstToDelete = mainKey[2]
-                instancesDeleted.append(newInstToDelete)
-                newDeletePath = self.getTuplePathInObjTree(newTupToDelete)
-                newDeleteData = (newInstToDelete, newTupToDelete, newDeletePath)
+                instancesDeleted.append(getattr(newInstToDelete, 'id', None))
+                newDeleteData = (newInstToDelete, newTupToDelete, mainPath)
                 (instancesDeleted, migratedInstances) = self.deleteTreeNode(className=className, nodePolariId=nodePolariId, baseDeleteData=baseDeleteData, deleteData=newDeleteData, instancesDeleted=instancesDeleted, migratedInstances=migratedInstances, startDelete=False)
             #If an outside path exists, find the path with shortest length, and migrate to it.
             else:
                 shortestPath = outsidePaths[0]
                 shortestPathLength = len(shortestPath)
                 for outPath in outsidePaths:
-                    if(len(shortestPath) < shortestPathLength):
+                    if(len(outPath) < shortestPathLength):
                         shortestPath = outPath
                         shortestPathLength = len(outPath)
-                migratedInstances = self.migrateTreeNode(originalPath=mainKey,newPath=shortestPath,migratedInstances=migratedInstances)
+                migratedInstances = self.migrateTreeNode(originalPath=mainPath,newPath=list(shortestPath),migratedInstances=migratedInstances)
+        #Finally remove the node itself from the tree and from the objectTables.
+        self.removeTreeBranch(deletePath[:len(deletePath)-1], tupToDelete)
+        instClassName = tupToDelete[0]
+        instId = getattr(instToDelete, 'id', None)
+        if(instClassName in self.objectTables and instId in self.objectTables[instClassName]):
+            del self.objectTables[instClassName][instId]
+        self.unindexInstance(instClassName, instId)
+        self.markInstanceDeleted(instClassName, instId)
+        self.bumpClassVersion(instClassName)
         return (instancesDeleted, migratedInstances)
 
     #Migration of a tree node should only occur as a part of the deletion process,
@@ -904,79 +1286,47 @@ class managerObject:
     #Under normal circumstances all migrations would be simple migrations since
     #they happen when a new node is created at a lower path length than it's
     #current existing main node.
+    #The whole sub-tree is moved with the node, so the nodes branching from it keep
+    #their position relative to it.
     def migrateTreeNode(self, originalPath, newPath, migratedInstances, removeOriginal=True):
         #Get the branch we want to load the new branch onto
-        targetPath = newPath
-        targetPath.pop()
-        originalParentPath = originalPath
-        originalParentPath.pop()
+        targetPath = list(newPath[:len(newPath)-1])
+        originalParentPath = list(originalPath[:len(originalPath)-1])
         originalParentInstance = originalParentPath[len(originalParentPath)-1][2]
-        originalInstance = originalPath[len(originalPath)-1][2]
-        targetBranch = self.getBranchNode(targetPath)
-        #Remove the duplicate being replaced
-        targetBranch.remove(newPath[len(newPath)-1])
-        #Get the original branch that needs to be migrated.
         originalTuple = originalPath[len(originalPath)-1]
-        originalBranch = self.getBranchNode(originalPath)
-        originalParentBranch = self.getBranchNode(originalParentPath)
-        #Check if the branch being migrated to is at an equal or lower depth than
-        #the current location, if it is we can directly skip the need for a
-        #complex migration process and just move the branch at once.
-        if(len(newPath) <= len(originalPath)):
-            #Directly move the branch over to the new location.
-            targetBranch[originalTuple] = originalBranch
-            #Then remove the node from the previous location on original parent branch.
-            originalParentBranch.remove(originalTuple)
-            if(not removeOriginal):
-                #TODO Instead, ensure it is replaced with a duplicate.
-                self.getDuplicateInstanceTuple(originalTuple[2])
-            else:
-                classType = originalTuple[2].__class__.__name__
-                self.removeInstanceReferences(instanceWithReferences=originalParentInstance, instanceReferenced=originalInstance)
-                #TODO All references to this instance should be removed from the instance
-                #that the parent branch references.
-            #...
-            #Now that it has been successfully migrated and removed from it's
-            #original location, we add it to migrated objects and return it.
-            migratedInstances.append(originalTuple[2])
-        #Now it gets complicated.. first, record what the path shift is.  We will
-        #need that to determine what main nodes, if any, will need to move.
+        originalInstance = originalTuple[2]
+        #Remove the duplicate being replaced
+        self.removeTreeBranch(targetPath, newPath[len(newPath)-1])
+        #Get the original branch that needs to be migrated, removing it from it's original location.
+        originalBranch = self.removeTreeBranch(originalParentPath, originalTuple)
+        if(originalBranch == None):
+            originalBranch = {}
+        #Directly move the branch over to the new location.
+        targetBranch = self.getBranchNode(targetPath)
+        targetBranch[originalTuple] = originalBranch
+        self.indexTreeBranch(originalTuple, targetPath[len(targetPath)-1] if targetPath else None, originalBranch)
+        if(not removeOriginal):
+            #Leave a duplicate at the original location, pointing to the new main node.
+            duplicateTuple = tuple([originalTuple[0], originalTuple[1], tuple(targetPath + [originalTuple])])
+            self.addDuplicateBranch(traversalList=originalParentPath, branchTuple=duplicateTuple)
         else:
-            newPathLength = len(newPath)
-            pathShift = len(originalPath) - newPathLength
-            mainNodes = []
-            for subBranchTuple in originalBranch.keys():
-                valueType = subBranchTuple[2].__class__.__name__
-                #Ignore duplicates and add all main nodes to a list.
-                if(valueType != "tuple" and valueType!="NoneType"):
-                    mainNodes.append(subBranchTuple)
-            #Go through each main node and compare all of their paths to see if any
-            #would be a shorter path than a what simple migration would result in.
-            for someNode in mainNodes:
-                #Get all paths
-                pathsList = self.getAllPathsForTupleInObjTree(someNode)
-                #Check to see if any path shorter than the converted path will exist.
-                shortestPathLength = newPathLength
-                shortestPath = None
-                foundShorterPath = False
-                for somePath in pathsList:
-                    if(len(somePath) < shortestPathLength):
-                        shortestPathLength = len(somePath)
-                        shortestPath = somePath
-                        foundShorterPath = True
-                if(foundShorterPath):
-                    #TODO migrate to the shorter path and replace with duplicate while leaving references.
-                    pass
-                else:
-                    migratedInstances.append(someNode[2])
-                
+            #All references to this instance are removed from the instance
+            #that the parent branch references.
+            self.removeInstanceReferences(instanceWithReferences=originalParentInstance, instanceReferenced=originalInstance)
+        #Now that it has been successfully migrated and removed from it's
+        #original location, we add it to migrated objects and return it.
+        migratedInstances.append(getattr(originalInstance, 'id', None))
+        return migratedInstances
+
     #Removes all references to a given instance from a given instance's variables.
     def removeInstanceReferences(self, instanceWithReferences, instanceReferenced):
         #Get polyTyping for instances
         instanceVars = instanceWithReferences.__dict__
         instanceReferencedType = instanceReferenced.__class__.__name__
-        instanceReferencedTyping = self.objectTypingDict(instanceReferencedType)
-        variablesWithReferences = instanceReferencedTyping.objectReferencesDict[instanceWithReferences.__class__.__name__]
+        instanceReferencedTyping = self.objectTypingDict.get(instanceReferencedType)
+        if(instanceReferencedTyping == None):
+            return
+        variablesWithReferences = instanceReferencedTyping.objectReferencesDict.get(instanceWithReferences.__class__.__name__, [])
         for someVar in variablesWithReferences:
             if(someVar in instanceVars.keys()):
                 varVal = getattr(instanceWithReferences, someVar)
@@ -993,24 +1343,27 @@ class managerObject:
                         if(elemType == instanceReferencedType):
                             if(instanceReferenced == elem):
                                 indexDict[indexCount] = index
+                                indexCount += 1
+                        index += 1
                     for i in range(0, indexCount):
                         removeIndex = indexDict[i] - i
                         varVal.pop(removeIndex)
                     #After removing all instance matches from the list, we set it.
                     setattr(instanceWithReferences,someVar,varVal)
 
-    def _removeClassFromTree(self, branch, className):
+    def _removeClassFromTree(self, branch, className, parentTuple=None):
         """Recursively remove all tuple keys where key[0] == className from the objectTree."""
         if not isinstance(branch, dict):
             return 0
         removed = 0
         keysToRemove = [k for k in branch if isinstance(k, tuple) and len(k) > 0 and k[0] == className]
         for k in keysToRemove:
+            self.unindexTreeBranch(k, parentTuple, branch[k])
             del branch[k]
             removed += 1
         for k in list(branch.keys()):
             if isinstance(branch[k], dict):
-                removed += self._removeClassFromTree(branch[k], className)
+                removed += self._removeClassFromTree(branch[k], className, k)
         return removed
 
     def purgeObjectType(self, className):
@@ -1027,6 +1380,10 @@ class managerObject:
         if className in self.objectTables:
             summary['instancesPurged'] = len(self.objectTables[className])
             del self.objectTables[className]
+        self.clearClassChanges(className)
+        self.unhydratedInstances.pop(className, None)
+        self.dropAttributeIndex(className)
+        self.bumpClassVersion(className)
 
         # 2. Purge DB table
         if self.db is not None and className in self.db.tables:
@@ -1036,10 +1393,7 @@ class managerObject:
 
         # 3. Remove typing
         if className in self.objectTypingDict:
-            typingObj = self.objectTypingDict[className]
-            del self.objectTypingDict[className]
-            if typingObj in self.objectTyping:
-                self.objectTyping.remove(typingObj)
+            self.unregisterObjectTyping(className)
             summary['typingRemoved'] = True
 
         # 4. Remove CRUDE endpoint
@@ -1058,6 +1412,7 @@ class managerObject:
         # 5. Remove from objectTree
         if self.objectTree is not None:
             summary['treeEntriesRemoved'] = self._removeClassFromTree(self.objectTree, className)
+        self.classInstanceRegistry.pop(className, None)
 
         print(f'[purgeObjectType] Purged {className}: {summary}', flush=True)
         return summary
@@ -1088,11 +1443,7 @@ class managerObject:
             raise ValueError(errMsg)
         #print("Got past valueError, confirming only one class type in list")
         #Go through and find correct polyTyping.
-        correctObjectTyping = None
-        for somePolyTyping in self.objectTyping:
-            if(somePolyTyping.className == className):
-                correctObjectTyping = somePolyTyping
-                break
+        correctObjectTyping = self.getRegisteredObjectTyping(className=className)
         if(correctObjectTyping == None):
             errMsg = "PolyTyping for type " + className + " could not be found!"
             raise ValueError(errMsg)
@@ -1118,7 +1469,8 @@ class managerObject:
 
 
     #Gets all data for a class and returns a Dictionary which is convertable to a json object.
-    def getJSONdictForClass(self, passedInstances, varsLimited=[]):
+    #varsIncluded, when passed, limits the variables sent for each instance to those listed.
+    def getJSONdictForClass(self, passedInstances, varsLimited=[], varsIncluded=None):
         # print("[getJSONdictForClass] START - passedInstances:", passedInstances, " varsLimited: ", varsLimited)  # Verbose
         # Automatically exclude internal treeObject variables from API responses.
         # These are framework infrastructure variables, not user-defined data.
@@ -1127,6 +1479,11 @@ class managerObject:
         try:
             if(type(passedInstances).__name__ == "dict"):
                 passedInstances = list(passedInstances.values())
+            #Instance data is read from __dict__, so lazily restored stubs are built first.
+            if(isinstance(passedInstances, list)):
+                self.hydrateInstances(passedInstances)
+            elif(passedInstances != None):
+                self.hydrateInstances([passedInstances])
             # print("[getJSONdictForClass] After dict conversion, passedInstances length:", len(passedInstances))  # Verbose
             if(len(passedInstances) > 0):
                 objSourceDetailsDict = self.getObjectSourceDetailsANDvalidateInstances(passedInstances=passedInstances)
@@ -1169,48 +1526,59 @@ class managerObject:
                 ]
             }
         ]
-        #dataEntriesList = classVarDict[0]["data"]
-        #Accounts for the case where a list of instances of the same class are passed into the function
-        if(isinstance(passedInstances, list)):
-            for someInstance in passedInstances:
-                classInstanceDict = {}
-                classInfoDict = someInstance.__dict__
-                #print('Printing Class Info: ' + str(classInfoDict))
-                for classElement in classInfoDict:
-                    if(not callable(getattr(someInstance, classElement)) and not classElement in varsLimited):
-                        classInstanceDict[classElement] = None
-                classVarDict[0]["data"].append( self.getJSONclassInstance(someInstance, classInstanceDict) )
-        elif(passedInstances == None):
-            pass
-            #if(passedInstances == None):
-                #classInstance = returnedClassInstantiationMethod()
-                #classInfoDict = classInstance.__dict__
-        else: #Accounts for the case where only a single instance of the class is passed into the function
-            classInstanceDict = {}
-            classInfoDict = passedInstances.__dict__
-            for classElement in classInfoDict:
-                #print('got attribute: ' + classElement)
-                if(not callable(getattr(passedInstances, classElement)) and not classElement in varsLimited):
-                    classInstanceDict[classElement] = None
-                    #print('not callable attribute: ' + classElement)
-            classVarDict[0]["data"].append( self.getJSONclassInstance(passedInstances, classInstanceDict) )
+        #Accounts for the case where a list of instances of the same class are passed into the function,
+        #or where only a single instance of the class is passed.
+        if(passedInstances != None):
+            if(not isinstance(passedInstances, list)):
+                passedInstances = [passedInstances]
+            if(passedInstances != []):
+                classSerializer = self.getClassSerializer(passedInstances[0].__class__)
+                classVarDict[0]["data"] = classSerializer.serializeInstances(passedInstances, varsLimited=varsLimited, varsIncluded=varsIncluded)
         #print('Class Variable Dictionary: ', classVarDict)
         return classVarDict
 
+    #Gets the same data as getJSONdictForClass already encoded as JSON bytes, ready to send.
+    def getJSONbytesForClass(self, passedInstances, varsLimited=[], varsIncluded=None):
+        return dumpJSONbytes(self.getJSONdictForClass(passedInstances, varsLimited=varsLimited, varsIncluded=varsIncluded))
+
+    #Yields the instance data getJSONdictForClass would send, as lists of at most chunkSize
+    #instance dictionaries, hydrating and converting each chunk only when it is reached.
+    def iterateJSONdictChunksForClass(self, passedInstances, varsLimited=[], varsIncluded=None, chunkSize=500):
+        if(type(passedInstances).__name__ == "dict"):
+            passedInstances = list(passedInstances.values())
+        for chunkStart in range(0, len(passedInstances), chunkSize):
+            instanceChunk = passedInstances[chunkStart:chunkStart + chunkSize]
+            self.hydrateInstances(instanceChunk)
+            classSerializer = self.getClassSerializer(instanceChunk[0].__class__)
+            yield classSerializer.serializeInstances(instanceChunk, varsLimited=varsLimited, varsIncluded=varsIncluded)
+
+    #Returns the serializer for a class, building it on first use or when the class has been
+    #re-defined since, as editing a dynamic class does.
+    def getClassSerializer(self, classObj):
+        classSerializer = self.classSerializers.get(classObj.__name__)
+        if(classSerializer == None or classSerializer.classObj is not classObj):
+            classSerializer = compiledClassSerializer(self, classObj)
+            self.classSerializers[classObj.__name__] = classSerializer
+        return classSerializer
+
+    #Drops the serializer of a class, so the next one is built from its current definition.
+    def invalidateClassSerializer(self, className):
+        self.classSerializers.pop(className, None)
+
     #If the Object's PolyTypedObject exists on the given manager object
     def getObjectTyping(self, classObj=None, className=None, classInstance=None ):
         if className != None:
-            for objType in self.objectTyping:
-                if(objType.className == className):
-                    return objType
+            objType = self.getRegisteredObjectTyping(className=className)
+            if(objType != None):
+                return objType
         elif classInstance != None:
-            for objType in self.objectTyping:
-                if(objType.className == classInstance.__class__.__name__):
-                    return objType
+            objType = self.getRegisteredObjectTyping(classObj=classInstance.__class__)
+            if(objType != None):
+                return objType
         elif classObj != None:
-            for objType in self.objectTyping:
-                if(objType.className == classObj.__name__):
-                    return objType
+            objType = self.getRegisteredObjectTyping(classObj=classObj)
+            if(objType != None):
+                return objType
         else:
             print("You called the \'getObjectTyping\' function without passing any parameters!  Must pass one of the three parameter options, the string name of the class, an instance of the class, or the class defining object itself \'__class__\'.")
         obj = None
@@ -1228,6 +1596,38 @@ class managerObject:
                 obj = self.makeDefaultObjectTyping(classObj=classObj)
         return obj
 
+    #Looks up a polyTypedObject in the typing registry without creating a default typing,
+    #returning None if the class has not been typed.  A class object is looked up directly
+    #and otherwise by it's name in objectTypingDict.
+    def getRegisteredObjectTyping(self, className=None, classObj=None):
+        objectTypingClassDict = self.__dict__.get('objectTypingClassDict')
+        objectTypingDict = self.__dict__.get('objectTypingDict')
+        if(objectTypingDict == None):
+            return None
+        if(classObj != None):
+            if(objectTypingClassDict != None):
+                objType = objectTypingClassDict.get(classObj)
+                #The class entry is only trusted while it is still the typing registered under
+                #the class name, since re-defining a dynamic class replaces it's typing.
+                if(objType != None and objectTypingDict.get(objType.className) is objType):
+                    return objType
+            className = classObj.__name__
+        objType = objectTypingDict.get(className)
+        if(objType != None and classObj != None and objectTypingClassDict != None):
+            objectTypingClassDict[classObj] = objType
+        return objType
+
+    #Removes a class's typing from every key of the typing registry.
+    def unregisterObjectTyping(self, className):
+        typingObj = self.objectTypingDict.pop(className, None)
+        self.invalidateClassSerializer(className)
+        objectTypingClassDict = self.__dict__.get('objectTypingClassDict', {})
+        for classObj in [someClass for someClass, someTyping in objectTypingClassDict.items() if someTyping is typingObj or someClass.__name__ == className]:
+            del objectTypingClassDict[classObj]
+        if typingObj is not None and typingObj in self.objectTyping:
+            self.objectTyping.remove(typingObj)
+        return typingObj
+
     def getJSONclassInstance(self, passedInstance, classInstanceDict):
         dataTypesPython = ['str','int','float','complex','list','tuple','range','dict','set','frozenset','bool','bytes','bytearray','memoryview', 'NoneType']
         #print("entered getJSONclassInstance()")
@@ -1375,6 +1775,9 @@ class managerObject:
 
     #
     def getListOfInstancesAtDepth(self, target_depth, depth=0, traversalList=[], source=None):
+        #Listings over the whole tree are answered from the depth registry.
+        if(depth == 0 and traversalList == [] and self.hasObjectTreeIndex()):
+            return [branchTuple[2] for branchTuple in self.depthInstanceRegistry.get(target_depth, {})]
         #print("In \'getListOfClassInstances\' branch with traveral list : ", traversalList)
         if(source==None):
             source = self
@@ -1405,177 +1808,271 @@ class managerObject:
 
     #Retrieves the source file for a given PolyTyped object for a given coding language, with the default set as python language.
     def getObjectTypingClassFile(self, className, language='py'):
-        for objType in self.objectTyping:
-            if(objType.className == className):
-                #print('Found typing for object ', className, ' the typing object is ', objType)
-                if(objType.sourceFiles != None and objType.sourceFiles != []):
-                    #print(objType.sourceFiles)
-                    for srcFile in objType.sourceFiles:
-                        if(srcFile.extension == language):
-                            return srcFile
+        objType = self.getRegisteredObjectTyping(className=className)
+        if(objType != None):
+            #print('Found typing for object ', className, ' the typing object is ', objType)
+            if(objType.sourceFiles != None and objType.sourceFiles != []):
+                #print(objType.sourceFiles)
+                for srcFile in objType.sourceFiles:
+                    if(srcFile.extension == language):
+                        return srcFile
         return None
 
-    #{"sampleStringAttribute":{"EQUALS":("id-1234","sampleClassName")),"CONTAINS":("","AND","")}, "sampleRefAttribute":{"IN":["polariID-0", ...]}}
+    #Queries are a dict of attribute requirements which must all hold, or a list of (comboMethod, segment)
+    #tuples where comboMethod is AND or OR and each segment is another dict or list.  An attribute
+    #requirement is either a plain value, meaning EQUALS, or a dict of operators to operands.
+    #{"sampleStringAttribute":{"EQUALS":"someValue","CONTAINS":"some"}, "sampleRefAttribute":{"IN":["polariID-0", ...]}, "sampleNumber":{"GTE":2,"LT":10}}
+    #[("AND",{"name":{"CONTAINS":"a"}}), ("OR",[("AND",{"value":1}), ("AND",{"value":{"GT":5}})])]
     def getListOfInstancesByAttributes(self, className, attributeQueryDict="*"):
         if(not className in self.objectTables.keys()):
             return {}
         allClassInstancesDict = self.objectTables[className]
-        remainingInstances = allClassInstancesDict
-        eliminatedInstances = {}
         if(attributeQueryDict == "*"):
             return allClassInstancesDict
-        elif(type(attributeQueryDict).__name__ == "list" or type(attributeQueryDict).__name__ == "polariList"):
-            remainingInstances = self.listConditionalRequirementsForQuery(className=className, comboMethod="AND",queryListSegment=attributeQueryDict, remainingInstancesDict=remainingInstances)
+        #Queries compare attribute values, so lazily restored stubs are built first.
+        self.hydrateClass(className)
+        if(type(attributeQueryDict).__name__ == "list" or type(attributeQueryDict).__name__ == "polariList"):
+            matchedIds = self.listConditionalRequirementsForQuery(className=className, comboMethod="AND", queryListSegment=attributeQueryDict)
         elif(type(attributeQueryDict).__name__ == "dict"):
-            remainingInstances = self.dictAttributeRequirementsForQuery(className=className, queryDictSegment=attributeQueryDict, remainingInstancesDict=remainingInstances)
+            matchedIds = self.dictAttributeRequirementsForQuery(className=className, queryDictSegment=attributeQueryDict)
         else:
             raise ValueError("attributeQuery value must be of type list or polariList, or a string containing *, instead it is ", attributeQueryDict)
-        return remainingInstances
+        if(matchedIds == None):
+            return dict(allClassInstancesDict)
+        return {someId:allClassInstancesDict[someId] for someId in matchedIds if someId in allClassInstancesDict}
+
+    #Returns one page of the instances matching a query, ordered by sortAttribute and then by id,
+    #as a tuple (pageInstances, totalCount, nextKey).  Pages are keyset paginated, afterKey is
+    #the nextKey of the previous page and nextKey is None on the last page.  Only the instances
+    #on the page are sorted, and an unfiltered page sorted on an attribute with a sorted index
+    #is read straight from the index.
+    def getPageOfInstances(self, className, attributeQueryDict="*", sortAttribute='id', descending=False, afterKey=None, limit=None):
+        matchedInstances = self.getListOfInstancesByAttributes(className=className, attributeQueryDict=attributeQueryDict)
+        totalCount = len(matchedInstances)
+        if(afterKey != None):
+            afterKey = tuple(afterKey)
+        index = self.attributeIndexes.get(className, {}).get(sortAttribute)
+        if(limit != None and attributeQueryDict == "*" and isinstance(index, sortedAttributeIndex) and len(index.sortedEntries) == totalCount):
+            entries = index.sortedEntries
+            if(not descending):
+                startIndex = 0 if afterKey == None else bisect_right(entries, (afterKey[:2], afterKey[2]))
+                pageEntries = entries[startIndex:startIndex + limit]
+                hasMore = startIndex + limit < len(entries)
+            else:
+                endIndex = len(entries) if afterKey == None else bisect_left(entries, (afterKey[:2], afterKey[2]))
+                pageEntries = entries[max(endIndex - limit, 0):endIndex][::-1]
+                hasMore = endIndex - limit > 0
+            pageInstances = [matchedInstances[entry[1]] for entry in pageEntries]
+            nextKey = None
+            if(hasMore and pageEntries != []):
+                nextKey = pageEntries[-1][0] + (pageEntries[-1][1],)
+            return (pageInstances, totalCount, nextKey)
+        def pageSortKey(someId, instance):
+            value = instance.__dict__.get(sortAttribute, _MISSING_ATTRIBUTE)
+            if(value is _MISSING_ATTRIBUTE):
+                value = getattr(instance, sortAttribute, None)
+            #Strings and numbers are keyed inline, as querySortKey would key them.
+            valueType = type(value)
+            if(valueType is str):
+                return (1, value, someId)
+            if(valueType is int or valueType is float):
+                return (0, value, someId)
+            return querySortKey(value) + (someId,)
+        #Keys are made as the instances are walked rather than stored for every instance, so
+        #only the page's keys outlive the walk.
+        keyedInstances = ((pageSortKey(someId, instance), instance) for someId, instance in matchedInstances.items())
+        if(afterKey != None):
+            if(not descending):
+                keyedInstances = (keyed for keyed in keyedInstances if keyed[0] > afterKey)
+            else:
+                keyedInstances = (keyed for keyed in keyedInstances if keyed[0] < afterKey)
+        if(limit == None):
+            return ([keyed[1] for keyed in sorted(keyedInstances, key=itemgetter(0), reverse=descending)], totalCount, None)
+        #One instance past the page is taken to tell whether another page follows.
+        if(not descending):
+            pageKeyed = heapq.nsmallest(limit + 1, keyedInstances, key=itemgetter(0))
+        else:
+            pageKeyed = heapq.nlargest(limit + 1, keyedInstances, key=itemgetter(0))
+        nextKey = None
+        if(len(pageKeyed) > limit):
+            pageKeyed = pageKeyed[:limit]
+            nextKey = pageKeyed[-1][0]
+        return ([keyed[1] for keyed in pageKeyed], totalCount, nextKey)
+
+    #Creates a secondary index on one attribute of a class, used by queries on that attribute.
+    #A 'hash' index answers EQUALS and IN, a 'sorted' index also answers GT, GTE, LT and LTE.
+    #Indexes are kept up to date as attributes are set, so they only pay off for attributes
+    #which are queried more often than they change.
+    def createAttributeIndex(self, className, attributeName, indexType='hash'):
+        if(indexType == 'hash'):
+            index = hashAttributeIndex(attributeName)
+        elif(indexType == 'sorted'):
+            index = sortedAttributeIndex(attributeName)
+        else:
+            raise ValueError("Attempted to create an attribute index of type '" + str(indexType) + "', only the types 'hash' and 'sorted' are allowed.")
+        if(className in self.objectTables):
+            self.hydrateClass(className)
+            index.build((instanceId, instance.__dict__[attributeName]) for instanceId, instance in self.objectTables[className].items() if attributeName in instance.__dict__)
+        self.attributeIndexes.setdefault(className, {})[attributeName] = index
+        return index
+
+    def dropAttributeIndex(self, className, attributeName=None):
+        if(attributeName == None):
+            self.attributeIndexes.pop(className, None)
+        elif(className in self.attributeIndexes):
+            self.attributeIndexes[className].pop(attributeName, None)
+            if(self.attributeIndexes[className] == {}):
+                del self.attributeIndexes[className]
+
+    #Called by treeObject.__setattr__ before an indexed attribute is assigned.
+    def updateAttributeIndex(self, instance, attributeName, value):
+        instanceId = instance.__dict__.get('id')
+        if(instanceId == None):
+            return
+        self.attributeIndexes[instance.__class__.__name__][attributeName].add(instanceId, value)
+
+    #Indexes every indexed attribute an instance already holds, for instances whose attributes
+    #were set without going through __setattr__, such as those restored from the database.
+    def indexInstance(self, instance):
+        classIndexes = self.attributeIndexes.get(instance.__class__.__name__)
+        instanceDict = instance.__dict__
+        if(not classIndexes or instanceDict.get('id') == None):
+            return
+        for attributeName, index in classIndexes.items():
+            if(attributeName in instanceDict):
+                index.add(instanceDict['id'], instanceDict[attributeName])
+            else:
+                index.remove(instanceDict['id'])
 
-    #Pass in a query Segment containing a tuple with an AND or OR operator
-    #in the middle.
-    def listConditionalRequirementsForQuery(self, className, queryListSegment, remainingInstancesDict, comboMethod="AND"):
+    def unindexInstance(self, className, instanceId):
+        for index in self.attributeIndexes.get(className, {}).values():
+            index.remove(instanceId)
+
+    #Evaluates a list of (comboMethod, segment) tuples, intersecting the ids matched by AND
+    #segments and unioning those matched by OR segments.  candidateIds limits the instances
+    #considered, where None means every instance of the class.  Returns a dict of matched ids,
+    #or None when the segment places no requirement on the candidates.
+    def listConditionalRequirementsForQuery(self, className, queryListSegment, candidateIds=None, comboMethod="AND"):
         if(not comboMethod in ["AND", "OR"]):
-            errMsg = "Attempted to generate query utilizing incorrect value '" + comboMethod + "' in the first position of a tuple in a Conditional Requirements List, only the values AND & OR are allowed in those positions for a query."
+            errMsg = "Attempted to generate query utilizing incorrect value '" + str(comboMethod) + "' in the first position of a tuple in a Conditional Requirements List, only the values AND & OR are allowed in those positions for a query."
             raise ValueError(errMsg)
-        tempInstancesDict = None
-        ListOfRemainingInstanceDictsForUnion = []
+        unionedIds = {}
+        hasSegment = False
         for logicTuple in queryListSegment:
-            if(type(logicTuple).__name__ == "tuple"):
-                if(len(logicTuple) != 2 and logicTuple[0] in ["AND", "OR"]):
-                    #At the base section, we assume it is an AND initially for the given list.
-                    segmentType = type(logicTuple[1]).__name__
-                    if(segmentType == "dict"):
-                        tempInstancesDict = self.dictAttributeRequirementsForQuery(className=className, queryDictSegment=logicTuple[1], remainingInstancesDict=remainingInstancesDict)
-                    elif(segmentType == "polariList" or segmentType == "list"):
-                        tempInstancesDict = self.listConditionalRequirementsForQuery(className=className, comboMethod=logicTuple[0],queryListSegment=logicTuple[1], remainingInstancesDict=remainingInstancesDict)
-                    else:
-                        errMsg = "Found unexpected value '"+ logicTuple[1] +"' of type '"+ segmentType +"' in conditional requirement tuple"
-                        raise ValueError(errMsg)
-                    if(comboMethod == "AND"):
-                        remainingInstancesDict = tempInstancesDict
-                    elif(comboMethod == "OR"):
-                        ListOfRemainingInstanceDictsForUnion.append(tempInstancesDict)
-        #Returns using this method when OR Conditional is being applied.
-        if(comboMethod == "OR"):
-            unionedInstancesDict = {}
-            for partialInstancesDict in ListOfRemainingInstanceDictsForUnion:
-                for someId in partialInstancesDict.keys():
-                    if(not someId in unionedInstancesDict):
-                        unionedInstancesDict[someId] = partialInstancesDict[someId]
-            return unionedInstancesDict
-        #Return using this method when AND Conditional is being applied
-        else:
-            return remainingInstancesDict
-
-
-
-    def dictAttributeRequirementsForQuery(self, className, queryDictSegment, remainingInstancesDict):
-        print("Starting query execution using atributeQueryDict: ", queryDictSegment)
-        attributeQueryDict = queryDictSegment
-        remainingInstances = remainingInstancesDict
-        eliminatedInstances = {}
-        for someAttribute in attributeQueryDict:
-            # Handle simple value format: {"id": "someValue"} -> treat as EQUALS
-            # This allows frontend to use simplified query format
-            attrValue = attributeQueryDict[someAttribute]
-            if isinstance(attrValue, str):
-                # Convert simple string value to EQUALS format
-                attributeQueryDict[someAttribute] = {"EQUALS": attrValue}
-            if("EQUALS" in attributeQueryDict[someAttribute]):
-                querySegment = attributeQueryDict[someAttribute]["EQUALS"]
-                querySegmentTyping = type(querySegment).__name__
-                #print("Entered EQUALS section of Query.  QuerySegment is type ",querySegmentTyping," and has value: ", querySegment)
-                if(querySegmentTyping == "str"):
-                    #print("In str section")
-                    #Scenario where it is expected for attribute of instance
-                    #to be an exact instance of a type with an exact id value.
-                    if(someAttribute == "id"):
-                        #print("in id section")
-                        if(querySegment in self.objectTables[className].keys()):
-                            #print("querySegment found in objectTables")
-                            #Find objects with the given attribute equal
-                            for remainingInstanceId in remainingInstances.keys():
-                            #    print("remaining Id: ", remainingInstanceId)
-                                remainingInstanceMeetsCriteria = False
-                                if(remainingInstanceId == querySegment):
-                                    returnDict = {remainingInstanceId:self.objectTables[className][remainingInstanceId]}
-                                    #print("ReturnDict = ", returnDict)
-                                    return returnDict
-                            #remainingInstanceMeetsCriteria = False
-                            #remainingInstance = self.objectTables[querySegment][remainingInstanceId]
-                            #if(hasattr(remainingInstance, someAttribute)):
-                            #    referencedInstance = getattr(remainingInstance, someAttribute)
-                            #    if(hasattr(referencedInstance, 'id')):
-                            #        if(referencedInstance.Id == querySegment):
-                            #            remainingInstanceMeetsCriteria = True
-                                if(not remainingInstanceMeetsCriteria):
-                                    #add to eliminated instances
-                                    eliminatedInstances[querySegment] = self.objectTables[className][remainingInstanceId]
-                    else:
-                        for remainingInstanceId in remainingInstances.keys():
-                            remainingInstanceMeetsCriteria = False
-                            if(remainingInstanceId != querySegment):
-                                remainingInstanceMeetsCriteria = True
-                        print("finding instances with non-id attribute of type string.")
+            if(type(logicTuple).__name__ != "tuple" or len(logicTuple) != 2):
+                continue
+            if(not logicTuple[0] in ["AND", "OR"]):
+                errMsg = "Attempted to generate query utilizing incorrect value '" + str(logicTuple[0]) + "' in the first position of a tuple in a Conditional Requirements List, only the values AND & OR are allowed in those positions for a query."
+                raise ValueError(errMsg)
+            segmentType = type(logicTuple[1]).__name__
+            #An AND list narrows candidateIds with each segment, so later segments check fewer instances.
+            if(segmentType == "dict"):
+                matchedIds = self.dictAttributeRequirementsForQuery(className=className, queryDictSegment=logicTuple[1], candidateIds=candidateIds)
+            elif(segmentType == "polariList" or segmentType == "list"):
+                matchedIds = self.listConditionalRequirementsForQuery(className=className, comboMethod=logicTuple[0], queryListSegment=logicTuple[1], candidateIds=candidateIds)
+            else:
+                errMsg = "Found unexpected value '"+ str(logicTuple[1]) +"' of type '"+ segmentType +"' in conditional requirement tuple"
+                raise ValueError(errMsg)
+            hasSegment = True
+            if(comboMethod == "AND"):
+                if(matchedIds != None):
+                    candidateIds = matchedIds
+                    if(candidateIds == {}):
+                        return candidateIds
+            else:
+                if(matchedIds == None):
+                    return candidateIds
+                unionedIds.update(matchedIds)
+        if(comboMethod == "OR" and hasSegment):
+            return unionedIds
+        return candidateIds
+
+    #Evaluates a dict of attribute requirements which must all hold.  Requirements answered by
+    #the id table or an attribute index are looked up, most selective first, and intersected;
+    #the rest are checked against the remaining candidates.  Returns a dict of matched ids, or
+    #None when the segment places no requirement on the candidates.
+    def dictAttributeRequirementsForQuery(self, className, queryDictSegment, candidateIds=None):
+        allClassInstancesDict = self.objectTables[className]
+        classIndexes = self.attributeIndexes.get(className, {})
+        #FORMAT: (estimatedMatches, attributeName, operator, operand, index or None for the id table)
+        lookups = []
+        #FORMAT: (attributeName, operator, operand)
+        scans = []
+        for attributeName, requirement in queryDictSegment.items():
+            if(type(requirement).__name__ != "dict"):
+                requirement = {"EQUALS":requirement}
+            for operator, operand in requirement.items():
+                if(not operator in QUERY_OPERATORS):
+                    continue
+                if(operator == "IN"):
+                    if(not type(operand).__name__ in ["list", "polariList", "tuple", "set", "frozenset"]):
+                        raise ValueError("Entered invalid type '" + type(operand).__name__ + "' into IN section of query, a list of values is required.")
+                    operand = [queryValueKey(someValue) for someValue in operand]
+                elif(operator != "CONTAINS"):
+                    operand = queryValueKey(operand)
+                if(attributeName == "id" and (operator == "EQUALS" or operator == "IN")):
+                    lookups.append((1 if operator == "EQUALS" else len(operand), attributeName, operator, operand, None))
+                    continue
+                index = classIndexes.get(attributeName)
+                estimatedMatches = None
+                if(index != None and operator in index.operators):
+                    estimatedMatches = index.estimate(operator, operand)
+                if(estimatedMatches == None):
+                    scans.append((attributeName, operator, operand))
                 else:
-                    raise ValueError("Entered invalid type into EQUALS section of query.")
-            #Remove eliminated instances from the remaining instances dict.
-            if(len(eliminatedInstances) != 0):
-                for someInstId in eliminatedInstances.keys():
-                    remainingInstances.pop(someInstId)
-                eliminatedInstances = []
-            #
-            if("CONTAINS" in attributeQueryDict[someAttribute]):
-                print("Entered 'contains' segment of query.")
-                querySegment = attributeQueryDict[someAttribute]["CONTAINS"]
-                querySegmentTyping = type(querySegment).__name__
-                if(querySegmentTyping == "str"):
-                    print("In string section of CONTAINS")
-                    #Find objects with the given attribute equal
-                    for remainingInstanceId in remainingInstances.keys():
-                        print("Analyzing for Id ", remainingInstanceId)
-                        remainingInstanceMeetsCriteria = False
-                        remainingInstance = self.objectTables[className][remainingInstanceId]
-                        if(hasattr(remainingInstance, someAttribute)):
-                            print("Found attribute in instance with CONTAINS: ", someAttribute, " with value: ", getattr(remainingInstance, someAttribute))
-                            if(querySegment in getattr(remainingInstance, someAttribute)):
-                                remainingInstanceMeetsCriteria = True
-                        if(not remainingInstanceMeetsCriteria):
-                            #add to eliminated instances
-                            eliminatedInstances[remainingInstanceId] = remainingInstance
-            #Remove eliminated instances from the remaining instances dict.
-            if(len(eliminatedInstances) != 0):
-                for someInstId in eliminatedInstances.keys():
-                    remainingInstances.pop(someInstId)
-                eliminatedInstances = []
-            if("IN" in attributeQueryDict[someAttribute]):
-                print("Entered 'IN' segment of query.")
-                querySegment = attributeQueryDict[someAttribute]["IN"]
-                querySegmentTyping = type(querySegment).__name__
-                print("querySegment type is ", querySegmentTyping, " and it's value is ", querySegment)
-                foundMatch = False
-                if(querySegmentTyping == "list"):
-                    for remainingInstanceId in remainingInstances.keys():
-                        remainingInstanceMeetsCriteria = False
-                        remainingInstance = self.objectTables[className][remainingInstanceId]
-                        if not remainingInstanceId in querySegment:
-                            eliminatedInstances[remainingInstanceId] = remainingInstance
-                            print("Eliminating instances using dict: ", eliminatedInstances)
-                            #Queue Id to be removed from remaining Ids.
-                        else:
-                            print("Found id", remainingInstanceId," in querySegment")
-                #Remove eliminated instances from the remaining instances dict.
-                if(len(eliminatedInstances.keys()) != 0):
-                    for someInstId in eliminatedInstances.keys():
-                        remainingInstances.pop(someInstId)
-                    eliminatedInstances = []
-        print("remainingInstancesDict = ", remainingInstances)
-        return remainingInstances
+                    lookups.append((estimatedMatches, attributeName, operator, operand, index))
+        lookups.sort(key=lambda lookup: lookup[0])
+        for (estimatedMatches, attributeName, operator, operand, index) in lookups:
+            #Once the candidates are fewer than a lookup would return, checking them is cheaper.
+            if(candidateIds != None and len(candidateIds) <= estimatedMatches):
+                scans.append((attributeName, operator, operand))
+                continue
+            if(index == None):
+                idList = [operand] if operator == "EQUALS" else operand
+                matchedIds = {}
+                for someId in idList:
+                    try:
+                        if(someId in allClassInstancesDict):
+                            matchedIds[someId] = None
+                    except TypeError:
+                        pass
+            else:
+                matchedIds = index.lookup(operator, operand)
+            if(candidateIds == None):
+                candidateIds = matchedIds
+            else:
+                candidateIds = {someId:None for someId in matchedIds if someId in candidateIds}
+            if(candidateIds == {}):
+                return candidateIds
+        if(scans == []):
+            return candidateIds
+        if(candidateIds == None):
+            candidateIds = allClassInstancesDict
+        matchedIds = {}
+        for someId in candidateIds:
+            instance = allClassInstancesDict.get(someId)
+            if(instance == None):
+                continue
+            for (attributeName, operator, operand) in scans:
+                #Reading __dict__ first skips the hydration check __getattr__ makes for missing attributes.
+                value = instance.__dict__.get(attributeName, _MISSING_ATTRIBUTE)
+                if(value is _MISSING_ATTRIBUTE):
+                    value = getattr(instance, attributeName, _MISSING_ATTRIBUTE)
+                if(value is _MISSING_ATTRIBUTE or not queryConditionHolds(value, operator, operand)):
+                    break
+            else:
+                matchedIds[someId] = None
+        return matchedIds
 
 
     #
     def getListOfClassInstances(self, className, traversalList=[], source=None):
+        #Listings over the whole tree are answered from the class registry.
+        if(traversalList == [] and self.hasObjectTreeIndex()):
+            return [branchTuple[2] for branchTuple in self.classInstanceRegistry.get(className, {})]
+        return self.searchListOfClassInstances(className=className, traversalList=traversalList, source=source)
+
+    def searchListOfClassInstances(self, className, traversalList=[], source=None):
         if(source==None):
             source = self
         #else:
@@ -1598,7 +2095,7 @@ class managerObject:
                     #else:
                         #print("A non-matching object was found, ", branchTuple[2])
                 for branchTuple in branch.keys():
-                    tempList = self.getListOfClassInstances(className=className, traversalList=traversalList+[branchTuple], source=source)
+                    tempList = self.searchListOfClassInstances(className=className, traversalList=traversalList+[branchTuple], source=source)
                     instanceList = instanceList + tempList
         else:
             #print('source object does not exist in the object tree of manager object, returning empty list of objects.')
@@ -1610,13 +2107,13 @@ class managerObject:
     def makeDefaultObjectTyping(self, classInstance=None, classObj=None):
         #First, make sure to double check that the polyTyping does not already exist.
         if(classInstance != None):
-            for someTypingObj in self.objectTyping:
-                if(someTypingObj.className == classInstance.__class__.__name__):
-                    return someTypingObj
+            someTypingObj = self.getRegisteredObjectTyping(classObj=classInstance.__class__)
+            if(someTypingObj != None):
+                return someTypingObj
         elif(classObj != None):
-            for someTypingObj in self.objectTyping:
-                if(someTypingObj.className == classObj.__name__):
-                    return someTypingObj
+            someTypingObj = self.getRegisteredObjectTyping(classObj=classObj)
+            if(someTypingObj != None):
+                return someTypingObj
         isBuiltinClass = False
         try:
             if(classInstance != None):
@@ -1747,69 +2244,197 @@ class managerObject:
             pathDict["pathDuplicates"] = pathDict["pathDuplicates"] + branchPathDict["pathDuplicates"]
         return pathDict
 
+    #Returns the path to the tuple's main node in the object tree, or the stored path on a
+    #duplicate node if only duplicates exist.  Searches of the whole tree are answered from
+    #objectTreeIndex, searches limited to a sub-tree (traversalList) walk that sub-tree.
+    def getTuplePathInObjTree(self, instanceTuple, traversalList=[]):
+        if(traversalList == [] and self.hasObjectTreeIndex()):
+            return self.getIndexedTuplePath(instanceTuple)
+        return self.searchTuplePathInObjTree(instanceTuple=instanceTuple, traversalList=traversalList)
+
     #Will go through every dictionary in the object tree and return branching depth of the tuple
     #if the tuple exists within the tree.
-    def getTuplePathInObjTree(self, instanceTuple, traversalList=[]):
-        #if(traversalList==[]):
-        #    print('Trying to find Tuple match in Object Tree for tuple: ')
-        #    print(instanceTuple)
+    def searchTuplePathInObjTree(self, instanceTuple, traversalList=[]):
         branch = self.getBranchNode(traversalList = traversalList)
         #Handles the case where no further branches exist, meaning, it is currently on a duplicate Node.
         if(branch == None):
             return None
         path = None
-        #print('Branch to be searched: ', branch)
         for branchTuple in branch.keys():
             if branchTuple[0] == instanceTuple[0] and branchTuple[1] == instanceTuple[1]:
-                #Case of a dup;icate match, where the path to the original is in the third position.
+                #Case of a duplicate match, where the path to the original is in the third position.
                 if(type(branchTuple[2]) == tuple):
-                    #print('Found tuple match!')
-                    #if(branchTuple[2] != [] and branchTuple[2] != None):
-                    #    print("Returning non-empty path! - ", branchTuple[2])
                     return branchTuple[2]
                 #Case of an exact match.
                 elif(branchTuple[2] == instanceTuple[2]):
-                    #print("Found an exact match in the tree for instance: ", instanceTuple[2])
-                    #if(traversalList != [] and traversalList != None):
-                    #    print("Returning non-empty path! - ", traversalList)
                     traversalList = traversalList + [branchTuple]
                     return traversalList
-                #print('Found tuple match!')
-                #print(traversalList)
-                #return traversalList
         for branchTuple in branch.keys():
-            path = self.getTuplePathInObjTree(traversalList=traversalList+[branchTuple],instanceTuple=instanceTuple)
+            path = self.searchTuplePathInObjTree(traversalList=traversalList+[branchTuple],instanceTuple=instanceTuple)
             if(path != None):
-                #if(path != [] and path != None):
-                #    print("Returning non-empty path! - ", path)
                 return path
-        #if(traversalList == []):
-        #    print('Tuple not found in tree!')
-        #    print(instanceTuple)
-        #if(path != [] and path != None):
-        #    print("Returning non-empty path! - ", path)
         return path
 
-    #Will go through every dictionary in the object tree and return branching depth of the tuple
-    #if the tuple exists within the tree.
-    def getAllPathsForTupleInObjTree(self, instanceTuple, traversalList=[], allPaths=[]):
+    #Returns every path (main node and duplicates) at which the tuple's class and identifiers
+    #exist in the object tree.
+    def getAllPathsForTupleInObjTree(self, instanceTuple, traversalList=[], allPaths=None):
+        if(traversalList == [] and allPaths == None and self.hasObjectTreeIndex()):
+            return self.getAllIndexedTuplePaths(instanceTuple)
+        if(allPaths == None):
+            allPaths = []
         branch = self.getBranchNode(traversalList = traversalList)
         #Handles the case where no further branches exist, meaning, it is currently on a duplicate Node.
         if(branch == None):
             return allPaths
-        #print('Branch to be searched: ', branch)
         for branchTuple in branch.keys():
             if branchTuple[0] == instanceTuple[0] and branchTuple[1] == instanceTuple[1]:
                 allPaths.append(traversalList + [branchTuple])
         for branchTuple in branch.keys():
             allPaths = self.getAllPathsForTupleInObjTree(traversalList=traversalList+[branchTuple],instanceTuple=instanceTuple, allPaths=allPaths)
-        #if(traversalList == []):
-        #    print('Tuple not found in tree!')
-        #    print(instanceTuple)
-        #if(path != [] and path != None):
-        #    print("Returning non-empty path! - ", path)
         return allPaths
 
+    #OBJECT TREE INDEX
+    #Each node placed in the objectTree is recorded together with the tuple of the node it
+    #branches from, so a path is rebuilt by walking parents instead of searching the tree,
+    #and moving a sub-tree only re-points the parent of the moved node.
+    def hasObjectTreeIndex(self):
+        return self.__dict__.get('objectTreeIndex') != None and self.__dict__.get('objectTree') != None
+
+    def isDuplicateTreeTuple(self, branchTuple):
+        return type(branchTuple[2]) == tuple or branchTuple[2] == None
+
+    def indexTreeNode(self, branchTuple, parentTuple):
+        key = (branchTuple[0], branchTuple[1])
+        if(self.isDuplicateTreeTuple(branchTuple)):
+            self.objectTreeDuplicateIndex.setdefault(key, {})[(branchTuple, parentTuple)] = None
+        else:
+            self.objectTreeIndex.setdefault(key, {})[branchTuple] = parentTuple
+            self.registerClassInstance(branchTuple, parentTuple)
+
+    def unindexTreeNode(self, branchTuple, parentTuple):
+        key = (branchTuple[0], branchTuple[1])
+        if(self.isDuplicateTreeTuple(branchTuple)):
+            indexDict = self.objectTreeDuplicateIndex
+            indexDict.get(key, {}).pop((branchTuple, parentTuple), None)
+        else:
+            indexDict = self.objectTreeIndex
+            placements = indexDict.get(key, {})
+            if(placements.get(branchTuple) == parentTuple):
+                placements.pop(branchTuple, None)
+                self.unregisterClassInstance(branchTuple)
+        if(key in indexDict and indexDict[key] == {}):
+            del indexDict[key]
+
+    #Records a main node in the class and depth registries, the depth being one more than the
+    #depth of the main node it branches from.
+    def registerClassInstance(self, branchTuple, parentTuple):
+        depth = 0
+        if(parentTuple != None):
+            depth = self.classInstanceRegistry.get(parentTuple[0], {}).get(parentTuple, -1) + 1
+        self.classInstanceRegistry.setdefault(branchTuple[0], {})[branchTuple] = depth
+        self.depthInstanceRegistry.setdefault(depth, {})[branchTuple] = None
+
+    def unregisterClassInstance(self, branchTuple):
+        classRegistry = self.classInstanceRegistry.get(branchTuple[0], {})
+        if(not branchTuple in classRegistry):
+            return
+        depth = classRegistry.pop(branchTuple)
+        if(classRegistry == {}):
+            del self.classInstanceRegistry[branchTuple[0]]
+        depthRegistry = self.depthInstanceRegistry.get(depth, {})
+        depthRegistry.pop(branchTuple, None)
+        if(depthRegistry == {}):
+            del self.depthInstanceRegistry[depth]
+
+    #Returns the number of instances of a class placed in the objectTree.
+    def getClassInstanceCount(self, className):
+        if(self.hasObjectTreeIndex()):
+            return len(self.classInstanceRegistry.get(className, {}))
+        return len(self.getListOfClassInstances(className=className))
+
+    #Indexes (or un-indexes) a node and every node on the sub-tree branching from it.
+    def indexTreeBranch(self, branchTuple, parentTuple, subBranch):
+        self.indexTreeNode(branchTuple, parentTuple)
+        if(type(subBranch) == dict):
+            for subTuple in subBranch.keys():
+                self.indexTreeBranch(subTuple, branchTuple, subBranch[subTuple])
+
+    def unindexTreeBranch(self, branchTuple, parentTuple, subBranch):
+        self.unindexTreeNode(branchTuple, parentTuple)
+        if(type(subBranch) == dict):
+            for subTuple in subBranch.keys():
+                self.unindexTreeBranch(subTuple, branchTuple, subBranch[subTuple])
+
+    #Discards the index and rebuilds it with a single pass over the objectTree.
+    def rebuildObjectTreeIndex(self):
+        self.objectTreeIndex = {}
+        self.objectTreeDuplicateIndex = {}
+        self.classInstanceRegistry = {}
+        self.depthInstanceRegistry = {}
+        if(self.objectTree == None):
+            return
+        for rootTuple in self.objectTree.keys():
+            self.indexTreeBranch(rootTuple, None, self.objectTree[rootTuple])
+
+    #Removes a node and the sub-tree branching from it off of the node at parentPath.
+    def removeTreeBranch(self, parentPath, branchTuple):
+        if(parentPath == [] or parentPath == None):
+            parentBranch = self.objectTree
+            parentTuple = None
+        else:
+            parentBranch = self.getBranchNode(parentPath)
+            parentTuple = parentPath[len(parentPath) - 1]
+        if(parentBranch == None or not branchTuple in parentBranch):
+            return None
+        subBranch = parentBranch.pop(branchTuple)
+        self.unindexTreeBranch(branchTuple, parentTuple, subBranch)
+        return subBranch
+
+    def buildIndexedTreePath(self, nodeTuple, parentTuple):
+        path = [nodeTuple]
+        #Bounds the walk so a corrupted index can never loop forever.
+        maxDepth = len(self.objectTreeIndex) + 1
+        while parentTuple != None and len(path) <= maxDepth:
+            path.append(parentTuple)
+            #Only main nodes have branches, so every parent is found among the main nodes.
+            parentTuple = self.objectTreeIndex.get((parentTuple[0], parentTuple[1]), {}).get(parentTuple)
+        path.reverse()
+        return path
+
+    def getIndexedTuplePath(self, instanceTuple):
+        key = (instanceTuple[0], instanceTuple[1])
+        placements = self.objectTreeIndex.get(key, {})
+        #Case of an exact match.
+        if(instanceTuple in placements):
+            return self.buildIndexedTreePath(instanceTuple, placements[instanceTuple])
+        #Case of a duplicate match, where the path to the original is in the third position.
+        for (placedTuple, parentTuple) in self.objectTreeDuplicateIndex.get(key, {}):
+            if(type(placedTuple[2]) == tuple):
+                return placedTuple[2]
+        return None
+
+    def getAllIndexedTuplePaths(self, instanceTuple):
+        key = (instanceTuple[0], instanceTuple[1])
+        allPaths = []
+        for (placedTuple, parentTuple) in self.objectTreeIndex.get(key, {}).items():
+            allPaths.append(self.buildIndexedTreePath(placedTuple, parentTuple))
+        for (placedTuple, parentTuple) in self.objectTreeDuplicateIndex.get(key, {}):
+            allPaths.append(self.buildIndexedTreePath(placedTuple, parentTuple))
+        return allPaths
+
+    #Returns the instances an instance branches from in the object tree, at its main node and
+    #at each of its duplicate nodes.  A duplicate placed beneath its own main node is skipped.
+    def getTreeParentInstances(self, instance):
+        instanceTuple = self.getInstanceTuple(instance)
+        if(not self.hasObjectTreeIndex()):
+            parents = [path[-2][2] for path in self.getAllPathsForTupleInObjTree(instanceTuple) if len(path) > 1]
+        else:
+            key = (instanceTuple[0], instanceTuple[1])
+            parentTuples = list(self.objectTreeIndex.get(key, {}).values())
+            parentTuples += [parentTuple for (placedTuple, parentTuple) in self.objectTreeDuplicateIndex.get(key, {})]
+            parents = [parentTuple[2] for parentTuple in parentTuples if parentTuple != None]
+        return [parent for parent in parents if parent is not instance]
+
     #Access a single object instance as a node, and checks each typingObject to see what variables
     #that object has which may hold instances of other objects as either a instance or list of
     #instances, then returns all branches seperated into 3 categories "new","old", or "duplicates".
@@ -1873,6 +2498,7 @@ class managerObject:
             baseTuple=tuple([type(self).__name__, self.getInstanceIdentifiers(self), self])
             traversalList=[baseTuple]
             self.objectTree = {baseTuple:{}}
+            self.rebuildObjectTreeIndex()
             #print('Tree Base Setup, getting Branches.')
         branchingDict = self.getBranches(traversalList)
         #print('Got Branches.')
@@ -1914,7 +2540,7 @@ class managerObject:
                 #If the newly generated Duplicate has a lower branching depth than the original,
                 #then we replace the original with the new path.
                 if(len(originalPath) > len(traversalList)):
-                    self.replaceOriginalTuple(self, originalPath=originalPath, newPath=traversalList+[duplicates[0]], newTuple=duplicates[0])
+                    self.replaceOriginalTuple(originalPath=originalPath, newPath=traversalList+[duplicates[0]], newTuple=duplicates[0])
                     iscomplete = self.makeObjectTree(traversalList=traversalList+[duplicates[0]], baseTuple=baseTuple)
                     if(iscomplete):
                         completionCount += 1
@@ -1988,9 +2614,14 @@ class managerObject:
         if(traversalList == []):
             #if(type(instance).__name__ == "treeBranchObject"):
             #    print("Attching treeBranchObject at base of tree?")
+            if(branchTuple in self.objectTree):
+                self.unindexTreeBranch(branchTuple, None, self.objectTree[branchTuple])
             self.objectTree[branchTuple] = {}
+            self.indexTreeNode(branchTuple, None)
         elif(branchNode.get(branchTuple) == None):
             #print("Adding new node in addNewBranch on sub-path's tuple: ", traversalList[len(traversalList) - 1])
+            if(not branchTuple in branchNode):
+                self.indexTreeNode(branchTuple, traversalList[len(traversalList) - 1])
             branchNode[branchTuple] = {}
 
     #Accesses a branch node and adds an empty duplicate sub-branch, which contain identifiers and
@@ -1998,28 +2629,34 @@ class managerObject:
     def addDuplicateBranch(self, traversalList, branchTuple):
         branchNode = self.getBranchNode(traversalList)
         if(branchNode.get(branchTuple) == None):
+            if(not branchTuple in branchNode):
+                self.indexTreeNode(branchTuple, traversalList[len(traversalList) - 1])
             branchNode[branchTuple] = None
 
     #Places a duplicate tuple in the node's original location and re-locates the
-    #main node which branches.
+    #main node which branches.  Both paths end with the tuple of the node being moved.
     def replaceOriginalTuple(self, originalPath, newPath, newTuple):
-        #Get the new branch where this tuple is now going to rest
-        newBranch = self.getBranchNode[newPath]
-        originalBranch = self.getBranchNode[originalPath]
-        originalTuple = None
-        for branchTuple in originalBranch.keys():
-            if(branchTuple[0]==newTuple[0] and branchTuple[1]==newTuple[1]):
-                originalTuple = branchTuple
-                break
-        #Bring over all of the sub-branches that were attached to it to the new path.
-        newBranch[originalTuple] = self.getBranchNode[originalPath+[originalTuple]]
-        #Get the original path that the tuple was resting on.
-        originalNode = self.getBranchNode[originalPath]
-        #Remove the tuple and all of it's sub-branches which have already been moved.
-        originalNode.remove(originalTuple)
+        originalParentPath = list(originalPath[:len(originalPath) - 1])
+        newParentPath = list(newPath[:len(newPath) - 1])
+        originalTuple = originalPath[len(originalPath) - 1]
+        #A node can not be moved onto a path that runs through itself.
+        if(originalTuple in newParentPath):
+            return
+        #Remove the tuple and all of it's sub-branches from the original path.
+        subBranch = self.removeTreeBranch(originalParentPath, originalTuple)
+        if(subBranch == None):
+            subBranch = {}
+        #Bring over all of the sub-branches that were attached to it to the new path,
+        #replacing the duplicate tuple which was resting there.
+        newBranch = self.getBranchNode(newParentPath)
+        if(newTuple in newBranch):
+            self.removeTreeBranch(newParentPath, newTuple)
+        newBranch[originalTuple] = subBranch
+        self.indexTreeBranch(originalTuple, newParentPath[len(newParentPath) - 1] if newParentPath else None, subBranch)
         #Replace the tuple on the old branch with a 'duplicateTuple' that references the new path.
-        replacementTuple = tuple([originalTuple[0], originalTuple[1], originalPath])
-        originalNode[replacementTuple] = None
+        replacementTuple = tuple([originalTuple[0], originalTuple[1], tuple(newParentPath + [originalTuple])])
+        if(originalParentPath != []):
+            self.addDuplicateBranch(traversalList=originalParentPath, branchTuple=replacementTuple)
 
     #Adds all of the basic objects that are necessary for the application to run, and accounts for
     #all of their identifiers.
@@ -2091,10 +2728,7 @@ class managerObject:
             #self.makeDefaultObjectTyping(objTyp)
 
     def addObjTyping(self, sourceFiles, className, identifierVariables, objectReferencesDict={}):
-        foundObj = False
-        for objTyp in self.objectTyping:
-            if(objTyp.className == className):
-                foundObj = True
+        foundObj = self.getRegisteredObjectTyping(className=className) != None
         if(not foundObj):
             newTypingObj = polyTypedObject(sourceFiles=sourceFiles, className=className, identifierVariables=identifierVariables, objectReferencesDict=objectReferencesDict, manager=self)
         
@@ -2127,9 +2761,10 @@ class managerObject:
             for i in range(0,N):
                 num = random.randint(0,63)
                 idString += numToBase64(num = num)
-            if(not idString in self.idList):
+            if(not idString in self.idSet):
                 self.id = idString
                 (self.idList).append(idString)
+                self.idSet.add(idString)
                 return
             else:
                 self.id = self.makeUniqueIdentifier(self, N=N+1)
@@ -2142,158 +2777,22 @@ class managerObject:
         return b64Num
 
 
-    #Types of operations on queries that can narrow down search criteria.
-    #Strict criteria run first because they narrow down options more quickly most consistently.
-    #relational criteria run second because they often narrow down options more than a subSet operation.
-    #subSet criteria run last because they 
-    #strict criteria (very restrictive) - Narrows to instances which carry only one specific value for a var.
-    #relational criteria (variably restrictive) - Narrows to instances which are determined to have a relation (Immediate connection through Object Tree) with a specified object.
-    #subSet criteria (less restrictive) - Narrows all instances down to a subset of possibilities of itself based on criteria.
-    #STRICT OPERATION TYPES TABLE
-    #max - gets instances in tree holding the maximum numeric value for that variable.
-    #min - gets instances in tree holding the minimum numeric value for that variable.
-    # == - gets instances where the variable has the exact value entered.
-    # SUBSET CRITERIA TYPES TABLE
-    # >,<,>=,<= - gets instances in tree based on numeric value in comparison to a specified value being compared.
-    #%+ - gets instances which have a post-fix matching the given specifier, and may have anything following that.
-    #+% - gets instances which have a pre-fix matching the given specifier
-    #+%+ - gets instances where any portion of the variables value matches the specifier
-    strictOperationTypes = [("max"),("min"),("==","var")]
-    WITHrelationalOperationTypes = [("hasChildren","subQuery"),("hasParents","subQuery")]
-    WHERErelationalOperationTypes = [("var","contains")]
-    subSetOperationTypes = [("var","%","var"),(">","var"),("<","var"),(">=","var"),("<=","var"),("%","var"),("var","%")]
-    WITHOperationTypes = strictOperationTypes + subSetOperationTypes
-    specialCharacters = ["=",">","<"]
-    orderingCharacters = [",","[","]","(",")",":"]
-    #This function's only purpose is to retrieve instances from the system, and to give the system/user the ability to specify most any specific circumstance or criteria 
-    #which one might want to use in order to narrow down their search for a specific set of instances,
-    #as well as allowing them to chain criteria as much as desired, allowing maximum freedom.
-    #SELECT section - If this section exists, the overall query will return a formatted json dictionary containing all converted objects with the specified variables included.
-    #Example complex Object Tree query: queryString=
-    #"[SELECT * FROM testObj WITH { id:(max), testVar:(=None), name:(a%c%), objList:( contains[ secondTestObj WITH { name:(='name') } ] ) } WHERE hasChildren:[ secondTestObj ]")
-    #This would return a json dictionary of testObj
-    def queryObjectTree(self, queryString): 
-        curType = None
-        idName = None
-        #make all letters in the query lowercase to ensure uniformity.
-        queryString = queryString.lower()
-        queryStartIndex = queryString.find('[')
-        queryEndIndex = queryString.rfind(']')
-        queryString = queryString.substring(queryStartIndex + 1, queryEndIndex - 1)
-        #if()
-        SELECTstring = ""
-        FROMstring = ""
-        WITHstring = ""
-        WHEREstring = ""
-        tempTuple = []
-        tuplesList = []
-        strictCommands = []
-        subSetCommands = []
-        subQueries = []
-        relationalCommands = []
-        varQuery = {}
-        #Parsing Commands and putting them in appropriate order
-        for objType in (self.manager).objectTyping:
-            if(objType.className == className):
-                curType = objType
-                break
-        if(curType == None):
-            print("Object Type (Polytyping Object) not defined on the given manager object for type - ", curType)
-            return
-        #Parse through and eliminate all spaces, then get variable query sets
-        i = 0
-        varName = None
-        cmdFound = False
-        #Go through the query and convert the query into a list of query commands
-        #sorted into strict, subSet, and relational sections, and assign a specific
-        #variable to perform each operation on and specified variables to utilize within
-        #the operation to narrow down allowed values.
-        curVar = None
-        while i < len(queryString):
-            cmdFound = False
-            #Skip over any spaces
-            if(queryString[i] == ' '):
-                continue
-            #A variable has been loaded and now we are iterating through criteria that must be met or analyzed in regards to that specific variable.
-            elif(curVar != None):
-                if(queryString[i]==')'):
-                    varDict['criteriaEndIndex'] = i
-                    curVar == None
-                    continue
-                for cmdTuple in WITHOperationTypes:
-                    if(cmdTuple[0] == 'var'):
-                        cmd = cmdTuple[1]
-                    else:
-                        cmd = cmdTuple[0]
-                    j = 0
-                    while j < len(cmd):
-                        if((cmd)[j:j+1] == queryString[i+j]):
-                            if(j == len(cmd) - 1):
-                                if(queryString[i:i+j] in strictOperationTypes):
-                                    strictCommands.append( tuple([]) )
-                                elif(queryString[i:i+j] in subSetOperationTypes):
-                                    subSetCommands.append( tuple([]) )
-                                elif(queryString[i:i+j] in relationalOperationTypes):
-                                    relationalCommands.append( tuple([]) )
-                                else:
-                                    print('Error: Could not find type for command.')
-                                cmdFound = True
-                                i = i + j
-                                break
-                        else:
-                            break
-                        j += 1
-            #looks to see if this may be the first character of a command
-            elif(curVar == None):
-                foundKeyChar = False
-                j = 0
-                while (not foundKeyChar) or i+j < len(queryString):
-                    if(queryString[i+j] in orderingCharacters):
-                        if(queryString[i+j:i+j+2] == ":("):
-                            #Get the word before this ':', which should be the variable name, load it onto varName.
-                            k = 0
-                            endSpaceIndexes = []
-                            wordStartFound = False
-                            lowestSpcIndex = None
-                            while not wordStartFound:
-                                if(queryString[i+j-k] == ' '):
-                                    if(k == 1):
-                                        lowestSpcIndex = k
-                                    elif(k == lowestSpcIndex+1):
-                                        lowestSpcIndex = k
-                                elif(queryString[i+j-k] == '[' or ','):
-                                    l = 1
-                                    while(i+j-k+l):
-                                        if(queryString[i+j-k+l]!=' '):
-                                            wordStartFound = True
-                                            startIndex= i+j-k+l
-                                        l+=1
-                                k+=1
-                            varDict = {'varName':queryString[startIndex:i+j-(lowestSpcIndex+1)],'queryCriteriaCount':0,'criteriaStartIndex':i+j+2,'criteriaEndIndex':None}
-                            varName = queryString[i:i+j-1]
-                            i = (i+j+2)
-                            break
-                    j += 1
-        if(not cmdFound):
-            i += 1
-
-    def parseSelect(startIndex, endIndex, queryString):
-        selectionsDict = {}
-        if(endIndex <= len(queryString)):
-            i = startIndex
-            while i < endIndex:
-                #Skips through spaces that are not important in terms of notation
-                if(queryString[i] == ' '):
-                    i += 1
-                    continue
-                #catches notation within the query which would indicate a subquery, calculates
-                #the logical equivolent WHERE operations based on the WHERE operations of the current
-                #query.
-                elif(queryString[i] == '['):
-                    closerIndex = None
-                    while i < endIndex and closerIndex==None:
-                        if(queryString[i] == ']'):
-                            closerIndex = i
-                        i += 1
-                
-        return selectionsDict
\ No newline at end of file
+    #Runs a query written in the object tree query language, whose syntax is described in
+    #objectTreeQueryLanguage.  Each query text is parsed and compiled once, and the compiled
+    #plan is kept in compiledQueryCache, so repeating a query skips straight to evaluation.
+    #Example object tree query: queryString=
+    #"[SELECT * FROM testObj WITH { id:(max), testVar:(=None), name:(a%c%), objList:( contains[ secondTestObj WITH { name:(='name') } ] ) } WHERE hasChildren:[ secondTestObj ]]"
+    #This would return a dictionary of the matched testObj instances keyed by id, while
+    #"[SELECT count(*), max(value) FROM testObj WITH { name:(a%) }]" would return {"count(*)":..., "max(value)":...}
+    def queryObjectTree(self, queryString):
+        return self.getCompiledQuery(queryString).run(self)
+
+    def getCompiledQuery(self, queryString):
+        queryPlan = self.compiledQueryCache.get(queryString)
+        if(queryPlan == None):
+            queryPlan = compileObjectTreeQuery(queryString)
+            if(len(self.compiledQueryCache) >= COMPILED_QUERY_CACHE_SIZE):
+                #Evicts the query compiled longest ago.
+                self.compiledQueryCache.pop(next(iter(self.compiledQueryCache)), None)
+            self.compiledQueryCache[queryString] = queryPlan
+        return queryPlan
@@ -0,0 +1,244 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Secondary attribute indexes over the instances in a manager's objectTables, used
+by the query planner in getListOfInstancesByAttributes.
+
+An index covers one attribute of one class and maps attribute values to the ids
+of the instances holding them.  Attributes which reference another tree object
+are indexed by the referenced object's id, matching how queries name them.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+# Operators a query may apply to an attribute, and those answered by each kind of index.
+QUERY_OPERATORS = frozenset({'EQUALS', 'IN', 'CONTAINS', 'GT', 'GTE', 'LT', 'LTE'})
+HASH_INDEX_OPERATORS = frozenset({'EQUALS', 'IN'})
+SORTED_INDEX_OPERATORS = frozenset({'EQUALS', 'IN', 'GT', 'GTE', 'LT', 'LTE'})
+RANGE_OPERATORS = frozenset({'GT', 'GTE', 'LT', 'LTE'})
+
+# Marks a value which cannot be placed in an index.
+_UNINDEXABLE = object()
+
+
+def queryValueKey(value):
+    """Return the value an attribute is compared by in queries, the id for tree object references."""
+    valueDict = getattr(value, '__dict__', None)
+    if valueDict is not None and 'manager' in valueDict and 'id' in valueDict:
+        return valueDict['id']
+    return value
+
+
+def queryConditionHolds(value, operator, operand):
+    """Check one query requirement against an attribute value, used where no index answers it.
+
+    EQUALS, IN and the range operators compare the value as queryValueKey gives it, CONTAINS
+    checks for a substring or for a member of a list, comparing referenced objects by id.
+    Values which cannot be compared with the operand never match.
+    """
+    try:
+        if operator == 'CONTAINS':
+            if isinstance(value, (list, tuple)):
+                return any(queryValueKey(someValue) == operand for someValue in value)
+            return operand in value
+        valueKey = queryValueKey(value)
+        if operator == 'EQUALS':
+            return valueKey == operand
+        if operator == 'IN':
+            return valueKey in operand
+        if operator == 'GT':
+            return valueKey > operand
+        if operator == 'GTE':
+            return valueKey >= operand
+        if operator == 'LT':
+            return valueKey < operand
+        if operator == 'LTE':
+            return valueKey <= operand
+    except TypeError:
+        return False
+    return False
+
+
+def _sortKey(value):
+    # Numbers and strings are kept in separate ranks so they never need to be compared.
+    valueType = type(value)
+    if valueType is int or valueType is float:
+        return (0, value)
+    if valueType is str:
+        return (1, value)
+    return _UNINDEXABLE
+
+
+def querySortKey(value):
+    """Return a key ordering attribute values of any type, numbers first, then strings,
+    then other values by their string form, then None.  Matches the sorted index order
+    for numbers and strings.
+    """
+    valueKey = queryValueKey(value)
+    sortKey = _sortKey(valueKey)
+    if sortKey is not _UNINDEXABLE:
+        return sortKey
+    if valueKey is None:
+        return (3, '')
+    if type(valueKey) is bool:
+        return (0, int(valueKey))
+    return (2, str(valueKey))
+
+
+class _MaxIdType:
+    """Compares greater than every instance id, to bisect past all entries of one value."""
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return other is self
+
+    __hash__ = object.__hash__
+
+_MaxId = _MaxIdType()
+
+
+class hashAttributeIndex:
+    """Index answering EQUALS and IN on one attribute with a dict of value buckets."""
+    operators = HASH_INDEX_OPERATORS
+
+    def __init__(self, attributeName):
+        self.attributeName = attributeName
+        #FORMAT: {valueKey:{instanceId:None}}
+        self.buckets = {}
+        #FORMAT: {instanceId:valueKey}
+        self.indexedValues = {}
+
+    def add(self, instanceId, value):
+        self.remove(instanceId)
+        valueKey = queryValueKey(value)
+        try:
+            bucket = self.buckets.get(valueKey)
+        except TypeError:
+            return
+        if bucket is None:
+            bucket = {}
+            self.buckets[valueKey] = bucket
+        bucket[instanceId] = None
+        self.indexedValues[instanceId] = valueKey
+
+    def build(self, idValuePairs):
+        """Index many (instanceId, value) pairs at once, used when an index is created."""
+        for (instanceId, value) in idValuePairs:
+            hashAttributeIndex.add(self, instanceId, value)
+
+    def remove(self, instanceId):
+        if instanceId not in self.indexedValues:
+            return
+        valueKey = self.indexedValues.pop(instanceId)
+        bucket = self.buckets[valueKey]
+        del bucket[instanceId]
+        if bucket == {}:
+            del self.buckets[valueKey]
+
+    def estimate(self, operator, operand):
+        """Return the number of ids lookup would return, or None if this index cannot answer it."""
+        try:
+            if operator == 'EQUALS':
+                return len(self.buckets.get(operand, ()))
+            if operator == 'IN':
+                return sum(len(self.buckets.get(someValue, ())) for someValue in operand)
+        except TypeError:
+            return None
+        return None
+
+    def lookup(self, operator, operand):
+        """Return a dict of the matching instance ids, keyed in the order they were indexed."""
+        if operator == 'EQUALS':
+            return dict(self.buckets.get(operand, {}))
+        matchedIds = {}
+        for someValue in operand:
+            matchedIds.update(self.buckets.get(someValue, {}))
+        return matchedIds
+
+
+class sortedAttributeIndex(hashAttributeIndex):
+    """Index which also keeps its values sorted, to answer GT, GTE, LT and LTE by bisection.
+
+    Only numbers and strings are placed in the sorted order, other values are still
+    answered by EQUALS and IN through the value buckets.
+    """
+    operators = SORTED_INDEX_OPERATORS
+
+    def __init__(self, attributeName):
+        hashAttributeIndex.__init__(self, attributeName)
+        #Sorted list of (sortKey, instanceId) pairs.
+        self.sortedEntries = []
+
+    def add(self, instanceId, value):
+        hashAttributeIndex.add(self, instanceId, value)
+        if instanceId in self.indexedValues:
+            sortKey = _sortKey(self.indexedValues[instanceId])
+            if sortKey is not _UNINDEXABLE:
+                insort(self.sortedEntries, (sortKey, instanceId))
+
+    def build(self, idValuePairs):
+        # Sorting once is far cheaper than an insort per instance.
+        hashAttributeIndex.build(self, idValuePairs)
+        sortedEntries = []
+        for (instanceId, valueKey) in self.indexedValues.items():
+            sortKey = _sortKey(valueKey)
+            if sortKey is not _UNINDEXABLE:
+                sortedEntries.append((sortKey, instanceId))
+        sortedEntries.sort()
+        self.sortedEntries = sortedEntries
+
+    def remove(self, instanceId):
+        if instanceId in self.indexedValues:
+            sortKey = _sortKey(self.indexedValues[instanceId])
+            if sortKey is not _UNINDEXABLE:
+                entryIndex = bisect_left(self.sortedEntries, (sortKey, instanceId))
+                if entryIndex < len(self.sortedEntries) and self.sortedEntries[entryIndex] == (sortKey, instanceId):
+                    del self.sortedEntries[entryIndex]
+        hashAttributeIndex.remove(self, instanceId)
+
+    def _rangeBounds(self, operator, operand):
+        sortKey = _sortKey(operand)
+        if sortKey is _UNINDEXABLE:
+            return None
+        # Bounds stay inside the operand's rank, so numbers never match strings.
+        rankStart = bisect_left(self.sortedEntries, ((sortKey[0],),))
+        rankEnd = bisect_left(self.sortedEntries, ((sortKey[0] + 1,),))
+        # Ids sort after every value key, so (sortKey,) sorts before all entries with that value.
+        if operator == 'GT':
+            return (bisect_right(self.sortedEntries, (sortKey, _MaxId), rankStart, rankEnd), rankEnd)
+        if operator == 'GTE':
+            return (bisect_left(self.sortedEntries, (sortKey,), rankStart, rankEnd), rankEnd)
+        if operator == 'LT':
+            return (rankStart, bisect_left(self.sortedEntries, (sortKey,), rankStart, rankEnd))
+        return (rankStart, bisect_right(self.sortedEntries, (sortKey, _MaxId), rankStart, rankEnd))
+
+    def estimate(self, operator, operand):
+        if operator in RANGE_OPERATORS:
+            bounds = self._rangeBounds(operator, operand)
+            if bounds is None:
+                return None
+            return max(bounds[1] - bounds[0], 0)
+        return hashAttributeIndex.estimate(self, operator, operand)
+
+    def lookup(self, operator, operand):
+        if operator in RANGE_OPERATORS:
+            (startIndex, endIndex) = self._rangeBounds(operator, operand)
+            return {entry[1]: None for entry in self.sortedEntries[startIndex:endIndex]}
+        return hashAttributeIndex.lookup(self, operator, operand)
@@ -0,0 +1,411 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Object Tree query language, run by managerObject.queryObjectTree.
+
+A query is tokenized and parsed once into a tree of nested dicts, then compiled into an
+objectTreeQueryPlan of Python closures which the manager caches by query text, so running
+the same query again does no string handling at all.
+
+    [SELECT * FROM testObj WITH { id:(max), testVar:(=None), name:(a%c%), objList:( contains[ secondTestObj WITH { name:(='name') } ] ) } WHERE hasChildren:[ secondTestObj ]]
+
+SELECT - '*' for the matched instances, a list of attribute names for their values, or a list
+    of aggregates: count(*), count(var), max(var), min(var), sum(var), avg(var).  A query without
+    a SELECT section, such as a subquery, matches instances.
+FROM - the class whose instances are queried.
+WITH - requirements on attributes, each written var:(condition, ...), which must all hold.
+    ==, =, !=, >, >=, <, <= compare the value with a literal.
+    A literal alone is an equality, or a wildcard pattern if it holds a % (a% prefix, %a suffix).
+    contains literal - a substring of a string value or a member of a list value.
+    contains[ subquery ] - the value references, or is a list holding, an instance the subquery matches.
+    max, min - the instances holding the largest or smallest value among those meeting every other requirement.
+WHERE - relations in the object tree, hasChildren:[ subquery ] and hasParents:[ subquery ].
+
+Keywords are case-insensitive, class and attribute names are not.  Literals are numbers,
+quoted strings, None, True, False, or bare words which are read as strings.
+"""
+
+import re
+from objectTreeQueryIndexes import queryValueKey, queryConditionHolds
+
+#Operators which compare an attribute with a literal, and the query dict operator each maps to.
+COMPARISON_OPERATORS = {'==': 'EQUALS', '=': 'EQUALS', '>': 'GT', '>=': 'GTE', '<': 'LT', '<=': 'LTE'}
+AGGREGATE_FUNCTIONS = frozenset({'count', 'max', 'min', 'sum', 'avg'})
+QUERY_KEYWORDS = frozenset({'select', 'from', 'with', 'where'})
+RELATION_TYPES = frozenset({'haschildren', 'hasparents'})
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<operator>==|!=|>=|<=|=|>|<)
+  | (?P<punctuation>[\[\]{}(),:*])
+  | (?P<word>[^\s\[\]{}(),:*'"=!<>]+)
+""", re.VERBOSE)
+_NUMBER_PATTERN = re.compile(r'-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+_BARE_LITERALS = {'none': None, 'null': None, 'true': True, 'false': False}
+_MISSING = object()
+
+
+def tokenizeObjectTreeQuery(queryString):
+    """Split a query into a list of (tokenType, value, position) tuples.
+
+    String tokens are unquoted, words which read as numbers become number tokens.
+    """
+    tokens = []
+    position = 0
+    while position < len(queryString):
+        match = _TOKEN_PATTERN.match(queryString, position)
+        if match is None:
+            raise ValueError("Unexpected character '" + queryString[position] + "' at position " + str(position) + " of object tree query.")
+        tokenType = match.lastgroup
+        text = match.group()
+        if tokenType == 'string':
+            tokens.append(('string', re.sub(r'\\(.)', r'\1', text[1:-1]), position))
+        elif tokenType == 'word' and _NUMBER_PATTERN.match(text):
+            number = float(text)
+            tokens.append(('number', int(number) if number.is_integer() and '.' not in text and 'e' not in text.lower() else number, position))
+        elif tokenType != 'space':
+            tokens.append((tokenType, text, position))
+        position = match.end()
+    return tokens
+
+
+class _queryParser:
+    """Recursive descent parser turning query tokens into nested dicts."""
+
+    def __init__(self, queryString):
+        self.queryString = queryString
+        self.tokens = tokenizeObjectTreeQuery(queryString)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ('end', None, len(self.queryString))
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def fail(self, expected):
+        (tokenType, value, position) = self.peek()
+        found = 'the end of the query' if tokenType == 'end' else "'" + str(value) + "'"
+        raise ValueError("Expected " + expected + " but found " + found + " at position " + str(position) + " of object tree query: " + self.queryString)
+
+    def isPunctuation(self, value):
+        token = self.peek()
+        return token[0] == 'punctuation' and token[1] == value
+
+    def isKeyword(self, keyword):
+        token = self.peek()
+        return token[0] == 'word' and token[1].lower() == keyword
+
+    def expectPunctuation(self, value):
+        if not self.isPunctuation(value):
+            self.fail("'" + value + "'")
+        self.take()
+
+    def expectWord(self, expected):
+        token = self.peek()
+        if token[0] != 'word':
+            self.fail(expected)
+        self.take()
+        return token[1]
+
+    def parse(self):
+        bracketed = self.isPunctuation('[')
+        if bracketed:
+            self.take()
+        query = self.parseQuery(allowSelect=True)
+        if bracketed:
+            self.expectPunctuation(']')
+        if self.peek()[0] != 'end':
+            self.fail('the end of the query')
+        return query
+
+    #FORMAT: {'select':None or {'kind':'all'|'attributes'|'aggregates', 'items':[...]},
+    #         'className':str, 'with':[(attributeName, [condition, ...])], 'where':[(relationType, subquery)]}
+    def parseQuery(self, allowSelect):
+        query = {'select': None, 'className': None, 'with': [], 'where': []}
+        if allowSelect and self.isKeyword('select'):
+            self.take()
+            query['select'] = self.parseSelect()
+            if not self.isKeyword('from'):
+                self.fail("'FROM'")
+        if self.isKeyword('from'):
+            self.take()
+        query['className'] = self.expectWord('a class name')
+        if self.isKeyword('with'):
+            self.take()
+            query['with'] = self.parseWith()
+        if self.isKeyword('where'):
+            self.take()
+            query['where'] = self.parseWhere()
+        return query
+
+    def parseSelect(self):
+        if self.isPunctuation('*'):
+            self.take()
+            return {'kind': 'all', 'items': []}
+        attributes = []
+        aggregates = []
+        while True:
+            name = self.expectWord('an attribute name or aggregate')
+            if name.lower() in QUERY_KEYWORDS:
+                self.position -= 1
+                self.fail('an attribute name or aggregate')
+            if self.isPunctuation('('):
+                if name.lower() not in AGGREGATE_FUNCTIONS:
+                    raise ValueError("Unknown aggregate '" + name + "' in object tree query, the aggregates are " + ', '.join(sorted(AGGREGATE_FUNCTIONS)) + ".")
+                self.take()
+                if self.isPunctuation('*'):
+                    self.take()
+                    if name.lower() != 'count':
+                        raise ValueError("Only count may be applied to '*' in object tree query: " + self.queryString)
+                    attributeName = '*'
+                else:
+                    attributeName = self.expectWord('an attribute name')
+                self.expectPunctuation(')')
+                aggregates.append((name.lower(), attributeName))
+            else:
+                attributes.append(name)
+            if not self.isPunctuation(','):
+                break
+            self.take()
+        if attributes and aggregates:
+            raise ValueError("SELECT may list attributes or aggregates but not both, in object tree query: " + self.queryString)
+        if aggregates:
+            return {'kind': 'aggregates', 'items': aggregates}
+        return {'kind': 'attributes', 'items': attributes}
+
+    def parseWith(self):
+        self.expectPunctuation('{')
+        requirements = []
+        while not self.isPunctuation('}'):
+            attributeName = self.expectWord('an attribute name')
+            self.expectPunctuation(':')
+            self.expectPunctuation('(')
+            conditions = [self.parseCondition()]
+            while self.isPunctuation(','):
+                self.take()
+                conditions.append(self.parseCondition())
+            self.expectPunctuation(')')
+            requirements.append((attributeName, conditions))
+            if not self.isPunctuation(','):
+                break
+            self.take()
+        self.expectPunctuation('}')
+        return requirements
+
+    #FORMAT: condition = (operator, operand) where operator is one of ==, !=, >, >=, <, <=,
+    #'like', 'contains', 'containsQuery', 'max' or 'min'.
+    def parseCondition(self):
+        (tokenType, value, position) = self.peek()
+        if tokenType == 'operator':
+            self.take()
+            return (value, self.parseLiteral())
+        if tokenType == 'word' and value.lower() in ('max', 'min'):
+            self.take()
+            return (value.lower(), None)
+        if tokenType == 'word' and value.lower() == 'contains':
+            self.take()
+            if self.isPunctuation('['):
+                self.take()
+                subquery = self.parseQuery(allowSelect=False)
+                self.expectPunctuation(']')
+                return ('containsQuery', subquery)
+            return ('contains', self.parseLiteral())
+        literal = self.parseLiteral()
+        if tokenType == 'word' and isinstance(literal, str) and '%' in literal:
+            return ('like', literal)
+        return ('==', literal)
+
+    def parseLiteral(self):
+        (tokenType, value, position) = self.peek()
+        if tokenType == 'string' or tokenType == 'number':
+            self.take()
+            return value
+        if tokenType == 'word':
+            self.take()
+            return _BARE_LITERALS.get(value.lower(), value)
+        self.fail('a value')
+
+    def parseWhere(self):
+        relations = []
+        while True:
+            relationType = self.expectWord('hasChildren or hasParents')
+            if relationType.lower() not in RELATION_TYPES:
+                raise ValueError("Unknown relation '" + relationType + "' in object tree query, only hasChildren and hasParents are allowed.")
+            self.expectPunctuation(':')
+            self.expectPunctuation('[')
+            subquery = self.parseQuery(allowSelect=False)
+            self.expectPunctuation(']')
+            relations.append((relationType.lower(), subquery))
+            if not self.isPunctuation(','):
+                break
+            self.take()
+        return relations
+
+
+def parseObjectTreeQuery(queryString):
+    """Parse a query into nested dicts, raising ValueError on a malformed query."""
+    return _queryParser(queryString).parse()
+
+
+def _likeMatcher(pattern):
+    compiledPattern = re.compile('.*'.join(re.escape(piece) for piece in pattern.split('%')), re.DOTALL)
+    def matches(value):
+        return isinstance(value, str) and compiledPattern.fullmatch(value) is not None
+    return matches
+
+
+def _aggregate(functionName, attributeName, instances):
+    if attributeName == '*':
+        return len(instances)
+    values = []
+    for instance in instances:
+        value = getattr(instance, attributeName, None)
+        if value is not None:
+            values.append(queryValueKey(value))
+    if functionName == 'count':
+        return len(values)
+    if values == []:
+        return None
+    try:
+        if functionName == 'max':
+            return max(values)
+        if functionName == 'min':
+            return min(values)
+        if functionName == 'sum':
+            return sum(values)
+        return sum(values) / len(values)
+    except TypeError:
+        raise ValueError("Could not apply " + functionName + " to the values of '" + attributeName + "', which are not all comparable numbers.")
+
+
+class objectTreeQueryPlan:
+    """A compiled query, run against a manager with run(manager).
+
+    attributeQuery holds the requirements getListOfInstancesByAttributes answers, so they
+    use any attribute indexes, rowFilters the requirements checked per instance, extremes
+    the max and min requirements, and relations the WHERE section.  Subqueries are compiled
+    into plans of their own and run once per run of this plan.
+    """
+
+    def __init__(self, queryString, parsedQuery):
+        self.queryString = queryString
+        self.className = parsedQuery['className']
+        self.select = parsedQuery['select']
+        #Query dict passed to getListOfInstancesByAttributes, or "*" when there is none.
+        self.attributeQuery = {}
+        #FORMAT: [(attributeName, matchFunction)] for literal requirements.
+        self.rowFilters = []
+        #FORMAT: [(attributeName, subqueryPlan)] for contains[ subquery ] requirements.
+        self.containsQueries = []
+        #FORMAT: [(attributeName, 'max' or 'min')]
+        self.extremes = []
+        #FORMAT: [(relationType, subqueryPlan)]
+        self.relations = []
+        for (attributeName, conditions) in parsedQuery['with']:
+            for (operator, operand) in conditions:
+                self.compileCondition(attributeName, operator, operand)
+        for (relationType, subquery) in parsedQuery['where']:
+            self.relations.append((relationType, objectTreeQueryPlan(queryString, subquery)))
+        if self.attributeQuery == {}:
+            self.attributeQuery = "*"
+
+    def compileCondition(self, attributeName, operator, operand):
+        if operator in COMPARISON_OPERATORS:
+            requirement = self.attributeQuery.setdefault(attributeName, {})
+            queryOperator = COMPARISON_OPERATORS[operator]
+            if queryOperator not in requirement:
+                requirement[queryOperator] = operand
+                return
+            #A repeated operator on one attribute is checked per instance instead.
+            self.rowFilters.append((attributeName, lambda value, queryOperator=queryOperator, operand=operand: queryConditionHolds(value, queryOperator, operand)))
+        elif operator == '!=':
+            self.rowFilters.append((attributeName, lambda value, operand=operand: not queryConditionHolds(value, 'EQUALS', operand)))
+        elif operator == 'like':
+            self.rowFilters.append((attributeName, _likeMatcher(operand)))
+        elif operator == 'contains':
+            self.rowFilters.append((attributeName, lambda value, operand=operand: queryConditionHolds(value, 'CONTAINS', operand)))
+        elif operator == 'containsQuery':
+            self.containsQueries.append((attributeName, objectTreeQueryPlan(self.queryString, operand)))
+        else:
+            self.extremes.append((attributeName, operator))
+
+    def matchInstances(self, manager):
+        """Return the list of instances of the plan's class which meet every requirement."""
+        if self.className not in manager.objectTables:
+            return []
+        manager.hydrateClass(self.className)
+        instances = list(manager.getListOfInstancesByAttributes(className=self.className, attributeQueryDict=self.attributeQuery).values())
+        rowFilters = list(self.rowFilters)
+        for (attributeName, subqueryPlan) in self.containsQueries:
+            referencedIds = {someInstance.id for someInstance in subqueryPlan.matchInstances(manager)}
+            rowFilters.append((attributeName, lambda value, referencedIds=referencedIds: _referencesAny(value, referencedIds)))
+        if rowFilters:
+            matched = []
+            for instance in instances:
+                for (attributeName, matchFunction) in rowFilters:
+                    value = instance.__dict__.get(attributeName, _MISSING)
+                    if value is _MISSING:
+                        value = getattr(instance, attributeName, _MISSING)
+                    if value is _MISSING or not matchFunction(value):
+                        break
+                else:
+                    matched.append(instance)
+            instances = matched
+        for (relationType, subqueryPlan) in self.relations:
+            relatedInstances = subqueryPlan.matchInstances(manager)
+            if relationType == 'haschildren':
+                parentObjectIds = {id(parent) for child in relatedInstances for parent in manager.getTreeParentInstances(child)}
+                instances = [instance for instance in instances if id(instance) in parentObjectIds]
+            else:
+                relatedObjectIds = {id(parent) for parent in relatedInstances}
+                instances = [instance for instance in instances if any(id(parent) in relatedObjectIds for parent in manager.getTreeParentInstances(instance))]
+        for (attributeName, extreme) in self.extremes:
+            extremeValue = _aggregate(extreme, attributeName, instances)
+            if extremeValue is None:
+                return []
+            instances = [instance for instance in instances if queryValueKey(getattr(instance, attributeName, None)) == extremeValue]
+        return instances
+
+    def run(self, manager):
+        """Run the query, returning {id:instance} for SELECT * or no SELECT section,
+        {id:{attributeName:value}} for a list of attributes, or {aggregate:value} for aggregates.
+        """
+        instances = self.matchInstances(manager)
+        if self.select is None or self.select['kind'] == 'all':
+            return {instance.id: instance for instance in instances}
+        if self.select['kind'] == 'attributes':
+            return {instance.id: {attributeName: getattr(instance, attributeName, None) for attributeName in self.select['items']} for instance in instances}
+        return {functionName + '(' + attributeName + ')': _aggregate(functionName, attributeName, instances) for (functionName, attributeName) in self.select['items']}
+
+
+def _referencesAny(value, referencedIds):
+    try:
+        if isinstance(value, (list, tuple)):
+            return any(queryValueKey(someValue) in referencedIds for someValue in value)
+        return queryValueKey(value) in referencedIds
+    except TypeError:
+        return False
+
+
+def compileObjectTreeQuery(queryString):
+    """Parse and compile a query into an objectTreeQueryPlan."""
+    return objectTreeQueryPlan(queryString, parseObjectTreeQuery(queryString))
@@ -0,0 +1,178 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Per-class JSON serializers for the instances of a manager's classes, used by
+getJSONdictForClass and getJSONbytesForClass.
+
+A serializer is built once per class and decides once per attribute value type how
+values of that type are converted, instead of comparing type names for every value
+of every instance.  The output matches getJSONclassInstance: primitive values are
+sent as they are, collections in the convertSetTypeIntoJSONdict format, and
+references to other tree objects as their identifiers.
+
+JSON is encoded with orjson when it is installed, and the json module otherwise.
+"""
+
+from objectTreeDecorators import TREE_OBJECT_INTERNAL_VARS
+import json
+import time
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Type names sent without conversion, as in getJSONclassInstance.
+PASS_THROUGH_TYPE_NAMES = frozenset({'str', 'int', 'float', 'complex', 'range', 'set', 'frozenset', 'bool', 'memoryview', 'NoneType'})
+SET_TYPE_NAMES = frozenset({'tuple', 'list', 'polariList', 'dict'})
+
+# Element types of a list or tuple which convertSetTypeIntoJSONdict sends as they are.
+PASS_THROUGH_ELEMENT_TYPES = frozenset({str, int, float, bool, type(None)})
+
+# Converter entries marking values which are sent as they are, and values which are not sent,
+# and the lookup default for a value type with no converter yet.
+_PASS = None
+_SKIP = False
+_UNKNOWN = object()
+
+
+def dumpJSONbytes(jsonValue):
+    """Encode a JSON-convertible value as UTF-8 bytes, with orjson when it is installed."""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(jsonValue, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Integers beyond 64 bits and similar values orjson refuses are left to json.
+            pass
+    return json.dumps(jsonValue, ensure_ascii=False).encode('utf-8')
+
+
+class compiledClassSerializer:
+    """Converts the instances of one class into the dictionaries getJSONdictForClass sends.
+
+    The typing's variables are not a complete list of an instance's attributes, since
+    variables are only learned as instances are analyzed, so every attribute in an
+    instance's __dict__ is considered and those in excludedNames are left out.  A
+    projection reads only the attributes it names.
+    """
+
+    def __init__(self, manager, classObj):
+        self.manager = manager
+        self.classObj = classObj
+        self.className = classObj.__name__
+        self.excludedNames = TREE_OBJECT_INTERNAL_VARS
+        #FORMAT: {valueType:converter}, where _PASS sends the value unchanged and _SKIP leaves it out.
+        self.typeConverters = {}
+
+    def getConverter(self, value):
+        valueType = type(value)
+        try:
+            return self.typeConverters[valueType]
+        except KeyError:
+            pass
+        converter = self.makeConverter(valueType, value)
+        # References are only cached once their class is typed, so untyped classes keep raising.
+        if converter != self.convertReference or valueType.__name__ in self.manager.objectTypingDict:
+            self.typeConverters[valueType] = converter
+        return converter
+
+    def makeConverter(self, valueType, value):
+        # Callable values are never sent, and whether a value is callable depends only on its type.
+        if callable(value):
+            return _SKIP
+        typeName = valueType.__name__
+        if typeName in PASS_THROUGH_TYPE_NAMES:
+            return _PASS
+        if typeName == 'dateTime':
+            return self.convertDateTime
+        if typeName == 'struct_time':
+            return self.convertStructTime
+        if typeName == 'TextIOWrapper':
+            return self.convertFile
+        if typeName == 'bytes' or typeName == 'bytearray':
+            return self.convertBytes
+        if typeName == 'dict':
+            return self.manager.convertSetTypeIntoJSONdict
+        if typeName in SET_TYPE_NAMES:
+            return self.convertSequence
+        if typeName == 'App':
+            return self.convertApp
+        return self.convertReference
+
+    def convertDateTime(self, value):
+        return value.strftime()
+
+    def convertStructTime(self, value):
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', value)
+
+    def convertFile(self, value):
+        return value.name
+
+    def convertBytes(self, value):
+        return value.decode()
+
+    def convertApp(self, value):
+        return "FALCON-API-APP-REFERENCE"
+
+    def convertSequence(self, value):
+        # Lists of primitive values, by far the most common, skip the per-element type checks.
+        for element in value:
+            if type(element) not in PASS_THROUGH_ELEMENT_TYPES:
+                return self.manager.convertSetTypeIntoJSONdict(value)
+        return [{type(value).__name__: list(value)}]
+
+    def convertReference(self, value):
+        typeName = type(value).__name__
+        if typeName not in self.manager.objectTypingDict:
+            raise Exception("invalid type detected : " + typeName)
+        return ["CLASS-" + typeName + "-REFERENCE", self.manager.convertSetTypeIntoJSONdict(passedSet=self.manager.getInstanceIdentifiers(value))]
+
+    def serializeInstance(self, instance, excludedNames, includedNames=None):
+        """Return the JSON-convertible dictionary of one instance's attributes.  When
+        includedNames is given only those attributes are read, in that order.
+        """
+        instanceData = {}
+        typeConverters = self.typeConverters
+        if includedNames is None:
+            attributeItems = instance.__dict__.items()
+        else:
+            instanceDict = instance.__dict__
+            attributeItems = [(attributeName, instanceDict[attributeName]) for attributeName in includedNames if attributeName in instanceDict]
+        for attributeName, value in attributeItems:
+            if attributeName in excludedNames:
+                continue
+            converter = typeConverters.get(type(value), _UNKNOWN)
+            if converter is _UNKNOWN:
+                converter = self.getConverter(value)
+            if converter is _PASS:
+                instanceData[attributeName] = value
+            elif converter is not _SKIP:
+                instanceData[attributeName] = converter(value)
+        return instanceData
+
+    def serializeInstances(self, instances, varsLimited=(), varsIncluded=None):
+        """Return the list of dictionaries for the given instances, leaving out the variables
+        in varsLimited and, when varsIncluded is given, any variable not in it.
+        """
+        excludedNames = self.excludedNames
+        if varsLimited:
+            excludedNames = excludedNames | frozenset(varsLimited)
+        includedNames = None
+        if varsIncluded is not None:
+            includedNames = tuple(attributeName for attributeName in varsIncluded if attributeName not in excludedNames)
+        serializeInstance = self.serializeInstance
+        return [serializeInstance(someInstance, excludedNames, includedNames) for someInstance in instances]
@@ -0,0 +1,172 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Serves a polariServer's falcon WSGI App from a falcon.asgi.App, for running under an
+ASGI server such as uvicorn.
+
+The resources of a polariServer read SQLite, tile files and the object tree with
+blocking calls, and routes are added to its WSGI App while the server runs, as classes
+are created.  Rather than keeping an async copy of every resource, one sink receives
+every request, reads its body on the event loop and hands it to the WSGI App on a
+bounded pool of worker threads.  The event loop only waits on sockets, so idle and
+slow connections no longer each hold a thread, and the pool size caps how many
+requests run blocking work at once.
+
+A streamed body is read on a stream worker of its own rather than on the pool.  Pooled
+SQLite connections belong to a thread, so a stream holding a cursor or read transaction
+open between chunks must not share its thread's connection with the requests a pool
+thread serves in the meantime.  At most maxStreamWorkers bodies are read at once, later
+ones wait for a stream worker, and idle stream workers keep their thread and connections
+for the next stream.
+
+    asgiApp = polServer.buildASGIApp(maxWorkers=16, maxStreamWorkers=8)
+    uvicorn.run(asgiApp, port=3000)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import io
+import sys
+import falcon
+import falcon.asgi
+
+# Worker threads running requests on the WSGI App, when not configured.
+DEFAULT_ASGI_WORKERS = 16
+# Streamed bodies read at once, each on a worker thread of its own, when not configured.
+DEFAULT_ASGI_STREAM_WORKERS = 8
+
+# Headers the ASGI App sets itself from the body it sends.
+HOP_BY_HOP_HEADERS = frozenset({'content-length', 'transfer-encoding', 'connection'})
+
+
+class wsgiAppBridge:
+    """A falcon.asgi sink answering every request with a falcon WSGI App, whose calls
+    run on a bounded thread pool.
+    """
+
+    def __init__(self, wsgiApp, maxWorkers=DEFAULT_ASGI_WORKERS, maxStreamWorkers=DEFAULT_ASGI_STREAM_WORKERS):
+        if(maxWorkers < 1):
+            raise ValueError("maxWorkers must be at least 1, got " + str(maxWorkers))
+        if(maxStreamWorkers < 1):
+            raise ValueError("maxStreamWorkers must be at least 1, got " + str(maxStreamWorkers))
+        self.wsgiApp = wsgiApp
+        self.maxWorkers = maxWorkers
+        self.maxStreamWorkers = maxStreamWorkers
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix='polariASGI')
+        #Single thread executors of the stream workers not reading a body.  A stream takes one
+        #while it holds a slot, so there are never more than maxStreamWorkers of them.
+        self.streamSlots = asyncio.Semaphore(maxStreamWorkers)
+        self.idleStreamExecutors = []
+
+    async def __call__(self, req, resp, **kwargs):
+        body = await req.stream.read()
+        environ = self.buildEnviron(req.scope, req.headers, body)
+        loop = asyncio.get_running_loop()
+        (status, headers, bodyChunks, bodyIterator) = await loop.run_in_executor(self.executor, self.callWSGIApp, environ)
+        resp.status = status
+        for (headerName, headerValue) in headers:
+            lowerName = headerName.lower()
+            if(lowerName in HOP_BY_HOP_HEADERS):
+                continue
+            if(lowerName == 'set-cookie'):
+                resp.append_header(headerName, headerValue)
+            else:
+                resp.set_header(headerName, headerValue)
+        if(bodyIterator == None):
+            resp.data = b''.join(bodyChunks)
+        else:
+            resp.stream = self.iterateBody(loop, bodyIterator)
+
+    #Calls the WSGI App with the environ, returning (status, headers, bodyChunks, bodyIterator).
+    #Bodies the App sent whole are returned as bodyChunks, with no iterator.  Streamed bodies
+    #are returned unread as the iterator, so none of their chunks are read on the pool.
+    def callWSGIApp(self, environ):
+        startedResponse = []
+        def startResponse(status, headers, exc_info=None):
+            startedResponse[:] = [status, headers]
+        result = self.wsgiApp(environ, startResponse)
+        if(isinstance(result, (list, tuple))):
+            return (startedResponse[0], startedResponse[1], result, None)
+        return (startedResponse[0], startedResponse[1], [], iter(result))
+
+    #Yields a streamed body holding one chunk at a time, every chunk read on one stream worker
+    #kept for this body alone until the body is closed.
+    async def iterateBody(self, loop, bodyIterator):
+        async with self.streamSlots:
+            if(self.idleStreamExecutors):
+                streamExecutor = self.idleStreamExecutors.pop()
+            else:
+                streamExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='polariASGIStream')
+            try:
+                while True:
+                    someChunk = await loop.run_in_executor(streamExecutor, next, bodyIterator, None)
+                    if(someChunk == None):
+                        break
+                    yield someChunk
+            finally:
+                await loop.run_in_executor(streamExecutor, self.closeBody, bodyIterator)
+                self.idleStreamExecutors.append(streamExecutor)
+
+    def closeBody(self, bodyIterator):
+        closeMethod = getattr(bodyIterator, 'close', None)
+        if(closeMethod != None):
+            closeMethod()
+
+    #Builds the WSGI environ (PEP 3333) of an ASGI http scope, its headers and its body.  The headers
+    #are read from the falcon request, since the scope's headers may be an iterator it has used up.
+    def buildEnviron(self, scope, headers, body):
+        (serverName, serverPort) = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(serverName),
+            'SERVER_PORT': str(serverPort),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        client = scope.get('client')
+        if(client):
+            environ['REMOTE_ADDR'] = client[0]
+        for (headerName, headerValue) in headers.items():
+            headerName = headerName.upper().replace('-', '_')
+            if(headerName == 'CONTENT_LENGTH'):
+                continue
+            if(headerName != 'CONTENT_TYPE'):
+                headerName = 'HTTP_' + headerName
+            environ[headerName] = headerValue
+        return environ
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        for streamExecutor in self.idleStreamExecutors:
+            streamExecutor.shutdown(wait=False)
+
+
+#Returns a falcon.asgi.App answering every request with the given WSGI App, including routes
+#added to it after the ASGI App is built.  CORS is left to the WSGI App's middleware.
+def buildASGIApp(wsgiApp, maxWorkers=DEFAULT_ASGI_WORKERS, maxStreamWorkers=DEFAULT_ASGI_STREAM_WORKERS):
+    asgiApp = falcon.asgi.App(cors_enable=False)
+    asgiApp.add_sink(wsgiAppBridge(wsgiApp, maxWorkers=maxWorkers, maxStreamWorkers=maxStreamWorkers), prefix='/')
+    return asgiApp
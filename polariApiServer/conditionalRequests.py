@@ -0,0 +1,89 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+ETag and Last-Modified validators for GET endpoints serving the instances of a class.
+
+The validators are built from the manager's class versions, which change whenever an
+instance of the class is created, changed, removed or persisted, so an endpoint can answer
+a conditional request with 304 Not Modified before it reads or serializes any instance.
+
+    validators = getClassValidators(self.manager, [self.apiObject], request)
+    if(answerNotModified(request, response, validators)):
+        return
+    ...build the response...
+    setValidators(response, validators)
+"""
+
+from datetime import datetime, timezone
+import hashlib
+import time
+import falcon
+
+
+#Returns (etag, lastModified) for a response built from the given classes.  The ETag also
+#covers the request's query string, authorization and accepted media types, since each changes
+#what is sent, and the time the manager started, since class versions restart with the manager.
+#Last-Modified only has whole seconds, and another change may follow within the second of the
+#last one, so lastModified is None until that second has passed.
+def getClassValidators(manager, classNames, request):
+    versionParts = [format(int(manager.versionStartTime * 1000), 'x')]
+    lastModified = manager.versionStartTime
+    for className in classNames:
+        (version, modifiedTime) = manager.getClassVersion(className)
+        versionParts.append(str(version))
+        lastModified = max(lastModified, modifiedTime)
+    variant = (request.path + '?' + request.query_string + '\n' + str(request.auth) + '\n' + request.accept).encode()
+    versionParts.append(hashlib.sha1(variant).hexdigest()[:12])
+    if(int(lastModified) >= int(time.time())):
+        return ('-'.join(versionParts), None)
+    lastModifiedDate = datetime.fromtimestamp(int(lastModified), tz=timezone.utc)
+    return ('-'.join(versionParts), lastModifiedDate)
+
+
+#Answers the request with 304 Not Modified, returning True, when the client already holds the
+#current response.  If-None-Match is used when sent, otherwise If-Modified-Since.
+def answerNotModified(request, response, validators):
+    (etag, lastModified) = validators
+    notModified = False
+    if(request.if_none_match):
+        notModified = matchesETag(request, etag)
+    elif(request.if_modified_since != None and lastModified != None):
+        ifModifiedSince = request.if_modified_since
+        if(ifModifiedSince.tzinfo == None):
+            ifModifiedSince = ifModifiedSince.replace(tzinfo=timezone.utc)
+        notModified = lastModified <= ifModifiedSince
+    if(not notModified):
+        return False
+    setValidators(response, validators)
+    response.status = falcon.HTTP_304
+    response.set_header('Powered-By', 'Polari')
+    return True
+
+
+#Returns True when the request's If-None-Match names the given ETag, sent without quotes.
+def matchesETag(request, etag):
+    ifNoneMatch = request.if_none_match
+    if(not ifNoneMatch):
+        return False
+    return any(someTag == '*' or str(someTag) == etag for someTag in ifNoneMatch)
+
+
+#Sends the validators with a successful response.
+def setValidators(response, validators):
+    (etag, lastModified) = validators
+    response.etag = '"' + etag + '"'
+    if(lastModified != None):
+        response.last_modified = lastModified
@@ -34,12 +34,23 @@ this endpoint returns data organized by columns:
       "length": 2
     }
 
+With ?_stream=true the same object is streamed one column at a time.
+
+The CRUDE paging parameters select columns, filter, sort and page the rows in
+SQLite (see tableQueries), e.g. ?fields=name&sort=-value&limit=100.  A page is
+sent with a "page" entry holding the cursor of the next one, also sent in the
+X-Next-Cursor header.
+
 These endpoints are NOT created by default -- they are only registered
 when a user enables the D3 Column format for a specific object type
 via the API Config page.
 """
 
 from objectTreeDecorators import treeObject, treeObjectInit
+from polariApiServer.conditionalRequests import getClassValidators, answerNotModified, setValidators
+from polariApiServer.streamingResponses import getStreamMode, guardStream
+from polariApiServer.tableQueries import getQueryableColumns, parseTableQuery, buildQueryClause, readTablePage, getSortSpec
+from objectTreeSerializer import dumpJSONbytes
 import falcon
 
 
@@ -98,6 +109,26 @@ class D3ColumnAPI(treeObject):
             return baseAccess, baseAccess
         return {}, {}
 
+    def _iterateColumnJSON(self, db, columnNames, queryClause='ORDER BY rowid', parameters=()):
+        """Yield the column-oriented JSON of the table's selected rows a chunk of values at a time.
+
+        The length is written last, counted from the first column as it is sent.
+        """
+        yield b'{"columns":' + dumpJSONbytes(columnNames) + b',"data":{'
+        rowCount = 0
+        columnIterator = db.iterateTableColumns(self.apiObject, columnNames, queryClause=queryClause, parameters=parameters)
+        for columnIndex, (colName, valueChunks) in enumerate(columnIterator):
+            yield (b',' if columnIndex > 0 else b'') + dumpJSONbytes(colName) + b':['
+            firstChunk = True
+            for valueChunk in valueChunks:
+                if columnIndex == 0:
+                    rowCount += len(valueChunk)
+                chunkBytes = dumpJSONbytes(valueChunk)[1:-1]
+                yield chunkBytes if firstChunk else b',' + chunkBytes
+                firstChunk = False
+            yield b']'
+        yield b'},"length":' + str(rowCount).encode() + b'}'
+
     def on_get(self, request, response):
         """Read all instances from DB as column-oriented JSON."""
         # Check if format is still enabled
@@ -115,6 +146,11 @@ class D3ColumnAPI(treeObject):
             response.media = {"error": "Read access not allowed for this user on this object type."}
             return
 
+        # Answer clients already holding the current data before querying the database
+        validators = getClassValidators(self.manager, [self.apiObject], request)
+        if answerNotModified(request, response, validators):
+            return
+
         try:
             db = self._findDatabaseForClass()
             if db is None:
@@ -126,27 +162,59 @@ class D3ColumnAPI(treeObject):
                 }
                 return
 
-            # Query database directly
-            (columnNames, dataTuples) = db.getAllInTable(self.apiObject)
+            # Columns, filters, sort and paging are run in SQLite, so only the requested rows are read
+            tableColumns = db.getTableColumnNames(self.apiObject)
+            tableQuery = parseTableQuery(request, getQueryableColumns(self.objTyping, tableColumns))
+            columnNames = tableColumns if tableQuery is None or tableQuery['fields'] is None else tableQuery['fields']
 
-            # Build column-oriented structure
-            columnData = {}
-            for colName in columnNames:
-                columnData[colName] = []
+            # A page is read as rows, at most the page size, and turned into columns
+            if tableQuery is not None and tableQuery['limit'] is not None:
+                (columnNames, pageRows, nextCursor) = readTablePage(db, self.apiObject, columnNames, tableQuery)
+                columnValues = list(zip(*pageRows)) if pageRows else [()] * len(columnNames)
+                response.media = {
+                    "columns": list(columnNames),
+                    "data": {colName: list(values) for colName, values in zip(columnNames, columnValues)},
+                    "length": len(pageRows),
+                    "page": {"limit": tableQuery['limit'], "offset": tableQuery['offset'],
+                             "sort": getSortSpec(tableQuery), "nextCursor": nextCursor}
+                }
+                if nextCursor is not None:
+                    response.set_header('X-Next-Cursor', nextCursor)
+                response.status = falcon.HTTP_200
+                setValidators(response, validators)
+                response.set_header('Powered-By', 'Polari')
+                return
 
-            for row in dataTuples:
-                for i, colName in enumerate(columnNames):
-                    columnData[colName].append(row[i])
+            # Every column is its own query, so the rows are always read in an explicit order
+            (queryClause, parameters) = buildQueryClause(tableQuery) if tableQuery is not None else ('ORDER BY rowid', ())
+            # Stream one column at a time when the client asks for it
+            if getStreamMode(request, allowNDJSON=False) is not None:
+                response.content_type = falcon.MEDIA_JSON
+                response.stream = guardStream(self._iterateColumnJSON(db, columnNames, queryClause, parameters), 'D3ColumnAPI')
+                response.status = falcon.HTTP_200
+                setValidators(response, validators)
+                response.set_header('Powered-By', 'Polari')
+                return
+
+            # Build the column-oriented structure from the cursor, a column's chunk of values at a time
+            columnData = {}
+            for colName, valueChunks in db.iterateTableColumns(self.apiObject, columnNames, queryClause=queryClause, parameters=parameters):
+                columnData[colName] = [value for valueChunk in valueChunks for value in valueChunk]
 
             result = {
                 "columns": list(columnNames),
                 "data": columnData,
-                "length": len(dataTuples)
+                "length": len(columnData[columnNames[0]]) if columnNames else 0
             }
 
             response.media = result
             response.status = falcon.HTTP_200
+            setValidators(response, validators)
 
+        except ValueError as err:
+            # Raised for malformed paging, sort, projection or filter parameters
+            response.status = falcon.HTTP_400
+            response.media = {"error": str(err), "class": self.apiObject}
         except Exception as err:
             response.status = falcon.HTTP_500
             response.media = {"error": str(err)}
@@ -29,12 +29,22 @@ this endpoint returns a simple array of flat JSON objects:
       {"id": "def", "name": "bar", "value": 99}
     ]
 
+Large tables can be streamed row by row, as the same array with ?_stream=true
+or as one row object per line with Accept: application/x-ndjson.
+
+The CRUDE paging parameters select columns, filter, sort and page the rows in
+SQLite (see tableQueries), e.g. ?fields=name&sort=-value&limit=100, with the
+cursor of the next page sent in the X-Next-Cursor header.
+
 These endpoints are NOT created by default -- they are only registered
 when a user enables the Flat JSON format for a specific object type
 via the API Config page.
 """
 
 from objectTreeDecorators import treeObject, treeObjectInit
+from polariApiServer.conditionalRequests import getClassValidators, answerNotModified, setValidators
+from polariApiServer.streamingResponses import getStreamMode, streamElements, chunkIterable
+from polariApiServer.tableQueries import getQueryableColumns, parseTableQuery, buildQueryClause, readTablePage
 import falcon
 
 
@@ -110,6 +120,11 @@ class FlatJsonAPI(treeObject):
             response.media = {"error": "Read access not allowed for this user on this object type."}
             return
 
+        # Answer clients already holding the current data before querying the database
+        validators = getClassValidators(self.manager, [self.apiObject], request)
+        if answerNotModified(request, response, validators):
+            return
+
         try:
             db = self._findDatabaseForClass()
             if db is None:
@@ -121,20 +136,37 @@ class FlatJsonAPI(treeObject):
                 }
                 return
 
-            # Query database directly
-            (columnNames, dataTuples) = db.getAllInTable(self.apiObject)
+            # Columns, filters, sort and paging are run in SQLite, so only the requested rows are read
+            tableColumns = db.getTableColumnNames(self.apiObject)
+            tableQuery = parseTableQuery(request, getQueryableColumns(self.objTyping, tableColumns))
+            columnNames = tableColumns if tableQuery is None or tableQuery['fields'] is None else tableQuery['fields']
+            if tableQuery is not None and tableQuery['limit'] is not None:
+                (columnNames, pageRows, nextCursor) = readTablePage(db, self.apiObject, columnNames, tableQuery)
+                rowIterator = iter(pageRows)
+                if nextCursor is not None:
+                    response.set_header('X-Next-Cursor', nextCursor)
+            else:
+                (queryClause, parameters) = buildQueryClause(tableQuery) if tableQuery is not None else ('', ())
+                (columnNames, rowIterator) = db.iterateTableRows(self.apiObject, columnNames=columnNames, queryClause=queryClause, parameters=parameters)
+
+            # Stream rows from the cursor as they are sent when the client asks for it
+            streamMode = getStreamMode(request)
+            if streamMode is not None:
+                rowDicts = (dict(zip(columnNames, row)) for row in rowIterator)
+                streamElements(response, streamMode, chunkIterable(rowDicts), 'FlatJsonAPI')
+                setValidators(response, validators)
+                response.set_header('Powered-By', 'Polari')
+                return
 
             # Convert to flat JSON: list of dicts
-            result = []
-            for row in dataTuples:
-                rowDict = {}
-                for i, colName in enumerate(columnNames):
-                    rowDict[colName] = row[i]
-                result.append(rowDict)
-
-            response.media = result
+            response.media = [dict(zip(columnNames, row)) for row in rowIterator]
             response.status = falcon.HTTP_200
+            setValidators(response, validators)
 
+        except ValueError as err:
+            # Raised for malformed paging, sort, projection or filter parameters
+            response.status = falcon.HTTP_400
+            response.media = {"error": str(err), "class": self.apiObject}
         except Exception as err:
             response.status = falcon.HTTP_500
             response.media = {"error": str(err)}
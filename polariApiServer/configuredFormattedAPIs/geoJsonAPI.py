@@ -41,6 +41,7 @@ via the API Config page.
 """
 
 from objectTreeDecorators import treeObject, treeObjectInit
+from polariApiServer.conditionalRequests import getClassValidators, answerNotModified, setValidators
 import falcon
 import json
 
@@ -177,6 +178,11 @@ class GeoJsonAPI(treeObject):
             response.media = {"error": "Read access not allowed for this user on this object type."}
             return
 
+        # Answer clients already holding the current data before querying the database
+        validators = getClassValidators(self.manager, [self.apiObject, 'GeoJsonDefinition'], request)
+        if answerNotModified(request, response, validators):
+            return
+
         try:
             db = self._findDatabaseForClass()
             if db is None:
@@ -240,6 +246,7 @@ class GeoJsonAPI(treeObject):
 
             response.media = result
             response.status = falcon.HTTP_200
+            setValidators(response, validators)
 
         except Exception as err:
             response.status = falcon.HTTP_500
@@ -18,8 +18,7 @@ from polariDataTyping.polyTyping import polyTypedObject
 from polariDataTyping.polyTypedVars import polyTypedVariable
 import falcon
 import json
-import sqlite3
-import os
+from polariDBmanagement.sqliteConnectionPool import getDBConnection
 
 
 class createClassAPI(treeObject):
@@ -319,8 +318,7 @@ def dynamic_init(self, manager=None, branch=None, id=None{param_str}):
                                  stateSpaceDisplayFields, stateSpaceFieldsPerRow):
         """Save dynamic class definition to _dynamic_class_registry table."""
         db = self.manager.db
-        dbFilePath = os.path.join(db.Path, db.name + '.db') if db.Path else db.name + '.db'
-        conn = sqlite3.connect(dbFilePath)
+        conn = db.getConnection()
         conn.execute('''CREATE TABLE IF NOT EXISTS _dynamic_class_registry (
             className TEXT PRIMARY KEY,
             displayName TEXT,
@@ -343,7 +341,6 @@ def dynamic_init(self, manager=None, branch=None, id=None{param_str}):
             )
         )
         conn.commit()
-        conn.close()
         print(f"[createClassAPI] Persisted class definition for {className} to registry")
 
     @staticmethod
@@ -357,16 +354,14 @@ def dynamic_init(self, manager=None, branch=None, id=None{param_str}):
             manager: The managerObject
             dbFilePath: Path to the .db file
         """
-        conn = sqlite3.connect(dbFilePath)
+        conn = getDBConnection(dbFilePath)
         cursor = conn.cursor()
         # Check if registry table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='_dynamic_class_registry'")
         if not cursor.fetchone():
-            conn.close()
             return
         cursor.execute('SELECT * FROM _dynamic_class_registry')
         rows = cursor.fetchall()
-        conn.close()
 
         if not rows:
             return
@@ -574,6 +569,11 @@ def dynamic_init(self, manager=None, branch=None, id=None{param_str}):
 
         # Update existingTyping: classDefinition, polyTypedVars, variableNameList, kwDefaultParams
         existingTyping.classDefinition = DynamicClass
+        if hasattr(self.manager, 'objectTypingClassDict'):
+            self.manager.objectTypingClassDict[DynamicClass] = existingTyping
+        # Instances are sent with a serializer built from the class, so the old one is dropped
+        if hasattr(self.manager, 'invalidateClassSerializer'):
+            self.manager.invalidateClassSerializer(className)
         existingTyping.polyTypedVars = []
         existingTyping.polyTypedVarsDict = {}
         existingTyping.variableNameList = []
@@ -626,9 +626,7 @@ def dynamic_init(self, manager=None, branch=None, id=None{param_str}):
         # Update SQLite table schema — add new columns for any new variables
         if hasattr(self.manager, 'db') and self.manager.db is not None:
             try:
-                db = self.manager.db
-                dbFilePath = os.path.join(db.Path, db.name + '.db') if db.Path else db.name + '.db'
-                conn = sqlite3.connect(dbFilePath)
+                conn = self.manager.db.getConnection()
                 cursor = conn.cursor()
                 # Get existing columns
                 cursor.execute(f'PRAGMA table_info("{className}")')
@@ -643,7 +641,7 @@ def dynamic_init(self, manager=None, branch=None, id=None{param_str}):
                         cursor.execute(f'ALTER TABLE "{className}" ADD COLUMN "{col_name}" {col_type}')
                         print(f'[DEBUG-CC] _editDynamicClass: added column {col_name} ({col_type}) to {className}', flush=True)
                 conn.commit()
-                conn.close()
+                self.manager.db.invalidateTableLayout(className)
             except Exception as e:
                 print(f"[DEBUG-CC] _editDynamicClass: WARNING DB schema update failed: {e}", flush=True)
 
@@ -0,0 +1,188 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Read-only, pooled access to .mbtiles files for tile serving.
+
+Each file gets one mbtilesReader, which detects the file's schema once, flat 'tiles'
+table or view versus tippecanoe's normalized 'map' + 'images' tables, and keeps a
+pool of read-only SQLite handles shared by the serving threads.  Handles are opened
+with the immutable flag, so SQLite takes no locks and never checks the file for
+changes.  A file is therefore never rewritten in place: a new download replaces it
+under a new inode and its reader is invalidated, while requests already reading the
+old file finish on their open handles.
+
+    reader = mbtilesReaders.getReader(local_path)
+    tile_data = reader.getTile(z, x, tms_y)
+    rows = reader.getTileRange(z, minX, maxX, minTmsY, maxTmsY)
+"""
+
+import os
+import sqlite3
+import threading
+import urllib.parse
+
+# Idle handles kept open per file, beyond which returned handles are closed.
+MAX_IDLE_HANDLES = 16
+
+FLAT_TILE_QUERY = 'SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?'
+NORMALIZED_TILE_QUERY = ('SELECT images.tile_data FROM map '
+                         'JOIN images ON map.tile_id = images.tile_id '
+                         'WHERE map.zoom_level = ? AND map.tile_column = ? AND map.tile_row = ?')
+
+# Batch queries select (zoom_level, tile_column, tile_row, tile_data) rows, with the
+# column prefix of the schema's table holding the coordinates.
+FLAT_BATCH_SELECT = ('SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles ', '')
+NORMALIZED_BATCH_SELECT = ('SELECT map.zoom_level, map.tile_column, map.tile_row, images.tile_data FROM map '
+                           'JOIN images ON map.tile_id = images.tile_id ', 'map.')
+# Tiles looked up per listed-tile query, three parameters each within SQLite's default limit of 999.
+MAX_TILES_PER_QUERY = 300
+
+
+class mbtilesReader:
+    """Pool of read-only handles to one .mbtiles file and the tile query for its schema."""
+
+    def __init__(self, filePath, maxIdleHandles=MAX_IDLE_HANDLES):
+        self.filePath = os.path.abspath(filePath)
+        self.maxIdleHandles = maxIdleHandles
+        self.closed = False
+        self._idleHandles = []
+        self._lock = threading.Lock()
+        handle = self._openHandle()
+        try:
+            self.schema = self._detectSchema(handle)
+        except Exception:
+            handle.close()
+            raise
+        self._idleHandles.append(handle)
+
+    def _openHandle(self):
+        # The statement cache keeps the tile query compiled on each handle, and handles move
+        # between serving threads, one thread at a time.
+        fileURI = 'file:' + urllib.parse.quote(self.filePath) + '?mode=ro&immutable=1'
+        return sqlite3.connect(fileURI, uri=True, check_same_thread=False)
+
+    def _detectSchema(self, handle):
+        schema = {row[0]: row[1] for row in handle.execute(
+            "SELECT name, type FROM sqlite_master WHERE type IN ('table','view')")}
+        if 'tiles' in schema:
+            (self.tileQuery, self.batchSelect) = (FLAT_TILE_QUERY, FLAT_BATCH_SELECT)
+            return 'flat'
+        if 'map' in schema and 'images' in schema:
+            (self.tileQuery, self.batchSelect) = (NORMALIZED_TILE_QUERY, NORMALIZED_BATCH_SELECT)
+            return 'normalized'
+        raise ValueError(f"Unrecognized mbtiles schema. Found: {list(schema.keys())}")
+
+    def _acquireHandle(self):
+        with self._lock:
+            if self._idleHandles:
+                return self._idleHandles.pop()
+        return self._openHandle()
+
+    def _releaseHandle(self, handle):
+        with self._lock:
+            if not self.closed and len(self._idleHandles) < self.maxIdleHandles:
+                self._idleHandles.append(handle)
+                return
+        handle.close()
+
+    def getTile(self, z, x, tmsY):
+        """Return the tile_data blob at zoom z, column x and TMS row tmsY, or None."""
+        handle = self._acquireHandle()
+        try:
+            row = handle.execute(self.tileQuery, (z, x, tmsY)).fetchone()
+        finally:
+            self._releaseHandle(handle)
+        return None if row is None else row[0]
+
+    def getTileRange(self, z, minX, maxX, minTmsY, maxTmsY):
+        """Return the (z, x, tmsY, tileData) rows of the tiles stored in a rectangle of one
+        zoom level, columns minX to maxX and TMS rows minTmsY to maxTmsY inclusive, read
+        with a single ranged query."""
+        (select, prefix) = self.batchSelect
+        query = (select + f'WHERE {prefix}zoom_level = ? AND {prefix}tile_column BETWEEN ? AND ? '
+                 f'AND {prefix}tile_row BETWEEN ? AND ?')
+        handle = self._acquireHandle()
+        try:
+            return handle.execute(query, (z, minX, maxX, minTmsY, maxTmsY)).fetchall()
+        finally:
+            self._releaseHandle(handle)
+
+    def getTiles(self, tileKeys):
+        """Return the (z, x, tmsY, tileData) rows of the stored tiles among tileKeys, a list of
+        (z, x, tmsY), read with one query per MAX_TILES_PER_QUERY keys."""
+        (select, prefix) = self.batchSelect
+        rows = []
+        handle = self._acquireHandle()
+        try:
+            for start in range(0, len(tileKeys), MAX_TILES_PER_QUERY):
+                keyChunk = tileKeys[start:start + MAX_TILES_PER_QUERY]
+                # ORed equality terms are each searched in the coordinate index, where SQLite
+                # scans the whole table for a row value IN a list of VALUES
+                query = select + 'WHERE ' + ' OR '.join(
+                    [f'({prefix}zoom_level = ? AND {prefix}tile_column = ? AND {prefix}tile_row = ?)'] * len(keyChunk))
+                rows.extend(handle.execute(query, [value for key in keyChunk for value in key]).fetchall())
+        finally:
+            self._releaseHandle(handle)
+        return rows
+
+    def close(self):
+        """Close the idle handles.  Handles in use are closed as they are returned."""
+        with self._lock:
+            self.closed = True
+            idleHandles = self._idleHandles
+            self._idleHandles = []
+        for handle in idleHandles:
+            handle.close()
+
+
+class mbtilesReaderRegistry:
+    """Process-wide mbtilesReader per .mbtiles file path."""
+
+    def __init__(self):
+        #FORMAT: {absoluteFilePath:mbtilesReader}
+        self._readers = {}
+        self._lock = threading.Lock()
+
+    def getReader(self, filePath):
+        """Return the reader of filePath, opening it and detecting its schema on first use."""
+        filePath = os.path.abspath(filePath)
+        reader = self._readers.get(filePath)
+        if reader is not None:
+            return reader
+        with self._lock:
+            reader = self._readers.get(filePath)
+            if reader is None:
+                reader = mbtilesReader(filePath)
+                self._readers[filePath] = reader
+            return reader
+
+    def invalidate(self, filePath):
+        """Drop the reader of filePath, e.g. once a new download has replaced the file."""
+        with self._lock:
+            reader = self._readers.pop(os.path.abspath(filePath), None)
+        if reader is not None:
+            reader.close()
+
+    def closeAll(self):
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers = {}
+        for reader in readers:
+            reader.close()
+
+
+# Readers shared by every TileGeneratorAPI in the process.
+mbtilesReaders = mbtilesReaderRegistry()
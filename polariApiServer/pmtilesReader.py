@@ -0,0 +1,292 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Read-only access to PMTiles (version 3) archives for tile serving.
+
+A PMTiles archive is one file holding a fixed 127 byte header, a root directory,
+optional leaf directories and the tile data.  Directories map Hilbert curve tile ids
+to byte ranges, so a tile is found by reading at most a few directories and then
+exactly its own bytes.  The archive is never downloaded whole: every read is a byte
+range, from a local file or a ranged GET on an object store.  The header and root
+directory are read once, and decompressed leaf directories are kept in a small LRU.
+
+    reader = pmtilesReader(localRangeSource(file_path))
+    reader = pmtilesReader(objectStoreRangeSource(store, bucket, object_name))
+    tile_data = reader.getTile(z, x, tms_y)
+
+Readers take TMS rows like mbtilesReader, so the tile endpoints serve both the same way.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+import gzip
+import json
+import os
+import struct
+import threading
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    HAS_ZSTANDARD = False
+
+HEADER_LENGTH = 127
+# Bytes read with the header, which holds the root directory in archives written to the spec.
+INITIAL_READ_LENGTH = 16384
+# Leaf directories kept decompressed per archive.
+MAX_CACHED_DIRECTORIES = 64
+# Directories followed from the root before an archive is taken as corrupt.
+MAX_DIRECTORY_DEPTH = 4
+
+#FORMAT: little-endian magic, version, 11 offsets/lengths/counts, clustered, compressions,
+#tile type, zoom range, bounds, center zoom and center
+HEADER_STRUCT = struct.Struct('<7sB11QBBBBBBiiiiBii')
+
+COMPRESSION_UNKNOWN = 0
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+COMPRESSION_BROTLI = 3
+COMPRESSION_ZSTD = 4
+TILE_TYPES = {0: 'unknown', 1: 'mvt', 2: 'png', 3: 'jpeg', 4: 'webp', 5: 'avif'}
+
+
+#Returns the Hilbert curve tile id of tile (z, x, y), counting every tile of the lower zoom
+#levels first.
+def zxyToTileId(z, x, y):
+    if not 0 <= z <= 31:
+        raise ValueError(f"Zoom level {z} is outside 0-31")
+    if not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise ValueError(f"Tile {z}/{x}/{y} is outside zoom level {z}")
+    tileId = ((1 << (2 * z)) - 1) // 3
+    side = 1 << z
+    while side > 1:
+        half = side >> 1
+        rx = 1 if x & half else 0
+        ry = 1 if y & half else 0
+        tileId += half * half * ((3 * rx) ^ ry)
+        (x, y) = (x & (half - 1), y & (half - 1))
+        if ry == 0:
+            if rx == 1:
+                (x, y) = (half - 1 - x, half - 1 - y)
+            (x, y) = (y, x)
+        side = half
+    return tileId
+
+
+def decompress(data, compression):
+    if compression in (COMPRESSION_NONE, COMPRESSION_UNKNOWN):
+        return data
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    if compression == COMPRESSION_BROTLI and HAS_BROTLI:
+        return brotli.decompress(data)
+    if compression == COMPRESSION_ZSTD and HAS_ZSTANDARD:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"Unsupported PMTiles compression {compression}, brotli and zstd need their optional packages")
+
+
+def readVarints(data, count, position):
+    """Return (values, position) of count unsigned LEB128 varints read from position."""
+    values = array('Q')
+    for _ in range(count):
+        value = 0
+        shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        values.append(value)
+    return (values, position)
+
+
+class pmtilesDirectory:
+    """A decompressed directory, its entries held as four parallel arrays."""
+
+    __slots__ = ('tileIds', 'runLengths', 'lengths', 'offsets')
+
+    def __init__(self, data):
+        (counts, position) = readVarints(data, 1, 0)
+        entryCount = counts[0]
+        (tileIds, position) = readVarints(data, entryCount, position)
+        for i in range(1, entryCount):
+            tileIds[i] += tileIds[i - 1]
+        (self.runLengths, position) = readVarints(data, entryCount, position)
+        (self.lengths, position) = readVarints(data, entryCount, position)
+        (offsets, position) = readVarints(data, entryCount, position)
+        # An offset of 0 continues from the end of the previous entry, others are stored plus 1
+        for i in range(entryCount):
+            if offsets[i] == 0 and i > 0:
+                offsets[i] = offsets[i - 1] + self.lengths[i - 1]
+            else:
+                offsets[i] -= 1
+        self.tileIds = tileIds
+        self.offsets = offsets
+
+    def findEntry(self, tileId):
+        """Return (offset, length, runLength) of the entry covering tileId, where runLength 0
+        points to a leaf directory, or None when no entry covers it."""
+        i = bisect_right(self.tileIds, tileId) - 1
+        if i < 0:
+            return None
+        runLength = self.runLengths[i]
+        if runLength == 0:
+            return (self.offsets[i], self.lengths[i], 0)
+        if tileId < self.tileIds[i] + runLength:
+            return (self.offsets[i], self.lengths[i], runLength)
+        return None
+
+
+class localRangeSource:
+    """Byte ranges of a local file, read with pread so threads share one descriptor."""
+
+    def __init__(self, filePath):
+        self.filePath = os.path.abspath(filePath)
+        self.name = self.filePath
+        self._fd = None
+        self._fd = os.open(self.filePath, os.O_RDONLY)
+
+    def readRange(self, offset, length):
+        return os.pread(self._fd, length, offset)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.close()
+
+
+class objectStoreRangeSource:
+    """Byte ranges of an object, read with ranged GETs through a managedObjectStore."""
+
+    def __init__(self, store, bucket, objectName):
+        self.store = store
+        self.bucket = bucket
+        self.objectName = objectName
+        self.name = f'{bucket}/{objectName}'
+
+    def readRange(self, offset, length):
+        return self.store.read_range(self.bucket, self.objectName, offset, length)
+
+    def close(self):
+        pass
+
+
+class pmtilesReader:
+    """Tile lookups in one PMTiles archive through its range source."""
+
+    def __init__(self, rangeSource, maxCachedDirectories=MAX_CACHED_DIRECTORIES):
+        self.rangeSource = rangeSource
+        self.maxCachedDirectories = maxCachedDirectories
+        #FORMAT: OrderedDict {(offset, length):pmtilesDirectory}, least recently used first
+        self._directories = OrderedDict()
+        self._lock = threading.Lock()
+        initialBytes = rangeSource.readRange(0, INITIAL_READ_LENGTH)
+        self.header = self._parseHeader(initialBytes)
+        rootOffset = self.header['rootDirectoryOffset']
+        rootLength = self.header['rootDirectoryLength']
+        if rootOffset + rootLength <= len(initialBytes):
+            rootBytes = initialBytes[rootOffset:rootOffset + rootLength]
+        else:
+            rootBytes = rangeSource.readRange(rootOffset, rootLength)
+        self.rootDirectory = pmtilesDirectory(decompress(rootBytes, self.header['internalCompression']))
+
+    def _parseHeader(self, data):
+        if len(data) < HEADER_LENGTH or data[:7] != b'PMTiles':
+            raise ValueError(f"{self.rangeSource.name} is not a PMTiles archive")
+        values = HEADER_STRUCT.unpack_from(data)
+        if values[1] != 3:
+            raise ValueError(f"Unsupported PMTiles version {values[1]} in {self.rangeSource.name}")
+        return {
+            "rootDirectoryOffset": values[2], "rootDirectoryLength": values[3],
+            "metadataOffset": values[4], "metadataLength": values[5],
+            "leafDirectoryOffset": values[6], "leafDirectoryLength": values[7],
+            "tileDataOffset": values[8], "tileDataLength": values[9],
+            "addressedTiles": values[10], "tileEntries": values[11], "tileContents": values[12],
+            "clustered": bool(values[13]), "internalCompression": values[14], "tileCompression": values[15],
+            "tileType": TILE_TYPES.get(values[16], 'unknown'), "minZoom": values[17], "maxZoom": values[18],
+            "bounds": [values[19] / 1e7, values[20] / 1e7, values[21] / 1e7, values[22] / 1e7],
+            "center": [values[24] / 1e7, values[25] / 1e7, values[23]]
+        }
+
+    def _getLeafDirectory(self, offset, length):
+        key = (offset, length)
+        with self._lock:
+            directory = self._directories.get(key)
+            if directory is not None:
+                self._directories.move_to_end(key)
+                return directory
+        leafBytes = self.rangeSource.readRange(self.header['leafDirectoryOffset'] + offset, length)
+        directory = pmtilesDirectory(decompress(leafBytes, self.header['internalCompression']))
+        with self._lock:
+            self._directories[key] = directory
+            while len(self._directories) > self.maxCachedDirectories:
+                self._directories.popitem(last=False)
+        return directory
+
+    def getTile(self, z, x, tmsY):
+        """Return the tile at zoom z, column x and TMS row tmsY, or None.  Tiles compressed with
+        brotli or zstd are returned decompressed, gzip ones as stored."""
+        if not 0 <= z <= 31 or not 0 <= x < (1 << z) or not 0 <= tmsY < (1 << z):
+            return None
+        tileId = zxyToTileId(z, x, (1 << z) - 1 - tmsY)
+        directory = self.rootDirectory
+        for depth in range(MAX_DIRECTORY_DEPTH):
+            entry = directory.findEntry(tileId)
+            if entry is None:
+                return None
+            (offset, length, runLength) = entry
+            if runLength > 0:
+                tileData = self.rangeSource.readRange(self.header['tileDataOffset'] + offset, length)
+                if self.header['tileCompression'] in (COMPRESSION_BROTLI, COMPRESSION_ZSTD):
+                    return decompress(tileData, self.header['tileCompression'])
+                return tileData
+            directory = self._getLeafDirectory(offset, length)
+        raise ValueError(f"PMTiles directories of {self.rangeSource.name} nest deeper than {MAX_DIRECTORY_DEPTH}")
+
+    def getTileRange(self, z, minX, maxX, minTmsY, maxTmsY):
+        """Return the (z, x, tmsY, tileData) rows of the tiles stored in a rectangle of one zoom
+        level, as mbtilesReader.getTileRange does."""
+        return self.getTiles([(z, x, tmsY) for tmsY in range(minTmsY, maxTmsY + 1) for x in range(minX, maxX + 1)])
+
+    def getTiles(self, tileKeys):
+        """Return the (z, x, tmsY, tileData) rows of the stored tiles among tileKeys."""
+        rows = []
+        for (z, x, tmsY) in tileKeys:
+            tileData = self.getTile(z, x, tmsY)
+            if tileData is not None:
+                rows.append((z, x, tmsY, tileData))
+        return rows
+
+    def getMetadata(self):
+        """Return the archive's JSON metadata."""
+        metadataBytes = self.rangeSource.readRange(self.header['metadataOffset'], self.header['metadataLength'])
+        return json.loads(decompress(metadataBytes, self.header['internalCompression']) or b'{}')
+
+    def close(self):
+        self.rangeSource.close()
@@ -17,10 +17,60 @@
 from objectTreeDecorators import *
 from accessControl.polariPermissionSet import polariPermissionSet
 from polariAnalytics.functionalityAnalysis import getAccessToClass
+from polariApiServer.conditionalRequests import getClassValidators, answerNotModified, setValidators
+from polariApiServer.streamingResponses import getStreamMode, streamElements, STREAM_CHUNK_SIZE, NDJSON_MEDIA_TYPE, iterateRequestLines
+from polariDBmanagement.sqliteConnectionPool import dbConnectionPool
+from objectTreeSerializer import dumpJSONbytes
 import json
+import base64
+import time
 import setOperators
 import falcon
 
+#Query parameters which shape a GET response, any other parameter names a variable to filter on.
+#limit - the number of instances on a page, at most MAX_PAGE_LIMIT.
+#cursor - the nextCursor of the previous page, to continue from where it ended.
+#fields - a comma separated list of the variables to send for each instance, id is always sent.
+#sort - the variable to order instances by, prefixed with '-' for descending order.
+#Filters are written variable=value for equality, or variable__operator=value where the operator
+#is one of gt, gte, lt, lte, in (a comma separated list of values) or contains.
+GET_PAGING_PARAMS = frozenset({'limit', 'cursor', 'fields', 'sort'})
+MAX_PAGE_LIMIT = 1000
+FILTER_OPERATOR_SUFFIXES = {'gt':'GT', 'gte':'GTE', 'lt':'LT', 'lte':'LTE', 'in':'IN', 'contains':'CONTAINS'}
+
+#Operations accepted by the bulk endpoint at /<ClassName>/bulk, sent as a JSON array or as NDJSON
+#with one operation per line, and the access each operation needs.
+#FORMAT: {"op":"create", "id":optionalId, "data":{varName:value, ..}}
+#FORMAT: {"op":"update", "id":instanceId, "data":{varName:value, ..}}
+#FORMAT: {"op":"delete", "id":instanceId}
+BULK_OPERATION_ACCESS = {'create':'C', 'update':'U', 'delete':'D'}
+#JSON value types accepted for variables the typing has recorded as one of these python types,
+#numbers being interchangeable.  Variables of any other type, and None values, are not checked.
+BULK_VALUE_TYPES = {'str':(str,), 'int':(int, float), 'float':(int, float), 'bool':(bool,)}
+
+#Query strings only carry text, so a filter value which reads as a number, boolean or null is
+#compared as that value.
+def parseFilterValue(rawValue):
+    try:
+        parsedValue = json.loads(rawValue)
+    except ValueError:
+        return rawValue
+    if(parsedValue == None or type(parsedValue) in (int, float, bool)):
+        return parsedValue
+    return rawValue
+
+def encodePageCursor(sortKey):
+    return base64.urlsafe_b64encode(json.dumps(list(sortKey)).encode('utf-8')).decode('ascii')
+
+def decodePageCursor(cursor):
+    try:
+        sortKey = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError("The cursor parameter is not a cursor returned by this endpoint.")
+    if(type(sortKey) != list or len(sortKey) != 3):
+        raise ValueError("The cursor parameter is not a cursor returned by this endpoint.")
+    return tuple(sortKey)
+
 #Defines the Create, Read, Update, and Delete Operations for a particular api endpoint designated for a particular dataChannel or polyTypedObject Instance.
 class polariCRUDE(treeObject):
     @treeObjectInit
@@ -46,6 +96,7 @@ class polariCRUDE(treeObject):
             self.validVarsList.append(someVarTyping.name)
         if(polServer != None):
             polServer.falconServer.add_route(self.apiName, self)
+            polServer.falconServer.add_route(self.apiName + '/bulk', self, suffix='bulk')
 
     #1. Returns an Access Permissions for the given object for the given operation
     #being performed, in the format of a set of different object queries and the
@@ -91,6 +142,10 @@ class polariCRUDE(treeObject):
         if(not "R" in permissionQueryDict):
             response.status = falcon.HTTP_405
             raise PermissionError("Read or Get requests do not have access to any variables on this object type.")
+        #A client which already holds the current response is answered before any instance is read.
+        validators = getClassValidators(self.manager, [self.apiObject], request)
+        if(answerNotModified(request, response, validators)):
+            return
         jsonObj = {}
         try:
             #Get which instances fall under what is being requested.
@@ -99,19 +154,38 @@ class polariCRUDE(treeObject):
             #Cross analyze requested Instances and allowed instances (according to Access
             #Dictionaries on user) in order to analyze which instances requested are able
             #to be returned, in other words it performs 'viewing access'.
+            streamMode = getStreamMode(request)
+            pageParameters = self.getPageParameters(request)
+            if(pageParameters != None):
+                self.respondWithPage(response, pageParameters, allowedQuery, streamMode=streamMode)
+                setValidators(response, validators)
+                response.set_header('Powered-By', 'Polari')
+                return
             requestedInstances = self.manager.getListOfInstancesByAttributes(className=self.apiObject, attributeQueryDict=accessQueryDict["R"][self.apiObject] )
             # Debug: log Definition class reads to trace persistence
             _defClasses = {'TableDefinition', 'DisplayDefinition', 'GraphDefinition', 'GeoJsonDefinition', 'TileSourceDefinition', 'GeocoderDefinition'}
             if self.apiObject in _defClasses:
                 print(f'[CRUDE-GET] {self.apiObject}: objectTables has {len(self.manager.objectTables.get(self.apiObject, {}))} instances, query returned {len(requestedInstances)} instances', flush=True)
 
+            if(requestedInstances != {} and streamMode != None):
+                self.streamClassData(response, streamMode, list(requestedInstances.values()))
+                setValidators(response, validators)
+                response.set_header('Powered-By', 'Polari')
+                return
             if(requestedInstances != {}):
                 #For now we just give everything being requested and don't bother with permissions
                 jsonObj[self.apiObject] = self.manager.getJSONdictForClass(passedInstances=requestedInstances)
             else:
                 jsonObj[self.apiObject] = {}
-            response.media = [jsonObj]
+            #Encoded here rather than through response.media, to use the fastest JSON encoder available.
+            response.data = dumpJSONbytes([jsonObj])
+            response.content_type = falcon.MEDIA_JSON
             response.status = falcon.HTTP_200
+            setValidators(response, validators)
+        except ValueError as err:
+            #Raised for malformed paging, sort, projection or filter parameters.
+            response.status = falcon.HTTP_400
+            response.media = {"error": str(err), "class": self.apiObject}
         except Exception as err:
             response.status = falcon.HTTP_500
             response.media = {"error": str(err), "class": self.apiObject}
@@ -120,6 +194,106 @@ class polariCRUDE(treeObject):
             traceback.print_exc()
         response.set_header('Powered-By', 'Polari')
 
+    #Reads the paging, projection, sort and filter parameters of a GET request, returning None
+    #when there are none so the whole class is sent as before.  Raises ValueError for malformed
+    #parameters.  Variables are not checked against the typing, which only learns of variables
+    #as instances are analyzed, so filters on a variable no instance has simply match nothing.
+    def getPageParameters(self, request):
+        if(request.params == {}):
+            return None
+        pageParameters = {'limit':None, 'afterKey':None, 'fields':None, 'sortAttribute':'id', 'descending':False, 'filterQuery':{}}
+        for paramName, paramValue in request.params.items():
+            if(type(paramValue) == list):
+                raise ValueError("The parameter '" + paramName + "' was given more than once.")
+            if(paramName == 'limit'):
+                try:
+                    limit = int(paramValue)
+                except ValueError:
+                    raise ValueError("The limit parameter must be a whole number.")
+                if(limit < 1 or limit > MAX_PAGE_LIMIT):
+                    raise ValueError("The limit parameter must be between 1 and " + str(MAX_PAGE_LIMIT) + ".")
+                pageParameters['limit'] = limit
+            elif(paramName == 'cursor'):
+                pageParameters['afterKey'] = decodePageCursor(paramValue)
+            elif(paramName == 'fields'):
+                fields = [fieldName.strip() for fieldName in paramValue.split(',') if fieldName.strip() != '']
+                pageParameters['fields'] = set(fields) | {'id'}
+            elif(paramName == 'sort'):
+                sortAttribute = paramValue[1:] if paramValue.startswith('-') else paramValue
+                if(sortAttribute == '' or sortAttribute in TREE_OBJECT_INTERNAL_VARS):
+                    raise ValueError("Cannot sort by the variable '" + sortAttribute + "'.")
+                pageParameters['sortAttribute'] = sortAttribute
+                pageParameters['descending'] = paramValue.startswith('-')
+            elif(paramName.startswith('_')):
+                #Parameters such as cache busters are not filters.
+                continue
+            else:
+                (attributeName, separator, operatorSuffix) = paramName.partition('__')
+                if(attributeName in TREE_OBJECT_INTERNAL_VARS):
+                    raise ValueError("Cannot filter on the variable '" + attributeName + "'.")
+                requirement = pageParameters['filterQuery'].setdefault(attributeName, {})
+                if(separator == ''):
+                    parsedValue = parseFilterValue(paramValue)
+                    requirement["IN"] = [paramValue] if parsedValue == paramValue else [paramValue, parsedValue]
+                elif(operatorSuffix in FILTER_OPERATOR_SUFFIXES):
+                    queryOperator = FILTER_OPERATOR_SUFFIXES[operatorSuffix]
+                    if(queryOperator == "IN"):
+                        requirement["IN"] = []
+                        for someValue in paramValue.split(','):
+                            parsedValue = parseFilterValue(someValue)
+                            requirement["IN"] += [someValue] if parsedValue == someValue else [someValue, parsedValue]
+                    elif(queryOperator == "CONTAINS"):
+                        requirement["CONTAINS"] = paramValue
+                    else:
+                        requirement[queryOperator] = parseFilterValue(paramValue)
+                else:
+                    raise ValueError("Unknown filter operator '" + operatorSuffix + "', the operators are " + ', '.join(sorted(FILTER_OPERATOR_SUFFIXES)) + ".")
+        return pageParameters
+
+    #Sends one page of the instances the user may read which meet the request's filters.  The
+    #page details go in a 'page' entry next to the class data, and the total count of matching
+    #instances is also sent in the X-Total-Count header.
+    def respondWithPage(self, response, pageParameters, allowedQuery, streamMode=None):
+        attributeQuery = allowedQuery
+        if(pageParameters['filterQuery'] != {}):
+            if(allowedQuery == "*"):
+                attributeQuery = pageParameters['filterQuery']
+            else:
+                attributeQuery = [("AND", allowedQuery), ("AND", pageParameters['filterQuery'])]
+        (pageInstances, totalCount, nextKey) = self.manager.getPageOfInstances(className=self.apiObject, attributeQueryDict=attributeQuery, sortAttribute=pageParameters['sortAttribute'], descending=pageParameters['descending'], afterKey=pageParameters['afterKey'], limit=pageParameters['limit'])
+        pageDetails = {
+            'totalCount': totalCount,
+            'returned': len(pageInstances),
+            'limit': pageParameters['limit'],
+            'sort': ('-' if pageParameters['descending'] else '') + pageParameters['sortAttribute'],
+            'nextCursor': encodePageCursor(nextKey) if nextKey != None else None
+        }
+        response.set_header('X-Total-Count', str(totalCount))
+        if(streamMode != None):
+            #NDJSON lines only hold instances, so the cursor for the next page goes in a header.
+            if(pageDetails['nextCursor'] != None):
+                response.set_header('X-Next-Cursor', pageDetails['nextCursor'])
+            self.streamClassData(response, streamMode, pageInstances, varsIncluded=pageParameters['fields'], pageDetails=pageDetails)
+            return
+        classData = self.manager.getJSONdictForClass(passedInstances=pageInstances, varsIncluded=pageParameters['fields'])
+        classData[0]['class'] = self.apiObject
+        classData[0]['page'] = pageDetails
+        response.data = dumpJSONbytes([{self.apiObject: classData}])
+        response.content_type = falcon.MEDIA_JSON
+        response.status = falcon.HTTP_200
+
+    #Streams instances in the form streamMode names.  The 'json' form is the same document an
+    #unstreamed GET sends, with the data list written a chunk of instances at a time, and the
+    #'ndjson' form sends one instance per line.
+    def streamClassData(self, response, streamMode, instances, varsIncluded=None, pageDetails=None):
+        classHeader = {"class":self.apiObject, "varsLimited":list(TREE_OBJECT_INTERNAL_VARS)}
+        if(pageDetails != None):
+            classHeader['page'] = pageDetails
+        #The header is encoded as an object and left open, so the data list is its last entry.
+        prefix = b'[{' + dumpJSONbytes(self.apiObject) + b':[' + dumpJSONbytes(classHeader)[:-1] + b',"data":['
+        instanceChunks = self.manager.iterateJSONdictChunksForClass(passedInstances=instances, varsIncluded=varsIncluded, chunkSize=STREAM_CHUNK_SIZE)
+        streamElements(response, streamMode, instanceChunks, 'polariCRUDE', prefix=prefix, suffix=b']}]}]')
+
     def on_get_collection(self, request, response):
         pass
 
@@ -164,6 +338,7 @@ class polariCRUDE(treeObject):
         if(singularUpdate != {}):
             massUpdateDataSet.append(singularUpdate)
         response.status = falcon.HTTP_200
+        updatedInstances = []
         for instUpdate in massUpdateDataSet:
             instToUpdate = None
             if("polariId" in instUpdate):
@@ -182,17 +357,19 @@ class polariCRUDE(treeObject):
                 #accounted for to be added.
                 for someVarName in updateDict.keys():
                     setattr(instToUpdate, someVarName, updateDict[someVarName])
-                # Persist updated instance to database
-                if instToUpdate and hasattr(self.manager, 'db') and self.manager.db is not None:
-                    try:
-                        saved = self.manager.db.saveInstanceInDB(instToUpdate)
-                        if not saved:
-                            print(f'[polariCRUDE] DB update-persist SKIPPED for {self.apiObject} (table missing)', flush=True)
-                    except Exception as e:
-                        print(f'[polariCRUDE] DB update-persist FAILED for {self.apiObject}: {e}', flush=True)
+                if instToUpdate:
+                    updatedInstances.append(instToUpdate)
             else:
                 response.status = falcon.HTTP_400
                 raise ValueError("Recieved Update request containing a valid instance id, but no updateData to perform the update with.")
+        # Persist all updated instances to database in one bulk save
+        if updatedInstances and hasattr(self.manager, 'db') and self.manager.db is not None:
+            try:
+                savedCount = self.manager.db.saveInstancesInDB(updatedInstances)
+                if savedCount < len(updatedInstances):
+                    print(f'[polariCRUDE] DB update-persist SKIPPED for {len(updatedInstances) - savedCount} {self.apiObject} instance(s) (table missing or no columns)', flush=True)
+            except Exception as e:
+                print(f'[polariCRUDE] DB update-persist FAILED for {self.apiObject}: {e}', flush=True)
 
     def on_put_collection(self, request, response):
         pass
@@ -324,15 +501,11 @@ class polariCRUDE(treeObject):
         #With all validation of permissions complete and queries resolved, we return the created instances
         # Persist newly created instances to database
         if tempInstancesList and hasattr(self.manager, 'db') and self.manager.db is not None:
-            for inst in tempInstancesList:
-                try:
-                    saved = self.manager.db.saveInstanceInDB(inst)
-                    if saved:
-                        print(f'[polariCRUDE] DB persist SUCCESS for {self.apiObject} id={getattr(inst, "id", "?")}', flush=True)
-                    else:
-                        print(f'[polariCRUDE] DB persist SKIPPED for {self.apiObject} id={getattr(inst, "id", "?")} (table missing or no columns)', flush=True)
-                except Exception as e:
-                    print(f'[polariCRUDE] DB persist FAILED for {self.apiObject}: {e}', flush=True)
+            try:
+                savedCount = self.manager.db.saveInstancesInDB(tempInstancesList)
+                print(f'[polariCRUDE] DB persisted {savedCount} of {len(tempInstancesList)} new {self.apiObject} instance(s)', flush=True)
+            except Exception as e:
+                print(f'[polariCRUDE] DB persist FAILED for {self.apiObject}: {e}', flush=True)
         elif tempInstancesList:
             print(f'[polariCRUDE] WARNING: {len(tempInstancesList)} instance(s) created but DB not available!', flush=True)
 
@@ -356,6 +529,159 @@ class polariCRUDE(treeObject):
     def on_post_collection(self, request, response):
         pass
 
+    #Bulk Create, Update and Delete in CRUDE.  Every operation is applied in one batch and the
+    #changes persisted in one transaction, and each gets a result in the order it was sent.  An
+    #operation which fails validation or access checks is reported and skipped, the rest are applied.
+    def on_post_bulk(self, request, response):
+        if self._guard_purged(response):
+            return
+        userAuthInfo = request.auth
+        (accessQueryDict, permissionQueryDict) = self.getUsersObjectAccessPermissions(userAuthInfo)
+        try:
+            operations = self.readBulkOperations(request)
+        except ValueError as err:
+            response.status = falcon.HTTP_400
+            response.media = {"error": str(err), "class": self.apiObject}
+            return
+        startTime = time.perf_counter()
+        #Ids each kind of operation may target, found only when its access query is not "*".
+        allowedIdsByAccess = {}
+        results = []
+        statusCounts = {'created':0, 'updated':0, 'deleted':0, 'error':0}
+        with self.manager.batchMode():
+            for operationIndex, operation in enumerate(operations):
+                try:
+                    result = self.applyBulkOperation(operation, accessQueryDict, allowedIdsByAccess)
+                except Exception as err:
+                    result = {"status":"error", "error":str(err)}
+                result["index"] = operationIndex
+                statusCounts[result["status"]] += 1
+                results.append(result)
+        persistCounts = self.persistBulkChanges(results)
+        print(f'[polariCRUDE] Bulk {self.apiObject}: {statusCounts["created"]} created, {statusCounts["updated"]} updated, {statusCounts["deleted"]} deleted, {statusCounts["error"]} failed in {(time.perf_counter() - startTime) * 1000:.1f}ms', flush=True)
+        responseData = {
+            "class":self.apiObject,
+            "created":statusCounts['created'],
+            "updated":statusCounts['updated'],
+            "deleted":statusCounts['deleted'],
+            "failed":statusCounts['error'],
+            "persisted":persistCounts,
+            "results":results
+        }
+        response.data = dumpJSONbytes(responseData)
+        response.content_type = falcon.MEDIA_JSON
+        response.status = falcon.HTTP_200
+        response.set_header('Powered-By', 'Polari')
+
+    #Reads the operations of a bulk request, as a JSON array or as NDJSON with one operation per
+    #line.  Raises ValueError if the body is neither.
+    def readBulkOperations(self, request):
+        if(request.content_type != None and request.content_type.startswith(NDJSON_MEDIA_TYPE)):
+            operations = []
+            for lineNumber, line in enumerate(iterateRequestLines(request.bounded_stream), start=1):
+                if(line.strip() == b''):
+                    continue
+                try:
+                    operations.append(json.loads(line))
+                except ValueError:
+                    raise ValueError("Line " + str(lineNumber) + " of the NDJSON body is not valid JSON.")
+            return operations
+        try:
+            operations = json.loads(request.bounded_stream.read() or b'[]')
+        except ValueError:
+            raise ValueError("The body of a bulk request must be a JSON array of operations, or NDJSON with one operation per line.")
+        if(type(operations) != list):
+            raise ValueError("The body of a bulk request must be a JSON array of operations, or NDJSON with one operation per line.")
+        return operations
+
+    #Applies one bulk operation, returning its result.  Raises for invalid or disallowed operations.
+    def applyBulkOperation(self, operation, accessQueryDict, allowedIdsByAccess):
+        if(type(operation) != dict or operation.get("op") not in BULK_OPERATION_ACCESS):
+            raise ValueError("Each bulk operation must be an object with an 'op' of " + ', '.join(BULK_OPERATION_ACCESS) + ".")
+        operationType = operation["op"]
+        accessType = BULK_OPERATION_ACCESS[operationType]
+        if(not accessType in accessQueryDict):
+            raise PermissionError(operationType.capitalize() + " requests not allowed at all for this user on this object type.")
+        instanceId = operation.get("id")
+        classInstances = self.manager.objectTables.get(self.apiObject, {})
+        if(operationType == "create"):
+            data = operation.get("data", {})
+            self.validateBulkData(data, isCreate=True)
+            if(instanceId != None and instanceId in classInstances):
+                raise ValueError("An instance of " + self.apiObject + " with id '" + str(instanceId) + "' already exists.")
+            #Variables which are not parameters of __init__ are set once the instance exists.
+            initParameters = {}
+            laterVariables = {}
+            for varName, value in data.items():
+                if(varName in self.CreateRequiredParameters or varName in self.CreateDefaultParameters):
+                    initParameters[varName] = value
+                else:
+                    laterVariables[varName] = value
+            if(instanceId != None):
+                initParameters["id"] = instanceId
+            newInstance = self.CreateMethod(**initParameters, manager=self.manager)
+            for varName, value in laterVariables.items():
+                setattr(newInstance, varName, value)
+            return {"status":"created", "id":newInstance.id}
+        if(instanceId == None or instanceId not in classInstances):
+            raise KeyError("No instance of " + self.apiObject + " with id '" + str(instanceId) + "' exists.")
+        accessQuery = accessQueryDict[accessType][self.apiObject]
+        if(accessQuery != "*"):
+            if(accessType not in allowedIdsByAccess):
+                allowedIdsByAccess[accessType] = self.manager.getListOfInstancesByAttributes(className=self.apiObject, attributeQueryDict=accessQuery)
+            if(instanceId not in allowedIdsByAccess[accessType]):
+                raise PermissionError("Access Permissions do not allow user to " + operationType + " the targeted instance.")
+        if(operationType == "update"):
+            data = operation.get("data")
+            self.validateBulkData(data, isCreate=False)
+            instToUpdate = classInstances[instanceId]
+            for varName, value in data.items():
+                setattr(instToUpdate, varName, value)
+            return {"status":"updated", "id":instanceId}
+        self.manager.deleteTreeNode(className=self.apiObject, nodePolariId=instanceId)
+        return {"status":"deleted", "id":instanceId}
+
+    #Checks the variables of a create or update against the typing.  Each must be a variable or
+    #__init__ parameter the typing knows of, and a create must give every required parameter.
+    def validateBulkData(self, data, isCreate):
+        if(type(data) != dict or (not isCreate and data == {})):
+            raise ValueError("The data of a bulk " + ("create" if isCreate else "update") + " must be an object mapping variables to their values.")
+        polyTypedVarsDict = self.objTyping.polyTypedVarsDict
+        for varName, value in data.items():
+            if(varName in TREE_OBJECT_INTERNAL_VARS or not (varName in polyTypedVarsDict or varName in self.CreateRequiredParameters or varName in self.CreateDefaultParameters)):
+                raise ValueError("'" + varName + "' is not a variable of " + self.apiObject + ".")
+            expectedTypes = BULK_VALUE_TYPES.get(getattr(polyTypedVarsDict.get(varName), 'pythonTypeDefault', None))
+            if(value != None and expectedTypes != None and type(value) not in expectedTypes):
+                raise ValueError("The variable '" + varName + "' of " + self.apiObject + " holds " + polyTypedVarsDict[varName].pythonTypeDefault + " values, was sent " + type(value).__name__ + ".")
+        if(isCreate):
+            missingParameters = [paramName for paramName in self.CreateRequiredParameters if paramName not in data]
+            if(missingParameters != []):
+                raise ValueError("Missing required parameters for creation of instances of object type '" + self.apiObject + "' missing required parameters are: " + str(missingParameters))
+
+    #Persists the changes of a bulk request in one transaction, returning the counts written.
+    #Managers tracking changes write them with persistChanges, otherwise the created and updated
+    #instances are saved directly.
+    def persistBulkChanges(self, results):
+        if(getattr(self.manager, 'db', None) == None):
+            return None
+        if(getattr(self.manager, 'dirtyTracking', False)):
+            (upsertedCount, deletedCount) = self.manager.persistChanges()
+            return {"upserted":upsertedCount, "deleted":deletedCount}
+        db = self.manager.db
+        classInstances = self.manager.objectTables.get(self.apiObject, {})
+        changedInstances = [classInstances[result["id"]] for result in results if result["status"] in ("created", "updated") and result["id"] in classInstances]
+        deletedIds = [(result["id"],) for result in results if result["status"] == "deleted"]
+        try:
+            with dbConnectionPool.transaction(db.getDBFilePath()) as dbConn:
+                savedCount = db.saveInstancesInDB(changedInstances)
+                deletedCount = 0
+                if(deletedIds != [] and self.apiObject in db.tables and 'id' in db.getTableLayout(self.apiObject, dbConn)[0]):
+                    deletedCount = dbConn.executemany(f'DELETE FROM {self.apiObject} WHERE id = ?', deletedIds).rowcount
+        except Exception as e:
+            print(f'[polariCRUDE] DB bulk-persist FAILED for {self.apiObject}: {e}', flush=True)
+            (savedCount, deletedCount) = (0, 0)
+        return {"upserted":savedCount, "deleted":deletedCount}
+
     #Delete in CRUD
     def on_delete(self, request, response):
         if self._guard_purged(response):
@@ -39,6 +39,7 @@ from polariApiServer.apiFormatConfig import ApiFormatConfig
 from polariApiServer.configuredFormattedAPIs import FlatJsonAPI, D3ColumnAPI, GeoJsonAPI
 from polariApiServer.tileGeneratorAPI import TileGeneratorAPI
 from polariApiServer.objectStorageAPI import ObjectStorageAPI
+from polariApiServer.asgiBridge import buildASGIApp, DEFAULT_ASGI_WORKERS, DEFAULT_ASGI_STREAM_WORKERS
 from polariApiProfiler.apiProfilerAPI import (
     APIProfilerQueryAPI,
     APIProfilerMatchAPI,
@@ -386,6 +387,12 @@ class polariServer(treeObject):
         self.serverInstance = simple_server.make_server('127.0.0.1', 8000, self.apiServer)
         self.serverInstance.serve_forever()
 
+    #Returns a falcon.asgi.App serving every endpoint of falconServer, for running under an ASGI
+    #server, with requests run on a pool of at most maxWorkers threads and at most maxStreamWorkers
+    #streamed bodies read at once.
+    def buildASGIApp(self, maxWorkers=DEFAULT_ASGI_WORKERS, maxStreamWorkers=DEFAULT_ASGI_STREAM_WORKERS):
+        return buildASGIApp(self.falconServer, maxWorkers=maxWorkers, maxStreamWorkers=maxStreamWorkers)
+
     def makeDefaultUserGroups(self):
         #Make AdminGroup access group - users with admin privilages.
         self.groups.append(UserGroup(groupname="AdminGroup", manager=self.manager))
@@ -604,23 +611,19 @@ class polariServer(treeObject):
         method detects the old schema and recreates the table with the
         correct structure so instances can be properly persisted.
         """
-        import sqlite3
         db = self.manager.db
         if db is None:
             return
         try:
-            dbFilePath = os.path.join(db.Path, db.name + '.db') if db.Path else db.name + '.db'
-            conn = sqlite3.connect(dbFilePath)
+            conn = db.getConnection()
             cursor = conn.execute(f"PRAGMA table_info({className})")
             columns = [row[1] for row in cursor.fetchall()]
-            conn.close()
             if 'id' not in columns:
                 print(f'[polariServer] Migrating {className} table: adding "id" column (recreating table)', flush=True)
                 # Drop the old table (it has no usable data without IDs)
-                conn = sqlite3.connect(dbFilePath)
                 conn.execute(f'DROP TABLE IF EXISTS {className}')
                 conn.commit()
-                conn.close()
+                db.invalidateTableLayout(className)
                 # Remove from tables list so makeTypedTableFromAnalysis can recreate
                 if className in db.tables:
                     db.tables.remove(className)
@@ -685,7 +688,7 @@ class polariServer(treeObject):
                 print(f'[DefRestore] Restored {restoredCount} {className} instances from DB', flush=True)
 
     def _autoRegisterMbtilesSources(self):
-        """Scan MinIO buckets for .mbtiles files and create or update
+        """Scan MinIO buckets for .mbtiles and .pmtiles files and create or update
         TileSourceDefinition instances so tile-serving works correctly.
 
         This ensures that previously generated tile sources survive server
@@ -727,7 +730,7 @@ class polariServer(treeObject):
                 continue
             for obj in objects:
                 obj_name = obj.get('name', '')
-                if not obj_name.endswith('.mbtiles'):
+                if not obj_name.endswith(('.mbtiles', '.pmtiles')):
                     continue
                 # Derive a readable name from the filename (strip extension)
                 source_name = obj_name.rsplit('.', 1)[0]
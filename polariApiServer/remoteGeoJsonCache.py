@@ -0,0 +1,104 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+On-disk cache of remote GeoJSON files used as tile generation sources.
+
+Every fetch goes through one shared requests session, so connections to the same
+host are reused, with connect and read timeouts.  A response body is streamed to
+disk rather than held in memory, and kept with the ETag it was sent with, keyed by
+its URL.  Later fetches of the URL send that ETag in If-None-Match and reuse the
+file when the server answers 304 Not Modified.
+"""
+
+from requests.adapters import HTTPAdapter
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+import requests
+
+# Seconds to connect to a remote host, and to wait between bytes of its response.
+REMOTE_TIMEOUT = (10, 60)
+# Bytes written to disk at a time while a response body downloads.
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Pooled connections kept per remote host.
+SESSION_POOL_SIZE = 8
+
+
+class remoteGeoJsonCache:
+    """Fetches remote GeoJSON into cache files, revalidated with their ETags."""
+
+    def __init__(self, cacheDir=None, timeout=REMOTE_TIMEOUT):
+        self.cacheDir = cacheDir or os.path.join(tempfile.gettempdir(), 'polari-geojson-cache')
+        self.timeout = timeout
+        self._session = None
+        self._sessionLock = threading.Lock()
+
+    def getSession(self):
+        """Return the shared session, created on first use."""
+        with self._sessionLock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=SESSION_POOL_SIZE, pool_maxsize=SESSION_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def getCachePaths(self, url):
+        """Return (dataPath, metadataPath) of the files caching a URL."""
+        urlKey = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return (os.path.join(self.cacheDir, urlKey + '.geojson'), os.path.join(self.cacheDir, urlKey + '.json'))
+
+    def fetchToFile(self, url):
+        """Return the path of a file holding the current body of url, downloading it unless the
+        cached copy's ETag is still current.  Raises requests exceptions on failure."""
+        os.makedirs(self.cacheDir, exist_ok=True)
+        (dataPath, metadataPath) = self.getCachePaths(url)
+        cachedETag = None
+        if os.path.exists(dataPath) and os.path.exists(metadataPath):
+            try:
+                with open(metadataPath, 'r') as metadataFile:
+                    cachedETag = json.load(metadataFile).get('etag')
+            except (OSError, ValueError):
+                cachedETag = None
+        headers = {'If-None-Match': cachedETag} if cachedETag else {}
+        with self.getSession().get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cachedETag:
+                print(f"[GeoJsonCache] Not modified, using cached copy of {url}", flush=True)
+                return dataPath
+            response.raise_for_status()
+            # Concurrent fetches of one URL each write their own file, and the last rename wins
+            downloadPath = f'{dataPath}.{uuid.uuid4().hex[:8]}.downloading'
+            try:
+                with open(downloadPath, 'wb') as dataFile:
+                    for bodyChunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        dataFile.write(bodyChunk)
+                os.replace(downloadPath, dataPath)
+            finally:
+                if os.path.exists(downloadPath):
+                    os.remove(downloadPath)
+            metadataTempPath = downloadPath + '.json'
+            with open(metadataTempPath, 'w') as metadataFile:
+                json.dump({'url': url, 'etag': response.headers.get('ETag')}, metadataFile)
+            os.replace(metadataTempPath, metadataPath)
+        return dataPath
+
+
+# Cache shared by every TileGeneratorAPI in the process.
+remoteGeoJsonFiles = remoteGeoJsonCache()
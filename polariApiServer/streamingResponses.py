@@ -0,0 +1,120 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Streamed JSON responses, for GET endpoints whose payload grows with the number of
+instances or rows they send.
+
+A streamed response is written from chunks of elements as the server sends it, so
+only one chunk is held as JSON at a time and the first bytes go out before the rest
+are read.  Clients ask for one of two forms:
+
+    GET /ClassName?_stream=true                  -> one JSON document, as sent unstreamed
+    GET /ClassName  Accept: application/x-ndjson -> one JSON element per line
+
+Parameters starting with '_' are never read as filters by polariCRUDE, so _stream
+combines with its paging and filter parameters.
+"""
+
+from objectTreeSerializer import dumpJSONbytes
+import falcon
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+# Elements encoded together before each write to the client.
+STREAM_CHUNK_SIZE = 500
+
+STREAM_MODE_JSON = 'json'
+STREAM_MODE_NDJSON = 'ndjson'
+
+
+#Returns the form a request asks its response to be streamed in, or None to send it whole.
+#Only endpoints sending a list of elements offer NDJSON, others pass allowNDJSON=False.
+def getStreamMode(request, allowNDJSON=True):
+    if(allowNDJSON and request.client_prefers([falcon.MEDIA_JSON, NDJSON_MEDIA_TYPE]) == NDJSON_MEDIA_TYPE):
+        return STREAM_MODE_NDJSON
+    if(request.get_param_as_bool('_stream', default=False)):
+        return STREAM_MODE_JSON
+    return None
+
+
+#Writes the elements of each chunk into a JSON array, between the prefix and suffix bytes
+#around it.  A whole chunk is encoded as one array and its brackets dropped.
+def iterateJSONArray(elementChunks, prefix=b'[', suffix=b']'):
+    yield prefix
+    firstChunk = True
+    for elementChunk in elementChunks:
+        if(not elementChunk):
+            continue
+        chunkBytes = dumpJSONbytes(elementChunk)[1:-1]
+        yield chunkBytes if firstChunk else b',' + chunkBytes
+        firstChunk = False
+    yield suffix
+
+
+#Writes each element of each chunk on a line of its own.
+def iterateNDJSON(elementChunks):
+    for elementChunk in elementChunks:
+        if(elementChunk):
+            yield b'\n'.join([dumpJSONbytes(element) for element in elementChunk]) + b'\n'
+
+
+#Logs an error raised while a response is streamed.  The status and headers have already been
+#sent by then, so the client sees the response end early.
+def guardStream(byteChunks, sourceName):
+    try:
+        yield from byteChunks
+    except Exception as err:
+        print(f"[{sourceName}] Error while streaming response: {err}", flush=True)
+        import traceback
+        traceback.print_exc()
+
+
+#Sends the element chunks as a streamed response, in the form streamMode names.  The prefix and
+#suffix wrap the JSON array for the 'json' form and are not sent with NDJSON.
+def streamElements(response, streamMode, elementChunks, sourceName, prefix=b'[', suffix=b']'):
+    if(streamMode == STREAM_MODE_NDJSON):
+        byteChunks = iterateNDJSON(elementChunks)
+        response.content_type = NDJSON_MEDIA_TYPE
+    else:
+        byteChunks = iterateJSONArray(elementChunks, prefix=prefix, suffix=suffix)
+        response.content_type = falcon.MEDIA_JSON
+    response.stream = guardStream(byteChunks, sourceName)
+    response.status = falcon.HTTP_200
+
+
+#Yields the lines of a request body, reading it a block at a time, for NDJSON request bodies.
+def iterateRequestLines(requestStream, blockSize=65536):
+    pendingBytes = b''
+    while True:
+        block = requestStream.read(blockSize)
+        if(not block):
+            break
+        lines = (pendingBytes + block).split(b'\n')
+        pendingBytes = lines.pop()
+        yield from lines
+    if(pendingBytes):
+        yield pendingBytes
+
+
+#Splits an iterable into lists of at most chunkSize items.
+def chunkIterable(someIterable, chunkSize=STREAM_CHUNK_SIZE):
+    chunk = []
+    for item in someIterable:
+        chunk.append(item)
+        if(len(chunk) >= chunkSize):
+            yield chunk
+            chunk = []
+    if(chunk):
+        yield chunk
@@ -73,7 +73,8 @@ class systemInfoAPI(treeObject):
                 "isFreshBoot": getattr(self.manager, 'isFreshBoot', False),
                 "baseline": getattr(self.manager, 'bootResourceBaseline', None),
                 "postTree": getattr(self.manager, 'bootResourcePostTree', None),
-                "postDB": getattr(self.manager, 'bootResourcePostDB', None)
+                "postDB": getattr(self.manager, 'bootResourcePostDB', None),
+                "restore": getattr(self.manager, 'bootRestoreProfile', None)
             }
 
             systemInfo = {
@@ -0,0 +1,193 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Paging, projection, sort and filter parameters of the formatted APIs, run in SQLite.
+
+The Flat JSON and D3 Column APIs read a class's table directly, so their GET
+parameters become one parameterized query rather than rows filtered in Python.
+They are written as for CRUDE endpoints, with offset added:
+
+    ?fields=name,value&sort=-value&limit=100&value__gte=3
+    ?fields=name,value&sort=-value&limit=100&cursor=<X-Next-Cursor of the last page>
+    ?sort=name&limit=100&offset=200
+
+Column names are checked against the class's polyTypedObject and its table before
+they are written into SQL, and every value is a bound parameter.  Cursor pages
+continue after the last row's sort value and rowid, so every page costs as much as
+the first, where an offset page reads and skips the rows before it.
+"""
+
+from polariApiServer.polariCRUDE import MAX_PAGE_LIMIT, FILTER_OPERATOR_SUFFIXES, parseFilterValue, encodePageCursor, decodePageCursor
+from objectTreeDecorators import TREE_OBJECT_INTERNAL_VARS
+
+#SQL comparison of each ordering filter operator.
+FILTER_SQL_OPERATORS = {'GT': '>', 'GTE': '>=', 'LT': '<', 'LTE': '<='}
+
+
+def quoteIdentifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+#Returns the table columns a request may select, sort or filter on, those which are variables or
+#identifiers of the class's polyTypedObject.  Tables of classes without analyzed variables keep all
+#of their columns, as a generalized table holds whatever the class's instances had.
+def getQueryableColumns(objTyping, tableColumns):
+    typedNames = set(getattr(objTyping, 'polyTypedVarsDict', None) or {}) | set(getattr(objTyping, 'identifiers', None) or [])
+    return [columnName for columnName in tableColumns
+            if columnName not in TREE_OBJECT_INTERNAL_VARS and (not typedNames or columnName in typedNames)]
+
+
+#Reads the paging, projection, sort and filter parameters of a GET request, returning None when
+#there are none so the whole table is sent as before.  Raises ValueError for malformed parameters
+#and for columns that are not in queryableColumns.
+#FORMAT: {'limit':int|None, 'offset':int, 'afterKey':(sortSpec, sortValue, rowid)|None, 'fields':[columnName]|None,
+#         'sortColumn':columnName|None, 'descending':bool, 'filters':[(columnName, operator, [values])]}
+def parseTableQuery(request, queryableColumns):
+    if(all(paramName.startswith('_') for paramName in request.params)):
+        return None
+    queryable = set(queryableColumns)
+    def checkColumn(columnName, purpose):
+        if(columnName not in queryable):
+            raise ValueError("Cannot " + purpose + " the column '" + columnName + "', the columns are " + ', '.join(queryableColumns) + ".")
+        return columnName
+    tableQuery = {'limit':None, 'offset':0, 'afterKey':None, 'fields':None, 'sortColumn':None, 'descending':False, 'filters':[]}
+    for paramName, paramValue in request.params.items():
+        if(type(paramValue) == list):
+            raise ValueError("The parameter '" + paramName + "' was given more than once.")
+        if(paramName in ('limit', 'offset')):
+            try:
+                number = int(paramValue)
+            except ValueError:
+                raise ValueError("The " + paramName + " parameter must be a whole number.")
+            if(paramName == 'limit' and (number < 1 or number > MAX_PAGE_LIMIT)):
+                raise ValueError("The limit parameter must be between 1 and " + str(MAX_PAGE_LIMIT) + ".")
+            if(paramName == 'offset' and number < 0):
+                raise ValueError("The offset parameter must not be negative.")
+            tableQuery[paramName] = number
+        elif(paramName == 'cursor'):
+            tableQuery['afterKey'] = decodePageCursor(paramValue)
+        elif(paramName == 'fields'):
+            fields = [checkColumn(fieldName.strip(), 'select') for fieldName in paramValue.split(',') if fieldName.strip() != '']
+            # Rows are always sent with their id, as CRUDE endpoints send instances
+            if('id' in queryable and 'id' not in fields):
+                fields.insert(0, 'id')
+            tableQuery['fields'] = list(dict.fromkeys(fields))
+        elif(paramName == 'sort'):
+            tableQuery['sortColumn'] = checkColumn(paramValue[1:] if paramValue.startswith('-') else paramValue, 'sort by')
+            tableQuery['descending'] = paramValue.startswith('-')
+        elif(paramName.startswith('_')):
+            #Parameters such as _stream and cache busters are not filters.
+            continue
+        else:
+            (columnName, separator, operatorSuffix) = paramName.partition('__')
+            checkColumn(columnName, 'filter on')
+            if(separator == ''):
+                parsedValue = parseFilterValue(paramValue)
+                tableQuery['filters'].append((columnName, 'IN', [paramValue] if parsedValue == paramValue else [paramValue, parsedValue]))
+            elif(operatorSuffix in FILTER_OPERATOR_SUFFIXES):
+                queryOperator = FILTER_OPERATOR_SUFFIXES[operatorSuffix]
+                if(queryOperator == 'IN'):
+                    values = []
+                    for someValue in paramValue.split(','):
+                        parsedValue = parseFilterValue(someValue)
+                        values += [someValue] if parsedValue == someValue else [someValue, parsedValue]
+                    tableQuery['filters'].append((columnName, 'IN', values))
+                elif(queryOperator == 'CONTAINS'):
+                    tableQuery['filters'].append((columnName, 'CONTAINS', [paramValue]))
+                else:
+                    tableQuery['filters'].append((columnName, queryOperator, [parseFilterValue(paramValue)]))
+            else:
+                raise ValueError("Unknown filter operator '" + operatorSuffix + "', the operators are " + ', '.join(sorted(FILTER_OPERATOR_SUFFIXES)) + ".")
+    if(tableQuery['afterKey'] != None and tableQuery['afterKey'][0] != getSortSpec(tableQuery)):
+        raise ValueError("The cursor parameter was returned for a different sort than '" + getSortSpec(tableQuery) + "'.")
+    return tableQuery
+
+
+#Returns the sort of a table query as written in its sort parameter, '' for the table's row order.
+def getSortSpec(tableQuery):
+    if(tableQuery['sortColumn'] == None):
+        return ''
+    return ('-' if tableQuery['descending'] else '') + tableQuery['sortColumn']
+
+
+#Returns (queryClause, parameters), the WHERE, ORDER BY and LIMIT clauses of a table query for
+#managedDatabase.iterateTableRows and iterateTableColumns.  Rows are always ordered, ending with rowid,
+#since iterateTableColumns reads each column with its own query.  fetchLimit overrides the query's limit,
+#so a page can be read with one extra row that tells whether another page follows it.
+def buildQueryClause(tableQuery, fetchLimit=None):
+    conditions = []
+    parameters = []
+    for (columnName, queryOperator, values) in tableQuery['filters']:
+        quotedName = quoteIdentifier(columnName)
+        if(queryOperator == 'IN'):
+            conditions.append(quotedName + ' IN (' + ', '.join(['?'] * len(values)) + ')')
+        elif(queryOperator == 'CONTAINS'):
+            conditions.append('instr(' + quotedName + ', ?) > 0')
+        else:
+            conditions.append(quotedName + ' ' + FILTER_SQL_OPERATORS[queryOperator] + ' ?')
+        parameters += values
+    descending = tableQuery['descending']
+    # Rows sort by the sort column then rowid, so rows with equal values keep one order between pages.
+    # SQLite sorts NULL before every value, so NULLs come first ascending and last descending.
+    if(tableQuery['afterKey'] != None):
+        (sortSpec, sortValue, afterRowId) = tableQuery['afterKey']
+        rowIdAfter = 'rowid < ?' if descending else 'rowid > ?'
+        if(tableQuery['sortColumn'] == None):
+            conditions.append(rowIdAfter)
+            parameters.append(afterRowId)
+        else:
+            quotedName = quoteIdentifier(tableQuery['sortColumn'])
+            if(sortValue == None and not descending):
+                conditions.append('((' + quotedName + ' IS NULL AND ' + rowIdAfter + ') OR ' + quotedName + ' IS NOT NULL)')
+                parameters.append(afterRowId)
+            elif(sortValue == None):
+                conditions.append('(' + quotedName + ' IS NULL AND ' + rowIdAfter + ')')
+                parameters.append(afterRowId)
+            else:
+                valueAfter = quotedName + (' < ?' if descending else ' > ?')
+                nullsAfter = ' OR ' + quotedName + ' IS NULL' if descending else ''
+                conditions.append('(' + valueAfter + ' OR (' + quotedName + ' = ? AND ' + rowIdAfter + ')' + nullsAfter + ')')
+                parameters += [sortValue, sortValue, afterRowId]
+    queryClause = ''
+    if(conditions != []):
+        queryClause += 'WHERE ' + ' AND '.join(conditions)
+    direction = ' DESC' if descending else ' ASC'
+    if(tableQuery['sortColumn'] != None):
+        queryClause += ' ORDER BY ' + quoteIdentifier(tableQuery['sortColumn']) + direction + ', rowid' + direction
+    else:
+        queryClause += ' ORDER BY rowid' + direction
+    limit = fetchLimit if fetchLimit != None else tableQuery['limit']
+    if(limit != None or tableQuery['offset'] > 0):
+        queryClause += ' LIMIT ? OFFSET ?'
+        parameters += [limit if limit != None else -1, tableQuery['offset']]
+    return (queryClause.strip(), parameters)
+
+
+#Reads one page of a table query, returning (columnNames, rows, nextCursor) where nextCursor is
+#None on the last page.  The page is read with its sort value and rowid, which make the cursor,
+#and one row more than the limit, which tells whether another page follows.
+def readTablePage(db, tableName, columnNames, tableQuery):
+    keyColumns = ['rowid'] + ([tableQuery['sortColumn']] if tableQuery['sortColumn'] != None else [])
+    (queryClause, parameters) = buildQueryClause(tableQuery, fetchLimit=tableQuery['limit'] + 1)
+    (selectedNames, rowIterator) = db.iterateTableRows(tableName, columnNames=columnNames + keyColumns, queryClause=queryClause, parameters=parameters)
+    pageRows = list(rowIterator)
+    nextCursor = None
+    if(len(pageRows) > tableQuery['limit']):
+        pageRows = pageRows[:tableQuery['limit']]
+        lastRow = pageRows[-1]
+        sortValue = lastRow[len(columnNames) + 1] if tableQuery['sortColumn'] != None else None
+        nextCursor = encodePageCursor((getSortSpec(tableQuery), sortValue, lastRow[len(columnNames)]))
+    return (columnNames, [row[:len(columnNames)] for row in pageRows], nextCursor)
@@ -0,0 +1,158 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+In-memory LRU cache of served tiles, bounded by the total bytes it holds.
+
+Low zoom tiles are fetched by every client, so each cached tile keeps what its
+response needs: the blob, its content type and content encoding, sniffed once from
+its magic bytes, and an ETag hashed from its content.  Tiles missing from a tileset
+are cached too, since empty areas are requested as often as any other.  A tileset's
+entries are dropped when its .mbtiles file is replaced, which also moves the tileset to
+a new generation, so a tile read from the old file while it was replaced is not cached.
+
+    generation = tileCache.getGeneration(tileset)
+    ...read the tile from the tileset's reader...
+    entry = tileCache.put(tileset, z, x, y, tileData, generation)
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+try:
+    from config_loader import config
+    DEFAULT_TILE_CACHE_BYTES = config.get_int('tiles.cache_bytes', 67108864)
+    TILE_CACHE_MAX_AGE = config.get_int('tiles.cache_max_age', 86400)
+except ImportError:
+    DEFAULT_TILE_CACHE_BYTES = 67108864
+    TILE_CACHE_MAX_AGE = 86400
+
+# Bytes charged per entry on top of its blob, for the key, the entry and its ETag.
+ENTRY_OVERHEAD_BYTES = 200
+
+
+#Returns (contentType, contentEncoding) of a tile blob from its magic bytes.  Vector tiles are
+#raw or gzip-compressed protobuf, raster tiles PNG, JPEG or WebP.
+def detectTileFormat(tileData):
+    if tileData[:2] == b'\x1f\x8b':
+        return ('application/x-protobuf', 'gzip')
+    if tileData[:4] == b'\x89PNG':
+        return ('image/png', None)
+    if tileData[:2] == b'\xff\xd8':
+        return ('image/jpeg', None)
+    if tileData[:4] == b'RIFF' and tileData[8:12] == b'WEBP':
+        return ('image/webp', None)
+    return ('application/x-protobuf', None)
+
+
+class tileEntry:
+    """A cached tile response, where tileData None marks a tile missing from its tileset."""
+
+    __slots__ = ('tileData', 'contentType', 'contentEncoding', 'etag', 'size')
+
+    def __init__(self, tileData):
+        self.tileData = tileData
+        if tileData is None:
+            (self.contentType, self.contentEncoding, self.etag) = (None, None, None)
+            self.size = ENTRY_OVERHEAD_BYTES
+            return
+        (self.contentType, self.contentEncoding) = detectTileFormat(tileData)
+        self.etag = hashlib.sha1(tileData).hexdigest()[:20]
+        self.size = len(tileData) + ENTRY_OVERHEAD_BYTES
+
+
+class tileLRUCache:
+    """Thread-safe LRU cache of tileEntry objects keyed by (tileset, z, x, y)."""
+
+    def __init__(self, maxBytes=DEFAULT_TILE_CACHE_BYTES):
+        self.maxBytes = maxBytes
+        self.currentBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        #FORMAT: OrderedDict {(tileset, z, x, y):tileEntry}, least recently used first
+        self._entries = OrderedDict()
+        #FORMAT: {tileset:generation}, counting the invalidations of each tileset
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def getGeneration(self, tileset):
+        """Return the tileset's generation, to be passed to put with tiles read after it."""
+        with self._lock:
+            return self._generations.get(tileset, 0)
+
+    def get(self, tileset, z, x, y):
+        """Return the cached entry of a tile, or None when it is not cached."""
+        key = (tileset, z, x, y)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, tileset, z, x, y, tileData, generation=None):
+        """Cache a tile read from its tileset, or its absence when tileData is None, and
+        return its entry.  Tiles larger than the whole cache, and tiles read in a generation
+        the tileset has since left, are returned uncached."""
+        entry = tileEntry(tileData)
+        if entry.size > self.maxBytes:
+            return entry
+        key = (tileset, z, x, y)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(tileset, 0):
+                return entry
+            previousEntry = self._entries.pop(key, None)
+            if previousEntry is not None:
+                self.currentBytes -= previousEntry.size
+            self._entries[key] = entry
+            self.currentBytes += entry.size
+            while self.currentBytes > self.maxBytes:
+                (evictedKey, evictedEntry) = self._entries.popitem(last=False)
+                self.currentBytes -= evictedEntry.size
+                self.evictions += 1
+        return entry
+
+    def invalidateTileset(self, tileset):
+        """Drop every cached tile of a tileset, e.g. once its file has been replaced."""
+        with self._lock:
+            self._generations[tileset] = self._generations.get(tileset, 0) + 1
+            for key in [key for key in self._entries if key[0] == tileset]:
+                self.currentBytes -= self._entries.pop(key).size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.currentBytes = 0
+
+    def getStats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.currentBytes,
+                "maxBytes": self.maxBytes
+            }
+
+
+# Tile cache shared by every TileGeneratorAPI in the process.
+tileCache = tileLRUCache()
@@ -23,21 +23,61 @@ using tippecanoe. Supports two output modes:
 
 Routes:
     GET  /tile-generator/sources              - List available GeoJSON sources
-    POST /tile-generator/generate             - Start tile generation job
-    GET  /tile-generator/status/{job_id}      - Check job status
+    POST /tile-generator/generate             - Queue a tile generation job
+    GET  /tile-generator/status/{job_id}      - Check job status, stage and percent complete
+    POST /tile-generator/cancel/{job_id}      - Cancel a pending or running job
+    GET  /tile-generator/jobs                 - List recent jobs
     GET  /tile-generator/download/{job_id}    - Download completed .mbtiles file
+    GET  /tile-generator/tile-cache           - Served tile cache hit/miss counters
 """
 
 from objectTreeDecorators import treeObject, treeObjectInit
+from polariApiServer.mbtilesReader import mbtilesReaders
+from polariApiServer.pmtilesReader import pmtilesReader, localRangeSource, objectStoreRangeSource
+from polariApiServer.tileCache import tileCache, TILE_CACHE_MAX_AGE
+from polariApiServer.conditionalRequests import matchesETag
+from polariApiServer.streamingResponses import chunkIterable
+from polariApiServer.tileJobQueue import tileJobQueue, tileJobCancelled, TILE_JOB_DB_PATH, DEFAULT_TILE_JOB_WORKERS
+from polariApiServer.remoteGeoJsonCache import remoteGeoJsonFiles
+from objectTreeSerializer import dumpJSONbytes
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 import falcon
 import json
 import os
+import re
+import struct
 import subprocess
 import tempfile
 import threading
 import time
 import uuid
 
+# Features read from the database and written to tippecanoe at a time.
+FEATURE_CHUNK_SIZE = 1000
+# Seconds tippecanoe may run after its last input is written.
+TIPPECANOE_TIMEOUT = 300
+# Seconds between checks of a running tippecanoe's log and its job's cancellation.
+TIPPECANOE_POLL_INTERVAL = 0.5
+# Percent complete at the end of gathering features and of running tippecanoe.
+GATHER_PERCENT = 50
+TILING_PERCENT = 95
+# Sources of one job gathered at once, each into its own layer file.
+try:
+    from config_loader import config
+    SOURCE_GATHER_WORKERS = config.get_int('tiles.source_workers', 4)
+    MAX_BATCH_TILES = config.get_int('tiles.batch_max_tiles', 512)
+except ImportError:
+    SOURCE_GATHER_WORKERS = 4
+    MAX_BATCH_TILES = 512
+# Characters allowed in a tippecanoe layer name, others are replaced with '_'.
+LAYER_NAME_PATTERN = re.compile(r'[^A-Za-z0-9_\-]+')
+# tippecanoe's progress lines, e.g. "  42.3%  11/327/791", from which the last percent is read.
+TIPPECANOE_PERCENT_PATTERN = re.compile(rb'(\d+(?:\.\d+)?)%')
+# Length-prefixed tile batches: each tile is a big-endian header of zoom (1 byte), x, y and
+# data length (4 bytes each) followed by its data, where length 0 marks a missing tile.
+TILE_BATCH_CONTENT_TYPE = 'application/x-polari-tile-batch'
+TILE_BATCH_HEADER = struct.Struct('>BIII')
+
 
 class TileGeneratorAPI(treeObject):
     """API for generating .mbtiles from GeoJSON sources using tippecanoe."""
@@ -46,10 +86,14 @@ class TileGeneratorAPI(treeObject):
     def __init__(self, polServer, manager=None):
         self.polServer = polServer
         self.apiName = '/tile-generator'
-        # Track generation jobs
-        self._jobs = {}
+        # Generation jobs are queued in their own database and run by a fixed pool of workers
+        self._jobQueue = tileJobQueue(TILE_JOB_DB_PATH, runJob=self._run_generation_job, workerCount=DEFAULT_TILE_JOB_WORKERS)
+        if os.path.exists(TILE_JOB_DB_PATH):
+            self._jobQueue.recoverJobs()
         # Cache of locally-downloaded .mbtiles files: { "tileset_name": "/tmp/path.mbtiles" }
         self._mbtiles_cache = {}
+        # PMTiles archives are read in place by range: { "tileset_name": pmtilesReader }
+        self._pmtiles_readers = {}
         # Lock to prevent concurrent downloads of the same file
         import threading
         self._download_locks = {}
@@ -59,7 +103,11 @@ class TileGeneratorAPI(treeObject):
             polServer.falconServer.add_route(self.apiName + '/generate', self, suffix='generate')
             polServer.falconServer.add_route(self.apiName + '/status/{job_id}', self, suffix='status')
             polServer.falconServer.add_route(self.apiName + '/download/{job_id}', self, suffix='download')
+            polServer.falconServer.add_route(self.apiName + '/cancel/{job_id}', self, suffix='cancel')
+            polServer.falconServer.add_route(self.apiName + '/jobs', self, suffix='jobs')
             polServer.falconServer.add_route(self.apiName + '/mbtiles', self, suffix='mbtiles')
+            polServer.falconServer.add_route(self.apiName + '/tile-cache', self, suffix='tile_cache')
+            polServer.falconServer.add_route('/tiles/{tileset}/batch', self, suffix='tile_batch')
             polServer.falconServer.add_route('/tiles/{tileset}/{z}/{x}/{y}', self, suffix='tile')
 
     def on_get_sources(self, request, response):
@@ -161,33 +209,27 @@ class TileGeneratorAPI(treeObject):
                     response.media = {"success": False, "error": "Object storage not connected. Use 'download' mode or connect MinIO first."}
                     return
 
-            # Create a job ID
+            # Queue the job, a worker runs it once one is free
             job_id = str(uuid.uuid4())[:8]
-            self._jobs[job_id] = {
+            self._jobQueue.submit({
                 "id": job_id,
                 "name": name,
-                "status": "pending",
-                "progress": "Queued for processing",
-                "startedAt": time.time(),
-                "completedAt": None,
+                "request": {
+                    "sources": sources,
+                    "options": options,
+                    "outputMode": output_mode,
+                    "minioBucket": minio_bucket
+                },
+                "featuresWritten": 0,
                 "outputPath": None,
-                "downloadUrl": None,
-                "error": None
-            }
-
-            # Run tile generation in a background thread
-            thread = threading.Thread(
-                target=self._run_generation_job,
-                args=(job_id, name, sources, options, output_mode, minio_bucket),
-                daemon=True
-            )
-            thread.start()
+                "downloadUrl": None
+            })
 
             response.status = falcon.HTTP_202
             response.media = {
                 "success": True,
                 "jobId": job_id,
-                "message": f"Tile generation job '{name}' started",
+                "message": f"Tile generation job '{name}' queued",
                 "statusUrl": f"/tile-generator/status/{job_id}"
             }
 
@@ -201,8 +243,8 @@ class TileGeneratorAPI(treeObject):
         response.set_header('Powered-By', 'Polari')
 
     def on_get_status(self, request, response, job_id):
-        """Check the status of a tile generation job."""
-        job = self._jobs.get(job_id)
+        """Check the status, stage and percent complete of a tile generation job."""
+        job = self._jobQueue.getJob(job_id)
         if job is None:
             response.status = falcon.HTTP_404
             response.media = {"success": False, "error": f"Job '{job_id}' not found"}
@@ -214,7 +256,7 @@ class TileGeneratorAPI(treeObject):
 
     def on_get_download(self, request, response, job_id):
         """Download the generated .mbtiles file for a completed job."""
-        job = self._jobs.get(job_id)
+        job = self._jobQueue.getJob(job_id)
         if job is None:
             response.status = falcon.HTTP_404
             response.media = {"success": False, "error": f"Job '{job_id}' not found"}
@@ -240,6 +282,30 @@ class TileGeneratorAPI(treeObject):
 
         response.status = falcon.HTTP_200
 
+    def on_post_cancel(self, request, response, job_id):
+        """Cancel a pending or running tile generation job."""
+        job = self._jobQueue.cancel(job_id)
+        if job is None:
+            response.status = falcon.HTTP_404
+            response.media = {"success": False, "error": f"Job '{job_id}' not found"}
+            return
+
+        if job['status'] not in ('pending', 'running', 'cancelled'):
+            response.status = falcon.HTTP_409
+            response.media = {"success": False, "error": f"Job has already finished (status: {job['status']})"}
+            return
+
+        response.status = falcon.HTTP_200
+        response.media = {"success": True, "job": job}
+        response.set_header('Powered-By', 'Polari')
+
+    def on_get_jobs(self, request, response):
+        """List the most recent tile generation jobs, newest first."""
+        limit = request.get_param_as_int('limit', min_value=1, max_value=500, default=50)
+        response.status = falcon.HTTP_200
+        response.media = {"success": True, "jobs": self._jobQueue.listJobs(limit=limit)}
+        response.set_header('Powered-By', 'Polari')
+
     def _classHasGeoJsonEndpoint(self, className):
         """Check if a class has the GeoJSON format endpoint enabled."""
         if className in self.manager.objectTypingDict:
@@ -249,53 +315,40 @@ class TileGeneratorAPI(treeObject):
                 return formatConfig.geoJsonEnabled
         return False
 
-    def _run_generation_job(self, job_id, name, sources, options, output_mode, minio_bucket):
-        """Background thread for tile generation."""
-        job = self._jobs[job_id]
+    def _run_generation_job(self, job):
+        """Run a tile generation job, on one of the job queue's workers."""
+        job_id = job['id']
+        name = job['name']
+        sources = job['request'].get('sources', [])
+        options = job['request'].get('options', {})
+        output_mode = job['request'].get('outputMode', 'download')
+        minio_bucket = job['request'].get('minioBucket', 'polari-tiles')
         job['status'] = 'running'
+        job['featuresWritten'] = 0
         tmpdir = None
 
         try:
             tmpdir = tempfile.mkdtemp(prefix='polari-tiles-')
-            input_files = []
-
-            # Step 1: Generate/fetch GeoJSON for each source
-            for i, source in enumerate(sources):
-                job['progress'] = f"Processing source {i+1}/{len(sources)}"
-                source_type = source.get('type', '')
-
-                if source_type == 'class':
-                    geojson = self._generate_geojson_for_class(
-                        source.get('className', ''),
-                        source.get('geoJsonConfigId', '')
-                    )
-                elif source_type == 'url':
-                    geojson = self._fetch_geojson_from_url(source.get('url', ''))
-                elif source_type == 'endpoint':
-                    geojson = self._fetch_geojson_from_endpoint(source.get('endpointName', ''))
-                else:
-                    print(f"[TileGeneratorAPI] Unknown source type: {source_type}")
-                    continue
-
-                feature_count = len(geojson.get('features', [])) if geojson else 0
-                print(f"[TileGeneratorAPI] Source {i+1} result: geojson={'present' if geojson else 'None'}, features={feature_count}")
-                if geojson and geojson.get('features'):
-                    filepath = os.path.join(tmpdir, f'source_{i}.geojson')
-                    with open(filepath, 'w') as f:
-                        json.dump(geojson, f)
-                    input_files.append(filepath)
-                    print(f"[TileGeneratorAPI] Wrote {feature_count} features to {filepath}")
+            output_path = os.path.join(tmpdir, f'{name}.mbtiles')
+            log_path = os.path.join(tmpdir, 'tippecanoe.log')
 
-            if not input_files:
+            # Step 1: Gather the sources' features for tippecanoe.  A single class source is piped
+            # into it as its rows are read; several sources, or a remote one, are gathered at
+            # once into a layer file each and read by tippecanoe as named layers
+            if len(sources) == 1 and sources[0].get('type') == 'class':
+                process = self._stream_features_to_tippecanoe(job, sources, output_path, options, log_path)
+            else:
+                layers = self._gather_source_layers(job, sources, tmpdir)
+                process = self._start_tippecanoe(output_path, options, log_path, layers=layers) if layers else None
+            if process is None:
                 job['status'] = 'failed'
                 job['error'] = 'No valid GeoJSON data found from any source'
                 job['completedAt'] = time.time()
                 return
 
-            # Step 2: Run tippecanoe
-            job['progress'] = 'Running tippecanoe...'
-            output_path = os.path.join(tmpdir, f'{name}.mbtiles')
-            self._run_tippecanoe(input_files, output_path, options)
+            # Step 2: Wait for tippecanoe to finish building tiles from the features
+            self._jobQueue.reportProgress(job, stage='tiling', percent=GATHER_PERCENT, message='Running tippecanoe...')
+            self._wait_for_tippecanoe(process, log_path, output_path, job)
 
             if not os.path.exists(output_path):
                 job['status'] = 'failed'
@@ -305,7 +358,7 @@ class TileGeneratorAPI(treeObject):
 
             # Step 3: Handle output based on mode
             if output_mode == 'minio':
-                job['progress'] = 'Uploading to MinIO...'
+                self._jobQueue.reportProgress(job, stage='uploading', percent=TILING_PERCENT, message='Uploading to MinIO...')
                 store = getattr(self.manager, 'objectStore', None)
                 if store is None or not store.connected:
                     job['status'] = 'failed'
@@ -324,10 +377,19 @@ class TileGeneratorAPI(treeObject):
                 job['downloadUrl'] = f'/tile-generator/download/{job_id}'
 
             job['status'] = 'completed'
+            job['stage'] = 'done'
+            job['percent'] = 100
             job['progress'] = 'Done'
             job['completedAt'] = time.time()
             print(f"[TileGeneratorAPI] Job {job_id} completed: {job['outputPath']}")
 
+        except tileJobCancelled:
+            job['status'] = 'cancelled'
+            job['stage'] = 'cancelled'
+            job['progress'] = 'Cancelled'
+            job['completedAt'] = time.time()
+            print(f"[TileGeneratorAPI] Job {job_id} cancelled")
+
         except Exception as e:
             job['status'] = 'failed'
             job['error'] = str(e)
@@ -336,10 +398,172 @@ class TileGeneratorAPI(treeObject):
             import traceback
             traceback.print_exc()
 
-    def _generate_geojson_for_class(self, className, geoJsonConfigId):
-        """Build a GeoJSON FeatureCollection from class instances using GeoJsonDefinition."""
+    def _iterate_source_features(self, source):
+        """Return (features, expectedCount) for a class source, where features iterates over its
+        GeoJSON Features and expectedCount estimates how many there are, or (None, 0) if the
+        source has no data.  Remote sources are downloaded by _download_source_geojson."""
+        className = source.get('className', '')
+        features = self._iterate_class_features(className, source.get('geoJsonConfigId', ''))
+        if features is None:
+            return (None, 0)
+        return (features, self._count_class_rows(className))
+
+    def _count_class_rows(self, className):
+        """Return the number of rows stored for a class, or 0 if they cannot be counted."""
+        db = getattr(self.manager, 'db', None)
+        # The class name comes from the request, so only the database's own table names reach the SQL
+        if db is None or className not in getattr(db, 'tables', ()):
+            return 0
+        try:
+            return db.getConnection().execute(f'SELECT COUNT(*) FROM {className}').fetchone()[0]
+        except Exception:
+            return 0
+
+    def _stream_features_to_tippecanoe(self, job, sources, output_path, options, log_path):
+        """Write every source's features to tippecanoe's stdin, one GeoJSON Feature per line.
+
+        tippecanoe is started with the first feature, so it reads features while later
+        ones are still generated, and is never started when no source has any.  Returns
+        the running process with its stdin closed, or None.  A cancelled job kills it.
+        """
+        process = None
+        try:
+            for i, source in enumerate(sources):
+                self._jobQueue.reportProgress(job, stage='gathering', percent=GATHER_PERCENT * i / len(sources),
+                                              message=f"Processing source {i+1}/{len(sources)}")
+                features, expected_count = self._iterate_source_features(source)
+                if features is None:
+                    print(f"[TileGeneratorAPI] Source {i+1} has no GeoJSON data")
+                    continue
+                source_count = 0
+                for feature_chunk in chunkIterable(features, FEATURE_CHUNK_SIZE):
+                    self._jobQueue.checkCancelled(job)
+                    if process is None:
+                        process = self._start_tippecanoe(output_path, options, log_path)
+                    process.stdin.write(b'\n'.join([dumpJSONbytes(feature) for feature in feature_chunk]) + b'\n')
+                    source_count += len(feature_chunk)
+                    job['featuresWritten'] += len(feature_chunk)
+                    source_fraction = min(source_count / expected_count, 1) if expected_count else 0
+                    self._jobQueue.reportProgress(job, percent=GATHER_PERCENT * (i + source_fraction) / len(sources))
+                print(f"[TileGeneratorAPI] Source {i+1} wrote {source_count} features to tippecanoe")
+        except BrokenPipeError:
+            # tippecanoe exited early, its log says why
+            pass
+        except BaseException:
+            if process is not None:
+                process.kill()
+                process.wait()
+            raise
+        finally:
+            if process is not None:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+        return process
+
+    def _gather_source_layers(self, job, sources, tmpdir):
+        """Gather every source into a layer file of its own, several sources at once, and
+        return the [(layerName, filePath)] of those with data.
+
+        Class sources are written one GeoJSON Feature per line as their rows are read,
+        remote sources are their cached downloads.  A failed or cancelled source stops
+        the others and its error is raised.
+        """
+        counters = {"featuresWritten": 0, "sourcesDone": 0}
+        counters_lock = threading.Lock()
+        stop_gathering = threading.Event()
+        layer_names = self._make_layer_names(sources)
+
+        def checkStopped():
+            self._jobQueue.checkCancelled(job)
+            if stop_gathering.is_set():
+                raise tileJobCancelled(f"Job {job['id']} stopped after another source failed")
+
+        def gatherSource(i):
+            source = sources[i]
+            if source.get('type') == 'class':
+                file_path = os.path.join(tmpdir, f'layer_{i}.geojsonl')
+                features, expected_count = self._iterate_source_features(source)
+                source_count = 0
+                if features is not None:
+                    with open(file_path, 'wb') as layer_file:
+                        for feature_chunk in chunkIterable(features, FEATURE_CHUNK_SIZE):
+                            checkStopped()
+                            layer_file.write(b'\n'.join([dumpJSONbytes(feature) for feature in feature_chunk]) + b'\n')
+                            source_count += len(feature_chunk)
+                            with counters_lock:
+                                counters['featuresWritten'] += len(feature_chunk)
+                print(f"[TileGeneratorAPI] Source {i+1} wrote {source_count} features to layer '{layer_names[i]}'")
+                file_path = file_path if source_count else None
+            else:
+                file_path = self._download_source_geojson(source)
+                checkStopped()
+            with counters_lock:
+                counters['sourcesDone'] += 1
+            return file_path
+
+        self._jobQueue.reportProgress(job, stage='gathering', percent=0, message=f"Gathering {len(sources)} sources")
+        with ThreadPoolExecutor(max_workers=min(SOURCE_GATHER_WORKERS, len(sources)), thread_name_prefix='tileSource') as pool:
+            futures = [pool.submit(gatherSource, i) for i in range(len(sources))]
+            pending = futures
+            while pending:
+                done, pending = wait(pending, timeout=TIPPECANOE_POLL_INTERVAL, return_when=FIRST_EXCEPTION)
+                with counters_lock:
+                    job['featuresWritten'] = counters['featuresWritten']
+                    sources_done = counters['sourcesDone']
+                self._jobQueue.reportProgress(job, percent=GATHER_PERCENT * sources_done / len(sources),
+                                              message=f"Gathered {sources_done}/{len(sources)} sources")
+                failed = [future for future in done if future.exception() is not None]
+                if failed:
+                    # The other sources stop at their next check rather than run to the end
+                    stop_gathering.set()
+                    for future in pending:
+                        future.cancel()
+                    wait(pending)
+                    raise failed[0].exception()
+        return [(layer_names[i], future.result()) for i, future in enumerate(futures) if future.result()]
+
+    def _make_layer_names(self, sources):
+        """Return a unique tippecanoe layer name for each source, from its layerName if it has
+        one, otherwise from its class, endpoint or URL file name."""
+        layer_names = []
+        for i, source in enumerate(sources):
+            base_name = (source.get('layerName') or source.get('className') or source.get('endpointName')
+                         or os.path.splitext(os.path.basename(source.get('url', '').split('?')[0]))[0]
+                         or f'source_{i}')
+            base_name = LAYER_NAME_PATTERN.sub('_', base_name).strip('_') or f'source_{i}'
+            layer_name = base_name
+            suffix = 2
+            while layer_name in layer_names:
+                layer_name = f'{base_name}_{suffix}'
+                suffix += 1
+            layer_names.append(layer_name)
+        return layer_names
+
+    def _download_source_geojson(self, source):
+        """Return the path of a cached download of a url or endpoint source, or None."""
+        if source.get('type') == 'url':
+            url = source.get('url', '')
+        elif source.get('type') == 'endpoint':
+            url = self._get_endpoint_url(source.get('endpointName', ''))
+        else:
+            print(f"[TileGeneratorAPI] Unknown source type: {source.get('type', '')}")
+            return None
+        if not url:
+            return None
+        try:
+            return remoteGeoJsonFiles.fetchToFile(url)
+        except Exception as e:
+            print(f"[TileGeneratorAPI] Error fetching URL {url}: {e}")
+            return None
+
+    def _iterate_class_features(self, className, geoJsonConfigId):
+        """Return an iterator over GeoJSON Features built from the rows of a class table using
+        its GeoJsonDefinition, or None if it has none.  Rows are read from the database a chunk
+        at a time as the features are consumed, so memory does not grow with the table."""
         if not className:
-            print(f"[TileGeneratorAPI] _generate_geojson_for_class: className is empty")
+            print(f"[TileGeneratorAPI] _iterate_class_features: className is empty")
             return None
 
         print(f"[TileGeneratorAPI] Generating GeoJSON for class='{className}', configId='{geoJsonConfigId}'")
@@ -348,7 +572,6 @@ class TileGeneratorAPI(treeObject):
         geoDef = None
         if 'GeoJsonDefinition' in self.manager.objectTables:
             geoDefTable = self.manager.objectTables['GeoJsonDefinition']
-            print(f"[TileGeneratorAPI] GeoJsonDefinition table has {len(geoDefTable)} entries: {list(geoDefTable.keys())}")
             if geoJsonConfigId:
                 geoDef = geoDefTable.get(geoJsonConfigId)
                 if geoDef is None:
@@ -356,9 +579,7 @@ class TileGeneratorAPI(treeObject):
             else:
                 # Find first matching definition for this class
                 for defId, defInstance in geoDefTable.items():
-                    srcClass = getattr(defInstance, 'source_class', '')
-                    print(f"[TileGeneratorAPI]   Checking defId={defId}, source_class='{srcClass}'")
-                    if srcClass == className:
+                    if getattr(defInstance, 'source_class', '') == className:
                         geoDef = defInstance
                         break
         else:
@@ -370,7 +591,6 @@ class TileGeneratorAPI(treeObject):
 
         # Parse definition
         definitionStr = getattr(geoDef, 'definition', '{}')
-        print(f"[TileGeneratorAPI] GeoJsonDefinition.definition = {definitionStr}")
         try:
             definitionData = json.loads(definitionStr) if isinstance(definitionStr, str) else definitionStr
         except (json.JSONDecodeError, ValueError):
@@ -390,37 +610,32 @@ class TileGeneratorAPI(treeObject):
             return None
 
         try:
-            columnNames, dataTuples = db.getAllInTable(className)
+            columnNames, rows = db.iterateTableRows(className, chunkSize=FEATURE_CHUNK_SIZE)
         except Exception as e:
             print(f"[TileGeneratorAPI] Error reading {className}: {e}")
             import traceback
             traceback.print_exc()
             return None
 
-        print(f"[TileGeneratorAPI] DB returned {len(dataTuples)} rows, columns: {columnNames}")
-        if dataTuples:
-            print(f"[TileGeneratorAPI] First row sample: {dataTuples[0]}")
-
-        # Build features
-        features = []
-        for row in dataTuples:
-            instance = {}
-            for i, colName in enumerate(columnNames):
-                instance[colName] = row[i]
-
-            lng, lat = self._parse_coordinates(instance, coordConfig)
-            if lng is None or lat is None:
-                if not features:  # Only log first failure to avoid spam
-                    print(f"[TileGeneratorAPI] Coordinate extraction failed for first row. instance keys={list(instance.keys())}")
-            else:
-                features.append({
+        def featureIterator():
+            rowCount = 0
+            featureCount = 0
+            for row in rows:
+                rowCount += 1
+                instance = dict(zip(columnNames, row))
+                lng, lat = self._parse_coordinates(instance, coordConfig)
+                if lng is None or lat is None:
+                    if rowCount == 1:  # Only log the first row's failure to avoid spam
+                        print(f"[TileGeneratorAPI] Coordinate extraction failed for first row. instance keys={list(instance.keys())}")
+                    continue
+                featureCount += 1
+                yield {
                     "type": "Feature",
                     "geometry": {"type": "Point", "coordinates": [lng, lat]},
                     "properties": instance
-                })
-
-        print(f"[TileGeneratorAPI] Built {len(features)} features from {len(dataTuples)} rows")
-        return {"type": "FeatureCollection", "features": features}
+                }
+            print(f"[TileGeneratorAPI] Built {featureCount} features from {rowCount} rows of {className}")
+        return featureIterator()
 
     def _parse_coordinates(self, instance, coordConfig):
         """Extract coordinates from instance using coordinate config."""
@@ -460,38 +675,19 @@ class TileGeneratorAPI(treeObject):
 
         return lng, lat
 
-    def _fetch_geojson_from_url(self, url):
-        """Fetch GeoJSON from an external URL."""
-        if not url:
-            return None
-        try:
-            import requests
-            resp = requests.get(url, timeout=30)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            print(f"[TileGeneratorAPI] Error fetching URL {url}: {e}")
-            return None
-
-    def _fetch_geojson_from_endpoint(self, endpointName):
-        """Fetch GeoJSON from a configured APIEndpoint."""
+    def _get_endpoint_url(self, endpointName):
+        """Return the URL of a configured APIEndpoint, or None."""
         if not endpointName or 'APIEndpoint' not in self.manager.objectTables:
             return None
 
-        endpoint = None
         for epId, epInstance in self.manager.objectTables['APIEndpoint'].items():
             if getattr(epInstance, 'name', '') == endpointName:
-                endpoint = epInstance
-                break
-
-        if endpoint is None:
-            return None
+                return getattr(epInstance, 'url', '')
+        return None
 
-        url = getattr(endpoint, 'url', '')
-        return self._fetch_geojson_from_url(url)
-
-    def _run_tippecanoe(self, input_files, output_path, options):
-        """Run tippecanoe subprocess to generate .mbtiles."""
+    def _tippecanoe_command(self, output_path, options, layers=()):
+        """Build the tippecanoe command line.  Named layers, [(layerName, filePath)], go into a
+        layer each; without them tippecanoe reads one layer from stdin."""
         cmd = ['tippecanoe', '-o', output_path, '--force']
 
         min_zoom = options.get('minZoom', 0)
@@ -500,22 +696,71 @@ class TileGeneratorAPI(treeObject):
 
         cmd.extend(['-z', str(max_zoom)])
         cmd.extend(['-Z', str(min_zoom)])
+        if layers:
+            for named_layer, layer_path in layers:
+                cmd.extend(['-L', f'{named_layer}:{layer_path}'])
+            return cmd
         cmd.extend(['-l', layer_name])
-
-        # Add input files
-        cmd.extend(input_files)
-
-        print(f"[TileGeneratorAPI] Running: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-
-        if result.returncode != 0:
-            error_msg = result.stderr or result.stdout or 'Unknown error'
-            raise RuntimeError(f"tippecanoe failed (exit {result.returncode}): {error_msg}")
+        return cmd
+
+    def _start_tippecanoe(self, output_path, options, log_path, layers=()):
+        """Start tippecanoe reading the named layer files, or without layers, newline-delimited
+        GeoJSON Features from its stdin.  Its output goes to a log file rather than a pipe,
+        which could fill and stall it."""
+        cmd = self._tippecanoe_command(output_path, options, layers=layers)
+        print(f"[TileGeneratorAPI] Running: {' '.join(cmd)}" + ('' if layers else ' < features'))
+        with open(log_path, 'wb') as log_file:
+            return subprocess.Popen(cmd, stdin=subprocess.DEVNULL if layers else subprocess.PIPE, stdout=log_file, stderr=log_file)
+
+    def _wait_for_tippecanoe(self, process, log_path, output_path, job=None):
+        """Wait for a tippecanoe started by _start_tippecanoe, raising with its log on failure.
+        While it runs, a job's percent follows tippecanoe's own progress, and cancelling the
+        job kills it."""
+        deadline = time.time() + TIPPECANOE_TIMEOUT
+        while True:
+            try:
+                returncode = process.wait(timeout=TIPPECANOE_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if job is not None and job.get('cancelRequested'):
+                process.kill()
+                process.wait()
+                self._jobQueue.checkCancelled(job)
+            if time.time() > deadline:
+                process.kill()
+                process.wait()
+                raise RuntimeError(f"tippecanoe did not finish within {TIPPECANOE_TIMEOUT} seconds")
+            if job is not None:
+                tippecanoe_percent = self._read_tippecanoe_percent(log_path)
+                if tippecanoe_percent is not None:
+                    self._jobQueue.reportProgress(job, percent=GATHER_PERCENT + (TILING_PERCENT - GATHER_PERCENT) * tippecanoe_percent / 100)
+
+        if returncode != 0:
+            error_msg = 'Unknown error'
+            if os.path.exists(log_path):
+                with open(log_path, 'r', errors='replace') as log_file:
+                    # Progress lines end in carriage returns, only the end of the log is kept
+                    error_msg = log_file.read()[-4000:].strip() or error_msg
+            raise RuntimeError(f"tippecanoe failed (exit {returncode}): {error_msg}")
 
         print(f"[TileGeneratorAPI] tippecanoe completed successfully: {output_path}")
 
+    def _read_tippecanoe_percent(self, log_path):
+        """Return the last percent tippecanoe has logged, or None before it logs one."""
+        try:
+            with open(log_path, 'rb') as log_file:
+                log_file.seek(0, os.SEEK_END)
+                log_file.seek(max(log_file.tell() - 512, 0))
+                matches = TIPPECANOE_PERCENT_PATTERN.findall(log_file.read())
+        except OSError:
+            return None
+        return min(float(matches[-1]), 100.0) if matches else None
+
     def _register_tile_source(self, name, bucket, object_name):
         """Auto-create a TileSourceDefinition for an uploaded .mbtiles file."""
+        # A regenerated tileset replaces the uploaded file, so its local copy and tiles are stale
+        self._forget_tileset(name)
         try:
             if 'TileSourceDefinition' not in self.manager.objectTables:
                 print("[TileGeneratorAPI] TileSourceDefinition not in objectTables, skipping auto-register")
@@ -555,7 +800,7 @@ class TileGeneratorAPI(treeObject):
             traceback.print_exc()
 
     def on_get_mbtiles(self, request, response):
-        """GET /tile-generator/mbtiles - List .mbtiles files in object storage."""
+        """GET /tile-generator/mbtiles - List .mbtiles and .pmtiles files in object storage."""
         try:
             store = getattr(self.manager, 'objectStore', None)
             if store is None or not store.connected:
@@ -564,20 +809,21 @@ class TileGeneratorAPI(treeObject):
                 response.set_header('Powered-By', 'Polari')
                 return
 
-            # Collect .mbtiles files across all buckets
+            # Collect .mbtiles and .pmtiles files across all buckets
             files = []
             for bucket_name in store.buckets:
                 try:
                     objects = store.list_objects(bucket_name)
                     for obj in objects:
                         obj_name = obj.get('name', '')
-                        if obj_name.endswith('.mbtiles'):
+                        if obj_name.endswith(('.mbtiles', '.pmtiles')):
                             files.append({
                                 'bucket': bucket_name,
                                 'name': obj_name,
                                 'size': obj.get('size', 0),
                                 'lastModified': obj.get('lastModified'),
-                                'path': f'{bucket_name}/{obj_name}'
+                                'path': f'{bucket_name}/{obj_name}',
+                                'format': obj_name.rsplit('.', 1)[-1]
                             })
                 except Exception as e:
                     print(f"[TileGeneratorAPI] Error listing bucket {bucket_name}: {e}")
@@ -593,13 +839,16 @@ class TileGeneratorAPI(treeObject):
     # ===================== Tile Serving =====================
 
     def on_get_tile(self, request, response, tileset, z, x, y):
-        """GET /tiles/{tileset}/{z}/{x}/{y} - Serve an individual tile from an .mbtiles file.
-
-        Looks up the tileset name in TileSourceDefinition instances to find the
-        bucket/object, downloads the .mbtiles from MinIO if not cached, and
-        reads the tile from the SQLite database.
+        """GET /tiles/{tileset}/{z}/{x}/{y} - Serve an individual tile from an .mbtiles or
+        .pmtiles file.
+
+        Serves the tile from the in-memory tile cache when it holds it.  Otherwise
+        looks up the tileset name in TileSourceDefinition instances to find the
+        bucket/object.  A .pmtiles archive is read in place by byte ranges, while a
+        .mbtiles file is downloaded from MinIO if not cached and read through the
+        file's pooled read-only handles.  Tiles are sent with an ETag of their
+        content and answered with 304 when it matches.
         """
-        import sqlite3
         import traceback as tb
 
         # Always set CORS headers (even on errors)
@@ -607,8 +856,6 @@ class TileGeneratorAPI(treeObject):
         response.set_header('Access-Control-Allow-Headers', '*')
 
         try:
-            print(f"[TileServe] Request: /tiles/{tileset}/{z}/{x}/{y}", flush=True)
-
             # Strip file extension from y (e.g. "5.pbf" -> "5", "5.png" -> "5")
             if isinstance(y, str) and '.' in y:
                 y = y.rsplit('.', 1)[0]
@@ -616,80 +863,47 @@ class TileGeneratorAPI(treeObject):
             try:
                 z, x, y = int(z), int(x), int(y)
             except (ValueError, TypeError):
-                print(f"[TileServe] ERROR: z/x/y not integers: z={z} x={x} y={y}", flush=True)
                 response.status = falcon.HTTP_400
                 response.media = {"error": "z, x, y must be integers"}
                 return
 
-            local_path = self._resolve_mbtiles_path(tileset)
-            if local_path is None:
-                print(f"[TileServe] ERROR: Tileset '{tileset}' not found (no mbtiles resolved)", flush=True)
-                response.status = falcon.HTTP_404
-                response.media = {"error": f"Tileset '{tileset}' not found"}
-                return
-
-            # Log file info
-            file_size = os.path.getsize(local_path) if os.path.exists(local_path) else -1
-            print(f"[TileServe] Resolved mbtiles path: {local_path} (size={file_size} bytes)", flush=True)
-
-            # mbtiles uses TMS y-coordinate (flipped)
-            tms_y = (1 << z) - 1 - y
-
-            conn = sqlite3.connect(local_path)
-            try:
-                # Determine schema: flat (tiles table/view) vs normalized (map+images)
-                schema_cursor = conn.execute(
-                    "SELECT name, type FROM sqlite_master WHERE type IN ('table','view')"
-                )
-                schema = {row[0]: row[1] for row in schema_cursor.fetchall()}
-
-                if 'tiles' in schema:
-                    # Flat schema or tiles view — query directly
-                    cursor = conn.execute(
-                        'SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
-                        (z, x, tms_y)
-                    )
-                elif 'map' in schema and 'images' in schema:
-                    # Normalized schema (tippecanoe default): map + images tables
-                    cursor = conn.execute(
-                        'SELECT images.tile_data FROM map '
-                        'JOIN images ON map.tile_id = images.tile_id '
-                        'WHERE map.zoom_level = ? AND map.tile_column = ? AND map.tile_row = ?',
-                        (z, x, tms_y)
-                    )
-                else:
-                    print(f"[TileServe] ERROR: Unrecognized mbtiles schema: {list(schema.keys())}", flush=True)
+            entry = tileCache.get(tileset, z, x, y)
+            if entry is None:
+                # Taken before the reader, so a tile read from a file replaced meanwhile is not cached
+                generation = tileCache.getGeneration(tileset)
+                try:
+                    reader = self._resolve_tile_reader(tileset)
+                except ValueError as err:
+                    # An .mbtiles file of neither schema, or a file that is not a PMTiles archive
+                    print(f"[TileServe] ERROR: {err}", flush=True)
                     response.status = falcon.HTTP_500
-                    response.media = {"error": f"Unrecognized mbtiles schema. Found: {list(schema.keys())}"}
+                    response.media = {"error": str(err)}
+                    return
+                if reader is None:
+                    print(f"[TileServe] ERROR: Tileset '{tileset}' not found (no mbtiles or pmtiles resolved)", flush=True)
+                    response.status = falcon.HTTP_404
+                    response.media = {"error": f"Tileset '{tileset}' not found"}
                     return
 
-                row = cursor.fetchone()
-            finally:
-                conn.close()
+                # Both readers take the TMS y-coordinate (flipped)
+                tile_data = reader.getTile(z, x, (1 << z) - 1 - y)
+                # Content type and encoding are detected from the tile's magic bytes once, here
+                entry = tileCache.put(tileset, z, x, y, tile_data, generation)
 
-            if row is None:
+            if entry.tileData is None:
                 response.status = falcon.HTTP_204
                 return
 
-            tile_data = row[0]
-            print(f"[TileServe] Tile z={z} x={x} y={y} (tms_y={tms_y}): {len(tile_data)} bytes, first2=0x{tile_data[:2].hex()}", flush=True)
-
-            # Detect tile format: PBF vector tiles start with gzip magic bytes
-            # or are raw protobuf. PNG starts with \x89PNG, JPEG with \xff\xd8.
-            if tile_data[:2] == b'\x1f\x8b':
-                # gzip-compressed PBF (vector tile)
-                response.content_type = 'application/x-protobuf'
-                response.set_header('Content-Encoding', 'gzip')
-            elif tile_data[:4] == b'\x89PNG':
-                response.content_type = 'image/png'
-            elif tile_data[:2] == b'\xff\xd8':
-                response.content_type = 'image/jpeg'
-            else:
-                # Assume PBF
-                response.content_type = 'application/x-protobuf'
+            response.set_header('Cache-Control', f'public, max-age={TILE_CACHE_MAX_AGE}')
+            response.etag = '"' + entry.etag + '"'
+            if matchesETag(request, entry.etag):
+                response.status = falcon.HTTP_304
+                return
 
-            response.set_header('Cache-Control', 'public, max-age=86400')
-            response.data = tile_data
+            response.content_type = entry.contentType
+            if entry.contentEncoding is not None:
+                response.set_header('Content-Encoding', entry.contentEncoding)
+            response.data = entry.tileData
             response.status = falcon.HTTP_200
 
         except Exception as e:
@@ -698,6 +912,179 @@ class TileGeneratorAPI(treeObject):
             response.status = falcon.HTTP_500
             response.media = {"error": str(e), "traceback": error_trace}
 
+    def on_get_tile_batch(self, request, response, tileset):
+        """GET /tiles/{tileset}/batch - Serve many tiles of a tileset in one response.
+
+        Takes either a rectangle, z, minX, maxX, minY and maxY, with an optional maxZ
+        adding the tiles under it down to that zoom level for prefetching, or a list,
+        tiles=z/x/y,z/x/y,...  The response is a length-prefixed binary batch, or with
+        format=multipart or an Accept of multipart/mixed, one part per tile.
+        """
+        self._serve_tile_batch(request, response, tileset, request.params)
+
+    def on_post_tile_batch(self, request, response, tileset):
+        """POST /tiles/{tileset}/batch - As GET, with the parameters in a JSON body, where
+        tiles may be a list of [z, x, y]."""
+        try:
+            body = request.media or {}
+        except Exception:
+            body = None
+        if not isinstance(body, dict):
+            response.set_header('Access-Control-Allow-Origin', '*')
+            response.status = falcon.HTTP_400
+            response.media = {"error": "Request body must be a JSON object"}
+            return
+        self._serve_tile_batch(request, response, tileset, {**request.params, **body})
+
+    def _serve_tile_batch(self, request, response, tileset, params):
+        """Answer a batch request with every requested tile, taken from the tile cache where
+        it holds them and otherwise read from the .mbtiles file with one ranged query per
+        zoom level, or for a list, one query for all of its tiles."""
+        response.set_header('Access-Control-Allow-Origin', '*')
+        response.set_header('Access-Control-Allow-Headers', '*')
+        try:
+            (tile_keys, tile_ranges) = self._parse_tile_batch(params)
+        except ValueError as err:
+            response.status = falcon.HTTP_400
+            response.media = {"error": str(err)}
+            return
+
+        #FORMAT: {(z, x, y):tileEntry}
+        entries = {}
+        for (z, x, y) in tile_keys:
+            entry = tileCache.get(tileset, z, x, y)
+            if entry is not None:
+                entries[(z, x, y)] = entry
+        missing_keys = [key for key in tile_keys if key not in entries]
+        if missing_keys:
+            generation = tileCache.getGeneration(tileset)
+            try:
+                reader = self._resolve_tile_reader(tileset)
+                if reader is None:
+                    response.status = falcon.HTTP_404
+                    response.media = {"error": f"Tileset '{tileset}' not found"}
+                    return
+                # Readers take TMS y-coordinates (flipped), so a y range flips end for end
+                if tile_ranges:
+                    missing_zooms = {key[0] for key in missing_keys}
+                    rows = []
+                    for (z, min_x, max_x, min_y, max_y) in tile_ranges:
+                        if z in missing_zooms:
+                            rows.extend(reader.getTileRange(z, min_x, max_x, (1 << z) - 1 - max_y, (1 << z) - 1 - min_y))
+                else:
+                    rows = reader.getTiles([(z, x, (1 << z) - 1 - y) for (z, x, y) in missing_keys])
+            except ValueError as err:
+                print(f"[TileServe] ERROR: {err}", flush=True)
+                response.status = falcon.HTTP_500
+                response.media = {"error": str(err)}
+                return
+            tile_data = {(z, x, (1 << z) - 1 - tms_y): data for (z, x, tms_y, data) in rows}
+            for (z, x, y) in missing_keys:
+                entries[(z, x, y)] = tileCache.put(tileset, z, x, y, tile_data.get((z, x, y)), generation)
+
+        response.set_header('Cache-Control', f'public, max-age={TILE_CACHE_MAX_AGE}')
+        if params.get('format') == 'multipart' or 'multipart/mixed' in (request.accept or ''):
+            boundary = 'polari-tiles-' + uuid.uuid4().hex
+            parts = []
+            for (z, x, y) in tile_keys:
+                entry = entries[(z, x, y)]
+                part_headers = f'--{boundary}\r\nContent-Location: /tiles/{tileset}/{z}/{x}/{y}\r\n'
+                if entry.tileData is not None:
+                    part_headers += f'Content-Type: {entry.contentType}\r\n'
+                    if entry.contentEncoding is not None:
+                        part_headers += f'Content-Encoding: {entry.contentEncoding}\r\n'
+                parts.append(part_headers.encode('ascii') + b'\r\n' + (entry.tileData or b'') + b'\r\n')
+            parts.append(f'--{boundary}--\r\n'.encode('ascii'))
+            response.content_type = f'multipart/mixed; boundary={boundary}'
+            response.data = b''.join(parts)
+        else:
+            parts = []
+            for (z, x, y) in tile_keys:
+                tile_data = entries[(z, x, y)].tileData or b''
+                parts.append(TILE_BATCH_HEADER.pack(z, x, y, len(tile_data)))
+                parts.append(tile_data)
+            response.content_type = TILE_BATCH_CONTENT_TYPE
+            response.data = b''.join(parts)
+        response.set_header('Tile-Count', str(len(tile_keys)))
+        response.status = falcon.HTTP_200
+
+    def _parse_tile_batch(self, params):
+        """Return (tileKeys, tileRanges) of a batch request, the XYZ (z, x, y) of each tile in
+        response order and the (z, minX, maxX, minY, maxY) rectangles they were given as,
+        empty for a list.  Raises ValueError for bad or too many coordinates."""
+        def toInt(name, value):
+            try:
+                return int(value)
+            except (ValueError, TypeError):
+                raise ValueError(f"{name} must be an integer, got {value!r}")
+
+        def checkTile(z, x, y):
+            if not 0 <= z <= 30:
+                raise ValueError(f"Zoom level {z} is outside 0-30")
+            if not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+                raise ValueError(f"Tile {z}/{x}/{y} is outside zoom level {z}")
+
+        tile_keys = []
+        tile_ranges = []
+        if params.get('tiles') is not None:
+            tiles = params['tiles']
+            # A query string gives one or more comma-separated strings, a JSON body a list
+            if isinstance(tiles, str):
+                tiles = [tiles]
+            if not isinstance(tiles, list):
+                raise ValueError("tiles must be a list of z/x/y")
+            tiles = [tile.split('/') if isinstance(tile, str) else tile
+                     for item in tiles for tile in (item.split(',') if isinstance(item, str) else [item]) if tile]
+            for tile in tiles:
+                if not isinstance(tile, (list, tuple)) or len(tile) != 3:
+                    raise ValueError(f"Tiles must be given as z/x/y, got {tile!r}")
+                (z, x, y) = [toInt('Tile coordinate', value) for value in tile]
+                checkTile(z, x, y)
+                tile_keys.append((z, x, y))
+            # Repeated tiles are sent once
+            tile_keys = list(dict.fromkeys(tile_keys))
+        else:
+            (z, min_x, max_x, min_y, max_y) = [toInt(name, params.get(name)) for name in ('z', 'minX', 'maxX', 'minY', 'maxY')]
+            max_z = toInt('maxZ', params.get('maxZ', z))
+            if min_x > max_x or min_y > max_y:
+                raise ValueError("minX and minY must not exceed maxX and maxY")
+            checkTile(z, min_x, min_y)
+            checkTile(z, max_x, max_y)
+            if not z <= max_z <= 30:
+                raise ValueError(f"maxZ must be between z and 30, got {max_z}")
+            tile_count = 0
+            for level in range(z, max_z + 1):
+                # The tiles under the rectangle at each deeper level, twice as many per side
+                shift = level - z
+                level_range = (level, min_x << shift, ((max_x + 1) << shift) - 1, min_y << shift, ((max_y + 1) << shift) - 1)
+                tile_count += (level_range[2] - level_range[1] + 1) * (level_range[4] - level_range[3] + 1)
+                if tile_count > MAX_BATCH_TILES:
+                    raise ValueError(f"A batch may hold at most {MAX_BATCH_TILES} tiles")
+                tile_ranges.append(level_range)
+            tile_keys = [(level, x, y) for (level, min_x, max_x, min_y, max_y) in tile_ranges
+                         for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+        if len(tile_keys) > MAX_BATCH_TILES:
+            raise ValueError(f"A batch may hold at most {MAX_BATCH_TILES} tiles")
+        if not tile_keys:
+            raise ValueError("A batch needs tiles, or z, minX, maxX, minY and maxY")
+        return (tile_keys, tile_ranges)
+
+    def on_get_tile_cache(self, request, response):
+        """GET /tile-generator/tile-cache - Hit, miss and size counters of the tile cache."""
+        response.media = {"success": True, "cache": tileCache.getStats()}
+        response.status = falcon.HTTP_200
+        response.set_header('Powered-By', 'Polari')
+
+    def _forget_tileset(self, tileset_name):
+        """Drop a tileset's local .mbtiles copy or its PMTiles reader, and its cached tiles,
+        so the next tile request resolves the tileset again."""
+        # Requests still reading the archive finish with the reader they hold
+        self._pmtiles_readers.pop(tileset_name, None)
+        local_path = self._mbtiles_cache.pop(tileset_name, None)
+        if local_path is not None:
+            mbtilesReaders.invalidate(local_path)
+        tileCache.invalidateTileset(tileset_name)
+
     def _get_download_lock(self, tileset_name):
         """Get or create a per-tileset lock to prevent concurrent downloads."""
         with self._download_locks_lock:
@@ -706,6 +1093,96 @@ class TileGeneratorAPI(treeObject):
                 self._download_locks[tileset_name] = threading.Lock()
             return self._download_locks[tileset_name]
 
+    def _find_tileset_object(self, tileset_name):
+        """Return (bucket, objectName, filePath) of a tileset from its TileSourceDefinition,
+        or from a scan of the MinIO buckets for a file named after it, with None for
+        what is unknown.  filePath is set by definitions of local .pmtiles archives."""
+        # Look up the TileSourceDefinition to find bucket/object
+        bucket = None
+        object_name = None
+        file_path = None
+        if 'TileSourceDefinition' in self.manager.objectTables:
+            defs_count = len(self.manager.objectTables['TileSourceDefinition'])
+            print(f"[TileResolve] Searching {defs_count} TileSourceDefinition(s)", flush=True)
+            for defId, defInstance in self.manager.objectTables['TileSourceDefinition'].items():
+                inst_name = getattr(defInstance, 'name', '')
+                if inst_name == tileset_name:
+                    defStr = getattr(defInstance, 'definition', '{}')
+                    print(f"[TileResolve]   MATCH id={defId}, definition={defStr}", flush=True)
+                    try:
+                        defData = json.loads(defStr) if isinstance(defStr, str) else defStr
+                    except (json.JSONDecodeError, ValueError):
+                        defData = {}
+                    stored_bucket = defData.get('bucket', '')
+                    stored_obj = defData.get('objectName', '')
+                    url = defData.get('url', '')
+                    file_path = defData.get('filePath') or None
+                    if stored_bucket and stored_obj:
+                        bucket = stored_bucket
+                        object_name = stored_obj
+                    elif '/' in url:
+                        clean = url.replace('s3://', '')
+                        parts = clean.split('/', 1)
+                        if len(parts) == 2:
+                            bucket = parts[0]
+                            object_name = parts[1]
+                    break
+        else:
+            print(f"[TileResolve] TileSourceDefinition NOT in objectTables", flush=True)
+
+        if (not bucket or not object_name) and not file_path:
+            # Fallback: scan all buckets for {tileset_name}.mbtiles or {tileset_name}.pmtiles
+            print(f"[TileResolve] Fallback: scanning MinIO buckets", flush=True)
+            store = getattr(self.manager, 'objectStore', None)
+            if store and store.connected:
+                for b in store.buckets:
+                    objects = store.list_objects(b)
+                    for obj in objects:
+                        oname = obj.get('name', '')
+                        if oname in (f'{tileset_name}.mbtiles', f'{tileset_name}.pmtiles'):
+                            bucket = b
+                            object_name = oname
+                            break
+                    if bucket:
+                        break
+        return (bucket, object_name, file_path)
+
+    def _resolve_tile_reader(self, tileset_name):
+        """Return the reader serving a tileset's tiles, or None if it cannot be resolved.
+
+        .pmtiles archives, local or in MinIO, get a pmtilesReader reading them in place
+        by byte ranges; anything else is an .mbtiles file resolved, and downloaded if
+        needed, by _resolve_mbtiles_path.  Raises ValueError for unreadable files.
+        """
+        reader = self._pmtiles_readers.get(tileset_name)
+        if reader is not None:
+            return reader
+        if tileset_name not in self._mbtiles_cache:
+            with self._get_download_lock(tileset_name):
+                reader = self._pmtiles_readers.get(tileset_name)
+                if reader is not None:
+                    return reader
+                (bucket, object_name, file_path) = self._find_tileset_object(tileset_name)
+                if not file_path and not (bucket and object_name):
+                    print(f"[TileResolve] FAILED to resolve tileset '{tileset_name}'", flush=True)
+                    return None
+                range_source = None
+                if file_path and file_path.endswith('.pmtiles') and os.path.exists(file_path):
+                    range_source = localRangeSource(file_path)
+                elif object_name and object_name.endswith('.pmtiles'):
+                    store = getattr(self.manager, 'objectStore', None)
+                    if store is None or not store.connected:
+                        print(f"[TileResolve] objectStore not available for {bucket}/{object_name}", flush=True)
+                        return None
+                    range_source = objectStoreRangeSource(store, bucket, object_name)
+                if range_source is not None:
+                    reader = pmtilesReader(range_source)
+                    self._pmtiles_readers[tileset_name] = reader
+                    print(f"[TileResolve] Reading PMTiles archive in place: {range_source.name}", flush=True)
+                    return reader
+        local_path = self._resolve_mbtiles_path(tileset_name)
+        return None if local_path is None else mbtilesReaders.getReader(local_path)
+
     def _resolve_mbtiles_path(self, tileset_name):
         """Resolve a tileset name to a local .mbtiles file path.
 
@@ -714,13 +1191,10 @@ class TileGeneratorAPI(treeObject):
         Uses per-tileset locking to prevent concurrent downloads that
         corrupt the file.
         """
-        print(f"[TileResolve] Resolving tileset: '{tileset_name}'", flush=True)
-
         # Check cache (fast path — no lock needed)
         if tileset_name in self._mbtiles_cache:
             cached = self._mbtiles_cache[tileset_name]
             if os.path.exists(cached):
-                print(f"[TileResolve] Cache hit: {cached}", flush=True)
                 return cached
 
         # Acquire per-tileset lock so only one thread downloads at a time
@@ -733,52 +1207,10 @@ class TileGeneratorAPI(treeObject):
                     print(f"[TileResolve] Cache hit (after lock): {cached}", flush=True)
                     return cached
 
-            # Look up the TileSourceDefinition to find bucket/object
-            bucket = None
-            object_name = None
-            if 'TileSourceDefinition' in self.manager.objectTables:
-                defs_count = len(self.manager.objectTables['TileSourceDefinition'])
-                print(f"[TileResolve] Searching {defs_count} TileSourceDefinition(s)", flush=True)
-                for defId, defInstance in self.manager.objectTables['TileSourceDefinition'].items():
-                    inst_name = getattr(defInstance, 'name', '')
-                    if inst_name == tileset_name:
-                        defStr = getattr(defInstance, 'definition', '{}')
-                        print(f"[TileResolve]   MATCH id={defId}, definition={defStr}", flush=True)
-                        try:
-                            defData = json.loads(defStr) if isinstance(defStr, str) else defStr
-                        except (json.JSONDecodeError, ValueError):
-                            defData = {}
-                        stored_bucket = defData.get('bucket', '')
-                        stored_obj = defData.get('objectName', '')
-                        url = defData.get('url', '')
-                        if stored_bucket and stored_obj:
-                            bucket = stored_bucket
-                            object_name = stored_obj
-                        elif '/' in url:
-                            clean = url.replace('s3://', '')
-                            parts = clean.split('/', 1)
-                            if len(parts) == 2:
-                                bucket = parts[0]
-                                object_name = parts[1]
-                        break
-            else:
-                print(f"[TileResolve] TileSourceDefinition NOT in objectTables", flush=True)
-
-            if not bucket or not object_name:
-                # Fallback: scan all buckets for {tileset_name}.mbtiles
-                print(f"[TileResolve] Fallback: scanning MinIO buckets", flush=True)
-                store = getattr(self.manager, 'objectStore', None)
-                if store and store.connected:
-                    for b in store.buckets:
-                        objects = store.list_objects(b)
-                        for obj in objects:
-                            oname = obj.get('name', '')
-                            if oname == f'{tileset_name}.mbtiles':
-                                bucket = b
-                                object_name = oname
-                                break
-                        if bucket:
-                            break
+            (bucket, object_name, file_path) = self._find_tileset_object(tileset_name)
+            if object_name and object_name.endswith('.pmtiles'):
+                # Read in place by _resolve_tile_reader, never downloaded
+                return None
 
             if not bucket or not object_name:
                 print(f"[TileResolve] FAILED to resolve tileset '{tileset_name}'", flush=True)
@@ -799,6 +1231,9 @@ class TileGeneratorAPI(treeObject):
                 store.download_file(bucket, object_name, tmp_path)
                 # Atomic rename so readers never see a partial file
                 os.replace(tmp_path, local_path)
+                # Pooled handles and cached tiles still hold the replaced file, so both are dropped
+                mbtilesReaders.invalidate(local_path)
+                tileCache.invalidateTileset(tileset_name)
                 self._mbtiles_cache[tileset_name] = local_path
                 print(f"[TileResolve] Downloaded and cached: {bucket}/{object_name} -> {local_path}", flush=True)
                 return local_path
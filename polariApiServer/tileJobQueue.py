@@ -0,0 +1,225 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+SQLite-backed queue of tile generation jobs, run by a fixed pool of worker threads.
+
+Jobs are dictionaries, stored as JSON in their own database file so they outlive
+the server process.  A job moves from 'pending' to 'running' and ends 'completed',
+'failed' or 'cancelled'.  While it runs the runner reports its stage and percent
+complete through reportProgress, which is written to the database at most once a
+second.  Jobs still pending or running when the server stopped are queued again
+when the queue is recovered at boot, and a job interrupted MAX_JOB_ATTEMPTS times
+is marked 'interrupted' instead.
+
+    queue = tileJobQueue(dbFilePath, runJob=someRunner, workerCount=2)
+    queue.recoverJobs()
+    queue.submit({"id": jobId, "name": name, "request": {...}})
+"""
+
+from polariDBmanagement.sqliteConnectionPool import dbConnectionPool
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    from config_loader import config
+    _databasePath = config.get('database.sqlite.path', './data/polari.db')
+    DEFAULT_TILE_JOB_WORKERS = config.get_int('tiles.job_workers', 2)
+except ImportError:
+    _databasePath = './data/polari.db'
+    DEFAULT_TILE_JOB_WORKERS = 2
+
+# Jobs are kept beside the configured database, on the same persistent volume.
+TILE_JOB_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(_databasePath)), 'tile_jobs.db')
+
+# Times a job is started before an interruption marks it 'interrupted' rather than queued again.
+MAX_JOB_ATTEMPTS = 2
+# Seconds between writes of a running job's progress to the database.
+PROGRESS_WRITE_INTERVAL = 1.0
+
+ACTIVE_JOB_STATUSES = ('pending', 'running')
+
+
+class tileJobCancelled(Exception):
+    """Raised inside a job's runner once the job has been cancelled."""
+
+
+class tileJobQueue:
+    """Persistent queue of tile generation jobs with a fixed number of worker threads."""
+
+    def __init__(self, dbFilePath=TILE_JOB_DB_PATH, runJob=None, workerCount=DEFAULT_TILE_JOB_WORKERS):
+        if(workerCount < 1):
+            raise ValueError("workerCount must be at least 1, got " + str(workerCount))
+        self.dbFilePath = os.path.abspath(dbFilePath)
+        self.runJob = runJob
+        self.workerCount = workerCount
+        self._pendingIds = queue.Queue()
+        #FORMAT: {jobId:job}, the live dictionaries of running jobs
+        self._activeJobs = {}
+        #FORMAT: {jobId:lastWriteTime}
+        self._lastWrites = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._tableReady = False
+
+    def _ensureTable(self):
+        if self._tableReady:
+            return
+        os.makedirs(os.path.dirname(self.dbFilePath), exist_ok=True)
+        with dbConnectionPool.transaction(self.dbFilePath) as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS tileJobs (id TEXT PRIMARY KEY, status TEXT, createdAt REAL, job TEXT)')
+        self._tableReady = True
+
+    def _saveJob(self, job):
+        self._ensureTable()
+        with dbConnectionPool.transaction(self.dbFilePath) as conn:
+            conn.execute('INSERT OR REPLACE INTO tileJobs (id, status, createdAt, job) VALUES (?, ?, ?, ?)',
+                         (job['id'], job['status'], job['createdAt'], json.dumps(job)))
+        self._lastWrites[job['id']] = time.time()
+
+    def _loadJob(self, jobId):
+        self._ensureTable()
+        row = dbConnectionPool.getConnection(self.dbFilePath).execute('SELECT job FROM tileJobs WHERE id = ?', (jobId,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def start(self):
+        """Start the worker threads, if they are not running yet."""
+        with self._lock:
+            if self._workers:
+                return
+            for workerIndex in range(self.workerCount):
+                worker = threading.Thread(target=self._work, name=f'tileJobWorker-{workerIndex}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, job):
+        """Store a new job as pending and queue it, returning the job."""
+        job.setdefault('createdAt', time.time())
+        job.update({"status": "pending", "stage": "queued", "percent": 0, "progress": "Queued for processing",
+                    "attempts": 0, "startedAt": None, "completedAt": None, "error": None})
+        self._saveJob(job)
+        self._pendingIds.put(job['id'])
+        self.start()
+        return job
+
+    def getJob(self, jobId):
+        """Return a copy of a job's current state, or None if there is no such job."""
+        with self._lock:
+            job = self._activeJobs.get(jobId)
+            if job is not None:
+                return dict(job)
+        return self._loadJob(jobId)
+
+    def listJobs(self, limit=50):
+        """Return the most recently created jobs, newest first."""
+        self._ensureTable()
+        rows = dbConnectionPool.getConnection(self.dbFilePath).execute(
+            'SELECT id, job FROM tileJobs ORDER BY createdAt DESC LIMIT ?', (limit,)).fetchall()
+        with self._lock:
+            return [dict(self._activeJobs[jobId]) if jobId in self._activeJobs else json.loads(jobJSON) for jobId, jobJSON in rows]
+
+    def cancel(self, jobId):
+        """Cancel a pending or running job, returning its state, or None if there is no such
+        job.  A running job stops at its runner's next checkCancelled."""
+        # Workers start pending jobs under the same lock, so a job is either cancelled before a
+        # worker starts it or is already running and stops at its next checkCancelled.
+        with self._lock:
+            job = self._activeJobs.get(jobId)
+            if job is not None:
+                job['cancelRequested'] = True
+                job['progress'] = 'Cancelling...'
+                return dict(job)
+            job = self._loadJob(jobId)
+            if job is not None and job['status'] == 'pending':
+                job.update({"status": "cancelled", "stage": "cancelled", "progress": "Cancelled", "completedAt": time.time()})
+                self._saveJob(job)
+            return job
+
+    def checkCancelled(self, job):
+        """Raise tileJobCancelled if the job has been cancelled, called by runners between steps."""
+        if job.get('cancelRequested'):
+            raise tileJobCancelled(f"Job {job['id']} was cancelled")
+
+    def reportProgress(self, job, stage=None, percent=None, message=None):
+        """Update a running job's stage, percent and progress message.  The job is written to
+        the database when its stage changes and otherwise at most once a second."""
+        stageChanged = stage is not None and stage != job.get('stage')
+        if stage is not None:
+            job['stage'] = stage
+        if percent is not None:
+            job['percent'] = round(min(max(percent, 0), 100), 1)
+        if message is not None:
+            job['progress'] = message
+        if job['id'] not in self._activeJobs:
+            return
+        if stageChanged or time.time() - self._lastWrites.get(job['id'], 0) >= PROGRESS_WRITE_INTERVAL:
+            self._saveJob(job)
+
+    def recoverJobs(self):
+        """Queue again the jobs left pending or running when the server last stopped, marking
+        those interrupted too often, and start the workers if any were queued."""
+        self._ensureTable()
+        rows = dbConnectionPool.getConnection(self.dbFilePath).execute(
+            'SELECT job FROM tileJobs WHERE status IN (?, ?) ORDER BY createdAt', ACTIVE_JOB_STATUSES).fetchall()
+        requeuedIds = []
+        for (jobJSON,) in rows:
+            job = json.loads(jobJSON)
+            if job['status'] == 'running' and job.get('attempts', 0) >= MAX_JOB_ATTEMPTS:
+                job.update({"status": "interrupted", "stage": "interrupted", "completedAt": time.time(),
+                            "error": f"Interrupted by server restarts {job['attempts']} times"})
+                print(f"[TileJobQueue] Job {job['id']} marked interrupted", flush=True)
+            else:
+                job.update({"status": "pending", "stage": "queued", "percent": 0, "progress": "Queued again after server restart"})
+                requeuedIds.append(job['id'])
+            job.pop('cancelRequested', None)
+            self._saveJob(job)
+        if requeuedIds:
+            print(f"[TileJobQueue] Requeued {len(requeuedIds)} interrupted job(s)", flush=True)
+            for jobId in requeuedIds:
+                self._pendingIds.put(jobId)
+            self.start()
+        return requeuedIds
+
+    def _work(self):
+        while True:
+            jobId = self._pendingIds.get()
+            # The job is read and marked running under the lock cancel takes, so a job cancelled
+            # while it waited is skipped rather than started
+            with self._lock:
+                job = self._loadJob(jobId)
+                if job is None or job['status'] != 'pending':
+                    continue
+                job.update({"status": "running", "stage": "starting", "startedAt": time.time(), "attempts": job.get('attempts', 0) + 1})
+                self._activeJobs[jobId] = job
+                self._saveJob(job)
+            try:
+                self.runJob(job)
+            except tileJobCancelled:
+                job.update({"status": "cancelled", "stage": "cancelled", "progress": "Cancelled"})
+            except Exception as err:
+                job.update({"status": "failed", "error": str(err)})
+                print(f"[TileJobQueue] Job {jobId} failed: {err}", flush=True)
+            finally:
+                if job['status'] == 'running':
+                    job.update({"status": "failed", "error": job.get('error') or 'Job ended without a result'})
+                job.pop('cancelRequested', None)
+                job['completedAt'] = job.get('completedAt') or time.time()
+                self._saveJob(job)
+                with self._lock:
+                    self._activeJobs.pop(jobId, None)
+                self._lastWrites.pop(jobId, None)
@@ -5,4 +5,4 @@ class TileSourceDefinition(treeObject):
     def __init__(self, name='', type='tileserver', definition='{}', manager=None):
         self.name = name
         self.type = type  # 'tileserver' or 's3-bucket'
-        self.definition = definition  # JSON blob of tile source config
+        self.definition = definition  # JSON blob of tile source config, locating its .mbtiles or .pmtiles file by bucket/objectName or filePath
@@ -21,11 +21,40 @@
 
 from polariFiles.managedFiles import managedFile
 from polariFiles.dataChannels import *
+from polariDBmanagement.sqliteConnectionPool import dbConnectionPool, getDBConnection
 from sqlite3 import Error
-import os, json, sqlite3, sys
+import os, json, sys
 
 DBtypesList = ['Polari', 'App', 'Test']
 DBstatuses = ['UnInitialized Tables', 'Finalized DB']
+#Number of rows written per executemany and committed per transaction by saveInstancesInDB.
+DEFAULT_BULK_CHUNK_SIZE = 5000
+#Types SQLite stores as they are, every other value is serialized before it is saved.
+sqliteNativeTypes = frozenset({str, int, float, bool, bytes})
+#Types stored as JSON TEXT, matching the types polyTypedObject.deserializeColumnValue loads back.
+sqliteJSONTypes = (list, dict, tuple)
+
+#Converts a python value into the value saved for it in an SQLite column.  None and empty lists
+#are saved as NULL, as they were never written by the original row-by-row save.
+def serializeDBValue(value):
+    valueType = type(value)
+    if valueType in sqliteNativeTypes:
+        return value
+    if value is None:
+        return None
+    if isinstance(value, sqliteJSONTypes):
+        if isinstance(value, list) and len(value) == 0:
+            return None
+        return json.dumps(value, default=str)
+    if isinstance(value, (str, int, float, bytes)):
+        return value
+    return str(value)
+
+#Returns the select list for columnNames, each quoted as an SQL identifier, or * when it is None.
+def quoteColumnList(columnNames):
+    if columnNames is None:
+        return '*'
+    return ', '.join(['"' + columnName.replace('"', '""') + '"' for columnName in columnNames])
 
 class managedDatabase(managedFile):
     #Creates an anonymous Database, used only when looking to load a pre-existing Database
@@ -39,6 +68,10 @@ class managedDatabase(managedFile):
             self.tables = tables
             self.DBstatus = ['UnInitialized DB']
             self.isRemote = None
+            self.bulkChunkSize = DEFAULT_BULK_CHUNK_SIZE
+            #Column layouts of tables, cached for bulk saves.
+            #FORMAT: {tableName:(columnNames, hasBranchPath)}
+            self.tableLayouts = {}
 
     def setExtension(self, fileExtension):
         if(fileExtensions.__contains__(fileExtension)):
@@ -80,86 +113,116 @@ class managedDatabase(managedFile):
     def createDatabase(self):
         self.createFile()
 
+    #Returns the path to this database's .db file.
+    def getDBFilePath(self):
+        return os.path.join(self.Path, self.name + '.db') if self.Path else self.name + '.db'
+
+    #Returns the calling thread's pooled connection to this database, connections are kept
+    #open between calls so they must not be closed by the caller.
+    def getConnection(self):
+        return getDBConnection(self.getDBFilePath())
+
+    #Returns the cached column layout of a table as (columnNames, hasBranchPath), where columnNames
+    #excludes _branch_path.  The schema is read once per table rather than once per saved row.
+    def getTableLayout(self, tableName, dbConnection=None):
+        layout = self.tableLayouts.get(tableName)
+        if layout is None:
+            if dbConnection is None:
+                dbConnection = self.getConnection()
+            tableColumns = [col[1] for col in dbConnection.execute(f'PRAGMA table_info({tableName})').fetchall()]
+            layout = (tuple(colName for colName in tableColumns if colName != '_branch_path'), '_branch_path' in tableColumns)
+            self.tableLayouts[tableName] = layout
+        return layout
+
+    #Drops cached table layouts after a schema change, all of them if no table is given.
+    def invalidateTableLayout(self, tableName=None):
+        if tableName is None:
+            self.tableLayouts = {}
+        else:
+            self.tableLayouts.pop(tableName, None)
+
     def saveInstanceInDB(self, passedInstance):
         """Persist instance to DB. Returns True on success, False if skipped/failed."""
-        className = str(type(passedInstance).__name__)
-        print(f'[DB-Save] saveInstanceInDB called for {className}, tables={self.tables}', flush=True)
-        if className not in self.tables:
-            print(f'[DB-Save] SKIP: {className} not in self.tables', flush=True)
-            return False
-        # SQLite-serializable types
-        serializableTypes = (str, int, float, bool, bytes, type(None))
-        # Get actual table columns from the DB schema
-        dbFilePath = os.path.join(self.Path, self.name + '.db') if self.Path else self.name + '.db'
-        print(f'[DB-Save] DB file: {dbFilePath}, exists={os.path.exists(dbFilePath)}', flush=True)
-        dbConnection = sqlite3.connect(dbFilePath)
-        dbCursor = dbConnection.cursor()
-        dbCursor.execute(f"PRAGMA table_info({className})")
-        tableColumns = [col[1] for col in dbCursor.fetchall()]
-        print(f'[DB-Save] Table columns for {className}: {tableColumns}', flush=True)
-        # Collect only attributes that match table columns and are serializable
-        rowList = []
-        valueList = []
+        return self.saveInstancesInDB([passedInstance]) == 1
+
+    def saveInstancesInDB(self, instances, chunkSize=None):
+        """Persist many instances to the DB in bulk, returns the number of rows written.
+
+        Instances are grouped by class and written with one executemany per chunk, each chunk
+        committed as a single transaction.  Instances whose class has no table, or which have no
+        values for any column, are skipped.  If a chunk fails it is retried row by row so that a
+        single bad row does not lose the rest of the chunk.
+        """
+        if chunkSize is None:
+            chunkSize = self.bulkChunkSize
+        instancesByClass = {}
+        for someInstance in instances:
+            instancesByClass.setdefault(type(someInstance).__name__, []).append(someInstance)
+        dbFilePath = self.getDBFilePath()
+        savedCount = 0
+        for className, classInstances in instancesByClass.items():
+            if className not in self.tables:
+                print(f'[DB-Save] SKIP: {className} not in self.tables', flush=True)
+                continue
+            (columnNames, hasBranchPath) = self.getTableLayout(className)
+            polyTypedObj = None
+            if hasBranchPath and getattr(self, 'manager', None) is not None:
+                polyTypedObj = self.manager.objectTypingDict.get(className)
+            rowColumns = columnNames + ('_branch_path',) if polyTypedObj is not None else columnNames
+            if len(rowColumns) == 0:
+                continue
+            placeholders = ', '.join(['?'] * len(rowColumns))
+            commandString = f'INSERT OR REPLACE INTO {className} ({", ".join(rowColumns)}) VALUES({placeholders});'
+            rowList = []
+            for someInstance in classInstances:
+                valueRow = self.serializeInstanceRow(someInstance, columnNames, polyTypedObj)
+                if valueRow is not None:
+                    rowList.append(valueRow)
+            for chunkStart in range(0, len(rowList), chunkSize):
+                chunkRows = rowList[chunkStart:chunkStart + chunkSize]
+                try:
+                    with dbConnectionPool.transaction(dbFilePath) as dbConnection:
+                        dbConnection.executemany(commandString, chunkRows)
+                    savedCount += len(chunkRows)
+                except Exception as e:
+                    print(f'[DB-Save] Bulk INSERT failed for {className}, retrying {len(chunkRows)} rows individually: {e}', flush=True)
+                    savedCount += self._saveRowsIndividually(dbFilePath, className, commandString, chunkRows)
+        return savedCount
+
+    def _saveRowsIndividually(self, dbFilePath, className, commandString, rowList):
+        savedCount = 0
+        with dbConnectionPool.transaction(dbFilePath) as dbConnection:
+            for valueRow in rowList:
+                try:
+                    dbConnection.execute(commandString, valueRow)
+                    savedCount += 1
+                except Exception as e:
+                    print(f'[DB-Save] INSERT failed for {className}: {e}', flush=True)
+        return savedCount
+
+    #Builds the tuple of column values for an instance, serialized as the polyTyping affinities
+    #expect them (lists, dicts and tuples as JSON TEXT).  Returns None if no column has a value.
+    def serializeInstanceRow(self, passedInstance, columnNames, polyTypedObj=None):
         classInfoDict = passedInstance.__dict__
-        print(f'[DB-Save] Instance __dict__ keys: {list(classInfoDict.keys())}', flush=True)
-        for colName in tableColumns:
-            if colName == '_branch_path':
-                continue  # Handle separately below
-            if colName in classInfoDict:
-                value = classInfoDict[colName]
-                if value is None or value == []:
-                    print(f'[DB-Save]   {colName}: skipped (None or empty)', flush=True)
-                    continue
-                # Convert lists/dicts to JSON strings
-                if isinstance(value, (list, dict)):
-                    import json
-                    value = json.dumps(value, default=str)
-                elif not isinstance(value, serializableTypes):
-                    value = str(value)
-                rowList.append(colName)
-                valueList.append(value)
-                print(f'[DB-Save]   {colName}: {repr(value)[:80]}', flush=True)
-            else:
-                print(f'[DB-Save]   {colName}: NOT in instance __dict__', flush=True)
-        # Add _branch_path if the table supports it
-        if '_branch_path' in tableColumns:
-            try:
-                if className in self.manager.objectTypingDict:
-                    polyTypedObj = self.manager.objectTypingDict[className]
-                    treePath = polyTypedObj.serializeTreePath(passedInstance)
-                    if treePath is not None:
-                        rowList.append('_branch_path')
-                        valueList.append(treePath)
-            except Exception:
-                pass
-        if len(rowList) == 0:
-            print(f'[DB-Save] SKIP: no columns to save for {className}', flush=True)
-            return False
-        # Build INSERT OR REPLACE to handle re-persisting on restart
-        placeholders = ', '.join(['?'] * len(rowList))
-        columns = ', '.join(rowList)
-        commandString = f'INSERT OR REPLACE INTO {className} ({columns}) VALUES({placeholders});'
-        valueTuple = tuple(valueList)
-        print(f'[DB-Save] SQL: {commandString}', flush=True)
-        print(f'[DB-Save] Values: {valueTuple[:3]}...', flush=True)
-        try:
-            dbCursor.execute(commandString, valueTuple)
-            dbConnection.commit()
-            print(f'[DB-Save] SUCCESS: saved {className} instance', flush=True)
-            dbConnection.close()
-            return True
-        except Exception as e:
-            print(f'[DB-Save] INSERT failed for {className}: {e}', flush=True)
-            dbConnection.close()
-            return False
+        valueList = []
+        hasValue = False
+        for colName in columnNames:
+            value = serializeDBValue(classInfoDict.get(colName))
+            if value is not None:
+                hasValue = True
+            valueList.append(value)
+        if polyTypedObj is not None:
+            valueList.append(polyTypedObj.serializeTreePath(passedInstance))
+        if not hasValue:
+            return None
+        return tuple(valueList)
 
     #Returns a List of Two Lists, the first of which contains the class variables, and the
     #second of which is the list of all instances as tuples of the requested class, which have
     #the same order as and are the corresponding values of the first list.
     def getAllInTable(self, tableName):
         commandString = 'SELECT * FROM ' + tableName + ';'
-        dbFilePath = os.path.join(self.Path, self.name + '.db') if self.Path else self.name + '.db'
-        dbConnection = sqlite3.connect(dbFilePath)
+        dbConnection = self.getConnection()
         dbCursor = dbConnection.cursor()
         print(commandString)
         dbCursor.execute(commandString)
@@ -170,9 +233,59 @@ class managedDatabase(managedFile):
             columnNames.append(column[0])
         tempList = [columnNames, dataSets]
         dataSets = tuple(tempList)
-        dbConnection.close()
         return dataSets
 
+    #Returns the column names of a table together with an iterator over its rows, which reads
+    #the rows from the cursor chunkSize at a time instead of loading the whole table at once.
+    #columnNames limits the columns read, and queryClause, with its bound parameters, is added
+    #after the FROM for WHERE, ORDER BY and LIMIT clauses built from already validated names.
+    def iterateTableRows(self, tableName, chunkSize=None, columnNames=None, queryClause='', parameters=()):
+        if chunkSize is None:
+            chunkSize = self.bulkChunkSize
+        dbCursor = self.getConnection().cursor()
+        dbCursor.execute('SELECT ' + quoteColumnList(columnNames) + ' FROM ' + tableName + ' ' + queryClause + ';', parameters)
+        columnNames = [column[0] for column in dbCursor.description]
+        def rowIterator():
+            rowChunk = dbCursor.fetchmany(chunkSize)
+            while rowChunk:
+                yield from rowChunk
+                rowChunk = dbCursor.fetchmany(chunkSize)
+        return (columnNames, rowIterator())
+
+    #Returns every column name of a table, in the order SELECT * returns them.
+    def getTableColumnNames(self, tableName):
+        return [col[1] for col in self.getConnection().execute(f'PRAGMA table_info({tableName})').fetchall()]
+
+    #Yields (columnName, valueChunks) for each column of a table in turn, where valueChunks
+    #iterates over lists of at most chunkSize of the column's values and must be read before the
+    #next column is.  Reading one column at a time lets column-oriented output be built without
+    #holding the table, and all columns are read in one transaction so they describe the same rows.
+    #Each column is its own query, which SQLite may answer from an index in another order, so the
+    #rows are always read in an explicit order.  queryClause and its parameters select and order the
+    #rows as for iterateTableRows, and must end their ORDER BY with rowid so the order is total.
+    def iterateTableColumns(self, tableName, columnNames=None, chunkSize=None, queryClause='ORDER BY rowid', parameters=()):
+        if chunkSize is None:
+            chunkSize = self.bulkChunkSize
+        if columnNames is None:
+            columnNames = self.getTableColumnNames(tableName)
+        dbConnection = self.getConnection()
+        ownsTransaction = not dbConnection.in_transaction
+        if ownsTransaction:
+            dbConnection.execute('BEGIN')
+        def valueChunkIterator(dbCursor):
+            rowChunk = dbCursor.fetchmany(chunkSize)
+            while rowChunk:
+                yield [row[0] for row in rowChunk]
+                rowChunk = dbCursor.fetchmany(chunkSize)
+        try:
+            for columnName in columnNames:
+                dbCursor = dbConnection.execute(f'SELECT {quoteColumnList([columnName])} FROM {tableName} {queryClause};', parameters)
+                yield (columnName, valueChunkIterator(dbCursor))
+        finally:
+            # Only reads were made, so the transaction is ended without writing anything.
+            if ownsTransaction and dbConnection.in_transaction:
+                dbConnection.rollback()
+
     #Uses a Directory Path and file name together with a class name to import a specific class
     #The Directory Path must exist either at the same location the class is defined or at 
     #Then creates a table by grabbing data from that Class, with all data types set to Text.
@@ -222,7 +335,7 @@ class managedDatabase(managedFile):
     #Takes in a table name and a list of strings, with each string having (Keyword, data type,
     #special conditions)
     def makeSQLiteTable(self, tableName, rowList):
-        dbFilePath = os.path.join(self.Path, self.name + '.db') if self.Path else self.name + '.db'
+        dbFilePath = self.getDBFilePath()
         if self.isRemote:
             print(f'[DB] makeSQLiteTable: skipping {tableName} (isRemote={self.isRemote})', flush=True)
             return
@@ -237,37 +350,32 @@ class managedDatabase(managedFile):
                 commandString = commandString + rowList[i] + ', '
                 i = i + 1
             commandString = commandString + rowList[rowCount - 1] + ');'
-            dbConnection = sqlite3.connect(dbFilePath)
+            dbConnection = self.getConnection()
             dbCursor = dbConnection.cursor()
             try:
                 dbCursor.execute(commandString)
                 dbConnection.commit()
+                self.invalidateTableLayout(tableName)
                 self.tables.append(tableName)
             except Exception as e:
                 print(f'[DB] CREATE TABLE failed for {tableName}: {e}', flush=True)
                 print(f'[DB] SQL: {commandString}', flush=True)
-            dbConnection.close()
 
     def deleteAllFromTable(self, tableName):
         """Delete all rows from a table."""
-        dbFilePath = os.path.join(self.Path, self.name + '.db') if self.Path else self.name + '.db'
         try:
-            dbConnection = sqlite3.connect(dbFilePath)
-            dbConnection.execute(f'DELETE FROM {tableName}')
-            dbConnection.commit()
-            dbConnection.close()
+            with dbConnectionPool.transaction(self.getDBFilePath()) as dbConnection:
+                dbConnection.execute(f'DELETE FROM {tableName}')
             print(f'[DB] Deleted all rows from {tableName}', flush=True)
         except Exception as e:
             print(f'[DB] Error deleting rows from {tableName}: {e}', flush=True)
 
     def dropTable(self, tableName):
         """Drop a table from the database and remove it from self.tables."""
-        dbFilePath = os.path.join(self.Path, self.name + '.db') if self.Path else self.name + '.db'
         try:
-            dbConnection = sqlite3.connect(dbFilePath)
-            dbConnection.execute(f'DROP TABLE IF EXISTS {tableName}')
-            dbConnection.commit()
-            dbConnection.close()
+            with dbConnectionPool.transaction(self.getDBFilePath()) as dbConnection:
+                dbConnection.execute(f'DROP TABLE IF EXISTS {tableName}')
+            self.invalidateTableLayout(tableName)
             if tableName in self.tables:
                 self.tables.remove(tableName)
             print(f'[DB] Dropped table {tableName}', flush=True)
@@ -278,14 +386,12 @@ class managedDatabase(managedFile):
     def loadDB_byFile(self, filePath):
         dbFilePath = os.path.join(filePath, self.name + '.db')
         if(os.path.exists(dbFilePath)):
-            dbConnection = sqlite3.connect(dbFilePath)
+            dbConnection = getDBConnection(dbFilePath)
             dbCursor = dbConnection.cursor()
             dbCursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
             # fetchall returns tuples like ('tableName',) — extract plain strings
             rawTables = dbCursor.fetchall()
             self.tables = [row[0] if isinstance(row, tuple) else row for row in rawTables]
-            dbConnection.commit()
-            dbConnection.close()
         else:
             print(f"Error: Database file not found at {dbFilePath}")
 
@@ -301,12 +407,10 @@ class managedDatabase(managedFile):
 
     def loadDB_byDB(self, dbPath):
         if(os.path.exists(dbPath)):
-            dbConnection = sqlite3.connect(dbPath)
+            dbConnection = getDBConnection(dbPath)
             dbCursor = dbConnection.cursor()
             dbCursor.execute("SELECT name, DBfile, DBtype, tables"
-            + "FROM managedDataBase WHERE name=" + self.name)
+            + " FROM managedDataBase WHERE name=?", (self.name,))
             self.tables = dbCursor.fetchall()
-            dbConnection.commit()
-            dbConnection.close()
         else:
             print("Error: Database file not found at location " + dbPath + " cannot load database, dumbass.")
\ No newline at end of file
@@ -110,6 +110,17 @@ class managedObjectStore(treeObject):
         self.client.fget_object(bucket, object_name, local_path)
         return local_path
 
+    def read_range(self, bucket, object_name, offset, length) -> bytes:
+        """Read length bytes of an object from offset with a ranged GET."""
+        if not self.connected or self.client is None:
+            raise RuntimeError('Object store not connected')
+        response = self.client.get_object(bucket, object_name, offset=offset, length=length)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
     def list_objects(self, bucket, prefix='') -> list:
         """List objects in a bucket with optional prefix filter."""
         if not self.connected or self.client is None:
@@ -0,0 +1,156 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+SQLite connection pool shared by the managedDatabase and the API servers.
+
+Each thread gets one persistent connection per database file, so the worker
+threads of the ThreadingWSGIServer never share a connection and never pay for
+opening one per query.  Every connection is opened in WAL journal mode so that
+readers do not block the writer.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas applied to every pooled connection when it is opened.
+# cache_size is negative so it is read as KiB rather than pages (64 MiB),
+# mmap_size lets reads be served from the OS page cache (256 MiB).
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+# Number of prepared statements sqlite3 keeps compiled per connection, keyed by SQL text.
+DEFAULT_CACHED_STATEMENTS = 256
+# Seconds a connection waits on a locked database before raising.
+DEFAULT_BUSY_TIMEOUT = 30.0
+
+
+class sqliteConnectionPool:
+    """Thread-affine pool of persistent SQLite connections keyed by database file."""
+
+    def __init__(self, pragmas=None, cachedStatements=DEFAULT_CACHED_STATEMENTS, busyTimeout=DEFAULT_BUSY_TIMEOUT):
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self.cachedStatements = cachedStatements
+        self.busyTimeout = busyTimeout
+        self._local = threading.local()
+        # Every open connection, so they can be closed from any thread.
+        # FORMAT: {(threadIdent, dbFilePath):connection}
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def getConnection(self, dbFilePath):
+        """Return this thread's connection to dbFilePath, opening it on first use."""
+        dbFilePath = os.path.abspath(dbFilePath)
+        threadConnections = getattr(self._local, 'connections', None)
+        if threadConnections is None:
+            threadConnections = {}
+            self._local.connections = threadConnections
+        key = (threading.get_ident(), dbFilePath)
+        conn = threadConnections.get(dbFilePath)
+        # A connection missing from the registry was closed by closeConnections or closeAll.
+        if conn is not None and self._connections.get(key) is conn:
+            return conn
+        conn = self._openConnection(dbFilePath)
+        threadConnections[dbFilePath] = conn
+        with self._lock:
+            self._pruneDeadThreads()
+            self._connections[key] = conn
+        return conn
+
+    def _openConnection(self, dbFilePath):
+        # check_same_thread is off only so closeAll can close connections owned by
+        # other threads; a connection is otherwise only ever used by its own thread.
+        conn = sqlite3.connect(dbFilePath, timeout=self.busyTimeout,
+                               cached_statements=self.cachedStatements,
+                               check_same_thread=False)
+        for pragmaName, pragmaValue in self.pragmas.items():
+            try:
+                conn.execute(f'PRAGMA {pragmaName}={pragmaValue}')
+            except sqlite3.Error as e:
+                print(f'[DB-Pool] Could not apply PRAGMA {pragmaName}={pragmaValue} on {dbFilePath}: {e}', flush=True)
+        return conn
+
+    def _pruneDeadThreads(self):
+        # Connections of threads which have exited can never be used again.
+        liveThreads = {someThread.ident for someThread in threading.enumerate()}
+        for key in [key for key in self._connections if key[0] not in liveThreads]:
+            try:
+                self._connections.pop(key).close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def transaction(self, dbFilePath):
+        """Yield this thread's connection, committing on success and rolling back on error.
+
+        A transaction opened while another is already open on the same connection becomes a
+        savepoint, so an error only undoes the inner block and the outer one commits once.
+        """
+        conn = self.getConnection(dbFilePath)
+        if conn.in_transaction:
+            # Savepoints stack, so the innermost one with this name is the one released.
+            conn.execute('SAVEPOINT nestedTransaction')
+            try:
+                yield conn
+                conn.execute('RELEASE nestedTransaction')
+            except Exception:
+                conn.execute('ROLLBACK TO nestedTransaction')
+                conn.execute('RELEASE nestedTransaction')
+                raise
+            return
+        conn.execute('BEGIN')
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def closeConnections(self, dbFilePath):
+        """Close every thread's connection to one database file, e.g. before deleting it."""
+        dbFilePath = os.path.abspath(dbFilePath)
+        with self._lock:
+            for key in [key for key in self._connections if key[1] == dbFilePath]:
+                try:
+                    self._connections.pop(key).close()
+                except sqlite3.Error:
+                    pass
+
+    def closeAll(self):
+        """Close every pooled connection, used on shutdown."""
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections = {}
+
+
+# Pool shared by every managedDatabase in the process.
+dbConnectionPool = sqliteConnectionPool()
+
+
+def getDBConnection(dbFilePath):
+    """Return the calling thread's pooled connection to dbFilePath."""
+    return dbConnectionPool.getConnection(dbFilePath)
@@ -97,6 +97,8 @@ class polyTypedObject(treeObject):
         self.manager = manager
         if(manager != None):
             manager.objectTypingDict[className] = self
+            if(classDefinition != None and hasattr(manager, 'objectTypingClassDict')):
+                manager.objectTypingClassDict[classDefinition] = self
         #The instances of this object's polyTyping in higher tiered contexts.
         self.inheritedTyping = []
         #Variables that may be used as unique identifiers.
@@ -337,18 +339,17 @@ class polyTypedObject(treeObject):
                 return
         if(hasattr(self, 'manager')):
             #print('Adding obj ', classObj, ' to object ref dict of ', self.className, ' for variable named: ', varName)
-            for objType in self.manager.objectTyping:
-                #Goes until objType == PolyTyping for object this variable belongs to.
-                if(objType.className == referencedClassObj.__name__):
-                    #The objectReference dictionary on the object's PolyTyping that the variable belongs to,
-                    #with the key-value set to be the class of the value set on the variable.
-                    #print("In addToObjReferenceDict for polyTyping of ", self.className," found typing for object ", objType.className, " for this typing adding variable ", referenceVarName)
-                    foundTyping = True
-                    if(not referencedClassObj.__name__ in objType.objectReferencesDict):
-                        objType.objectReferencesDict[referencedClassObj.__name__] = [referenceVarName]
-                    elif(not referenceVarName in objType.objectReferencesDict[referencedClassObj.__name__]):
-                        (objType.objectReferencesDict[objType.className]).append(referenceVarName)
-                    break
+            #Gets the PolyTyping for object this variable belongs to.
+            objType = self.manager.getRegisteredObjectTyping(classObj=referencedClassObj)
+            if(objType != None):
+                #The objectReference dictionary on the object's PolyTyping that the variable belongs to,
+                #with the key-value set to be the class of the value set on the variable.
+                #print("In addToObjReferenceDict for polyTyping of ", self.className," found typing for object ", objType.className, " for this typing adding variable ", referenceVarName)
+                foundTyping = True
+                if(not referencedClassObj.__name__ in objType.objectReferencesDict):
+                    objType.objectReferencesDict[referencedClassObj.__name__] = [referenceVarName]
+                elif(not referenceVarName in objType.objectReferencesDict[referencedClassObj.__name__]):
+                    (objType.objectReferencesDict[objType.className]).append(referenceVarName)
             if(not foundTyping):
                 print("Never found typing in addToObjReferenceDict function for type ", referencedClassObj.__name__, " being allocated to variable ", referenceVarName)
                 #TODO Create default typing if the typing does not exist.
@@ -485,7 +486,11 @@ class polyTypedObject(treeObject):
                 self._updateDataCostDict(self.perInstanceDataCostDictDB, dbSize)
 
             classInfoDict = pythonClassInstance.__dict__
+            #Runtime state a class lists in untypedVars, such as locks, is not part of its typing.
+            untypedVars = getattr(type(pythonClassInstance), 'untypedVars', ())
             for someVariableKey in list(classInfoDict.keys()):
+                if(someVariableKey in untypedVars):
+                    continue
                 var = getattr(pythonClassInstance, someVariableKey)
                 #If the var is accounted for, analyze the current value.
                 if(type(pythonClassInstance).__name__ != "polyTypedVariable" and type(pythonClassInstance).__name__ != "polyTypedObject"):
@@ -693,17 +698,17 @@ class polyTypedObject(treeObject):
 
     def getObjectTyping(self, classObj=None, className=None, classInstance=None ):
         if className != None:
-            for objType in (self.manager).objectTyping:
-                if(objType.className == className):
-                    return objType
+            objType = (self.manager).getRegisteredObjectTyping(className=className)
+            if(objType != None):
+                return objType
         elif classInstance != None:
-            for objType in (self.manager).objectTyping:
-                if(objType.className == classInstance.__class__.__name__):
-                    return objType
+            objType = (self.manager).getRegisteredObjectTyping(classObj=classInstance.__class__)
+            if(objType != None):
+                return objType
         elif classObj != None:
-            for objType in (self.manager).objectTyping:
-                if(objType.className == classObj.__name__):
-                    return objType
+            objType = (self.manager).getRegisteredObjectTyping(classObj=classObj)
+            if(objType != None):
+                return objType
         else:
             print("You called the \'getObjectTyping\' function without passing any parameters!  Must pass one of the three parameter options, the string name of the class, an instance of the class, or the class defining object itself \'__class__\'.")
         obj = None
@@ -716,7 +721,7 @@ class polyTypedObject(treeObject):
         return obj
 
     def getInstanceIdentifiers(self, instance):
-        obj = self.getObjectTyping(type(instance).__name__)
+        obj = self.getObjectTyping(className=type(instance).__name__)
         idVars = obj.identifiers
         #Compiles a dictionary of key-value pairs for the identifiers 
         identifiersDict = {}
@@ -755,7 +760,7 @@ class polyTypedObject(treeObject):
         potentialObjects = []
         #A list of all object instances referenced on the current object, regardless of relation.
         traversalObjects = []
-        mngObj = self.getObjectTyping( type(self.manager).__name__ )
+        mngObj = self.getObjectTyping(className=type(self.manager).__name__)
         #Checks each Object see if the current object (the manager) has any potential references to it.
         #Generates a list of potentialObjects, which may potentially hold instances of the desired obj.
         for obj in (self.manager).objectTyping:
@@ -278,6 +278,11 @@ class managedApp(managerObject, managedFolder):
         
         
 
+    #The managedApp builds it's tree with it's own functions which do not maintain the
+    #objectTreeIndex, so path lookups always search the tree.
+    def hasObjectTreeIndex(self):
+        return False
+
     #Accesses a branch node and adds a sub-branch to it, if the sub-branch does not already exist.
     def addNewBranch(self, traversalList, branchTuple):
         branchNode = self.getBranchNode(traversalList)
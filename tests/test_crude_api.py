@@ -21,14 +21,22 @@ Tests all polariCRUDE endpoints to ensure proper functionality.
 import unittest
 import json
 import sys
+import threading
+import asyncio
+import tempfile
+import shutil
 import os
 
 # Add parent directory to path to import modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from falcon import testing
+from falcon import testing, http_now
 from objectTreeManagerDecorators import managerObject
 from objectTreeDecorators import treeObject, treeObjectInit
+from polariApiServer.polariCRUDE import polariCRUDE
+from polariApiServer.asgiBridge import wsgiAppBridge
+from polariDBmanagement.managedDB import managedDatabase
+from polariDBmanagement.sqliteConnectionPool import dbConnectionPool
 
 
 # Define a test class for use in CRUDE operations
@@ -476,6 +484,180 @@ class CRUDEEndpointTestCase(unittest.TestCase):
             print(f"✓ {method} method ({operation}) available: {result.status_code}")
 
 
+class CRUDEPagedReadTestCase(unittest.TestCase):
+    """Test case for paginated, filtered and projected GET requests"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up a CRUDE endpoint over a known set of instances"""
+        cls.manager = managerObject(hasServer=True)
+        cls.manager.getObjectTyping(classObj=TestObject)
+        cls.crude = polariCRUDE(apiObject='TestObject', polServer=cls.manager.polServer, manager=cls.manager)
+        cls.client = testing.TestClient(cls.manager.polServer.falconServer)
+        cls.instances = [TestObject(name="paged_" + str(i % 2), description="Paged", value=i, manager=cls.manager) for i in range(7)]
+
+    def getPage(self, queryString):
+        result = self.client.simulate_get('/TestObject', query_string=queryString)
+        self.assertEqual(result.status_code, 200)
+        classData = result.json[0]['TestObject'][0]
+        return (classData['data'], classData['page'], result)
+
+    def test_01_pages_follow_cursor(self):
+        """Cursor pages return every instance once, in sort order, with the total count"""
+        seenValues = []
+        (data, page, result) = self.getPage('sort=-value&limit=3&fields=value')
+        self.assertEqual(page['totalCount'], 7)
+        self.assertEqual(result.headers.get('X-Total-Count'), '7')
+        while True:
+            seenValues += [instanceData['value'] for instanceData in data]
+            self.assertTrue(all(set(instanceData.keys()) == {'id', 'value'} for instanceData in data))
+            if page['nextCursor'] is None:
+                break
+            (data, page, result) = self.getPage('sort=-value&limit=3&fields=value&cursor=' + page['nextCursor'])
+        self.assertEqual(seenValues, [6, 5, 4, 3, 2, 1, 0])
+
+    def test_02_filters_and_bad_parameters(self):
+        """Filters reuse attribute queries, and malformed parameters are rejected"""
+        (data, page, result) = self.getPage('name=paged_1&value__gte=3&sort=value')
+        self.assertEqual([instanceData['value'] for instanceData in data], [3, 5])
+        self.assertEqual(page['totalCount'], 2)
+        (data, page, result) = self.getPage('value__in=0,6')
+        self.assertEqual(sorted(instanceData['value'] for instanceData in data), [0, 6])
+        for badQuery in ['limit=0', 'cursor=notACursor', 'value__between=1']:
+            self.assertEqual(self.client.simulate_get('/TestObject', query_string=badQuery).status_code, 400)
+
+    def test_03_conditional_get(self):
+        """A repeated GET with the ETag is answered with 304 until an instance changes"""
+        (data, page, result) = self.getPage('sort=value&limit=2')
+        etag = result.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        notModified = self.client.simulate_get('/TestObject', query_string='sort=value&limit=2', headers={'If-None-Match': etag})
+        self.assertEqual(notModified.status_code, 304)
+        otherQuery = self.client.simulate_get('/TestObject', query_string='sort=value&limit=3', headers={'If-None-Match': etag})
+        self.assertEqual(otherQuery.status_code, 200)
+        self.instances[0].description = "Changed"
+        changed = self.client.simulate_get('/TestObject', query_string='sort=value&limit=2', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers.get('ETag'), etag)
+        # Last-Modified is only sent once the second of the last change has passed, since a
+        # later change in the same second would have the same whole-second Last-Modified.
+        self.assertIsNone(changed.headers.get('Last-Modified'))
+        sameSecond = self.client.simulate_get('/TestObject', query_string='sort=value&limit=2', headers={'If-Modified-Since': http_now()})
+        self.assertEqual(sameSecond.status_code, 200)
+        self.manager.classModifiedTimes['TestObject'] -= 2
+        self.manager.versionStartTime -= 2
+        earlier = self.client.simulate_get('/TestObject', query_string='sort=value&limit=2')
+        lastModified = earlier.headers.get('Last-Modified')
+        self.assertIsNotNone(lastModified)
+        notModified = self.client.simulate_get('/TestObject', query_string='sort=value&limit=2', headers={'If-Modified-Since': lastModified})
+        self.assertEqual(notModified.status_code, 304)
+
+    def test_04_streamed_responses(self):
+        """Streamed GETs send the same instances as JSON or as one NDJSON line per instance"""
+        (data, page, result) = self.getPage('sort=value&fields=value')
+        (streamedData, streamedPage, streamed) = self.getPage('sort=value&fields=value&_stream=true')
+        self.assertEqual(streamedData, data)
+        self.assertEqual(streamedPage, page)
+        ndjson = self.client.simulate_get('/TestObject', query_string='sort=value&limit=5', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(ndjson.headers.get('Content-Type'), 'application/x-ndjson')
+        lines = [json.loads(line) for line in ndjson.text.splitlines()]
+        self.assertEqual([instanceData['value'] for instanceData in lines], [0, 1, 2, 3, 4])
+        self.assertIsNotNone(ndjson.headers.get('X-Next-Cursor'))
+
+    def test_05_bulk_operations(self):
+        """Bulk requests apply each valid operation and report every operation's result"""
+        operations = [
+            {"op": "create", "data": {"name": "bulk", "value": 100}},
+            {"op": "create", "id": "bulkFixedId", "data": {"name": "bulk", "value": 101}},
+            {"op": "update", "id": "bulkFixedId", "data": {"description": "Bulk updated"}},
+            {"op": "create", "data": {"notAVariable": 1}},
+            {"op": "delete", "id": "missingId"},
+            {"op": "rename"}
+        ]
+        result = self.client.simulate_post('/TestObject/bulk', body=json.dumps(operations))
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual((result.json['created'], result.json['updated'], result.json['failed']), (2, 1, 3))
+        self.assertEqual([opResult['status'] for opResult in result.json['results']], ['created', 'created', 'updated', 'error', 'error', 'error'])
+        self.assertEqual(self.manager.objectTables['TestObject']['bulkFixedId'].description, "Bulk updated")
+        ndjsonBody = '\n'.join(json.dumps({"op": "delete", "id": opResult['id']}) for opResult in result.json['results'][:2])
+        deleted = self.client.simulate_post('/TestObject/bulk', body=ndjsonBody, headers={'Content-Type': 'application/x-ndjson'})
+        self.assertEqual(deleted.json['deleted'], 2)
+        self.assertNotIn('bulkFixedId', self.manager.objectTables['TestObject'])
+        self.assertEqual(self.client.simulate_post('/TestObject/bulk', body='{"op": "create"}').status_code, 400)
+
+    def test_06_asgi_app(self):
+        """The ASGI App answers like the WSGI App, including streamed bodies and conditional GETs"""
+        asgiClient = testing.TestClient(self.manager.polServer.buildASGIApp(maxWorkers=2))
+        (data, page, result) = self.getPage('sort=value&fields=value')
+        asgiResult = asgiClient.simulate_get('/TestObject', query_string='sort=value&fields=value')
+        self.assertEqual(asgiResult.status_code, 200)
+        self.assertEqual(asgiResult.json, result.json)
+        streamed = asgiClient.simulate_get('/TestObject', query_string='sort=value&fields=value&_stream=true')
+        self.assertEqual(streamed.json, result.json)
+        notModified = asgiClient.simulate_get('/TestObject', query_string='sort=value&fields=value', headers={'If-None-Match': asgiResult.headers.get('ETag')})
+        self.assertEqual(notModified.status_code, 304)
+        created = asgiClient.simulate_post('/TestObject/bulk', body=json.dumps([{"op": "create", "data": {"name": "asgi", "value": 200}}]))
+        self.assertEqual(created.json['created'], 1)
+        self.assertEqual(asgiClient.simulate_get('/notARoute').status_code, 404)
+        # Every chunk of a streamed body is read on one thread kept for that body
+        class threadNamesResource:
+            def on_get(self, request, response):
+                response.stream = (threading.current_thread().name.encode() + b'\n' for chunkIndex in range(3))
+        self.manager.polServer.falconServer.add_route('/streamThreadNames', threadNamesResource())
+        threadNames = asgiClient.simulate_get('/streamThreadNames').text.split()
+        self.assertEqual(len(threadNames), 3)
+        self.assertEqual(len(set(threadNames)), 1)
+        self.assertTrue(threadNames[0].startswith('polariASGIStream'))
+        # Streams beyond maxStreamWorkers wait for a stream worker, which is reused
+        bridge = wsgiAppBridge(self.manager.polServer.falconServer, maxWorkers=2, maxStreamWorkers=1)
+        chunkThreadNames = set()
+        def streamBody(tag):
+            for chunkIndex in range(3):
+                chunkThreadNames.add(threading.current_thread().name)
+                yield tag
+        async def readStreams():
+            loop = asyncio.get_running_loop()
+            async def readBody(tag):
+                return [someChunk async for someChunk in bridge.iterateBody(loop, streamBody(tag))]
+            return await asyncio.gather(readBody(b'a'), readBody(b'b'))
+        self.assertEqual(asyncio.run(readStreams()), [[b'a'] * 3, [b'b'] * 3])
+        self.assertEqual(len(chunkThreadNames), 1)
+        bridge.shutdown()
+
+
+class CRUDEBulkPersistTestCase(unittest.TestCase):
+    """Test case for bulk requests persisted to a database without dirty tracking"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.manager = managerObject(hasServer=True)
+        self.manager.getObjectTyping(classObj=TestObject)
+        self.db = managedDatabase(name='bulkCrudeTest', manager=self.manager, tables=[])
+        self.db.manager = self.manager
+        self.db.Path = self.tempDir
+        self.db.getConnection()
+        self.db.makeSQLiteTable(tableName='TestObject', rowList=['id TEXT PRIMARY KEY', 'name TEXT', 'description TEXT', 'value INTEGER'])
+        self.manager.db = self.db
+        self.manager.dirtyTracking = False
+        self.crude = polariCRUDE(apiObject='TestObject', polServer=self.manager.polServer, manager=self.manager)
+        self.client = testing.TestClient(self.manager.polServer.falconServer)
+
+    def tearDown(self):
+        dbConnectionPool.closeConnections(self.db.getDBFilePath())
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_01_bulk_deletes_are_persisted(self):
+        """Rows of instances deleted in a bulk request are deleted in the same transaction as the upserts"""
+        operations = [{"op": "create", "id": "bulkRow" + str(i), "data": {"name": "bulk", "value": i}} for i in range(3)]
+        created = self.client.simulate_post('/TestObject/bulk', body=json.dumps(operations))
+        self.assertEqual(created.json['persisted'], {"upserted": 3, "deleted": 0})
+        operations = [{"op": "delete", "id": "bulkRow0"}, {"op": "delete", "id": "bulkRow1"}, {"op": "update", "id": "bulkRow2", "data": {"value": 20}}]
+        changed = self.client.simulate_post('/TestObject/bulk', body=json.dumps(operations))
+        self.assertEqual(changed.json['persisted'], {"upserted": 1, "deleted": 2})
+        (columnNames, rows) = self.db.getAllInTable('TestObject')
+        self.assertEqual([(row[columnNames.index('id')], row[columnNames.index('value')]) for row in rows], [('bulkRow2', 20)])
+
+
 def run_tests():
     """Run all CRUDE API tests"""
     print("\n" + "="*70)
@@ -496,6 +678,8 @@ def run_tests():
     # Add all test cases
     suite.addTests(loader.loadTestsFromTestCase(CRUDEAPITestCase))
     suite.addTests(loader.loadTestsFromTestCase(CRUDEEndpointTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(CRUDEPagedReadTestCase))
+    suite.addTests(loader.loadTestsFromTestCase(CRUDEBulkPersistTestCase))
 
     # Run tests with verbose output
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,313 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the SQLite persistence layer, covering the pooled connections used
+by the managedDatabase.
+"""
+
+import unittest
+import tempfile
+import threading
+import time
+import shutil
+import json
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from polariDBmanagement.sqliteConnectionPool import sqliteConnectionPool, dbConnectionPool
+from polariDBmanagement.managedDB import managedDatabase
+from polariApiServer.tableQueries import parseTableQuery, buildQueryClause, readTablePage
+from types import SimpleNamespace
+from objectTreeManagerDecorators import managerObject
+from objectTreeDecorators import treeObject, treeObjectInit
+
+
+class DBTestObject(treeObject):
+    """Simple object saved into a test database"""
+    @treeObjectInit
+    def __init__(self, name="", value=0, tags=None):
+        self.name = name
+        self.value = value
+        self.tags = tags
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+    """Test case for the thread-affine SQLite connection pool"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.dbFilePath = os.path.join(self.tempDir, 'poolTest.db')
+        self.pool = sqliteConnectionPool()
+
+    def tearDown(self):
+        self.pool.closeAll()
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_01_connection_reused_per_thread(self):
+        """A thread gets the same WAL connection back, other threads get their own"""
+        conn = self.pool.getConnection(self.dbFilePath)
+        self.assertIs(self.pool.getConnection(self.dbFilePath), conn)
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0].lower(), 'wal')
+        otherConns = []
+        worker = threading.Thread(target=lambda: otherConns.append(self.pool.getConnection(self.dbFilePath)))
+        worker.start()
+        worker.join()
+        self.assertIsNot(otherConns[0], conn)
+
+    def test_02_transaction_rolls_back_on_error(self):
+        """A failed transaction leaves no partial writes behind"""
+        with self.pool.transaction(self.dbFilePath) as conn:
+            conn.execute('CREATE TABLE poolRows (id TEXT PRIMARY KEY)')
+        with self.assertRaises(ValueError):
+            with self.pool.transaction(self.dbFilePath) as conn:
+                conn.execute("INSERT INTO poolRows VALUES ('a')")
+                raise ValueError('abort')
+        conn = self.pool.getConnection(self.dbFilePath)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM poolRows').fetchone()[0], 0)
+
+    def test_03_closed_connections_are_reopened(self):
+        """Closing a database's connections makes the next call open a fresh one"""
+        conn = self.pool.getConnection(self.dbFilePath)
+        self.pool.closeConnections(self.dbFilePath)
+        newConn = self.pool.getConnection(self.dbFilePath)
+        self.assertIsNot(newConn, conn)
+        self.assertEqual(newConn.execute('SELECT 1').fetchone()[0], 1)
+
+
+class BulkSaveTestCase(unittest.TestCase):
+    """Test case for the managedDatabase bulk save path"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.manager = managerObject()
+        self.db = managedDatabase(name='bulkTest', manager=self.manager, tables=[])
+        self.db.manager = self.manager
+        self.db.Path = self.tempDir
+        # Opening the pooled connection creates the database file.
+        self.db.getConnection()
+        self.db.makeSQLiteTable(tableName='DBTestObject', rowList=['id TEXT PRIMARY KEY', 'name TEXT', 'value INTEGER', 'tags TEXT'])
+
+    def tearDown(self):
+        dbConnectionPool.closeConnections(self.db.getDBFilePath())
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_01_bulk_save_in_chunks(self):
+        """Every instance is written when the rows span several chunks"""
+        instances = [DBTestObject(name='inst' + str(i), value=i, tags=['a', i], manager=self.manager) for i in range(25)]
+        self.assertEqual(self.db.saveInstancesInDB(instances, chunkSize=10), 25)
+        (columnNames, rows) = self.db.getAllInTable('DBTestObject')
+        self.assertEqual(len(rows), 25)
+        savedRow = dict(zip(columnNames, [row for row in rows if row[columnNames.index('name')] == 'inst3'][0]))
+        self.assertEqual(savedRow['value'], 3)
+        self.assertEqual(json.loads(savedRow['tags']), ['a', 3])
+        # Saving again replaces rows rather than duplicating them.
+        self.assertEqual(self.db.saveInstancesInDB(instances), 25)
+        self.assertEqual(len(self.db.getAllInTable('DBTestObject')[1]), 25)
+
+    def test_02_single_save_and_layout_cache(self):
+        """saveInstanceInDB uses the bulk path and the cached table layout"""
+        instance = DBTestObject(name='single', value=1, manager=self.manager)
+        self.assertTrue(self.db.saveInstanceInDB(instance))
+        self.assertEqual(self.db.tableLayouts['DBTestObject'], (('id', 'name', 'value', 'tags'), False))
+        self.db.dropTable('DBTestObject')
+        self.assertNotIn('DBTestObject', self.db.tableLayouts)
+        self.assertFalse(self.db.saveInstanceInDB(instance))
+
+    def test_03_persist_changes_writes_deltas(self):
+        """persistChanges upserts new and changed instances and deletes removed ones"""
+        self.manager.dirtyTracking = True
+        self.manager.db = self.db
+        instances = [DBTestObject(name='inst' + str(i), value=i, manager=self.manager) for i in range(5)]
+        self.assertEqual(self.manager.persistChanges(), (5, 0))
+        self.assertEqual(self.manager.persistChanges(), (0, 0))
+        instances[1].value = 100
+        self.manager.deleteTreeNode(className='DBTestObject', nodePolariId=instances[2].id)
+        self.assertEqual(self.manager.persistChanges(), (1, 1))
+        (columnNames, rows) = self.db.getAllInTable('DBTestObject')
+        savedValues = {row[columnNames.index('id')]: row[columnNames.index('value')] for row in rows}
+        self.assertEqual(len(savedValues), 4)
+        self.assertEqual(savedValues[instances[1].id], 100)
+        self.assertNotIn(instances[2].id, savedValues)
+
+    def test_04_columns_read_in_one_row_order(self):
+        """Every column is read in the same row order, even when an index orders the id column"""
+        with dbConnectionPool.transaction(self.db.getDBFilePath()) as conn:
+            conn.executemany('INSERT INTO DBTestObject (id, name, value) VALUES (?, ?, 0)', [(rowId, 'n-' + rowId) for rowId in ('zzz', 'aaa', 'mmm')])
+        columnData = {colName: [value for valueChunk in valueChunks for value in valueChunk]
+                      for colName, valueChunks in self.db.iterateTableColumns('DBTestObject', ['id', 'name'], chunkSize=2)}
+        self.assertEqual(['n-' + instanceId for instanceId in columnData['id']], columnData['name'])
+
+    def test_05_table_queries_run_in_sqlite(self):
+        """Projection, filters, sort and cursor pages of a table query are read by SQLite"""
+        instances = [DBTestObject(name='inst' + str(i), value=i % 4 if i % 5 else None, manager=self.manager) for i in range(12)]
+        self.db.saveInstancesInDB(instances)
+        queryable = ['id', 'name', 'value', 'tags']
+        query = parseTableQuery(SimpleNamespace(params={'fields': 'name', 'value__gte': '2'}), queryable)
+        (queryClause, parameters) = buildQueryClause(query)
+        (columnNames, rowIterator) = self.db.iterateTableRows('DBTestObject', chunkSize=2, columnNames=query['fields'],
+                                                             queryClause=queryClause, parameters=parameters)
+        self.assertEqual(columnNames, ['id', 'name'])
+        self.assertEqual(sorted(row[1] for row in rowIterator), sorted(inst.name for inst in instances if inst.value is not None and inst.value >= 2))
+        columnData = {colName: [value for valueChunk in valueChunks for value in valueChunk]
+                      for colName, valueChunks in self.db.iterateTableColumns('DBTestObject', ['name'], chunkSize=3,
+                                                                                queryClause=queryClause, parameters=parameters)}
+        self.assertEqual(len(columnData['name']), 5)
+        # Columns read for a query without filters or sort still describe the same rows
+        query = parseTableQuery(SimpleNamespace(params={'fields': 'name,value'}), queryable)
+        (queryClause, parameters) = buildQueryClause(query)
+        columnData = {colName: [value for valueChunk in valueChunks for value in valueChunk]
+                      for colName, valueChunks in self.db.iterateTableColumns('DBTestObject', query['fields'], chunkSize=3,
+                                                                                queryClause=queryClause, parameters=parameters)}
+        self.assertEqual(len(columnData['id']), 12)
+        instancesById = {inst.id: inst for inst in instances}
+        self.assertEqual([instancesById[instanceId].name for instanceId in columnData['id']], columnData['name'])
+        self.assertEqual([instancesById[instanceId].value for instanceId in columnData['id']], columnData['value'])
+        # Cursor pages over a sort with ties and NULLs return every row once, in sort order
+        for sortSpec in ('value', '-value'):
+            params = {'sort': sortSpec, 'limit': '5', 'fields': 'value'}
+            pagedRows = []
+            while True:
+                query = parseTableQuery(SimpleNamespace(params=params), queryable)
+                (columnNames, pageRows, nextCursor) = readTablePage(self.db, 'DBTestObject', query['fields'], query)
+                pagedRows += pageRows
+                if nextCursor is None:
+                    break
+                params = dict(params, cursor=nextCursor)
+            self.assertEqual(sorted(row[0] for row in pagedRows), sorted(inst.id for inst in instances))
+            values = [row[1] for row in pagedRows]
+            expected = sorted(values, key=lambda value: (value is not None, value if value is not None else 0))
+            self.assertEqual(values, expected[::-1] if sortSpec.startswith('-') else expected)
+        with self.assertRaises(ValueError):
+            parseTableQuery(SimpleNamespace(params={'sort': 'secret'}), queryable)
+        with self.assertRaises(ValueError):
+            parseTableQuery(SimpleNamespace(params={'sort': 'name', 'cursor': params['cursor']}), queryable)
+
+
+
+class LazyRestoreTestCase(unittest.TestCase):
+    """Test case for restoring a manager from an existing database"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        sourceManager = managerObject()
+        sourceManager.getObjectTyping(classObj=DBTestObject)
+        sourceDB = managedDatabase(name='restoreTest', manager=sourceManager, tables=[])
+        sourceDB.manager = sourceManager
+        sourceDB.Path = self.tempDir
+        sourceDB.getConnection()
+        sourceDB.makeSQLiteTable(tableName='DBTestObject', rowList=['id TEXT PRIMARY KEY', 'name TEXT', 'value INTEGER', 'tags TEXT'])
+        self.sourceInstances = [DBTestObject(name='inst' + str(i), value=i, manager=sourceManager) for i in range(3)]
+        sourceDB.saveInstancesInDB(self.sourceInstances)
+        self.dbFilePath = sourceDB.getDBFilePath()
+        self.manager = managerObject()
+        self.manager.getObjectTyping(classObj=DBTestObject)
+
+    def tearDown(self):
+        dbConnectionPool.closeConnections(self.dbFilePath)
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_01_lazy_restore_hydrates_on_access(self):
+        """Lazily restored instances are stubs until an attribute is read"""
+        self.manager.restoreFromDatabase('restoreTest', self.tempDir, lazy=True)
+        self.assertEqual(self.manager.bootRestoreProfile['lazyStubs'], 3)
+        sourceInstance = self.sourceInstances[1]
+        stub = self.manager.objectTables['DBTestObject'][sourceInstance.id]
+        self.assertNotIn('name', stub.__dict__)
+        self.assertEqual(stub.name, 'inst1')
+        self.assertEqual(stub.value, 1)
+        self.assertNotIn(sourceInstance.id, self.manager.unhydratedInstances.get('DBTestObject', {}))
+        # Queries build the remaining stubs before comparing values.
+        matches = self.manager.getListOfInstancesByAttributes(className='DBTestObject', attributeQueryDict={'id': self.sourceInstances[2].id})
+        self.assertEqual(list(matches.keys()), [self.sourceInstances[2].id])
+        self.assertEqual(self.manager.unhydratedInstances, {})
+
+    def test_02_eager_restore_builds_instances(self):
+        """Eagerly restored instances are built with their stored values at restore"""
+        self.manager.restoreFromDatabase('restoreTest', self.tempDir, lazy=False)
+        self.assertEqual(self.manager.bootRestoreProfile['instancesBuilt'], 3)
+        restored = self.manager.objectTables['DBTestObject'][self.sourceInstances[0].id]
+        self.assertEqual(restored.__dict__['name'], 'inst0')
+        self.assertEqual(self.manager.unhydratedInstances, {})
+
+    def test_03_seed_rows_matched_by_fingerprint(self):
+        """Rows with the same content as a runtime instance are skipped and recorded as seeds"""
+        seedInstance = DBTestObject(name='inst0', value=0, manager=self.manager)
+        self.manager.restoreFromDatabase('restoreTest', self.tempDir, lazy=True)
+        self.assertNotIn(self.sourceInstances[0].id, self.manager.objectTables['DBTestObject'])
+        self.assertIn(self.sourceInstances[1].id, self.manager.objectTables['DBTestObject'])
+        # This boot's seed is recorded, so the next boot recognizes its row by id.
+        self.assertIn(seedInstance.id, self.manager.loadRecordedSeedIds()['DBTestObject'])
+
+    def test_05_concurrent_reads_of_a_stub(self):
+        """Threads reading a stub while another thread hydrates it all get the stored value"""
+        self.manager.restoreFromDatabase('restoreTest', self.tempDir, lazy=True)
+        stub = self.manager.objectTables['DBTestObject'][self.sourceInstances[1].id]
+        buildRestoredInstance = self.manager.buildRestoredInstance
+        def slowBuild(*args, **kwargs):
+            time.sleep(0.05)
+            return buildRestoredInstance(*args, **kwargs)
+        self.manager.__dict__['buildRestoredInstance'] = slowBuild
+        startBarrier = threading.Barrier(4)
+        readValues = []
+        def readName():
+            startBarrier.wait()
+            try:
+                readValues.append(stub.name)
+            except AttributeError as err:
+                readValues.append(err)
+        readers = [threading.Thread(target=readName) for readerIndex in range(4)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(readValues, ['inst1'] * 4)
+
+    def test_06_edited_seed_rows_are_restored(self):
+        """A recorded seed's row edited since the boot that seeded it is restored, not replaced"""
+        seedInstance = DBTestObject(name='seeded', value=7, manager=self.manager)
+        self.manager.restoreFromDatabase('restoreTest', self.tempDir, lazy=True)
+        # The seed is persisted, then renamed at runtime and persisted again.
+        with dbConnectionPool.transaction(self.dbFilePath) as conn:
+            conn.execute("INSERT INTO DBTestObject (id, name, value) VALUES (?, 'renamed', 7)", (seedInstance.id,))
+        rebootedManager = managerObject()
+        rebootedManager.getObjectTyping(classObj=DBTestObject)
+        DBTestObject(name='seeded', value=7, manager=rebootedManager)
+        rebootedManager.restoreFromDatabase('restoreTest', self.tempDir, lazy=True)
+        self.assertIn(seedInstance.id, rebootedManager.objectTables['DBTestObject'])
+        self.assertEqual(rebootedManager.objectTables['DBTestObject'][seedInstance.id].name, 'renamed')
+        self.assertNotIn(seedInstance.id, rebootedManager.deletedInstanceIds.get('DBTestObject', {}))
+
+    def test_04_write_to_stub_before_read_is_kept(self):
+        """Setting an attribute of a stub hydrates it first, so the row does not overwrite the write"""
+        self.manager.restoreFromDatabase('restoreTest', self.tempDir, lazy=True)
+        (firstId, secondId) = (self.sourceInstances[1].id, self.sourceInstances[2].id)
+        stub = self.manager.objectTables['DBTestObject'][firstId]
+        stub.name = 'renamed'
+        self.assertEqual(stub.value, 1)
+        self.assertEqual(stub.name, 'renamed')
+        # With dirty tracking on the write is also kept for the next persist.
+        self.manager.dirtyTracking = True
+        stub = self.manager.objectTables['DBTestObject'][secondId]
+        stub.name = 'renamedToo'
+        self.assertEqual(stub.value, 2)
+        self.assertEqual(stub.name, 'renamedToo')
+        self.assertIn(secondId, self.manager.dirtyInstances.get('DBTestObject', {}))
+
+if __name__ == '__main__':
+    unittest.main()
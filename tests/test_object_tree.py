@@ -0,0 +1,250 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for the managerObject's object tree, covering the indexed path lookups
+and the tree mutations which must keep the index in sync with the tree.
+"""
+
+import unittest
+import json
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from objectTreeManagerDecorators import managerObject
+from objectTreeDecorators import treeObject, treeObjectInit
+
+
+class TreeTestObject(treeObject):
+    """Simple object used to build object trees"""
+    @treeObjectInit
+    def __init__(self, name="", value=0):
+        self.name = name
+        self.value = value
+
+
+class ObjectTreeIndexTestCase(unittest.TestCase):
+    """Test case for the objectTree path index"""
+
+    def setUp(self):
+        self.manager = managerObject()
+        self.manager.getObjectTyping(classObj=TreeTestObject)
+        self.baseTuple = list(self.manager.objectTree.keys())[0]
+        self.instA = TreeTestObject(name="a", manager=self.manager)
+        self.instB = TreeTestObject(name="b", manager=self.manager)
+        self.instC = TreeTestObject(name="c", manager=self.manager)
+        self.tupA = self.manager.getInstanceTuple(self.instA)
+        self.tupB = self.manager.getInstanceTuple(self.instB)
+        self.tupC = self.manager.getInstanceTuple(self.instC)
+        # base -> a -> b, base -> c -> (duplicate of b)
+        self.manager.addNewBranch(traversalList=[self.baseTuple], branchTuple=self.tupA)
+        self.manager.addNewBranch(traversalList=[self.baseTuple, self.tupA], branchTuple=self.tupB)
+        self.manager.addNewBranch(traversalList=[self.baseTuple], branchTuple=self.tupC)
+        duplicateTuple = (self.tupB[0], self.tupB[1], tuple([self.baseTuple, self.tupA, self.tupB]))
+        self.manager.addDuplicateBranch(traversalList=[self.baseTuple, self.tupC], branchTuple=duplicateTuple)
+
+    def test_01_indexed_path_matches_tree_search(self):
+        """Index lookups return the same paths a full tree search does"""
+        for instTuple in [self.baseTuple, self.tupA, self.tupB, self.tupC]:
+            self.assertEqual(self.manager.getTuplePathInObjTree(instTuple), self.manager.searchTuplePathInObjTree(instTuple))
+        self.assertEqual(self.manager.getTuplePathInObjTree(self.tupB), [self.baseTuple, self.tupA, self.tupB])
+
+    def test_02_all_paths_include_duplicates(self):
+        """All paths for a tuple include the main node and each duplicate node"""
+        allPaths = self.manager.getAllPathsForTupleInObjTree(self.tupB)
+        self.assertEqual(len(allPaths), 2)
+        self.assertIn([self.baseTuple, self.tupA, self.tupB], allPaths)
+        # Repeated calls must not accumulate paths from earlier calls.
+        self.assertEqual(len(self.manager.getAllPathsForTupleInObjTree(self.tupB)), 2)
+
+    def test_03_delete_migrates_and_unindexes(self):
+        """Deleting a node migrates sub-nodes which have a duplicate elsewhere"""
+        (deleted, migrated) = self.manager.deleteTreeNode(className='TreeTestObject', nodePolariId=self.instA.id)
+        self.assertIn(self.instA.id, deleted)
+        self.assertIn(self.instB.id, migrated)
+        self.assertNotIn(self.instA.id, self.manager.objectTables['TreeTestObject'])
+        self.assertIsNone(self.manager.getTuplePathInObjTree(self.tupA))
+        self.assertEqual(self.manager.getTuplePathInObjTree(self.tupB), [self.baseTuple, self.tupC, self.tupB])
+        self.assertEqual(self.manager.searchTuplePathInObjTree(self.tupB), [self.baseTuple, self.tupC, self.tupB])
+
+    def test_04_rebuild_index(self):
+        """Rebuilding the index from the tree gives the same lookups"""
+        expectedPaths = [self.manager.getTuplePathInObjTree(t) for t in [self.tupA, self.tupB, self.tupC]]
+        self.manager.rebuildObjectTreeIndex()
+        self.assertEqual([self.manager.getTuplePathInObjTree(t) for t in [self.tupA, self.tupB, self.tupC]], expectedPaths)
+
+    def test_05_class_registry_listings(self):
+        """Class and depth listings come from the registry and follow tree changes"""
+        self.assertEqual(len(self.manager.getListOfClassInstances('TreeTestObject')), 3)
+        self.assertEqual(self.manager.getClassInstanceCount('TreeTestObject'), 3)
+        self.assertIn(self.instB, self.manager.getListOfInstancesAtDepth(target_depth=2))
+        self.assertNotIn(self.instA, self.manager.getListOfInstancesAtDepth(target_depth=2))
+        self.assertCountEqual(self.manager.getListOfClassInstances('TreeTestObject'), self.manager.searchListOfClassInstances('TreeTestObject'))
+        self.manager.deleteTreeNode(className='TreeTestObject', nodePolariId=self.instA.id)
+        self.assertEqual(self.manager.getClassInstanceCount('TreeTestObject'), 2)
+        self.assertNotIn(self.instA, self.manager.getListOfClassInstances('TreeTestObject'))
+        # b was migrated under c, which keeps it at depth 2.
+        self.assertIn(self.instB, self.manager.getListOfInstancesAtDepth(target_depth=2))
+        self.manager.purgeObjectType('TreeTestObject')
+        self.assertEqual(self.manager.getListOfClassInstances('TreeTestObject'), [])
+
+    def test_06_typing_registry(self):
+        """Typing lookups by name, class and instance resolve to the registered typing"""
+        typing = self.manager.objectTypingDict['TreeTestObject']
+        self.assertIs(self.manager.getObjectTyping(className='TreeTestObject'), typing)
+        self.assertIs(self.manager.getObjectTyping(classObj=TreeTestObject), typing)
+        self.assertIs(self.manager.getObjectTyping(classInstance=self.instA), typing)
+        self.assertIs(self.manager.objectTypingClassDict[TreeTestObject], typing)
+        self.manager.purgeObjectType('TreeTestObject')
+        self.assertNotIn(TreeTestObject, self.manager.objectTypingClassDict)
+        self.assertIsNone(self.manager.getRegisteredObjectTyping(classObj=TreeTestObject))
+        # The manager's locks and counters are runtime state, never typed as variables or classes
+        managerTyping = self.manager.objectTypingDict['managerObject']
+        self.assertFalse(managerObject.untypedVars & set(managerTyping.polyTypedVarsDict))
+        self.assertFalse({'lock', 'RLock', 'count'} & set(self.manager.objectTypingDict))
+
+    def test_07_batch_mode_defers_wiring(self):
+        """Objects created in batchMode are placed in the tree when the batch ends"""
+        with self.manager.batchMode():
+            parent = TreeTestObject(name="parent", manager=self.manager, branch=self.manager)
+            child = TreeTestObject(name="child", manager=self.manager, branch=parent)
+            # Nothing is wired into the tree until the batch ends.
+            self.assertIsNone(self.manager.getTuplePathInObjTree(self.manager.getInstanceTuple(parent)))
+            self.assertIn(child.id, self.manager.objectTables['TreeTestObject'])
+        parentPath = self.manager.getTuplePathInObjTree(self.manager.getInstanceTuple(parent))
+        childPath = self.manager.getTuplePathInObjTree(self.manager.getInstanceTuple(child))
+        self.assertEqual(parentPath, [self.baseTuple, self.manager.getInstanceTuple(parent)])
+        self.assertEqual(childPath, parentPath + [self.manager.getInstanceTuple(child)])
+        self.assertEqual(self.manager.batchPendingWiring, {})
+
+
+class AttributeQueryTestCase(unittest.TestCase):
+    """Test case for attribute queries and the secondary indexes they use"""
+
+    def setUp(self):
+        self.manager = managerObject()
+        self.manager.getObjectTyping(classObj=TreeTestObject)
+        self.instances = [TreeTestObject(name="inst" + str(i % 3), value=i, manager=self.manager) for i in range(12)]
+
+    def queryIds(self, attributeQuery):
+        return set(self.manager.getListOfInstancesByAttributes(className='TreeTestObject', attributeQueryDict=attributeQuery))
+
+    def test_01_indexed_queries_match_scans(self):
+        """Queries give the same instances with and without indexes on the queried attributes"""
+        queries = [
+            {'name': 'inst1'},
+            {'name': {'IN': ['inst0', 'inst2']}, 'value': {'GTE': 6}},
+            {'value': {'GT': 3, 'LTE': 7}},
+            {'name': {'CONTAINS': '2'}, 'value': {'LT': 5}},
+            [('AND', {'name': 'inst0'}), ('OR', [('OR', {'value': 0}), ('OR', {'value': {'GT': 10}})])]
+        ]
+        scanned = [self.queryIds(query) for query in queries]
+        self.assertEqual(scanned[0], {inst.id for inst in self.instances if inst.name == 'inst1'})
+        self.assertEqual(scanned[2], {inst.id for inst in self.instances[4:8]})
+        self.assertEqual(scanned[4], {self.instances[0].id})
+        self.manager.createAttributeIndex('TreeTestObject', 'name')
+        self.manager.createAttributeIndex('TreeTestObject', 'value', indexType='sorted')
+        self.assertEqual([self.queryIds(query) for query in queries], scanned)
+        # Queries return new dicts, leaving the objectTables untouched.
+        self.assertEqual(len(self.manager.objectTables['TreeTestObject']), 12)
+
+    def test_02_indexes_follow_changes(self):
+        """Indexes pick up new values and forget deleted instances"""
+        self.manager.createAttributeIndex('TreeTestObject', 'value', indexType='sorted')
+        self.instances[0].value = 100
+        self.assertEqual(self.queryIds({'value': {'GT': 50}}), {self.instances[0].id})
+        self.assertEqual(self.queryIds({'value': 0}), set())
+        added = TreeTestObject(name="added", value=200, manager=self.manager)
+        self.assertEqual(self.queryIds({'value': {'GTE': 100}}), {self.instances[0].id, added.id})
+        self.manager.deleteTreeNode(className='TreeTestObject', nodePolariId=added.id)
+        self.assertEqual(self.queryIds({'value': {'GTE': 100}}), {self.instances[0].id})
+
+
+class ObjectTreeQueryTestCase(unittest.TestCase):
+    """Test case for the compiled queryObjectTree language"""
+
+    def setUp(self):
+        self.manager = managerObject()
+        self.manager.getObjectTyping(classObj=TreeTestObject)
+        baseTuple = list(self.manager.objectTree.keys())[0]
+        self.parent = TreeTestObject(name="parent", value=10, manager=self.manager)
+        self.child = TreeTestObject(name="child", value=3, manager=self.manager)
+        self.other = TreeTestObject(name="other", value=7, manager=self.manager)
+        self.referrer = TreeTestObject(name="referrer", value=[self.child], manager=self.manager)
+        parentTuple = self.manager.getInstanceTuple(self.parent)
+        self.manager.addNewBranch(traversalList=[baseTuple], branchTuple=parentTuple)
+        self.manager.addNewBranch(traversalList=[baseTuple, parentTuple], branchTuple=self.manager.getInstanceTuple(self.child))
+
+    def queryNames(self, queryString):
+        return sorted(instance.name for instance in self.manager.queryObjectTree(queryString).values())
+
+    def test_01_conditions_and_aggregates(self):
+        """WITH conditions filter instances and SELECT aggregates summarize them"""
+        self.assertEqual(self.queryNames("[SELECT * FROM TreeTestObject WITH { name:(%t%), value:(>5) }]"), ['other', 'parent'])
+        self.assertEqual(self.queryNames("[SELECT * FROM TreeTestObject WITH { value:(<100, max) }]"), ['parent'])
+        self.assertEqual(self.queryNames("[SELECT * FROM TreeTestObject WITH { value:( contains[ TreeTestObject WITH { name:('child') } ] ) }]"), ['referrer'])
+        aggregates = self.manager.queryObjectTree("[select count(*), sum(value) from TreeTestObject with { value:(!=10, <= 7) }]")
+        self.assertEqual(aggregates, {'count(*)': 2, 'sum(value)': 10})
+        projected = self.manager.queryObjectTree("[SELECT name FROM TreeTestObject WITH { value:(==3) }]")
+        self.assertEqual(projected, {self.child.id: {'name': 'child'}})
+
+    def test_02_tree_relations_and_plan_cache(self):
+        """WHERE relations follow the object tree and each query is compiled only once"""
+        queryString = "[SELECT * FROM TreeTestObject WHERE hasChildren:[ TreeTestObject WITH { name:(child) } ]]"
+        self.assertEqual(self.queryNames(queryString), ['parent'])
+        plan = self.manager.compiledQueryCache[queryString]
+        self.assertEqual(self.queryNames(queryString), ['parent'])
+        self.assertIs(self.manager.compiledQueryCache[queryString], plan)
+        self.assertEqual(self.queryNames("[SELECT * FROM TreeTestObject WHERE hasParents:[ TreeTestObject ]]"), ['child'])
+        with self.assertRaises(ValueError):
+            self.manager.queryObjectTree("[SELECT * FROM TreeTestObject WITH { name:(==) }]")
+
+
+class ClassSerializerTestCase(unittest.TestCase):
+    """Test case for the per-class serializers behind getJSONdictForClass"""
+
+    def setUp(self):
+        self.manager = managerObject()
+        self.manager.getObjectTyping(classObj=TreeTestObject)
+        self.plain = TreeTestObject(name="plain", value=[1, "two", None], manager=self.manager)
+        self.bytesValue = TreeTestObject(name=b"bytes", value={"key": 1}, manager=self.manager)
+        self.referrer = TreeTestObject(name="referrer", value=self.plain, manager=self.manager)
+
+    def test_01_matches_instance_conversion(self):
+        """Serialized instances match getJSONclassInstance, and the bytes decode to the same data"""
+        instances = [self.plain, self.bytesValue, self.referrer]
+        data = self.manager.getJSONdictForClass(passedInstances=instances)[0]['data']
+        for instance, instanceData in zip(instances, data):
+            expected = self.manager.getJSONclassInstance(instance, {'id': None, 'name': None, 'value': None})
+            self.assertEqual(instanceData, expected)
+        self.assertEqual(json.loads(self.manager.getJSONbytesForClass(passedInstances=instances)), json.loads(json.dumps(self.manager.getJSONdictForClass(passedInstances=instances))))
+        projected = self.manager.getJSONdictForClass(passedInstances=[self.plain], varsIncluded={'name', 'manager'})
+        self.assertEqual(projected[0]['data'], [{'name': 'plain'}])
+
+    def test_02_rebuilt_for_new_class(self):
+        """A re-defined class gets a new serializer, and invalidation drops the old one"""
+        serializer = self.manager.getClassSerializer(TreeTestObject)
+        self.assertIs(self.manager.getClassSerializer(TreeTestObject), serializer)
+        redefinedClass = type('TreeTestObject', (TreeTestObject,), {})
+        self.assertIsNot(self.manager.getClassSerializer(redefinedClass), serializer)
+        self.manager.invalidateClassSerializer('TreeTestObject')
+        self.assertNotIn('TreeTestObject', self.manager.classSerializers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,465 @@
+#    Copyright (C) 2020  Dustin Etts
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for serving tiles from .mbtiles files through the TileGeneratorAPI.
+"""
+
+import unittest
+import tempfile
+import sqlite3
+import shutil
+import json
+import gzip
+import threading
+import struct
+import time
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from polariApiServer.mbtilesReader import mbtilesReaderRegistry
+from polariApiServer.pmtilesReader import pmtilesReader, localRangeSource, zxyToTileId
+from polariApiServer.tileSourceDefinition import TileSourceDefinition
+from polariApiServer.tileCache import tileLRUCache, ENTRY_OVERHEAD_BYTES, tileCache
+from polariApiServer.tileGeneratorAPI import TileGeneratorAPI
+from polariApiServer.tileJobQueue import tileJobQueue, MAX_JOB_ATTEMPTS
+from polariApiServer.geoJsonDefinition import GeoJsonDefinition
+from polariDBmanagement.sqliteConnectionPool import dbConnectionPool
+from polariDBmanagement.managedDB import managedDatabase
+from objectTreeManagerDecorators import managerObject
+from falcon import testing
+
+# Stands in for tippecanoe, writing the number of features read from stdin to its -o file.
+FAKE_TIPPECANOE = '''#!python3
+import sys, json
+layers = [sys.argv[i + 1].split(':', 1) for i, arg in enumerate(sys.argv) if arg == '-L']
+with open(sys.argv[sys.argv.index('-o') + 1], 'w') as outFile:
+    if layers:
+        json.dump({name: sum(1 for line in open(path) if line.strip()) for name, path in layers}, outFile)
+    else:
+        outFile.write(str(sum(1 for line in sys.stdin if line.strip())))
+'''
+
+
+#Writes an .mbtiles file holding the given tiles, {(z, x, tmsY):tileData}, in the flat
+#'tiles' table schema or tippecanoe's normalized 'map' + 'images' schema.
+def writeMbtiles(filePath, tiles, normalized=False):
+    conn = sqlite3.connect(filePath)
+    if normalized:
+        conn.execute('CREATE TABLE map (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_id TEXT)')
+        conn.execute('CREATE TABLE images (tile_data BLOB, tile_id TEXT)')
+        for (z, x, tmsY), tileData in tiles.items():
+            tileId = f'{z}-{x}-{tmsY}'
+            conn.execute('INSERT INTO map VALUES (?, ?, ?, ?)', (z, x, tmsY, tileId))
+            conn.execute('INSERT INTO images VALUES (?, ?)', (tileData, tileId))
+    else:
+        conn.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)')
+        conn.executemany('INSERT INTO tiles VALUES (?, ?, ?, ?)', [key + (tileData,) for key, tileData in tiles.items()])
+    conn.commit()
+    conn.close()
+
+
+#Encodes unsigned integers as the LEB128 varints of PMTiles directories.
+def encodeVarints(values):
+    encoded = bytearray()
+    for value in values:
+        while value >= 0x80:
+            encoded.append((value & 0x7f) | 0x80)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+
+#Returns a gzipped PMTiles directory of (tileId, offset, length, runLength) entries.
+def encodeDirectory(entries):
+    tileIds = [entry[0] for entry in entries]
+    deltas = [tileIds[0]] + [tileIds[i] - tileIds[i - 1] for i in range(1, len(tileIds))] if tileIds else []
+    return gzip.compress(encodeVarints([len(entries)]) + encodeVarints(deltas) + encodeVarints([entry[3] for entry in entries])
+                         + encodeVarints([entry[2] for entry in entries]) + encodeVarints([entry[1] + 1 for entry in entries]))
+
+
+#Writes a PMTiles archive holding the given tiles, {(z, x, y):tileData} in XYZ rows, with its
+#entries split into leaf directories of leafSize entries when leafSize is given.
+def writePmtiles(filePath, tiles, leafSize=None):
+    entries = []
+    tileData = b''
+    for (tileId, key) in sorted((zxyToTileId(*key), key) for key in tiles):
+        entries.append((tileId, len(tileData), len(tiles[key]), 1))
+        tileData += tiles[key]
+    leafData = b''
+    if leafSize:
+        rootEntries = []
+        for start in range(0, len(entries), leafSize):
+            leaf = encodeDirectory(entries[start:start + leafSize])
+            rootEntries.append((entries[start][0], len(leafData), len(leaf), 0))
+            leafData += leaf
+        root = encodeDirectory(rootEntries)
+    else:
+        root = encodeDirectory(entries)
+    metadata = gzip.compress(b'{"name": "test"}')
+    metadataOffset = 127 + len(root)
+    leafOffset = metadataOffset + len(metadata)
+    tileOffset = leafOffset + len(leafData)
+    header = struct.pack('<7sB11QBBBBBBiiiiBii', b'PMTiles', 3, 127, len(root), metadataOffset, len(metadata),
+                         leafOffset, len(leafData), tileOffset, len(tileData), len(entries), len(entries), len(entries),
+                         1, 2, 2, 1, 0, 14, 0, 0, 0, 0, 0, 0, 0)
+    with open(filePath, 'wb') as archiveFile:
+        archiveFile.write(header + root + metadata + leafData + tileData)
+
+
+class MbtilesReaderTestCase(unittest.TestCase):
+    """Test case for the pooled read-only .mbtiles readers"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.readers = mbtilesReaderRegistry()
+
+    def tearDown(self):
+        self.readers.closeAll()
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_01_reads_both_schemas(self):
+        """Tiles are read from flat and normalized files, with missing tiles as None"""
+        for normalized in (False, True):
+            filePath = os.path.join(self.tempDir, f'schema{int(normalized)}.mbtiles')
+            writeMbtiles(filePath, {(1, 0, 1): b'tileA', (1, 1, 0): b'tileB'}, normalized=normalized)
+            reader = self.readers.getReader(filePath)
+            self.assertEqual(reader.schema, 'normalized' if normalized else 'flat')
+            self.assertEqual(reader.getTile(1, 0, 1), b'tileA')
+            self.assertEqual(reader.getTile(1, 1, 0), b'tileB')
+            self.assertIsNone(reader.getTile(2, 0, 0))
+            self.assertEqual(sorted(reader.getTileRange(1, 0, 1, 0, 1)), [(1, 0, 1, b'tileA'), (1, 1, 0, b'tileB')])
+            self.assertEqual(reader.getTiles([(1, 1, 0), (2, 0, 0)]), [(1, 1, 0, b'tileB')])
+            self.assertIs(self.readers.getReader(filePath), reader)
+
+    def test_02_replaced_file_is_read_after_invalidate(self):
+        """A file replaced by a new download is read once its reader is invalidated"""
+        filePath = os.path.join(self.tempDir, 'replaced.mbtiles')
+        writeMbtiles(filePath, {(0, 0, 0): b'old'})
+        self.assertEqual(self.readers.getReader(filePath).getTile(0, 0, 0), b'old')
+        newFilePath = filePath + '.downloading'
+        writeMbtiles(newFilePath, {(0, 0, 0): b'new'})
+        os.replace(newFilePath, filePath)
+        self.readers.invalidate(filePath)
+        self.assertEqual(self.readers.getReader(filePath).getTile(0, 0, 0), b'new')
+
+    def test_03_unrecognized_schema_raises(self):
+        """A file with neither tile schema raises ValueError"""
+        filePath = os.path.join(self.tempDir, 'other.mbtiles')
+        conn = sqlite3.connect(filePath)
+        conn.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+        conn.commit()
+        conn.close()
+        with self.assertRaises(ValueError):
+            self.readers.getReader(filePath)
+
+
+class PmtilesReaderTestCase(unittest.TestCase):
+    """Test case for reading PMTiles archives by byte ranges"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def test_01_tile_ids_follow_the_hilbert_curve(self):
+        """Tile ids count the lower zoom levels, then follow the Hilbert curve"""
+        self.assertEqual([zxyToTileId(0, 0, 0), zxyToTileId(1, 0, 0), zxyToTileId(1, 0, 1), zxyToTileId(1, 1, 1),
+                          zxyToTileId(1, 1, 0), zxyToTileId(2, 0, 0)], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(zxyToTileId(12, 3423, 1763), 19078479)
+
+    def test_02_reads_root_and_leaf_directories(self):
+        """Tiles are found through the root directory alone and through leaf directories"""
+        tiles = {(z, x, y): f'{z}/{x}/{y}'.encode() for z in range(4) for x in range(1 << z) for y in range(1 << z) if (x + y) % 3}
+        for leafSize in (None, 4):
+            filePath = os.path.join(self.tempDir, f'leaves{leafSize}.pmtiles')
+            writePmtiles(filePath, tiles, leafSize=leafSize)
+            reader = pmtilesReader(localRangeSource(filePath))
+            self.assertEqual(reader.getMetadata(), {'name': 'test'})
+            for (z, x, y), tileData in tiles.items():
+                self.assertEqual(reader.getTile(z, x, (1 << z) - 1 - y), tileData)
+            self.assertIsNone(reader.getTile(1, 0, 1))
+            self.assertIsNone(reader.getTile(9, 0, 0))
+            self.assertIsNone(reader.getTile(1, 2, 0))
+            self.assertIsNone(reader.getTile(1, -1, 0))
+            self.assertEqual(len(reader._directories), 0 if leafSize is None else len(range(0, len(tiles), leafSize)))
+
+    def test_03_other_files_raise(self):
+        """A file that is not a PMTiles archive raises ValueError"""
+        filePath = os.path.join(self.tempDir, 'other.pmtiles')
+        writeMbtiles(filePath, {(0, 0, 0): b'tile'})
+        with self.assertRaises(ValueError):
+            pmtilesReader(localRangeSource(filePath))
+
+
+class TileCacheTestCase(unittest.TestCase):
+    """Test case for the byte-bounded LRU tile cache"""
+
+    def test_01_least_recently_used_tiles_are_evicted(self):
+        """Tiles beyond the byte budget are evicted least recently used first"""
+        cache = tileLRUCache(maxBytes=3 * (100 + ENTRY_OVERHEAD_BYTES))
+        for x in range(3):
+            cache.put('set', 1, x, 0, b'\x89PNG' + bytes(96))
+        self.assertIsNotNone(cache.get('set', 1, 0, 0))
+        cache.put('set', 1, 3, 0, b'\x1f\x8b' + bytes(98))
+        self.assertIsNone(cache.get('set', 1, 1, 0))
+        entry = cache.get('set', 1, 0, 0)
+        self.assertEqual((entry.contentType, entry.contentEncoding), ('image/png', None))
+        self.assertEqual(cache.get('set', 1, 3, 0).contentEncoding, 'gzip')
+        stats = cache.getStats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['entries']), (3, 1, 1, 3))
+        self.assertLessEqual(stats['bytes'], stats['maxBytes'])
+
+    def test_02_tileset_invalidation(self):
+        """Invalidating a tileset drops its tiles, including cached missing tiles, and no others"""
+        cache = tileLRUCache()
+        cache.put('first', 0, 0, 0, b'tile')
+        cache.put('first', 1, 0, 0, None)
+        cache.put('second', 0, 0, 0, b'tile')
+        self.assertIsNone(cache.get('first', 1, 0, 0).tileData)
+        cache.invalidateTileset('first')
+        self.assertIsNone(cache.get('first', 0, 0, 0))
+        self.assertIsNone(cache.get('first', 1, 0, 0))
+        self.assertEqual(cache.get('second', 0, 0, 0).etag, cache.put('other', 0, 0, 0, b'tile').etag)
+
+    def test_03_tiles_read_before_invalidation_are_not_cached(self):
+        """A tile read before its tileset was invalidated is returned but not cached"""
+        cache = tileLRUCache()
+        generation = cache.getGeneration('set')
+        cache.invalidateTileset('set')
+        self.assertEqual(cache.put('set', 0, 0, 0, b'stale', generation).tileData, b'stale')
+        self.assertIsNone(cache.get('set', 0, 0, 0))
+        cache.put('set', 0, 0, 0, b'fresh', cache.getGeneration('set'))
+        self.assertEqual(cache.get('set', 0, 0, 0).tileData, b'fresh')
+
+
+class TileEndpointTestCase(unittest.TestCase):
+    """Test case for tiles served through the /tiles endpoint"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tempDir = tempfile.mkdtemp()
+        cls.manager = managerObject(hasServer=True)
+        cls.client = testing.TestClient(cls.manager.polServer.falconServer)
+        cls.tileAPI = [api for api in cls.manager.polServer.customAPIsList if isinstance(api, TileGeneratorAPI)][0]
+        cls.filePath = os.path.join(cls.tempDir, 'endpointTiles.mbtiles')
+        # Tile (z=1, x=0, y=0) is stored at TMS row 1
+        writeMbtiles(cls.filePath, {(1, 0, 1): b'\x1f\x8b' + bytes(20)})
+        cls.tileAPI._mbtiles_cache['endpointTiles'] = cls.filePath
+        cls.archivePath = os.path.join(cls.tempDir, 'archiveTiles.pmtiles')
+        writePmtiles(cls.archivePath, {(1, 0, 0): b'\x1f\x8b' + bytes(30), (1, 1, 1): b'\x1f\x8b' + bytes(40)})
+        cls.archiveDefinition = TileSourceDefinition(name='archiveTiles', definition=json.dumps({'filePath': cls.archivePath}), manager=cls.manager)
+        cls.manager.objectTables.setdefault('TileSourceDefinition', {})[cls.archiveDefinition.id] = cls.archiveDefinition
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tileAPI._forget_tileset('endpointTiles')
+        cls.tileAPI._forget_tileset('archiveTiles')
+        cls.manager.objectTables['TileSourceDefinition'].pop(cls.archiveDefinition.id, None)
+        shutil.rmtree(cls.tempDir, ignore_errors=True)
+
+    def test_01_cached_tiles_and_conditional_requests(self):
+        """Tiles carry caching headers, repeat requests hit the cache and matching ETags get 304"""
+        hitsBefore = tileCache.getStats()['hits']
+        result = self.client.simulate_get('/tiles/endpointTiles/1/0/0.pbf')
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.headers.get('Content-Encoding'), 'gzip')
+        self.assertIn('max-age', result.headers.get('Cache-Control'))
+        etag = result.headers.get('ETag')
+        notModified = self.client.simulate_get('/tiles/endpointTiles/1/0/0.pbf', headers={'If-None-Match': etag})
+        self.assertEqual(notModified.status_code, 304)
+        self.assertEqual(self.client.simulate_get('/tiles/endpointTiles/1/1/1.pbf').status_code, 204)
+        stats = self.client.simulate_get('/tile-generator/tile-cache').json['cache']
+        self.assertEqual(stats['hits'] - hitsBefore, 1)
+
+    def test_02_tile_batches(self):
+        """A range, with the tiles under it, or a list of tiles is served in one response"""
+        result = self.client.simulate_get('/tiles/endpointTiles/batch', params={'z': 0, 'minX': 0, 'maxX': 0, 'minY': 0, 'maxY': 0, 'maxZ': 1})
+        self.assertEqual(result.status_code, 200)
+        tiles = []
+        offset = 0
+        while offset < len(result.content):
+            (z, x, y, length) = struct.unpack_from('>BIII', result.content, offset)
+            offset += 13
+            tiles.append(((z, x, y), result.content[offset:offset + length]))
+            offset += length
+        self.assertEqual([key for key, tileData in tiles], [(0, 0, 0), (1, 0, 0), (1, 1, 0), (1, 0, 1), (1, 1, 1)])
+        self.assertEqual([key for key, tileData in tiles if tileData], [(1, 0, 0)])
+        listed = self.client.simulate_post('/tiles/endpointTiles/batch', json={'tiles': [[1, 0, 0], [1, 0, 1]], 'format': 'multipart'})
+        self.assertTrue(listed.headers['Content-Type'].startswith('multipart/mixed'))
+        self.assertEqual(listed.content.count(b'Content-Location: /tiles/endpointTiles/'), 2)
+        self.assertEqual(listed.content.count(b'Content-Encoding: gzip'), 1)
+        tooMany = self.client.simulate_get('/tiles/endpointTiles/batch', params={'z': 10, 'minX': 0, 'maxX': 99, 'minY': 0, 'maxY': 99})
+        self.assertEqual(tooMany.status_code, 400)
+
+    def test_03_pmtiles_archives_are_served_in_place(self):
+        """A tileset defined by a local .pmtiles archive is served from it without a download"""
+        result = self.client.simulate_get('/tiles/archiveTiles/1/1/1.pbf')
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.content, b'\x1f\x8b' + bytes(40))
+        self.assertEqual(result.headers.get('Content-Encoding'), 'gzip')
+        self.assertEqual(self.client.simulate_get('/tiles/archiveTiles/1/0/1.pbf').status_code, 204)
+        self.assertEqual(self.client.simulate_get('/tiles/archiveTiles/1/5/0.pbf').status_code, 204)
+        self.assertNotIn('archiveTiles', self.tileAPI._mbtiles_cache)
+        self.assertEqual(self.client.simulate_get('/tiles/unknownTiles/0/0/0.pbf').status_code, 404)
+
+
+class TileGenerationTestCase(unittest.TestCase):
+    """Test case for generation jobs streaming features into tippecanoe"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        binDir = os.path.join(self.tempDir, 'bin')
+        os.makedirs(binDir)
+        with open(os.path.join(binDir, 'tippecanoe'), 'w') as scriptFile:
+            scriptFile.write(FAKE_TIPPECANOE.replace('python3', sys.executable, 1))
+        os.chmod(os.path.join(binDir, 'tippecanoe'), 0o755)
+        self.originalPath = os.environ.get('PATH', '')
+        os.environ['PATH'] = binDir + os.pathsep + self.originalPath
+        self.manager = managerObject()
+        self.db = managedDatabase(name='tileGenTest', manager=self.manager, tables=[])
+        self.db.manager = self.manager
+        self.db.Path = self.tempDir
+        # Opening the pooled connection creates the database file.
+        self.db.getConnection()
+        self.db.makeSQLiteTable(tableName='Place', rowList=['id TEXT PRIMARY KEY', 'lat REAL', 'lng REAL'])
+        with dbConnectionPool.transaction(self.db.getDBFilePath()) as conn:
+            conn.executemany('INSERT INTO Place VALUES (?, ?, ?)', [('p' + str(i), i % 90, None if i % 10 == 0 else i % 180) for i in range(2500)])
+        self.manager.db = self.db
+        geoDef = GeoJsonDefinition(name='places', source_class='Place', manager=self.manager,
+                                   definition=json.dumps({'coordinateMode': 'separate', 'latitudeVariable': 'lat', 'longitudeVariable': 'lng'}))
+        self.manager.objectTables.setdefault('GeoJsonDefinition', {})[geoDef.id] = geoDef
+        self.tileAPI = TileGeneratorAPI(polServer=None, manager=self.manager)
+
+    def tearDown(self):
+        os.environ['PATH'] = self.originalPath
+        dbConnectionPool.closeConnections(self.db.getDBFilePath())
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def runJob(self, sources):
+        job = {"id": 'job', "name": 'places', "request": {"sources": sources, "outputMode": 'download'}}
+        self.tileAPI._run_generation_job(job)
+        return job
+
+    def test_01_rows_are_streamed_into_tippecanoe(self):
+        """Every row with coordinates reaches tippecanoe as one feature per line"""
+        job = self.runJob([{'type': 'class', 'className': 'Place'}])
+        self.assertEqual(job['status'], 'completed', job.get('error'))
+        self.assertEqual(job['featuresWritten'], 2250)
+        self.assertEqual((job['stage'], job['percent']), ('done', 100))
+        with open(job['outputPath']) as outFile:
+            self.assertEqual(outFile.read(), '2250')
+
+    def test_02_job_without_features_fails(self):
+        """A job whose sources have no features fails without starting tippecanoe"""
+        job = self.runJob([{'type': 'class', 'className': 'Missing'}])
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], 'No valid GeoJSON data found from any source')
+
+    def test_03_sources_are_gathered_into_layers(self):
+        """Several sources are gathered into a named layer each, and sources without data are left out"""
+        job = self.runJob([{'type': 'class', 'className': 'Place'},
+                           {'type': 'class', 'className': 'Missing'},
+                           {'type': 'class', 'className': 'Place', 'layerName': 'place copy'}])
+        self.assertEqual(job['status'], 'completed', job.get('error'))
+        self.assertEqual(job['featuresWritten'], 4500)
+        with open(job['outputPath']) as outFile:
+            self.assertEqual(json.load(outFile), {'Place': 2250, 'place_copy': 2250})
+
+
+class TileJobQueueTestCase(unittest.TestCase):
+    """Test case for the persistent tile generation job queue"""
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.dbFilePath = os.path.join(self.tempDir, 'tile_jobs.db')
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        dbConnectionPool.closeConnections(self.dbFilePath)
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    #Runs until released, then completes unless cancelled.
+    def blockingRunner(self, jobQueue):
+        def runJob(job):
+            jobQueue.reportProgress(job, stage='gathering', percent=10)
+            while not self.release.wait(0.01):
+                jobQueue.checkCancelled(job)
+            job['status'] = 'completed'
+        return runJob
+
+    def waitForStatus(self, jobQueue, jobId, status, stage=None):
+        for attempt in range(500):
+            job = jobQueue.getJob(jobId)
+            if job['status'] == status and stage in (None, job['stage']):
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {jobId} never reached {status}, last {job['status']}")
+
+    def test_01_bounded_workers_and_cancellation(self):
+        """Jobs beyond the worker count wait, and pending or running jobs can be cancelled"""
+        jobQueue = tileJobQueue(self.dbFilePath, workerCount=1)
+        jobQueue.runJob = self.blockingRunner(jobQueue)
+        for jobId in ('first', 'second', 'third'):
+            jobQueue.submit({"id": jobId, "name": jobId, "request": {}})
+        running = self.waitForStatus(jobQueue, 'first', 'running', stage='gathering')
+        self.assertEqual(running['percent'], 10)
+        self.assertEqual(jobQueue.getJob('second')['status'], 'pending')
+        self.assertEqual(jobQueue.cancel('second')['status'], 'cancelled')
+        jobQueue.cancel('first')
+        self.waitForStatus(jobQueue, 'first', 'cancelled')
+        self.waitForStatus(jobQueue, 'third', 'running')
+        self.release.set()
+        self.waitForStatus(jobQueue, 'third', 'completed')
+        self.assertEqual([job['id'] for job in jobQueue.listJobs()], ['third', 'second', 'first'])
+
+    def test_02_interrupted_jobs_are_recovered(self):
+        """Jobs left running by a stopped server are queued again, up to MAX_JOB_ATTEMPTS starts"""
+        stoppedQueue = tileJobQueue(self.dbFilePath, workerCount=1)
+        for (jobId, attempts) in (('resumed', 1), ('abandoned', MAX_JOB_ATTEMPTS)):
+            stoppedQueue._saveJob({"id": jobId, "name": jobId, "request": {}, "status": "running", "createdAt": time.time(), "attempts": attempts})
+        bootQueue = tileJobQueue(self.dbFilePath, workerCount=1)
+        bootQueue.runJob = self.blockingRunner(bootQueue)
+        self.assertEqual(bootQueue.recoverJobs(), ['resumed'])
+        self.assertEqual(bootQueue.getJob('abandoned')['status'], 'interrupted')
+        self.release.set()
+        self.waitForStatus(bootQueue, 'resumed', 'completed')
+
+    def test_03_cancelled_jobs_are_never_started(self):
+        """A job reported cancelled while workers pick jobs up is never run"""
+        jobQueue = tileJobQueue(self.dbFilePath, workerCount=4)
+        startedIds = []
+        def runJob(job):
+            startedIds.append(job['id'])
+            job['status'] = 'completed'
+        jobQueue.runJob = runJob
+        cancelledIds = []
+        for jobIndex in range(60):
+            jobId = 'job' + str(jobIndex)
+            jobQueue.submit({"id": jobId, "name": jobId, "request": {}})
+            if jobQueue.cancel(jobId)['status'] == 'cancelled':
+                cancelledIds.append(jobId)
+        for jobIndex in range(60):
+            self.waitForStatus(jobQueue, 'job' + str(jobIndex), 'cancelled' if 'job' + str(jobIndex) in cancelledIds else 'completed')
+        self.assertFalse(set(cancelledIds) & set(startedIds))
+
+
+if __name__ == '__main__':
+    unittest.main()